@@ -11,11 +11,25 @@ from app.db.base import Base
 from app.db import models as db_models
 from app.api.auth import get_current_user_any
 from app.core.security import hash_password
+from app.core.events import publish_ticket_created, publish_ticket_deleted
+from app.services import stock_levels  # noqa: F401  (applies ledger edits to stock_level)
+from app.services.inventory import InventoryService
+from app.services.ticket import TicketService
+from app.services.ticket_metrics import ticket_bucket
 from sqlalchemy import select, update
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Projection tables: rebuilt from the stock ledger and ticket events, never
+# written through the generic CRUD. Stock unit writes go through the
+# inventory service and ticket writes publish ticket events, which keep the
+# projections current.
+_DERIVED_MODELS: Dict[str, str] = {
+    "StockLevel": "stock is derived from the stock ledger; use the inventory endpoints or record a stock movement",
+    "TicketMetricsDaily": "ticket metrics are derived from ticket events; use the helpdesk ticket endpoints",
+}
+
 
 def _model_map() -> Dict[str, Type[Base]]:
     """Return a mapping of model name to SQLAlchemy ORM class.
@@ -59,6 +73,72 @@ def _get_model(name: str) -> Type[Base]:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model: {name}")
 
 
+def _check_writable(model: Type[Base]) -> None:
+    """Reject writes to projection tables.
+
+    Args:
+        model: Model class being written.
+
+    Raises:
+        HTTPException: If the model is derived from the stock ledger or ticket events.
+    """
+
+    if model.__name__ in _DERIVED_MODELS:
+        raise HTTPException(
+            status_code=status.HTTP_405_METHOD_NOT_ALLOWED,
+            detail=f"{model.__name__}: {_DERIVED_MODELS[model.__name__]}",
+        )
+
+
+async def _publish_ticket_write(
+    session: AsyncSession,
+    ticket: db_models.Chamado,
+    before: Optional[Tuple[Optional[int], Dict[str, int]]],
+    changed_fields: Optional[List[str]] = None,
+) -> None:
+    """Keep SLA deadlines current and publish the ticket event of an admin create, update or delete.
+
+    The helpdesk endpoints do the same, so the stored `sla_*_ate` deadlines
+    (SLA filters, the SLA scheduler) and ticket_metrics_daily follow tickets
+    written here too. Deadlines are recomputed on create and when status,
+    priority or agent change. Admin writes add no chamado_log entry and
+    therefore count no logged updates.
+
+    Args:
+        session: DB session of the write (flushed for creates).
+        ticket: Ticket being written.
+        before: (empresa_id, bucket) prior to the write; None for a create.
+        changed_fields: Changed column names for an update; None for a delete.
+    """
+
+    if before is None:
+        await session.flush()
+        await TicketService().refresh_sla_deadlines(session, ticket)
+        if ticket.empresa_id:
+            await publish_ticket_created(
+                session, ticket.id, ticket.empresa_id, ticket.numero, ticket.titulo,
+                bucket=ticket_bucket(ticket),
+            )
+        return
+    empresa_before, bucket_before = before
+    if changed_fields and set(changed_fields) & {"status_id", "prioridade_id", "agente_contato_id"}:
+        await TicketService().refresh_sla_deadlines(session, ticket)
+    if changed_fields is None or ticket.empresa_id != empresa_before:
+        # Deleted, or moved to another tenant: leave the old tenant's bucket
+        if empresa_before:
+            await publish_ticket_deleted(session, ticket.id, empresa_before, bucket=bucket_before)
+        if changed_fields is not None and ticket.empresa_id:
+            await publish_ticket_created(
+                session, ticket.id, ticket.empresa_id, ticket.numero, ticket.titulo,
+                bucket=ticket_bucket(ticket),
+            )
+        return
+    if changed_fields and ticket.empresa_id:
+        await TicketService().publish_ticket_change(
+            session, ticket, bucket_before, changed_fields, log_entries=0
+        )
+
+
 def _model_columns(model: Type[Base]) -> List[str]:
     """Return list of column names for a model (excluding relationships)."""
 
@@ -392,6 +472,7 @@ async def create_item(model: str, payload: Dict[str, Any], session: AsyncSession
     """
 
     m = _get_model(model)
+    _check_writable(m)
     cols = set(_model_columns(m))
     pk = _pk_column(m)
     column_to_attr = _get_column_to_attr_mapping(m)
@@ -409,6 +490,10 @@ async def create_item(model: str, payload: Dict[str, Any], session: AsyncSession
     obj = m(**data)
     session.add(obj)
     try:
+        if m is db_models.Chamado:
+            await _publish_ticket_write(session, obj, None)
+        elif m is db_models.Estoque:
+            await InventoryService().record_unit_created(session, obj)
         await session.commit()
     except IntegrityError as exc:
         await session.rollback()
@@ -431,12 +516,23 @@ async def update_item(model: str, item_id: int, payload: Dict[str, Any], session
     
     # Convert datetime values first
     converted_payload = _convert_datetime_values(m, payload)
+    changed = [
+        k for k, v in converted_payload.items()
+        if k in cols and k != pk and getattr(obj, column_to_attr.get(k, k)) != v
+    ]
+    _check_writable(m)
+    if m is db_models.Chamado:
+        before = (obj.empresa_id, ticket_bucket(obj))
+    elif m is db_models.Estoque:
+        await InventoryService().record_unit_edit(session, obj, {k: converted_payload[k] for k in changed})
     
     for k, v in converted_payload.items():
         if k in cols and k != pk:
             attr_name = column_to_attr.get(k, k)
             setattr(obj, attr_name, v)
     try:
+        if m is db_models.Chamado:
+            await _publish_ticket_write(session, obj, before, changed)
         await session.commit()
     except IntegrityError as exc:
         await session.rollback()
@@ -450,6 +546,7 @@ async def delete_item(model: str, item_id: int, session: AsyncSession = Depends(
     """Delete an item by primary key."""
 
     m = _get_model(model)
+    _check_writable(m)
     obj = await session.get(m, item_id)
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
@@ -461,6 +558,10 @@ async def delete_item(model: str, item_id: int, session: AsyncSession = Depends(
                 await session.execute(delete(getattr(db_models, "UserAuth")).where(getattr(db_models, "UserAuth").contato_id == item_id))
             except Exception:
                 pass
+        if m is db_models.Chamado:
+            await _publish_ticket_write(session, obj, (obj.empresa_id, ticket_bucket(obj)))
+        elif m is db_models.Estoque:
+            await InventoryService().record_unit_deleted(session, obj)
         await session.delete(obj)
         await session.commit()
     except IntegrityError as exc:
@@ -1,7 +1,9 @@
 from __future__ import annotations
 import logging
+from datetime import datetime
 from typing import Any, Dict, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
@@ -14,20 +16,30 @@ from app.core.authorization import (
     ResourceOwnershipValidator, UserRole
 )
 from app.core.exceptions import business_exception_to_http, BusinessLogicError
-from app.repositories.ativo import AtivoRepository
+from app.core.http_cache import etag_matches, make_etag, not_modified, query_fingerprint, set_etag
+from app.core.reference_data import priority_code, reference_data, status_code
+from app.repositories.ativo import ASSET_SORTS, DEFAULT_ASSET_SORT, AtivoRepository
 from app.services.inventory import InventoryService
+from app.services.stock_levels import stock_levels
+from app.services.data_export import MEDIA_TYPES as EXPORT_MEDIA_TYPES, ExportRange, data_exporter, export_filename
 from app.services.ticket import TicketService
 from app.services.ordem_servico import OrdemServicoService
-from app.db.models import StatusChamado, Prioridade, Contato, Pendencia, OrdemServicoPendenciaSolucao, OrdemServico
+from app.db.models import (
+    Chamado, Contato, Pendencia, OrdemServicoPendenciaSolucao, OrdemServico, OrdemServicoAtividade,
+)
 from app.repositories.chamado_defeito import ChamadoDefeitoRepository
 from app.schemas.helpdesk import (
     InventoryIntakeRequest,
     InventoryIntakeResponse,
+    InventoryBulkIntakeRequest,
+    InventoryBulkIntakeResponse,
+    StockLevelResponse,
     CreateTicketRequest,
     CreateTicketResponse,
     CreateServiceOrderRequest,
     CreateServiceOrderResponse,
     AssetSummary,
+    AssetListResponse,
     NamedEntity,
     ErrorResponse,
     SuccessResponse,
@@ -35,10 +47,14 @@ from app.schemas.helpdesk import (
     UpdateTicketRequest,
     TicketFilters,
     TicketListResponse,
+    TicketChangesResponse,
+    TicketImportResponse,
     TicketAnalyticsResponse,
     ServiceOrderDetailResponse,
     UpdateServiceOrderRequest,
     AddActivityRequest,
+    ServiceOrderActivityListResponse,
+    ServiceOrderActivityResponse,
     ServiceOrderFilters,
     ServiceOrderListResponse,
     ServiceOrderAnalyticsResponse,
@@ -96,6 +112,7 @@ async def inventory_intake(
             status_estoque_id=payload.status_estoque_id,
             qtd=int(payload.qtd or 1),
             auto_create_asset=payload.auto_create_asset,
+            user_auth_id=auth_context.user.id,
         )
         await session.commit()
         
@@ -121,24 +138,166 @@ async def inventory_intake(
         )
 
 
+@router.post(
+    "/inventory/intake/bulk",
+    response_model=InventoryBulkIntakeResponse,
+    responses={
+        200: {"description": "Shipment received"},
+        400: {"model": ErrorResponse, "description": "Invalid input data or duplicate serials"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        404: {"model": ErrorResponse, "description": "Catalog item or movement type not found"},
+        409: {"model": ErrorResponse, "description": "Serial number conflict"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="Process a bulk inventory intake",
+    description="Receive many units of one catalog item in a single transaction: serials are allocated in one block "
+                "and inventory items, assets and stock movements are inserted in batches. Requires agent or admin "
+                "role and manage inventory permission."
+)
+async def inventory_bulk_intake(
+    payload: InventoryBulkIntakeRequest,
+    session: AsyncSession = Depends(get_db),
+    auth_context: AuthorizationContext = Depends(require_agent_or_admin_role),
+) -> InventoryBulkIntakeResponse:
+    """
+    Receive a shipment of one catalog item; all-or-nothing.
+    Requires agent or admin role.
+    """
+    try:
+        if not auth_context.has_permission(Permission.MANAGE_INVENTORY):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to manage inventory"
+            )
+        
+        svc = InventoryService()
+        try:
+            summary = await svc.bulk_intake(
+                session=session,
+                empresa_id=auth_context.tenant.empresa_id,
+                catalogo_peca_id=payload.catalogo_peca_id,
+                units=[unit.dict() for unit in payload.units],
+                quantity=payload.quantity,
+                status_estoque_id=payload.status_estoque_id,
+                auto_create_asset=payload.auto_create_asset,
+                tipo_movimentacao_id=payload.tipo_movimentacao_id,
+                observacao=payload.observacao,
+                user_auth_id=auth_context.user.id,
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        
+        logger.info(
+            f"User {auth_context.user.id} received {summary['received']} units of catalog item "
+            f"{payload.catalogo_peca_id} for empresa {auth_context.tenant.empresa_id}"
+        )
+        return InventoryBulkIntakeResponse(**summary)
+        
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error in bulk inventory intake: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error in bulk inventory intake: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred during bulk inventory intake"
+        )
+
+
+@router.get(
+    "/inventory/stock-levels",
+    response_model=List[StockLevelResponse],
+    responses={
+        200: {"description": "Stock on hand per catalog item and status"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="List stock levels",
+    description="Quantity on hand per catalog item and inventory status, read from the stock level summary. "
+                "Requires view inventory permission."
+)
+async def list_stock_levels(
+    catalogo_peca_id: Optional[int] = Query(None, gt=0, description="Only this catalog item"),
+    session: AsyncSession = Depends(get_db),
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+) -> List[StockLevelResponse]:
+    """
+    List the company's stock levels.
+    Requires view inventory permission.
+    """
+    try:
+        if not auth_context.has_permission(Permission.VIEW_INVENTORY):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to view inventory"
+            )
+        
+        levels = await stock_levels.levels(session, auth_context.tenant.empresa_id, catalogo_peca_id)
+        return [
+            StockLevelResponse(
+                catalogo_peca_id=level.catalogo_peca_id,
+                status_estoque_id=level.status_estoque_id or None,
+                quantidade=level.quantidade,
+            )
+            for level in levels
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error listing stock levels: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while listing stock levels"
+        )
+
+
 @router.get(
     "/assets",
-    response_model=List[AssetSummary],
+    response_model=AssetListResponse,
     responses={
-        200: {"description": "List of assets for the current company"},
+        200: {"description": "Page of assets for the current company"},
+        304: {"description": "Not modified (If-None-Match matches the current ETag)"},
+        400: {"model": ErrorResponse, "description": "Invalid sort or cursor"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
     summary="List company assets",
-    description="Retrieve a list of all assets belonging to the authenticated user's company. Requires view assets permission."
+    description="Retrieve a page of the assets belonging to the authenticated user's company, with filters, sorting "
+                "and cursor pagination. Requires view assets permission."
 )
 async def list_assets(
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_db),
     auth_context: AuthorizationContext = Depends(get_authorization_context),
-) -> List[AssetSummary]:
+    tipo_ativo_id: Optional[int] = Query(None, gt=0, description="Filter by asset type ID"),
+    status_ativo_id: Optional[int] = Query(None, gt=0, description="Filter by asset status ID"),
+    local_instalacao_id: Optional[int] = Query(None, gt=0, description="Filter by installation location ID"),
+    contrato_id: Optional[int] = Query(None, gt=0, description="Filter by contract ID"),
+    # UI-friendly name filters
+    type_name: Optional[str] = Query(None, alias="type", description="Filter by asset type name (ignores case, accents and spaces)"),
+    status_name: Optional[str] = Query(None, alias="status", description="Filter by asset status name (ignores case, accents and spaces)"),
+    location_name: Optional[str] = Query(None, alias="location", description="Filter by location name (ignores case, accents and spaces)"),
+    search: Optional[str] = Query(None, description="Text search on serial, tag and description"),
+    sort: str = Query(DEFAULT_ASSET_SORT, description=f"Sort column ({', '.join(ASSET_SORTS)}), `-` prefix for descending"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    page: int = Query(1, ge=1, description="Page number (offset paging, ignored with a cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    include_total: bool = Query(True, description="Count the matching assets"),
+) -> AssetListResponse:
     """
-    List assets for the current company.
+    List assets for the current company, one page at a time.
     Requires view assets permission.
+
+    Pass `next_cursor`/`prev_cursor` from a previous response as `cursor` for
+    constant-cost paging; `page` keeps working for older clients. Send the
+    returned `ETag` as `If-None-Match` to get `304 Not Modified` while no
+    asset of the company changed.
     """
     try:
         # Check permission
@@ -148,69 +307,41 @@ async def list_assets(
                 detail="Insufficient permissions to view assets"
             )
         
+        filters: Dict[str, Any] = {
+            "tipo_ativo_id": tipo_ativo_id,
+            "status_ativo_id": status_ativo_id,
+            "local_instalacao_id": local_instalacao_id,
+            "contrato_id": contrato_id,
+            "tipo": type_name,
+            "status": status_name,
+            "local": location_name,
+            "search": search,
+        }
         repo = AtivoRepository()
-        items = await repo.list_by_empresa(session, auth_context.tenant.empresa_id)
+        empresa_id = auth_context.tenant.empresa_id
+        etag = make_etag(
+            "assets", empresa_id, query_fingerprint(request), await repo.list_version(session, empresa_id)
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
+        offset = (page - 1) * limit
+        page_data = await repo.list_page(session, empresa_id, filters, sort, limit, offset, cursor)
+        rows = page_data["items"]
+        total = await repo.count(session, empresa_id, filters) if include_total else len(rows)
         
-        logger.debug(f"User {auth_context.user.id} listed {len(items)} assets")
+        logger.debug(f"User {auth_context.user.id} listed {len(rows)} assets")
         
-        # Be tolerant with timestamp types: handle datetime and string
-        from datetime import datetime as _dt
-
-        def _format_created(value: Any) -> Optional[str]:
-            if value is None:
-                return None
-            try:
-                if isinstance(value, _dt):
-                    return value.isoformat()
-                # Already a string or other printable type
-                return str(value)
-            except Exception:
-                # Fallback without breaking listing
-                return None
-
-        summaries: List[AssetSummary] = []
-        for a in items:
-            try:
-                tipo = None
-                if getattr(a, "tipo", None) is not None:
-                    try:
-                        tipo = NamedEntity(id=getattr(a.tipo, "id", None), nome=getattr(a.tipo, "nome", None))
-                    except Exception:
-                        tipo = None
-
-                status = None
-                if getattr(a, "status", None) is not None:
-                    try:
-                        status = NamedEntity(id=getattr(a.status, "id", None), nome=getattr(a.status, "nome", None))
-                    except Exception:
-                        status = None
-
-                local_instalacao = None
-                if getattr(a, "local_instalacao", None) is not None:
-                    try:
-                        local_instalacao = NamedEntity(id=getattr(a.local_instalacao, "id", None), nome=getattr(a.local_instalacao, "nome", None))
-                    except Exception:
-                        local_instalacao = None
-
-                summaries.append(
-                    AssetSummary(
-                        id=a.id,
-                        serial_text=getattr(a, "serial_text", None),
-                        descricao=a.descricao,
-                        tag=a.tag,
-                        criado_em=_format_created(getattr(a, "criado_em", None)),
-                        tipo=tipo,
-                        status=status,
-                        local_instalacao=local_instalacao,
-                    )
-                )
-            except Exception as item_err:
-                logger.warning(
-                    f"Skipping asset {getattr(a, 'id', '?')} due to serialization error: {item_err}"
-                )
-                continue
-
-        return summaries
+        return AssetListResponse(
+            assets=[_asset_summary(row) for row in rows],
+            total=total,
+            limit=limit,
+            page=page,
+            total_pages=max(1, (total + limit - 1) // limit),
+            next_cursor=page_data["next_cursor"],
+            prev_cursor=page_data["prev_cursor"],
+        )
         
     except BusinessLogicError as e:
         logger.warning(f"Business logic error listing assets: {e}")
@@ -221,10 +352,30 @@ async def list_assets(
         logger.exception(f"Unexpected error listing assets: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"list_assets failed: {e}"
+            detail="An unexpected error occurred while listing assets"
         )
 
 
+def _named(entity_id: Optional[int], nome: Optional[str]) -> Optional[NamedEntity]:
+    return NamedEntity(id=entity_id, nome=nome) if entity_id is not None else None
+
+
+def _asset_summary(row: Any) -> AssetSummary:
+    """Build an `AssetSummary` from a projected `AtivoRepository.list_page` row."""
+    criado_em = row.criado_em
+    return AssetSummary(
+        id=row.id,
+        serial_text=row.serial_text,
+        descricao=row.descricao,
+        tag=row.tag,
+        criado_em=criado_em.isoformat() if isinstance(criado_em, datetime) else (str(criado_em) if criado_em else None),
+        tipo=_named(row.tipo_ativo_id, row.tipo_nome),
+        status=_named(row.status_ativo_id, row.status_nome),
+        local_instalacao=_named(row.local_instalacao_id, row.local_nome),
+        contrato=_named(row.contrato_id, row.contrato_nome),
+    )
+
+
 @router.post(
     "/tickets",
     response_model=TicketDetailResponse,
@@ -260,8 +411,7 @@ async def create_ticket(
             if not prioridade_id:
                 pr_text = (payload.prioridade or payload.priority or "").strip().lower()
                 if pr_text:
-                    result = await session.execute(select(Prioridade).where(Prioridade.nome.ilike(f"%{pr_text}%")))
-                    prow = result.scalars().first()
+                    prow = await reference_data.priority_by_name(session, pr_text)
                     if prow:
                         prioridade_id = prow.id
         except Exception:
@@ -302,6 +452,81 @@ async def create_ticket(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"{e.__class__.__name__}: {str(e)}")
 
 
+@router.post(
+    "/tickets/import",
+    response_model=TicketImportResponse,
+    responses={
+        200: {"description": "Import finished; rejected records are listed in `errors`"},
+        400: {"model": ErrorResponse, "description": "Unsupported file format"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="Bulk import tickets",
+    description="Stream a CSV (header row) or NDJSON file of tickets into the tenant in batched inserts."
+)
+async def import_tickets(
+    file: UploadFile = File(..., description="CSV or NDJSON file"),
+    import_format: Optional[str] = Query(None, alias="format", description="csv or ndjson (default: from the file name)"),
+    resume_after: int = Query(0, ge=0, description="Skip rows up to this `checkpoint` of a previous call"),
+    origem: str = "import",
+    session: AsyncSession = Depends(get_db),
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+) -> TicketImportResponse:
+    """
+    Bulk ticket import for migrations (see `app.services.ticket_import` for the columns).
+
+    Every batch commits on its own: on failure, call again with
+    `resume_after` set to the last `checkpoint` received.
+    """
+    import io
+    from app.services.ticket_import import IMPORT_FORMATS, TicketImporter, iter_records
+
+    committed = {"checkpoint": resume_after}
+    try:
+        if not auth_context.has_permission(Permission.MANAGE_TICKETS):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to import tickets"
+            )
+        fmt = (import_format or "").lower()
+        if not fmt:
+            name = (file.filename or "").lower()
+            fmt = "ndjson" if name.endswith((".ndjson", ".jsonl")) or "json" in (file.content_type or "") else "csv"
+        if fmt not in IMPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported format '{fmt}' (use {', '.join(IMPORT_FORMATS)})"
+            )
+
+        # The upload is spooled by Starlette; records are parsed from it one at a time
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        try:
+            result = await TicketImporter().run(
+                session, auth_context.tenant.empresa_id, iter_records(stream, fmt),
+                origem=origem, resume_after=resume_after,
+                on_checkpoint=lambda progress: committed.update(checkpoint=progress.checkpoint),
+            )
+        finally:
+            stream.detach()
+
+        logger.info(
+            f"User {auth_context.user.id} imported {result.imported} tickets ({result.failed} rejected)"
+        )
+        return TicketImportResponse(**result.to_dict())
+
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error importing tickets: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error importing tickets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred while importing tickets (resume_after={committed['checkpoint']})"
+        )
+
+
 @router.post("/service-orders", response_model=CreateServiceOrderResponse)
 async def create_service_order(
     payload: CreateServiceOrderRequest,
@@ -327,6 +552,7 @@ async def create_service_order(
     response_model=TicketListResponse,
     responses={
         200: {"description": "List of tickets with filtering and pagination"},
+        304: {"description": "Not modified (If-None-Match matches the current ETag)"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
@@ -334,6 +560,8 @@ async def create_service_order(
     description="Retrieve a paginated list of tickets with optional filtering by status, priority, assignment, etc."
 )
 async def list_tickets(
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_db),
     auth_context: AuthorizationContext = Depends(get_authorization_context),
     status_id: Optional[int] = None,
@@ -351,10 +579,17 @@ async def list_tickets(
     limit: int = 100,
     offset: int = 0,
     page: int = 1,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
 ) -> TicketListResponse:
     """
     List tickets with comprehensive filtering and pagination.
     Requires view tickets permission.
+
+    Pass `next_cursor`/`prev_cursor` from a previous response as `cursor` for
+    constant-cost paging; `page`/`offset` keep working for older clients.
+    Send the returned `ETag` as `If-None-Match` to get `304 Not Modified`
+    while no matching ticket changed.
     """
     try:
         if auth_context.role == UserRole.REQUESTER:
@@ -386,25 +621,23 @@ async def list_tickets(
             filters["ativo_id"] = ativo_id
         if search:
             filters["search"] = search
+        if sla:
+            # Evaluated in SQL on the stored SLA deadlines, so pages stay full
+            filters["sla"] = sla
         
         # Map textual filters to IDs
         if status and not filters.get("status_id"):
-            status_name = status.strip().lower()
-            result = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike(f"%{status_name}%")))
-            row = result.scalars().first()
+            row = await reference_data.status_by_name(session, status)
             if row:
                 filters["status_id"] = row.id
         if priority and not filters.get("prioridade_id"):
-            priority_name = priority.strip().lower()
-            result = await session.execute(select(Prioridade).where(Prioridade.nome.ilike(f"%{priority_name}%")))
-            prow = result.scalars().first()
+            prow = await reference_data.priority_by_name(session, priority)
             if prow:
                 filters["prioridade_id"] = prow.id
         if agent and not filters.get("agente_contato_id"):
             agent_val = agent.strip().lower()
             if agent_val == "unassigned":
-                # will filter after response build
-                pass
+                filters["unassigned"] = True
             else:
                 # try parse ID or resolve by name
                 try:
@@ -418,31 +651,30 @@ async def list_tickets(
         if auth_context.role == UserRole.REQUESTER:
             filters["requisitante_contato_id"] = auth_context.user.contato_id
         
+        ticket_svc = TicketService()
+        empresa_id = auth_context.tenant.empresa_id
+        etag = make_etag(
+            "tickets", empresa_id, auth_context.user.id, query_fingerprint(request),
+            await ticket_svc.list_version(session, empresa_id, filters),
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
         # Compute offset from page
         computed_offset = offset
         if page and page > 1:
             computed_offset = (page - 1) * limit
         
-        ticket_svc = TicketService()
-        tickets = await ticket_svc.list_tickets(
-            session, auth_context.tenant.empresa_id, filters, limit, computed_offset
+        page_data = await ticket_svc.list_tickets_page(
+            session, empresa_id, filters, limit, computed_offset, cursor=cursor
         )
+        tickets = page_data["tickets"]
         
-        # Convert to response format
-        ticket_responses = []
-        for ticket in tickets:
-            ticket_detail = await _build_ticket_detail_response(
-                session, ticket, auth_context.role, include_sla=True, include_actions=False
-            )
-            ticket_responses.append(ticket_detail)
+        # Convert to response format (batched: constant queries per page)
+        ticket_responses = await _build_ticket_list_responses(session, tickets, include_sla=True)
 
-        # Apply SLA filter if provided
-        if sla:
-            wanted = sla.strip().lower()
-            ticket_responses = [t for t in ticket_responses if (t.sla_status or "").lower() == wanted]
-        
-        # Get total count (simplified - in production, use a separate count query)
-        total = len(ticket_responses)
+        total = await ticket_svc.count_tickets(session, empresa_id, filters) if include_total else len(ticket_responses)
         total_pages = 1
         if limit:
             total_pages = max(1, (total + limit - 1) // limit)
@@ -455,7 +687,9 @@ async def list_tickets(
             limit=limit,
             offset=computed_offset,
             page=page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=page_data["next_cursor"],
+            prev_cursor=page_data["prev_cursor"],
         )
         
     except BusinessLogicError as e:
@@ -469,11 +703,182 @@ async def list_tickets(
         )
 
 
+@router.get(
+    "/tickets/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Export file, streamed in chunks"},
+        400: {"model": ErrorResponse, "description": "Invalid format or date range"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="Export tickets",
+    description="Stream every ticket of the tenant in the date range as CSV, NDJSON or Parquet (for BI / nightly exports)."
+)
+async def export_tickets(
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+    export_format: str = Query("csv", alias="format", description="csv, ndjson or parquet (needs pyarrow)"),
+    date_from: Optional[datetime] = Query(None, description="Inclusive lower bound on `date_field`"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive upper bound on `date_field`"),
+    date_field: str = Query("criado_em", description="Date column filtered by the range: criado_em, atualizado_em or fechado_em"),
+) -> StreamingResponse:
+    """
+    Rows are read with a streaming cursor and written chunk by chunk, so
+    memory stays constant whatever the export size. The export uses its own
+    database session (the response body is produced after this handler
+    returns).
+    """
+    try:
+        if not auth_context.has_permission(Permission.VIEW_TICKETS):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to export tickets"
+            )
+        period = ExportRange(date_from, date_to)
+        export_format = data_exporter.check_format(export_format)
+        body = data_exporter.tickets(auth_context.tenant.empresa_id, export_format, period, date_field)
+        return StreamingResponse(
+            body,
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{export_filename("tickets", export_format)}"'},
+        )
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error exporting tickets: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error exporting tickets: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while exporting tickets"
+        )
+
+
+@router.get(
+    "/tickets/changes",
+    response_model=TicketChangesResponse,
+    responses={
+        200: {"description": "Tickets, comments and status changes written after the cursor"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="Ticket change feed",
+    description="Incremental sync: returns only what changed after `cursor` (everything when omitted)."
+)
+async def list_ticket_changes(
+    session: AsyncSession = Depends(get_db),
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    latest: bool = False,
+) -> TicketChangesResponse:
+    """
+    Delta sync for bots and the web UI.
+
+    Store the returned `cursor` and pass it on the next call; while
+    `has_more` is true, call again immediately. Clients that just loaded the
+    ticket list can pass `latest=true` (without a cursor) to start from the
+    newest change. Requesters only receive their own tickets.
+    """
+    try:
+        if auth_context.role == UserRole.REQUESTER:
+            if not auth_context.has_permission(Permission.VIEW_OWN_TICKETS):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Insufficient permissions to view own tickets"
+                )
+        elif not auth_context.has_permission(Permission.VIEW_TICKETS):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to view tickets"
+            )
+        filters: Dict[str, Any] = {}
+        if auth_context.role == UserRole.REQUESTER:
+            filters["requisitante_contato_id"] = auth_context.user.contato_id
+
+        feed = await TicketService().list_ticket_changes(
+            session, auth_context.tenant.empresa_id, cursor, max(1, min(limit, 500)), filters, latest=latest
+        )
+        reference = await reference_data.load(session)
+        statuses = reference["status"].by_id
+        priorities = reference["priority"].by_id
+
+        def _status_of(status_id: Optional[int]) -> Optional[str]:
+            row = statuses.get(status_id)
+            return _status_code(row.nome) if row else None
+
+        def _iso(value: Any) -> Optional[str]:
+            return value.isoformat() if value else None
+
+        return TicketChangesResponse(
+            tickets=[
+                {
+                    "id": t.id,
+                    "numero": str(t.numero or ""),
+                    "titulo": str(t.titulo or ""),
+                    "status": _status_of(t.status_id),
+                    "status_id": t.status_id,
+                    "prioridade": _priority_code(getattr(priorities.get(t.prioridade_id), "nome", None)),
+                    "prioridade_id": t.prioridade_id,
+                    "categoria_id": t.categoria_id,
+                    "requisitante_contato_id": t.requisitante_contato_id,
+                    "agente_contato_id": t.agente_contato_id,
+                    "criado_em": _iso(t.criado_em),
+                    "atualizado_em": _iso(t.atualizado_em),
+                    "change_seq": t.change_seq,
+                }
+                for t in feed["tickets"]
+            ],
+            comments=[
+                {
+                    "id": c.id,
+                    "chamado_id": c.chamado_id,
+                    "contato_id": c.contato_id,
+                    "comentario": c.comentario,
+                    "data_hora": _iso(c.data_hora),
+                    "change_seq": c.change_seq,
+                }
+                for c in feed["comments"]
+            ],
+            status_changes=[
+                {
+                    "id": log.id,
+                    "chamado_id": log.chamado_id,
+                    "contato_id": log.contato_id,
+                    "de": _status_of(log.status_de_id),
+                    "para": _status_of(log.status_para_id),
+                    "de_id": log.status_de_id,
+                    "para_id": log.status_para_id,
+                    "data_hora": _iso(log.data_hora),
+                    "change_seq": log.change_seq,
+                }
+                for log in feed["status_changes"]
+            ],
+            cursor=feed["cursor"],
+            has_more=feed["has_more"],
+        )
+
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error reading ticket changes: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error reading ticket changes: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while reading ticket changes"
+        )
+
+
 @router.get(
     "/tickets/{ticket_id}",
     response_model=TicketDetailResponse,
     responses={
         200: {"description": "Ticket details with SLA status and next actions"},
+        304: {"description": "Not modified (If-None-Match matches the current ETag)"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         404: {"model": ErrorResponse, "description": "Ticket not found"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
@@ -483,11 +888,16 @@ async def list_tickets(
 )
 async def get_ticket(
         ticket_id: int,
+        request: Request,
+        response: Response,
         session: AsyncSession = Depends(get_db),
         auth_context: AuthorizationContext = Depends(get_authorization_context),
     ) -> TicketDetailResponse:
     """
     Get detailed ticket information with workflow context.
+
+    Send the returned `ETag` as `If-None-Match` to get `304 Not Modified`
+    while the ticket, its comments and its SLA state are unchanged.
     """
     try:
         if auth_context.role == UserRole.REQUESTER:
@@ -504,6 +914,17 @@ async def get_ticket(
                 )
         
         ticket_svc = TicketService()
+        role = auth_context.role.value if hasattr(auth_context.role, "value") else str(auth_context.role)
+        version = await ticket_svc.ticket_version(session, auth_context.tenant.empresa_id, ticket_id)
+        if version and (
+            auth_context.role != UserRole.REQUESTER
+            or version["requisitante_contato_id"] == auth_context.user.contato_id
+        ):
+            etag = make_etag("ticket", ticket_id, auth_context.tenant.empresa_id, role, version["version"])
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            set_etag(response, etag)
+
         ticket = await ticket_svc.get_by_id(
             session, auth_context.tenant.empresa_id, ticket_id
         )
@@ -529,7 +950,7 @@ async def get_ticket(
         ticket_detail = await _build_ticket_detail_response(
             session,
             ticket,
-            (auth_context.role.value if hasattr(auth_context.role, "value") else str(auth_context.role)),
+            role,
             include_sla=True,
             include_actions=True
         )
@@ -728,6 +1149,129 @@ async def get_ticket_analytics(
         )
 
 
+def _status_code(name: Optional[str]) -> Optional[str]:
+    """Normalize a StatusChamado name to the UI status code."""
+    return status_code(name)
+
+
+def _priority_code(name: Optional[str]) -> Optional[str]:
+    """Normalize a Prioridade name to the UI priority code."""
+    return priority_code(name)
+
+
+def _sla_indicator(sla_breaches: Dict[str, bool]) -> str:
+    """Map SLA breach flags to the UI indicator (breach, warning, ok)."""
+    if sla_breaches.get("response_breach") or sla_breaches.get("resolution_breach"):
+        return "breach"
+    if sla_breaches.get("escalation_needed"):
+        return "warning"
+    return "ok"
+
+
+async def _build_ticket_list_responses(
+    session: AsyncSession,
+    tickets: List["Chamado"],
+    include_sla: bool = True,
+) -> List[TicketDetailResponse]:
+    """Build list-row responses for a whole page of tickets.
+
+    Reads only the tickets' foreign keys; statuses, priorities and categories
+    come from the reference-data registry and comments/contacts from one `IN`
+    query per entity type, so the statement count per page is constant
+    regardless of page size. SLA state is computed in the same pass from the
+    resolved values.
+    """
+    from app.core.ticket_workflow import TicketWorkflowEngine
+    from app.db.models import ChamadoComentario
+    from datetime import datetime
+
+    if not tickets:
+        return []
+
+    async def _by_id(model: Any, ids: set) -> Dict[int, Any]:
+        ids.discard(None)
+        if not ids:
+            return {}
+        res = await session.execute(select(model).where(model.id.in_(ids)))
+        return {row.id: row for row in res.scalars().all()}
+
+    reference = await reference_data.load(session)
+    statuses = reference["status"].by_id
+    priorities = reference["priority"].by_id
+    categories = reference["category"].by_id
+
+    comments_by_ticket: Dict[int, List[Any]] = {t.id: [] for t in tickets}
+    res = await session.execute(
+        select(
+            ChamadoComentario.id, ChamadoComentario.chamado_id, ChamadoComentario.contato_id,
+            ChamadoComentario.comentario, ChamadoComentario.data_hora,
+        )
+        .where(ChamadoComentario.chamado_id.in_(comments_by_ticket.keys()))
+        .order_by(ChamadoComentario.id)
+    )
+    comment_rows = res.all()
+    for row in comment_rows:
+        comments_by_ticket[row.chamado_id].append(row)
+
+    contact_ids = {t.requisitante_contato_id for t in tickets} | {t.agente_contato_id for t in tickets}
+    contact_ids |= {row.contato_id for row in comment_rows}
+    contacts = await _by_id(Contato, contact_ids)
+
+    def _named(contato_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        contato = contacts.get(contato_id) if contato_id else None
+        return {"id": contato.id, "nome": contato.nome} if contato else None
+
+    workflow = TicketWorkflowEngine()
+    now = datetime.utcnow()
+    responses: List[TicketDetailResponse] = []
+    for ticket in tickets:
+        status_rel = statuses.get(ticket.status_id)
+        prioridade_rel = priorities.get(ticket.prioridade_id)
+        categoria_rel = categories.get(ticket.categoria_id)
+        comments = comments_by_ticket.get(ticket.id, [])
+        created = ticket.criado_em or now
+        updated = ticket.atualizado_em or ticket.criado_em or now
+        priority_code = _priority_code(getattr(prioridade_rel, "nome", None))
+        response_data: Dict[str, Any] = {
+            "id": ticket.id,
+            "numero": str(ticket.numero or ""),
+            "titulo": str(ticket.titulo or ""),
+            "descricao": ticket.descricao,
+            "status": _status_code(getattr(status_rel, "nome", None)),
+            "status_id": ticket.status_id,
+            "prioridade": priority_code,
+            "prioridade_id": ticket.prioridade_id,
+            "priority": priority_code,
+            "categoria": getattr(categoria_rel, "nome", None) or None,
+            "ativo_id": ticket.ativo_id,
+            "requisitante": _named(ticket.requisitante_contato_id),
+            "agente": _named(ticket.agente_contato_id),
+            "criado_em": created.isoformat(),
+            "atualizado_em": updated.isoformat(),
+            "fechado_em": (ticket.fechado_em.isoformat() if getattr(ticket.fechado_em, "isoformat", None) else (str(ticket.fechado_em) if ticket.fechado_em else None)),
+            "comentarios": [
+                {
+                    "id": c.id,
+                    "contato": _named(c.contato_id),
+                    "comentario": c.comentario,
+                    "data_hora": c.data_hora.isoformat() if c.data_hora else None,
+                }
+                for c in comments
+            ],
+        }
+        if include_sla:
+            sla_breaches = workflow.evaluate_sla(
+                workflow.priority_from_name(getattr(prioridade_rel, "nome", None)),
+                created,
+                has_response=ticket.agente_contato_id is not None or bool(comments),
+                is_resolved=workflow.is_resolved_status(getattr(status_rel, "nome", None)),
+                current_time=now,
+            )
+            response_data["sla_status"] = _sla_indicator(sla_breaches)
+        responses.append(TicketDetailResponse(**response_data))
+    return responses
+
+
 async def _build_ticket_detail_response(
     session: AsyncSession,
     ticket: "Chamado",
@@ -770,46 +1314,6 @@ async def _build_ticket_detail_response(
         # If any relation fails to load, continue building with available data
         pass
     
-    # Build basic response with normalized status/priority for UI
-    def _status_code(name: Optional[str]) -> Optional[str]:
-        if not name:
-            return None
-        n = name.strip().lower()
-        mapping = {
-            "novo": "new",
-            "new": "new",
-            "aberto": "open",
-            "open": "open",
-            "em andamento": "in_progress",
-            "em atendimento": "in_progress",
-            "in_progress": "in_progress",
-            "em espera": "pending_customer",
-            "espera": "pending_customer",
-            "aguardando": "pending_customer",
-            "aguardando cliente": "pending_customer",
-            "pending_customer": "pending_customer",
-            "resolvido": "resolved",
-            "resolved": "resolved",
-            "fechado": "closed",
-            "closed": "closed",
-        }
-        return mapping.get(n, n)
-
-    def _priority_code(name: Optional[str]) -> Optional[str]:
-        if not name:
-            return None
-        n = name.strip().lower()
-        mapping = {
-            "baixa": "low",
-            "low": "low",
-            "normal": "normal",
-            "alta": "high",
-            "high": "high",
-            "urgente": "urgent",
-            "urgent": "urgent",
-        }
-        return mapping.get(n, n)
-
     created = ticket.criado_em or datetime.utcnow()
     updated = ticket.atualizado_em or ticket.criado_em or datetime.utcnow()
     response_data = {
@@ -854,14 +1358,7 @@ async def _build_ticket_detail_response(
     if include_sla:
         workflow = TicketWorkflowEngine()
         sla_breaches = workflow.check_sla_breaches(ticket, datetime.utcnow())
-        # Map breaches to UI-friendly indicator
-        if sla_breaches.get("response_breach") or sla_breaches.get("resolution_breach"):
-            sla_indicator = "breach"
-        elif sla_breaches.get("escalation_needed"):
-            sla_indicator = "warning"
-        else:
-            sla_indicator = "ok"
-        response_data["sla_status"] = sla_indicator
+        response_data["sla_status"] = _sla_indicator(sla_breaches)
     
     # Add next actions if requested
     if include_actions:
@@ -872,11 +1369,63 @@ async def _build_ticket_detail_response(
     return TicketDetailResponse(**response_data)
 
 
+@router.get(
+    "/service-orders/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Export file, streamed in chunks"},
+        400: {"model": ErrorResponse, "description": "Invalid format or date range"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="Export service orders",
+    description="Stream every service order of the tenant in the date range (on data_hora_inicio) as CSV, NDJSON or Parquet."
+)
+async def export_service_orders(
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+    export_format: str = Query("csv", alias="format", description="csv, ndjson or parquet (needs pyarrow)"),
+    date_from: Optional[datetime] = Query(None, description="Inclusive lower bound on `data_hora_inicio`"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive upper bound on `data_hora_inicio`"),
+) -> StreamingResponse:
+    """
+    Rows are read with a streaming cursor and written chunk by chunk, so
+    memory stays constant whatever the export size. The export uses its own
+    database session (the response body is produced after this handler
+    returns).
+    """
+    try:
+        if not auth_context.has_permission(Permission.MANAGE_SERVICE_ORDERS):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to export service orders"
+            )
+        period = ExportRange(date_from, date_to)
+        export_format = data_exporter.check_format(export_format)
+        body = data_exporter.service_orders(auth_context.tenant.empresa_id, export_format, period)
+        return StreamingResponse(
+            body,
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{export_filename("service-orders", export_format)}"'},
+        )
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error exporting service orders: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error exporting service orders: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while exporting service orders"
+        )
+
+
 @router.get(
     "/service-orders",
     response_model=ServiceOrderListResponse,
     responses={
         200: {"description": "List of service orders with filtering and pagination"},
+        304: {"description": "Not modified (If-None-Match matches the current ETag)"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
@@ -884,6 +1433,8 @@ async def _build_ticket_detail_response(
     description="Retrieve a paginated list of service orders with optional filtering by type, ticket, etc."
 )
 async def list_service_orders(
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_db),
     auth_context: AuthorizationContext = Depends(get_authorization_context),
     tipo_os_id: Optional[int] = None,
@@ -897,6 +1448,7 @@ async def list_service_orders(
     """
     List service orders with comprehensive filtering and pagination.
     Requires manage service orders permission.
+    Supports `If-None-Match` (304 while no matching service order changed).
     """
     try:
         if auth_context.role == UserRole.REQUESTER:
@@ -931,12 +1483,20 @@ async def list_service_orders(
         if auth_context.role == UserRole.REQUESTER:
             filters["requisitante_contato_id"] = auth_context.tenant.contato_id
         
+        service_order_svc = OrdemServicoService()
+        etag = make_etag(
+            "service-orders", auth_context.tenant.empresa_id, auth_context.user.id, query_fingerprint(request),
+            await service_order_svc.list_version(session, auth_context.tenant.empresa_id, filters),
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+
         # Compute offset from page for UI parity with tickets
         computed_offset = offset
         if page and page > 1:
             computed_offset = (page - 1) * limit
         
-        service_order_svc = OrdemServicoService()
         service_orders = await service_order_svc.list_service_orders(
             session, auth_context.tenant.empresa_id, filters, limit, computed_offset
         )
@@ -980,6 +1540,7 @@ async def list_service_orders(
     response_model=ServiceOrderAnalyticsResponse,
     responses={
         200: {"description": "Service order analytics and time tracking"},
+        400: {"model": ErrorResponse, "description": "Invalid date range"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     },
@@ -990,9 +1551,13 @@ async def get_service_order_analytics(
     session: AsyncSession = Depends(get_db),
     auth_context: AuthorizationContext = Depends(get_authorization_context),
     user_specific: bool = False,
+    date_from: Optional[datetime] = Query(None, description="Only orders started at or after this time"),
+    date_to: Optional[datetime] = Query(None, description="Only orders started before this time"),
+    technician_id: Optional[int] = Query(None, description="Only orders assigned to or worked on by this contact"),
 ) -> ServiceOrderAnalyticsResponse:
     """
     Get comprehensive service order analytics with time tracking.
+    Aggregated in SQL over every matching service order.
     """
     try:
         # Check permission
@@ -1012,7 +1577,10 @@ async def get_service_order_analytics(
         analytics = await service_order_svc.get_service_order_analytics(
             session=session,
             empresa_id=auth_context.tenant.empresa_id,
-            user_id=auth_context.user.contato_id if user_specific else None
+            user_id=auth_context.user.contato_id if user_specific else None,
+            date_from=date_from,
+            date_to=date_to,
+            technician_id=technician_id,
         )
         
         logger.debug(f"Generated service order analytics for user {auth_context.user.id}")
@@ -1360,11 +1928,75 @@ async def add_service_order_activity(
         )
 
 
+@router.get(
+    "/service-orders/{service_order_id}/activities",
+    response_model=ServiceOrderActivityListResponse,
+    responses={
+        200: {"description": "Page of the activity log"},
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        403: {"model": ErrorResponse, "description": "Insufficient permissions"},
+        404: {"model": ErrorResponse, "description": "Service order not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    },
+    summary="List service order activities",
+    description="Page through a service order's activity log, oldest first, with billable time totals."
+)
+async def list_service_order_activities(
+    service_order_id: int,
+    session: AsyncSession = Depends(get_db),
+    auth_context: AuthorizationContext = Depends(get_authorization_context),
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> ServiceOrderActivityListResponse:
+    """
+    List activities of a service order with keyset pagination.
+    """
+    try:
+        if not auth_context.has_permission(Permission.MANAGE_SERVICE_ORDERS):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions to view service orders"
+            )
+
+        service_order_svc = OrdemServicoService()
+        so = await service_order_svc.get_by_id(
+            session, auth_context.tenant.empresa_id, service_order_id
+        )
+        if not so:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Service order with ID {service_order_id} not found"
+            )
+
+        page = await service_order_svc.list_activities(
+            session, service_order_id, limit=max(1, min(limit, 200)), cursor=cursor
+        )
+        return ServiceOrderActivityListResponse(
+            activities=[_activity_response(a) for a in page["activities"]],
+            next_cursor=page["next_cursor"],
+            prev_cursor=page["prev_cursor"],
+            time_tracking=await service_order_svc.calculate_billable_time(session, service_order_id),
+        )
+
+    except BusinessLogicError as e:
+        logger.warning(f"Business logic error listing activities of service order {service_order_id}: {e}")
+        raise business_exception_to_http(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Unexpected error listing activities of service order {service_order_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An unexpected error occurred while listing the activities"
+        )
+
+
 @router.get(
     "/service-orders/{service_order_id}",
     response_model=ServiceOrderDetailResponse,
     responses={
         200: {"description": "Service order details with activity tracking"},
+        304: {"description": "Not modified (If-None-Match matches the current ETag)"},
         403: {"model": ErrorResponse, "description": "Insufficient permissions"},
         404: {"model": ErrorResponse, "description": "Service order not found"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
@@ -1374,11 +2006,14 @@ async def add_service_order_activity(
 )
 async def get_service_order(
     service_order_id: int,
+    request: Request,
+    response: Response,
     session: AsyncSession = Depends(get_db),
     auth_context: AuthorizationContext = Depends(get_authorization_context),
 ) -> ServiceOrderDetailResponse:
     """
     Get detailed service order information with activity tracking.
+    Supports `If-None-Match` (304 while the service order is unchanged).
     """
     try:
         # Check permission
@@ -1389,6 +2024,15 @@ async def get_service_order(
             )
         
         service_order_svc = OrdemServicoService()
+        version = await service_order_svc.service_order_version(
+            session, auth_context.tenant.empresa_id, service_order_id
+        )
+        if version is not None:
+            etag = make_etag("service-order", service_order_id, auth_context.tenant.empresa_id, version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            set_etag(response, etag)
+
         so = await service_order_svc.get_by_id(
             session, auth_context.tenant.empresa_id, service_order_id
         )
@@ -1421,6 +2065,21 @@ async def get_service_order(
         )
 
 
+SERVICE_ORDER_DETAIL_ACTIVITIES = 50
+
+
+def _activity_response(activity: "OrdemServicoAtividade") -> ServiceOrderActivityResponse:
+    return ServiceOrderActivityResponse(
+        id=activity.id,
+        timestamp=activity.timestamp.isoformat() if activity.timestamp else None,
+        user_id=activity.contato_id,
+        activity_type=activity.activity_type,
+        description=activity.description,
+        duration_minutes=activity.duration_minutes,
+        billable=activity.billable,
+    )
+
+
 async def _build_service_order_detail_response(
     session: AsyncSession,
     service_order: "OrdemServico",
@@ -1428,7 +2087,6 @@ async def _build_service_order_detail_response(
     include_time_tracking: bool = False
 ) -> ServiceOrderDetailResponse:
     """Helper function to build detailed service order response."""
-    import json
     from app.core.service_order_workflow import ServiceOrderWorkflowEngine
     
     # Build basic response
@@ -1446,24 +2104,26 @@ async def _build_service_order_detail_response(
         "status": "draft",  # Default status (would be from actual status field in production)
     }
     
-    # Add activities if requested
-    if include_activities and service_order.observacao:
-        try:
-            activities = json.loads(service_order.observacao)
-            if isinstance(activities, list):
-                response_data["activities"] = activities
-        except json.JSONDecodeError:
-            # If observacao is not JSON, treat as single note
-            response_data["activities"] = [{"description": service_order.observacao, "type": "note"}]
+    service_order_svc = OrdemServicoService()
+    # Add activities if requested (first page; the rest through /service-orders/{id}/activities)
+    if include_activities:
+        page = await service_order_svc.list_activities(
+            session, service_order.id, limit=SERVICE_ORDER_DETAIL_ACTIVITIES
+        )
+        response_data["activities"] = [
+            _activity_response(a).model_dump() for a in page["activities"]
+        ]
     
     # Add time tracking if requested
     if include_time_tracking and service_order.data_hora_inicio:
         workflow = ServiceOrderWorkflowEngine()
         if service_order.data_hora_fim:
             duration = workflow.calculate_duration(service_order.data_hora_inicio, service_order.data_hora_fim)
+            billable = await service_order_svc.calculate_billable_time(session, service_order.id)
             response_data["time_tracking"] = {
                 "total_hours": round(duration / 60, 2),
-                "billable_hours": round(duration / 60, 2),  # Simplified - would calculate from activities
+                # Logged activity time when there is any, the whole span otherwise
+                "billable_hours": billable["billable_hours"] if billable["total_minutes"] else round(duration / 60, 2),
                 "duration_minutes": duration
             }
     
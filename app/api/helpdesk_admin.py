@@ -8,9 +8,10 @@ from app.db.models import (
     HelpdeskMacro,
     HelpdeskSLAOverride,
     HelpdeskAutoClosePolicy,
-    StatusChamado,
-    Chamado,
 )
+from app.services.notification_queue import enqueue_email
+from app.services.ticket_auto_close import auto_close_scheduler
+from app.services.ticket_routing import routing_engine
 from app.core.helpdesk_config import load_notifications_config, save_notifications_config
 
 router = APIRouter(prefix="/admin/helpdesk", tags=["admin"])
@@ -25,6 +26,8 @@ async def get_routing(auth: AuthorizationContext = Depends(get_authorization_con
                 "id": r.id,
                 "categoria_id": r.categoria_id,
                 "prioridade_id": r.prioridade_id,
+                "origem": r.origem,
+                "tipo_ativo_id": r.tipo_ativo_id,
                 "agente_contato_id": r.agente_contato_id,
                 "ativo": r.ativo,
             }
@@ -32,7 +35,7 @@ async def get_routing(auth: AuthorizationContext = Depends(get_authorization_con
         ]
     except Exception:
         rules = []
-    return {"empresa_id": empresa_id, "rules": rules}
+    return {"empresa_id": empresa_id, "version": routing_engine.version(empresa_id), "rules": rules}
 
 @router.put("/routing")
 async def put_routing(payload: dict, auth: AuthorizationContext = Depends(get_authorization_context), session: AsyncSession = Depends(get_db)):
@@ -44,12 +47,16 @@ async def put_routing(payload: dict, auth: AuthorizationContext = Depends(get_au
             empresa_id=empresa_id,
             categoria_id=it.get("categoria_id"),
             prioridade_id=it.get("prioridade_id"),
+            origem=it.get("origem"),
+            tipo_ativo_id=it.get("tipo_ativo_id"),
             agente_contato_id=it.get("agente_contato_id"),
             ativo=bool(it.get("ativo", True)),
         )
         session.add(rule)
     await session.commit()
-    return {"ok": True}
+    # The bulk delete bypasses ORM events, so drop the compiled table explicitly
+    routing_engine.invalidate(empresa_id)
+    return {"ok": True, "version": routing_engine.version(empresa_id)}
 
 @router.get("/macros")
 async def get_macros(auth: AuthorizationContext = Depends(get_authorization_context), session: AsyncSession = Depends(get_db)):
@@ -118,15 +125,16 @@ async def put_sla_overrides(payload: dict, auth: AuthorizationContext = Depends(
             escalation_hours=int(it.get("escalation_hours", 48)),
         )
         session.add(ov)
-    await session.commit()
     try:
-        from app.services.notification_email import EmailNotifier
         from app.core.config import get_settings
-        notifier = EmailNotifier()
         team = get_settings().NOTIFY_SLA_TEAM_EMAILS
-        notifier.send_sla_overrides_updated(team, {"empresa_id": empresa_id})
+        await enqueue_email(
+            session, "sla_overrides_updated", team, {"empresa_id": empresa_id},
+            empresa_id=empresa_id, aggregate_type="empresa", aggregate_id=empresa_id,
+        )
     except Exception:
         pass
+    await session.commit()
     return {"ok": True}
 
 @router.get("/notifications")
@@ -174,37 +182,12 @@ async def put_auto_close_policy(payload: dict, auth: AuthorizationContext = Depe
     await session.commit()
     return {"ok": True}
 
+@router.get("/auto-close/status")
+async def get_auto_close_status(auth: AuthorizationContext = Depends(get_authorization_context)):
+    """Progress of the tenant's latest auto-close run."""
+    return auto_close_scheduler.status(auth.tenant.empresa_id).to_dict()
+
 @router.post("/run-auto-close")
-async def run_auto_close(auth: AuthorizationContext = Depends(get_authorization_context), session: AsyncSession = Depends(get_db)):
-    from datetime import datetime, timedelta
-    empresa_id = auth.tenant.empresa_id
-    polres = await session.execute(select(HelpdeskAutoClosePolicy).where(HelpdeskAutoClosePolicy.empresa_id == empresa_id))
-    pol = polres.scalars().first()
-    if not pol or not pol.enabled:
-        return {"closed": 0}
-    pending_days = int(pol.pending_customer_days)
-    resolved_days = int(pol.resolved_days)
-    now = datetime.utcnow()
-    status_rows = await session.execute(select(StatusChamado))
-    statuses = {s.nome.strip().lower(): s for s in status_rows.scalars().all()}
-    def _get(name: str):
-        return statuses.get(name) or statuses.get(name.replace("_", " "))
-    pending = _get("pending_customer") or _get("aguardando cliente") or _get("em espera")
-    closed = _get("closed") or _get("fechado")
-    resolved = _get("resolved") or _get("resolvido")
-    if not closed:
-        return {"closed": 0}
-    q = select(Chamado).where(Chamado.empresa_id == empresa_id)
-    res = await session.execute(q)
-    tickets = res.scalars().all()
-    count = 0
-    for t in tickets:
-        status_name = (t.status.nome if t.status else "").strip().lower()
-        if pending and status_name in [pending.nome.strip().lower()] and t.atualizado_em and t.atualizado_em < now - timedelta(days=pending_days):
-            t.status_id = closed.id
-            count += 1
-        if resolved and status_name in [resolved.nome.strip().lower()] and t.atualizado_em and t.atualizado_em < now - timedelta(days=resolved_days):
-            t.status_id = closed.id
-            count += 1
-    await session.commit()
-    return {"closed": count}
+async def run_auto_close(auth: AuthorizationContext = Depends(get_authorization_context)):
+    """Start an auto-close run for the tenant now; poll /auto-close/status for progress."""
+    return auto_close_scheduler.trigger(auth.tenant.empresa_id).to_dict()
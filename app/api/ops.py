@@ -14,6 +14,8 @@ from app.core.authorization import (
     UserRole,
 )
 from app.core.config import get_settings
+from app.services.email_templates import email_templates
+from app.services.sla_scheduler import sla_scheduler
 
 router = APIRouter(prefix="/api", tags=["infra"])
 
@@ -30,6 +32,8 @@ async def get_performance_metrics(auth_context: AuthorizationContext = Depends(g
         "cache": cache_health,
         "database": db_stats,
         "performance": perf_stats,
+        "email_templates": email_templates.get_stats(),
+        "sla_scheduler": sla_scheduler.get_stats(),
     }
 
 
@@ -17,6 +17,28 @@ class Settings(BaseSettings):
 
     # DB
     DB_URL: AnyUrl | str = "sqlite+aiosqlite:///./app.db"
+    DB_ENGINE_PROFILE: str = Field(default="pooled", description="pooled|high_concurrency|nullpool")
+    # Overrides for the selected profile (None keeps the per-dialect default)
+    DB_POOL_SIZE: int | None = None
+    DB_MAX_OVERFLOW: int | None = None
+    DB_POOL_TIMEOUT: float | None = None
+    DB_POOL_PRE_PING: bool | None = None
+    DB_POOL_RECYCLE: int | None = None
+    DB_STATEMENT_CACHE_SIZE: int | None = None
+
+    # SQLite pragmas (applied on every new connection)
+    SQLITE_JOURNAL_MODE: str = Field(default="WAL", description="DELETE|TRUNCATE|PERSIST|MEMORY|WAL|OFF")
+    SQLITE_SYNCHRONOUS: str = Field(default="NORMAL", description="OFF|NORMAL|FULL|EXTRA")
+    SQLITE_CACHE_SIZE: int = Field(default=-64000, description="Pages, or KiB when negative")
+    SQLITE_MMAP_SIZE: int = 268435456
+    SQLITE_TEMP_STORE: str = Field(default="MEMORY", description="DEFAULT|FILE|MEMORY")
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+
+    # Lookup caches / search / analytics
+    REFERENCE_DATA_TTL_SECONDS: int = Field(default=300, description="Max age of cached status/priority/category lookups; 0 disables expiry")
+    ROUTING_TABLE_TTL_SECONDS: int = Field(default=300, description="Max age of compiled ticket routing tables; 0 disables expiry")
+    TICKET_SEARCH_FTS: bool = Field(default=True, description="Use the FTS5/tsvector index for ticket search when present")
+    TICKET_METRICS_ROLLUP: bool = Field(default=True, description="Read ticket counts from ticket_metrics_daily when populated")
 
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -42,6 +64,33 @@ class Settings(BaseSettings):
     NOTIFY_SLA_ON_ESCALATION: bool = True
     NOTIFY_SLA_ON_OVERRIDES_UPDATED: bool = True
     NOTIFY_SLA_TEAM_EMAILS: list[str] = []
+    # Auto-close job (per-tenant HelpdeskAutoClosePolicy)
+    AUTO_CLOSE_SCHEDULE_ENABLED: bool = True
+    AUTO_CLOSE_INTERVAL_SECONDS: float = Field(default=3600.0, description="Time between scheduled auto-close passes")
+    AUTO_CLOSE_BATCH_SIZE: int = Field(default=500, description="Tickets closed per UPDATE/commit")
+    # SLA deadline scheduler (fires breach alerts when deadlines pass)
+    SLA_SCHEDULER_ENABLED: bool = True
+    SLA_SCHEDULER_BATCH_SIZE: int = Field(default=200, description="Due deadlines handled per transaction")
+    SLA_SCHEDULER_MAX_SLEEP_SECONDS: float = Field(
+        default=60.0, description="Longest wait between checks when no deadline is due sooner"
+    )
+    # Bulk ticket import (CSV / NDJSON)
+    TICKET_IMPORT_BATCH_SIZE: int = Field(default=500, description="Imported rows inserted per batch/commit")
+    TICKET_IMPORT_MAX_ERRORS: int = Field(default=1000, description="Row errors reported per import (further ones are only counted)")
+    # Bulk inventory intake (one transaction per shipment)
+    INVENTORY_BULK_MAX_UNITS: int = Field(default=5000, description="Maximum units accepted by one bulk intake call")
+    # Streaming exports (tickets / service orders)
+    EXPORT_CHUNK_SIZE: int = Field(default=1000, description="Rows fetched and encoded per chunk by streaming exports")
+    # Notification queue (outbox-backed, drained by a background worker)
+    NOTIFY_QUEUE_BATCH_SIZE: int = 50
+    NOTIFY_QUEUE_POLL_SECONDS: float = Field(default=5.0, description="Max wait between outbox polls when idle")
+    NOTIFY_QUEUE_MAX_RETRIES: int = 6
+    NOTIFY_QUEUE_BACKOFF_SECONDS: float = Field(default=30.0, description="First retry delay; doubles per attempt")
+    NOTIFY_QUEUE_BACKOFF_MAX_SECONDS: float = 3600.0
+    NOTIFY_QUEUE_LEASE_SECONDS: float = Field(default=300.0, description="Claimed messages are retried after this if the worker dies")
+    EMAIL_RENDER_CACHE_SIZE: int = Field(default=512, description="Rendered email bodies kept for identical contexts; 0 disables")
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+    SMTP_IDLE_SECONDS: float = Field(default=60.0, description="Close the reused SMTP connection after this idle time")
 
 @lru_cache
 def get_settings() -> Settings:
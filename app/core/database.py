@@ -177,8 +177,7 @@ class DatabaseManager:
             
             # Check table existence
             async with engine.connect() as connection:
-                inspector = inspect(connection.sync_connection)
-                tables = inspector.get_table_names()
+                tables = await connection.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
                 
                 expected_tables = [
                     "empresa", "contato", "user_auth", "ativo", "estoque",
@@ -204,7 +203,9 @@ class DatabaseManager:
                         "size_bytes": db_size,
                         "size_mb": round(db_size / (1024 * 1024), 2)
                     }
-            
+
+                health_status["checks"]["sqlite_pragmas"] = await self.check_sqlite_pragmas()
+
             # Overall status
             failed_checks = [check for check in health_status["checks"].values() if check["status"] == "fail"]
             if failed_checks:
@@ -219,6 +220,42 @@ class DatabaseManager:
         
         return health_status
 
+    async def check_sqlite_pragmas(self) -> Dict[str, Any]:
+        """Read back the pragmas applied by the application engine's connect hook.
+
+        Uses the shared engine from `app.db.session` (not an ad hoc one) so the
+        values reflect what request sessions actually run with.
+        """
+        from app.db.session import engine as app_engine, sqlite_pragmas
+
+        # PRAGMA read-back returns enum pragmas as integers
+        enum_names = {
+            "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+            "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+        }
+        try:
+            expected = sqlite_pragmas(self.settings)
+            applied: Dict[str, Any] = {}
+            async with app_engine.connect() as connection:
+                for name in expected:
+                    value = (await connection.execute(text(f"PRAGMA {name}"))).scalar()
+                    if name in enum_names:
+                        value = enum_names[name].get(value, value)
+                    elif isinstance(value, str):
+                        value = value.upper()
+                    applied[name] = value
+
+            mismatched = [name for name, value in expected.items() if applied.get(name) != value]
+            return {
+                "status": "pass" if not mismatched else "warn",
+                "applied": applied,
+                "expected": expected,
+                "mismatched": mismatched,
+            }
+        except Exception as e:
+            logger.error(f"Error reading SQLite pragmas: {e}")
+            return {"status": "warn", "error": str(e)}
+
     async def ensure_schema_consistency(self) -> None:
         """Ensure critical columns and indexes exist; apply lightweight fixes for SQLite."""
         engine = create_async_engine(str(self.settings.DB_URL))
@@ -364,8 +401,7 @@ class DatabaseManager:
             
             async with engine.connect() as connection:
                 # Get table row counts
-                inspector = inspect(connection.sync_connection)
-                tables = inspector.get_table_names()
+                tables = await connection.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
                 
                 table_stats = {}
                 for table in tables:
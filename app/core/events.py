@@ -10,7 +10,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Callable
 from dataclasses import dataclass, asdict
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import insert, select, and_, or_
 
 from app.db.event_models import OutboxEvent, EventStatus, EventType
 from app.core.exceptions import ValidationError
@@ -29,6 +29,7 @@ class DomainEvent:
     metadata: Optional[Dict[str, Any]] = None
     empresa_id: Optional[int] = None
     occurred_at: Optional[datetime] = None
+    max_retries: Optional[int] = None
 
     def __post_init__(self):
         if not self.occurred_at:
@@ -116,6 +117,63 @@ class TicketStatusChangedEvent(DomainEvent):
         )
 
 
+@dataclass
+class TicketUpdatedEvent(DomainEvent):
+    """Event fired when ticket fields other than the status change."""
+    
+    def __init__(self, ticket_id: int, empresa_id: int, changed_fields: List[str], **kwargs):
+        super().__init__(
+            event_id=str(uuid.uuid4()),
+            event_type=EventType.TICKET_UPDATED,
+            aggregate_type="ticket",
+            aggregate_id=str(ticket_id),
+            payload={
+                "ticket_id": ticket_id,
+                "changed_fields": changed_fields,
+                **kwargs
+            },
+            empresa_id=empresa_id
+        )
+
+
+@dataclass
+class TicketDeletedEvent(DomainEvent):
+    """Event fired when a ticket is deleted."""
+    
+    def __init__(self, ticket_id: int, empresa_id: int, **kwargs):
+        super().__init__(
+            event_id=str(uuid.uuid4()),
+            event_type=EventType.TICKET_DELETED,
+            aggregate_type="ticket",
+            aggregate_id=str(ticket_id),
+            payload={
+                "ticket_id": ticket_id,
+                **kwargs
+            },
+            empresa_id=empresa_id
+        )
+
+
+@dataclass
+class TicketSlaBreachedEvent(DomainEvent):
+    """Event fired when a ticket passes one of its SLA deadlines (response, resolution, escalation)."""
+    
+    def __init__(self, ticket_id: int, empresa_id: int, kind: str, deadline: datetime, **kwargs):
+        super().__init__(
+            event_id=str(uuid.uuid4()),
+            event_type=EventType.TICKET_SLA_BREACHED,
+            aggregate_type="ticket",
+            aggregate_id=str(ticket_id),
+            payload={
+                "ticket_id": ticket_id,
+                "kind": kind,
+                "deadline": deadline.isoformat(),
+                **kwargs
+            },
+            empresa_id=empresa_id
+        )
+
+
 @dataclass
 class ServiceOrderCreatedEvent(DomainEvent):
     """Event fired when a service order is created."""
@@ -135,6 +193,35 @@ class ServiceOrderCreatedEvent(DomainEvent):
         )
 
 
+@dataclass
+class EmailNotificationEvent(DomainEvent):
+    """Queued email notification, delivered by the notification worker."""
+    
+    def __init__(
+        self,
+        kind: str,
+        to: List[str],
+        context: Dict[str, Any],
+        empresa_id: Optional[int] = None,
+        aggregate_type: str = "ticket",
+        aggregate_id: Optional[Any] = None,
+        **kwargs
+    ):
+        super().__init__(
+            event_id=str(uuid.uuid4()),
+            event_type=EventType.NOTIFICATION_EMAIL,
+            aggregate_type=aggregate_type,
+            aggregate_id=str(aggregate_id if aggregate_id is not None else empresa_id or 0),
+            payload={
+                "kind": kind,
+                "to": to,
+                "context": context,
+            },
+            empresa_id=empresa_id,
+            **kwargs
+        )
+
+
 class EventDispatcher:
     """
     Event dispatcher for publishing domain events using the outbox pattern.
@@ -143,6 +230,7 @@ class EventDispatcher:
     
     def __init__(self):
         self._event_handlers: Dict[str, List[Callable]] = {}
+        self._projectors: Dict[str, List[Callable]] = {}
     
     async def publish_event(self, session: AsyncSession, event: DomainEvent) -> None:
         """
@@ -166,12 +254,17 @@ class EventDispatcher:
                 payload=event.payload,
                 event_metadata=event.metadata or {},
                 empresa_id=event.empresa_id,
-                status=EventStatus.PENDING
+                status=EventStatus.PENDING,
+                max_retries=event.max_retries or 3,
             )
             
             session.add(outbox_event)
             await session.flush()
             
+            # Projections are updated in the same transaction as the outbox row
+            for projector in self._projectors.get(event.event_type, []):
+                await projector(session, event)
+            
             logger.info(f"Published event {event.event_type} for {event.aggregate_type}:{event.aggregate_id}")
             
         except Exception as e:
@@ -189,6 +282,39 @@ class EventDispatcher:
         for event in events:
             await self.publish_event(session, event)
     
+    async def record_events(self, session: AsyncSession, events: List[DomainEvent]) -> None:
+        """
+        Insert outbox rows for many events in one statement.
+        
+        Projectors are not run: bulk writers (e.g. the auto-close job) update
+        the projections themselves in aggregate, in the same transaction.
+        
+        Args:
+            session: Database session (must be part of the business transaction)
+            events: Domain events to store
+        """
+        if not events:
+            return
+        await session.execute(
+            insert(OutboxEvent),
+            [
+                {
+                    "event_id": event.event_id,
+                    "event_type": event.event_type,
+                    "aggregate_type": event.aggregate_type,
+                    "aggregate_id": event.aggregate_id,
+                    "payload": event.payload,
+                    "event_metadata": event.metadata or {},
+                    "empresa_id": event.empresa_id,
+                    "status": EventStatus.PENDING,
+                    "retry_count": 0,
+                    "max_retries": event.max_retries or 3,
+                }
+                for event in events
+            ],
+        )
+        logger.info(f"Recorded {len(events)} events in the outbox")
+    
     async def get_pending_events(
         self, 
         session: AsyncSession, 
@@ -282,6 +408,24 @@ class EventDispatcher:
         self._event_handlers[event_type].append(handler)
         logger.info(f"Registered handler for event type: {event_type}")
     
+    def register_projector(self, event_type: str, projector: Callable) -> None:
+        """
+        Register a projector run synchronously inside `publish_event`.
+        
+        Unlike handlers, projectors receive the publishing session and the
+        `DomainEvent` itself, so read models they maintain commit or roll back
+        together with the business change. Registering the same projector
+        twice is a no-op.
+        
+        Args:
+            event_type: Event type to project
+            projector: Async function `(session, event) -> None`
+        """
+        projectors = self._projectors.setdefault(event_type, [])
+        if projector not in projectors:
+            projectors.append(projector)
+            logger.info(f"Registered projector for event type: {event_type}")
+    
     async def process_event(self, session: AsyncSession, event: OutboxEvent) -> bool:
         """
         Process a single event by calling registered handlers.
@@ -412,6 +556,29 @@ async def publish_ticket_status_changed(
     await event_dispatcher.publish_event(session, event)
 
 
+async def publish_ticket_updated(
+    session: AsyncSession, 
+    ticket_id: int, 
+    empresa_id: int, 
+    changed_fields: List[str],
+    **kwargs
+) -> None:
+    """Publish ticket updated event."""
+    event = TicketUpdatedEvent(ticket_id, empresa_id, changed_fields, **kwargs)
+    await event_dispatcher.publish_event(session, event)
+
+
+async def publish_ticket_deleted(
+    session: AsyncSession, 
+    ticket_id: int, 
+    empresa_id: int,
+    **kwargs
+) -> None:
+    """Publish ticket deleted event."""
+    event = TicketDeletedEvent(ticket_id, empresa_id, **kwargs)
+    await event_dispatcher.publish_event(session, event)
+
+
 async def publish_service_order_created(
     session: AsyncSession, 
     service_order_id: int, 
@@ -21,12 +21,6 @@ def _save_json(name: str, data: Any) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-def load_routing_rules() -> Dict[str, Any]:
-    return _load_json("routing_rules", {"by_category": {}, "by_priority": {}, "default_agent_id": None})
-
-def save_routing_rules(data: Dict[str, Any]) -> None:
-    _save_json("routing_rules", data)
-
 def load_macros() -> List[Dict[str, Any]]:
     return _load_json("macros", [])
 
@@ -0,0 +1,63 @@
+"""
+Conditional GET helpers (ETag / If-None-Match).
+
+Read endpoints derive a weak ETag from cheap version data - a row's
+`change_seq`, or the max `change_seq` and row count of a filtered listing -
+plus everything else the body depends on (caller, role, query parameters).
+When the client's `If-None-Match` matches, the endpoint answers
+`304 Not Modified` before loading or serializing anything:
+
+    etag = make_etag("ticket", user.id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+"""
+
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response, status
+
+# Responses are per user; let clients keep them but always revalidate
+CACHE_CONTROL = "private, no-cache"
+VARY = "Authorization, Cookie"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the string form of `parts`."""
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's `If-None-Match` matches `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = VARY
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current validators."""
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
+
+
+def query_fingerprint(request: Request) -> str:
+    """Order-independent form of the query string, for listing ETags."""
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
@@ -0,0 +1,154 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque, URL-safe tokens carrying the sort key of the boundary row
+and the direction to read in. Queries seek past that row with a compound
+`(sort_column, id)` predicate instead of an OFFSET, so every page costs the
+same regardless of depth.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.exceptions import ValidationError
+
+NEXT = "next"
+PREV = "prev"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def encode_cursor(sort_value: Any, row_id: int, direction: str = NEXT, sort_key: Optional[str] = None) -> str:
+    """Encode a boundary row into an opaque cursor.
+
+    Args:
+        sort_value: Value of the sort column for the boundary row.
+        row_id: Primary key of the boundary row (tie-breaker).
+        direction: `next` to read rows after it, `prev` to read rows before it.
+        sort_key: Optional name of the sort column, checked on decode.
+
+    Returns:
+        str: URL-safe cursor token.
+    """
+    payload: Dict[str, Any] = {"v": sort_value, "id": row_id, "d": direction}
+    if sort_key:
+        payload["s"] = sort_key
+    raw = json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: Optional[str] = None) -> Dict[str, Any]:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor: Cursor token.
+        sort_key: Expected sort column name, if the cursor carries one.
+
+    Returns:
+        Dict with `value`, `id` and `direction`.
+
+    Raises:
+        ValidationError: If the cursor is malformed or was built for another sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        row_id = int(payload["id"])
+        direction = payload.get("d", NEXT)
+        if direction not in (NEXT, PREV):
+            raise ValueError(direction)
+    except Exception:
+        raise ValidationError("Invalid pagination cursor", {"cursor": cursor})
+    if sort_key and payload.get("s", sort_key) != sort_key:
+        raise ValidationError("Cursor does not match the requested sort order", {"cursor": cursor, "sort": sort_key})
+    return {"value": payload.get("v"), "id": row_id, "direction": direction}
+
+
+def keyset_predicate(
+    sort_column: Any,
+    id_column: Any,
+    cursor: Dict[str, Any],
+    descending: bool = True,
+) -> ColumnElement:
+    """Build the seek predicate for reading past the cursor row.
+
+    The boundary sort value is read back from the cursor row itself (falling
+    back to the value stored in the cursor if the row is gone), so comparisons
+    happen between values in the database's own storage format.
+
+    Args:
+        sort_column: Column the listing is ordered by.
+        id_column: Primary key column used as tie-breaker.
+        cursor: Decoded cursor (see `decode_cursor`).
+        descending: Whether the listing is ordered newest/highest first.
+
+    Returns:
+        SQL boolean expression.
+    """
+    boundary_value = cursor["value"]
+    try:
+        is_datetime = sort_column.type.python_type is datetime
+    except NotImplementedError:
+        is_datetime = False
+    if is_datetime and isinstance(boundary_value, str):
+        try:
+            boundary_value = datetime.fromisoformat(boundary_value)
+        except ValueError:
+            pass
+    boundary = func.coalesce(
+        select(sort_column).where(id_column == cursor["id"]).scalar_subquery(),
+        boundary_value,
+    )
+    # Reading "next" on a descending listing (or "prev" on an ascending one) walks down the keys
+    walk_down = descending == (cursor["direction"] == NEXT)
+    if walk_down:
+        return or_(sort_column < boundary, and_(sort_column == boundary, id_column < cursor["id"]))
+    return or_(sort_column > boundary, and_(sort_column == boundary, id_column > cursor["id"]))
+
+
+def keyset_order(sort_column: Any, id_column: Any, descending: bool = True, direction: str = NEXT) -> List[Any]:
+    """Return ORDER BY clauses for reading in `direction` (prev pages are read reversed)."""
+    read_desc = descending == (direction == NEXT)
+    if read_desc:
+        return [sort_column.desc(), id_column.desc()]
+    return [sort_column.asc(), id_column.asc()]
+
+
+def page_cursors(
+    rows: Sequence[Any],
+    sort_attr: str,
+    has_more: bool,
+    direction: str = NEXT,
+    had_cursor: bool = False,
+    sort_key: Optional[str] = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """Compute `(next_cursor, prev_cursor)` for a page already in display order.
+
+    Args:
+        rows: Page rows in display order.
+        sort_attr: Attribute holding the sort value on each row.
+        has_more: Whether a row exists beyond the page in the read direction.
+        direction: Direction the page was read in.
+        had_cursor: Whether the page itself was reached through a cursor/offset.
+        sort_key: Sort column name embedded in the cursors.
+
+    Returns:
+        Tuple of next and previous cursors (None when there is no such page).
+    """
+    if not rows:
+        return None, None
+    first, last = rows[0], rows[-1]
+    more_after = has_more if direction == NEXT else had_cursor
+    more_before = had_cursor if direction == NEXT else has_more
+    next_cursor = encode_cursor(getattr(last, sort_attr), last.id, NEXT, sort_key) if more_after else None
+    prev_cursor = encode_cursor(getattr(first, sort_attr), first.id, PREV, sort_key) if more_before else None
+    return next_cursor, prev_cursor
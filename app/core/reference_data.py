@@ -0,0 +1,244 @@
+"""
+In-process registry for the small helpdesk lookup tables.
+
+StatusChamado, Prioridade and ChamadoCategoria hold a handful of rows and only
+change through admin CRUD, yet tickets resolve them by id or by (EN/PT) name
+on every create, update and filtered listing. The registry loads each table
+once, indexes it by id, normalized name and canonical alias code, and is
+invalidated whenever an ORM flush writes one of these models. A TTL bounds
+staleness for writes made by other processes.
+"""
+
+import asyncio
+import logging
+import time
+import unicodedata
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models import ChamadoCategoria, Prioridade, StatusChamado
+
+logger = logging.getLogger(__name__)
+
+# Canonical code -> accepted names (EN code first, then PT labels in preference order)
+STATUS_ALIASES: Dict[str, List[str]] = {
+    "new": ["new", "novo"],
+    "open": ["open", "aberto"],
+    "in_progress": ["in_progress", "em andamento", "em atendimento"],
+    "pending_customer": [
+        "pending_customer", "aguardando cliente", "em espera", "pendente cliente", "aguardando", "espera",
+    ],
+    "resolved": ["resolved", "resolvido"],
+    "closed": ["closed", "fechado", "concluído"],
+}
+
+PRIORITY_ALIASES: Dict[str, List[str]] = {
+    "low": ["low", "baixa"],
+    "normal": ["normal"],
+    "high": ["high", "alta"],
+    "urgent": ["urgent", "urgente"],
+    "critical": ["critical", "crítica"],
+}
+
+REFERENCE_MODELS = (StatusChamado, Prioridade, ChamadoCategoria)
+
+
+def normalize_name(name: Any) -> str:
+    """Lower-case, accent-free, single-spaced form of a lookup name (`_` counts as space)."""
+    text = unicodedata.normalize("NFKD", str(name or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.replace("_", " ").lower().split())
+
+
+def _alias_index(aliases: Dict[str, List[str]]) -> Dict[str, str]:
+    return {normalize_name(alias): code for code, names in aliases.items() for alias in names}
+
+
+_STATUS_CODES = _alias_index(STATUS_ALIASES)
+_PRIORITY_CODES = _alias_index(PRIORITY_ALIASES)
+
+
+def status_code(name: Optional[str]) -> Optional[str]:
+    """Map a StatusChamado name to its canonical code (unknown names are returned lower-cased)."""
+    if not name:
+        return None
+    return _STATUS_CODES.get(normalize_name(name), name.strip().lower())
+
+
+def priority_code(name: Optional[str]) -> Optional[str]:
+    """Map a Prioridade name to its canonical code (unknown names are returned lower-cased)."""
+    if not name:
+        return None
+    return _PRIORITY_CODES.get(normalize_name(name), name.strip().lower())
+
+
+@dataclass(frozen=True)
+class ReferenceEntry:
+    """Detached snapshot of one lookup row."""
+    id: int
+    nome: str
+    code: Optional[str] = None
+
+
+class ReferenceTable:
+    """One lookup table indexed by id, normalized name and alias code."""
+
+    def __init__(self, entries: Iterable[ReferenceEntry], aliases: Optional[Dict[str, List[str]]] = None):
+        self.entries: List[ReferenceEntry] = sorted(entries, key=lambda e: e.id)
+        self.aliases = aliases or {}
+        self._codes = _alias_index(self.aliases)
+        self.by_id: Dict[int, ReferenceEntry] = {e.id: e for e in self.entries}
+        self.by_name: Dict[str, ReferenceEntry] = {}
+        self.by_code: Dict[str, List[ReferenceEntry]] = {}
+        for entry in self.entries:
+            self.by_name.setdefault(normalize_name(entry.nome), entry)
+            if entry.code:
+                self.by_code.setdefault(entry.code, []).append(entry)
+
+    def get(self, entry_id: Optional[int]) -> Optional[ReferenceEntry]:
+        return self.by_id.get(entry_id) if entry_id else None
+
+    def first_containing(self, terms: Iterable[str]) -> Optional[ReferenceEntry]:
+        """First entry (by id) whose normalized name contains one of `terms`, tried in order."""
+        for term in terms:
+            needle = normalize_name(term)
+            if not needle:
+                continue
+            for entry in self.entries:
+                if needle in normalize_name(entry.nome):
+                    return entry
+        return None
+
+    def resolve(self, name: Optional[str]) -> Optional[ReferenceEntry]:
+        """Resolve a free-text name: exact name, then alias code, then substring matches.
+
+        Args:
+            name: Name, label or canonical code in EN or PT (case/accent-insensitive).
+
+        Returns:
+            Matching entry or None.
+        """
+        norm = normalize_name(name)
+        if not norm:
+            return None
+        entry = self.by_name.get(norm)
+        if entry:
+            return entry
+        code = self._codes.get(norm)
+        if code and self.by_code.get(code):
+            return self.by_code[code][0]
+        entry = self.first_containing([norm])
+        if entry or not code:
+            return entry
+        return self.first_containing(self.aliases[code])
+
+
+class ReferenceDataRegistry:
+    """Process-wide cache of the helpdesk lookup tables."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self._ttl_seconds = ttl_seconds
+        self._tables: Optional[Dict[str, ReferenceTable]] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return get_settings().REFERENCE_DATA_TTL_SECONDS
+
+    def invalidate(self) -> None:
+        """Drop the cached tables; the next lookup reloads them."""
+        self._version += 1
+        self._tables = None
+
+    def _fresh(self) -> Optional[Dict[str, ReferenceTable]]:
+        tables = self._tables
+        if tables is None:
+            return None
+        ttl = self.ttl_seconds
+        if ttl and time.monotonic() - self._loaded_at > ttl:
+            return None
+        return tables
+
+    async def load(self, session: AsyncSession) -> Dict[str, ReferenceTable]:
+        """Return the cached tables, loading them through `session` when missing or stale."""
+        tables = self._fresh()
+        if tables is not None:
+            return tables
+        async with self._lock:
+            tables = self._fresh()
+            if tables is not None:
+                return tables
+            version = self._version
+            status_rows = (await session.execute(select(StatusChamado.id, StatusChamado.nome))).all()
+            priority_rows = (await session.execute(select(Prioridade.id, Prioridade.nome))).all()
+            category_rows = (await session.execute(select(ChamadoCategoria.id, ChamadoCategoria.nome))).all()
+            tables = {
+                "status": ReferenceTable(
+                    (ReferenceEntry(r.id, r.nome, _STATUS_CODES.get(normalize_name(r.nome))) for r in status_rows),
+                    STATUS_ALIASES,
+                ),
+                "priority": ReferenceTable(
+                    (ReferenceEntry(r.id, r.nome, _PRIORITY_CODES.get(normalize_name(r.nome))) for r in priority_rows),
+                    PRIORITY_ALIASES,
+                ),
+                "category": ReferenceTable(ReferenceEntry(r.id, r.nome) for r in category_rows),
+            }
+            # Only publish the snapshot if no write invalidated it while loading
+            if version == self._version:
+                self._tables = tables
+                self._loaded_at = time.monotonic()
+            return tables
+
+    async def statuses(self, session: AsyncSession) -> ReferenceTable:
+        return (await self.load(session))["status"]
+
+    async def priorities(self, session: AsyncSession) -> ReferenceTable:
+        return (await self.load(session))["priority"]
+
+    async def categories(self, session: AsyncSession) -> ReferenceTable:
+        return (await self.load(session))["category"]
+
+    async def status_by_name(self, session: AsyncSession, name: Optional[str]) -> Optional[ReferenceEntry]:
+        return (await self.statuses(session)).resolve(name)
+
+    async def priority_by_name(self, session: AsyncSession, name: Optional[str]) -> Optional[ReferenceEntry]:
+        return (await self.priorities(session)).resolve(name)
+
+    async def category_by_name(self, session: AsyncSession, name: Optional[str]) -> Optional[ReferenceEntry]:
+        return (await self.categories(session)).resolve(name)
+
+
+reference_data = ReferenceDataRegistry()
+
+
+_DIRTY_KEY = "reference_data_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session: Session, flush_context: Any) -> None:
+    if any(isinstance(obj, REFERENCE_MODELS) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_DIRTY_KEY] = True
+        reference_data.invalidate()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    # Readers may have reloaded the uncommitted rows between flush and commit
+    if session.info.pop(_DIRTY_KEY, False):
+        reference_data.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _invalidate_on_rollback(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        reference_data.invalidate()
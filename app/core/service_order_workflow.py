@@ -6,7 +6,7 @@ Handles service order status transitions, activity tracking, and time logging.
 import logging
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -222,6 +222,11 @@ class ServiceOrderWorkflowEngine:
                 else:
                     non_billable_minutes += activity.duration_minutes
         
+        return self.billable_summary(billable_minutes, non_billable_minutes)
+
+    @staticmethod
+    def billable_summary(billable_minutes: int, non_billable_minutes: int) -> Dict[str, Any]:
+        """Shape billable / non-billable minute totals (shared with the SQL aggregate)."""
         return {
             "billable_minutes": billable_minutes,
             "non_billable_minutes": non_billable_minutes,
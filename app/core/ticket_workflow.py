@@ -194,19 +194,10 @@ class TicketWorkflowEngine:
         Returns:
             Dictionary indicating which SLAs have been breached
         """
-        if not current_time:
-            current_time = datetime.utcnow()
-        
         # Determine priority from ticket
-        priority = TicketPriority.NORMAL  # Default
+        priority_name = None
         if ticket.prioridade and hasattr(ticket.prioridade, 'nome'):
-            priority_name = ticket.prioridade.nome.lower()
-            for p in TicketPriority:
-                if p.value in priority_name:
-                    priority = p
-                    break
-        
-        deadlines = self.calculate_sla_deadlines(priority, ticket.criado_em)
+            priority_name = ticket.prioridade.nome
         
         # Check if ticket has been responded to (has agent assigned or comments)
         has_response = (
@@ -214,8 +205,49 @@ class TicketWorkflowEngine:
             (hasattr(ticket, 'comentarios') and len(ticket.comentarios) > 0)
         )
         
-        # Check if ticket is resolved
-        is_resolved = ticket.status and ticket.status.nome.lower() in ['resolved', 'closed']
+        is_resolved = self.is_resolved_status(ticket.status.nome if ticket.status else None)
+        
+        return self.evaluate_sla(
+            self.priority_from_name(priority_name), ticket.criado_em,
+            has_response, is_resolved, current_time
+        )
+    
+    @staticmethod
+    def priority_from_name(priority_name: Optional[str]) -> TicketPriority:
+        """Map a Prioridade name to a TicketPriority (NORMAL when unknown)."""
+        if priority_name:
+            lowered = priority_name.lower()
+            for p in TicketPriority:
+                if p.value in lowered:
+                    return p
+        return TicketPriority.NORMAL
+    
+    @staticmethod
+    def is_resolved_status(status_name: Optional[str]) -> bool:
+        """Whether a StatusChamado name counts as resolved for SLA purposes."""
+        return bool(status_name) and status_name.lower() in ['resolved', 'closed']
+    
+    def evaluate_sla(
+        self,
+        priority: TicketPriority,
+        created_at: datetime,
+        has_response: bool,
+        is_resolved: bool,
+        current_time: Optional[datetime] = None
+    ) -> Dict[str, bool]:
+        """
+        Evaluate SLA breaches from plain ticket attributes.
+        
+        Lets callers that already hold the relevant values (e.g. batch list
+        builders) skip loading relationships on every ticket.
+        
+        Returns:
+            Dictionary indicating which SLAs have been breached
+        """
+        if not current_time:
+            current_time = datetime.utcnow()
+        
+        deadlines = self.calculate_sla_deadlines(priority, created_at)
         
         return {
             "response_breach": not has_response and current_time > deadlines["response_deadline"],
@@ -238,6 +270,16 @@ class TicketWorkflowEngine:
         Returns:
             List of escalation recommendations
         """
+        priority_name = ticket.prioridade.nome if ticket.prioridade else None
+        return self.recommend_escalations(sla_breaches, priority_name, ticket.agente_contato_id)
+    
+    def recommend_escalations(
+        self,
+        sla_breaches: Dict[str, bool],
+        priority_name: Optional[str],
+        agente_contato_id: Optional[int]
+    ) -> List[str]:
+        """Escalation recommendations from plain ticket attributes (see `get_escalation_recommendations`)."""
         recommendations = []
         
         if sla_breaches["response_breach"]:
@@ -250,8 +292,8 @@ class TicketWorkflowEngine:
             recommendations.append("Escalate to manager - ticket requires immediate attention")
         
         # Additional business rules
-        if ticket.prioridade and "critical" in ticket.prioridade.nome.lower():
-            if not ticket.agente_contato_id:
+        if priority_name and "critical" in priority_name.lower():
+            if not agente_contato_id:
                 recommendations.append("Critical ticket requires immediate agent assignment")
         
         return recommendations
@@ -10,6 +10,9 @@ from app.db.base import Base
 from datetime import datetime
 from enum import Enum
 
+# SQLite only auto-increments INTEGER PRIMARY KEY (rowid alias), not BIGINT.
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class EventStatus(str, Enum):
     """Event processing status."""
@@ -36,6 +39,7 @@ class EventType(str, Enum):
     # Ticket events
     TICKET_CREATED = "ticket.created"
     TICKET_UPDATED = "ticket.updated"
+    TICKET_DELETED = "ticket.deleted"
     TICKET_STATUS_CHANGED = "ticket.status.changed"
     TICKET_ASSIGNED = "ticket.assigned"
     TICKET_RESOLVED = "ticket.resolved"
@@ -57,6 +61,9 @@ class EventType(str, Enum):
     # Company events
     COMPANY_CREATED = "company.created"
     COMPANY_UPDATED = "company.updated"
+    
+    # Notification events
+    NOTIFICATION_EMAIL = "notification.email"
 
 
 class OutboxEvent(Base):
@@ -66,7 +73,7 @@ class OutboxEvent(Base):
     """
     __tablename__ = "outbox_events"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True, index=True)
     
     # Event identification
     event_id: Mapped[str] = mapped_column(String(255), nullable=False, unique=True, index=True)
@@ -138,7 +145,7 @@ class WebhookDelivery(Base):
     """
     __tablename__ = "webhook_deliveries"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True, index=True)
     
     # References
     webhook_endpoint_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
@@ -174,7 +181,7 @@ class IntegrationLog(Base):
     """
     __tablename__ = "integration_logs"
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id: Mapped[int] = mapped_column(BigIntPK, primary_key=True, autoincrement=True, index=True)
     
     # Integration details
     integration_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)  # whatsapp, ai_gateway, etc.
@@ -1,11 +1,12 @@
 # app/db/models.py
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, Boolean, ForeignKey, UniqueConstraint,
-    JSON, BigInteger
+    Column, Integer, String, Text, Date, DateTime, Boolean, ForeignKey, UniqueConstraint,
+    JSON, BigInteger, Index
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy import text, MetaData
 from app.db.base import Base
+from app.db.search_ddl import install_ticket_search_ddl
 from sqlalchemy import UniqueConstraint
 
 convention = {
@@ -199,6 +200,8 @@ class Ativo(Base):
     __tablename__ = "ativo"
     __table_args__ = (
         UniqueConstraint("empresa_id", "serial_text", name="uq_ativo_empresa_serial"),
+        Index("ix_ativo_empresa_change_seq", "empresa_id", "change_seq"),
+        Index("ix_ativo_empresa_criado_em", "empresa_id", "criado_em", "id"),
     )
 
     id = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
@@ -223,7 +226,9 @@ class Ativo(Base):
     # novo serial textual, único por empresa
     serial_text = mapped_column(Text, nullable=False)
 
-    criado_em = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=True)
+    criado_em = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
+    # Row version stamped from the global `change_seq` counter on every write (ETags)
+    change_seq = mapped_column(BigInteger, nullable=False, server_default=text("0"))
 
     # relationships (ajuste nomes conforme seu padrão):
     empresa = relationship("Empresa")
@@ -254,6 +259,9 @@ class OrdemServicoPendenciaSolucao(Base):
 
 class OrdemServico(Base):
     __tablename__ = "ordem_servico"
+    __table_args__ = (
+        Index("ix_ordem_servico_change_seq", "change_seq"),
+    )
     chamados = relationship(
         "Chamado",
         secondary="ordem_servico_chamado",
@@ -271,6 +279,8 @@ class OrdemServico(Base):
     observacao: Mapped[str | None] = mapped_column(Text)
     numero_apr: Mapped[str | None] = mapped_column(Text)
     tipo_os_id: Mapped[int | None] = mapped_column(ForeignKey("tipo_os.id"))
+    # Row version stamped from the global `change_seq` counter on every write (ETags)
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
 
     tipo = relationship("TipoOS", back_populates="ordens_servico")
     chamado = relationship("Chamado", back_populates="ordens_servico", foreign_keys=[chamado_id])
@@ -282,6 +292,26 @@ class OrdemServico(Base):
         lazy="selectin",
     )
 
+
+class OrdemServicoAtividade(Base):
+    """Append-only activity log of a service order (one row per entry)."""
+    __tablename__ = "ordem_servico_atividade"
+    __table_args__ = (
+        Index("ix_ordem_servico_atividade_os_timestamp", "ordem_servico_id", "timestamp", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    ordem_servico_id: Mapped[int] = mapped_column(
+        ForeignKey("ordem_servico.id", ondelete="CASCADE"), nullable=False
+    )
+    timestamp: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
+    contato_id: Mapped[int | None] = mapped_column(ForeignKey("contato.id"))
+    activity_type: Mapped[str] = mapped_column(Text, nullable=False)
+    description: Mapped[str | None] = mapped_column(Text)
+    duration_minutes: Mapped[int | None] = mapped_column(Integer)
+    billable: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+
 class Pendencia(Base):
     __tablename__ = "pendencia"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
@@ -630,6 +660,11 @@ class Chamado(Base):
     __tablename__ = "chamado"
     __table_args__ = (
         UniqueConstraint("empresa_id", "numero", name="uq_chamado_empresa_numero"),
+        Index("ix_chamado_empresa_sla_resposta", "empresa_id", "sla_resposta_ate"),
+        Index("ix_chamado_empresa_sla_resolucao", "empresa_id", "sla_resolucao_ate"),
+        Index("ix_chamado_empresa_sla_escalonamento", "empresa_id", "sla_escalonamento_ate"),
+        Index("ix_chamado_empresa_change_seq", "empresa_id", "change_seq"),
+        Index("ix_chamado_change_seq", "change_seq"),
     )
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
@@ -649,6 +684,12 @@ class Chamado(Base):
     criado_em: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
     atualizado_em: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
     fechado_em: Mapped[DateTime | None] = mapped_column(DateTime)
+    # Pending SLA deadlines; cleared once met (responded / resolved) so breach checks are index range scans
+    sla_resposta_ate: Mapped[DateTime | None] = mapped_column(DateTime)
+    sla_resolucao_ate: Mapped[DateTime | None] = mapped_column(DateTime)
+    sla_escalonamento_ate: Mapped[DateTime | None] = mapped_column(DateTime)
+    # Change-feed position: bumped from the global `change_seq` counter on every write to the ticket, its comments or logs
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
     origem_os_pendencia_id: Mapped[int | None] = mapped_column(ForeignKey("ordem_servico.id"))
 
     empresa = relationship("Empresa", back_populates="chamados")
@@ -664,14 +705,21 @@ class Chamado(Base):
     ordens_servico = relationship("OrdemServico", back_populates="chamado", foreign_keys="OrdemServico.chamado_id")
 
 
+install_ticket_search_ddl(Chamado.__table__)
+
+
 class ChamadoComentario(Base):
     __tablename__ = "chamado_comentario"
+    __table_args__ = (
+        Index("ix_chamado_comentario_chamado_change_seq", "chamado_id", "change_seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     chamado_id: Mapped[int] = mapped_column(ForeignKey("chamado.id"), nullable=False)
     contato_id: Mapped[int | None] = mapped_column(ForeignKey("contato.id"))
     comentario: Mapped[str] = mapped_column(Text, nullable=False)
     data_hora: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
 
     contato = relationship("Contato", back_populates="comentarios_chamado")
     chamado = relationship("Chamado", back_populates="comentarios")
@@ -679,15 +727,48 @@ class ChamadoComentario(Base):
 
 class ChamadoLog(Base):
     __tablename__ = "chamado_log"
+    __table_args__ = (
+        Index("ix_chamado_log_chamado_change_seq", "chamado_id", "change_seq"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     chamado_id: Mapped[int] = mapped_column(ForeignKey("chamado.id"), nullable=False)
     contato_id: Mapped[int | None] = mapped_column(ForeignKey("contato.id"))
     id_alteracao: Mapped[str | None] = mapped_column(Text)
     data_hora: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
+    # Status transition recorded by this entry, if any
+    status_de_id: Mapped[int | None] = mapped_column(ForeignKey("status_chamado.id"))
+    status_para_id: Mapped[int | None] = mapped_column(ForeignKey("status_chamado.id"))
+    change_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
 
     chamado = relationship("Chamado", back_populates="logs")
     contato = relationship("Contato", back_populates="logs_chamado")
+
+
+class ChamadoSlaAlerta(Base):
+    """SLA deadline alert already fired for a ticket (one row per ticket, kind and deadline)."""
+    __tablename__ = "chamado_sla_alerta"
+    __table_args__ = (
+        UniqueConstraint("chamado_id", "tipo", "prazo", name="uq_chamado_sla_alerta"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    chamado_id: Mapped[int] = mapped_column(ForeignKey("chamado.id", ondelete="CASCADE"), nullable=False)
+    empresa_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    tipo: Mapped[str] = mapped_column(Text, nullable=False)  # response | resolution | escalation
+    prazo: Mapped[DateTime] = mapped_column(DateTime, nullable=False)
+    disparado_em: Mapped[DateTime] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"), nullable=False)
+
+
+class ChangeSequence(Base):
+    """Named monotonic counters (e.g. the change feed's `change_seq`); one row per counter."""
+    __tablename__ = "change_sequence"
+
+    nome: Mapped[str] = mapped_column(Text, primary_key=True)
+    valor: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+
 class TicketSequence(Base):
     __tablename__ = "ticket_sequence"
     __table_args__ = (
@@ -711,6 +792,65 @@ class TicketCounter(Base):
     next_value: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
 
+class SerialCounter(Base):
+    """Per-tenant counter behind generated serials, one row per kind (ATIVO / ESTOQUE)."""
+    __tablename__ = "serial_counter"
+    __table_args__ = (
+        UniqueConstraint("empresa_id", "kind", name="uq_serial_counter_empresa_kind"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    empresa_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    next_value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+
+
+class StockLevel(Base):
+    """Stock on hand per tenant, catalog item and inventory status.
+
+    Maintained from `movimentacao_estoque` in the transaction that records
+    the movement, so availability is a primary-key lookup instead of a scan
+    of `estoque`. `status_estoque_id` uses 0 for "no status" (it is part of
+    the primary key).
+    """
+    __tablename__ = "stock_level"
+
+    empresa_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    catalogo_peca_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    status_estoque_id: Mapped[int] = mapped_column(Integer, primary_key=True, default=0)
+    quantidade: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    atualizado_em: Mapped[DateTime | None] = mapped_column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+
+
+class TicketMetricsDaily(Base):
+    """Per-day ticket flow counters, one row per tenant/day/status/priority/agent.
+
+    Dimension columns use 0 for "none" so the natural key stays unique (NULLs
+    never conflict in a unique constraint). The current ticket count of a
+    bucket is `SUM(created_count + moved_in_count - moved_out_count)` over
+    its days.
+    """
+    __tablename__ = "ticket_metrics_daily"
+    __table_args__ = (
+        UniqueConstraint(
+            "empresa_id", "day", "status_id", "prioridade_id", "agente_contato_id",
+            name="uq_ticket_metrics_daily_bucket",
+        ),
+        Index("ix_ticket_metrics_daily_empresa_day", "empresa_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    empresa_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    day: Mapped[Date] = mapped_column(Date, nullable=False)
+    status_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    prioridade_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    agente_contato_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    moved_in_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    moved_out_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class HelpdeskRoutingRule(Base, TimestampMixin):
     __tablename__ = "helpdesk_routing_rule"
 
@@ -718,6 +858,9 @@ class HelpdeskRoutingRule(Base, TimestampMixin):
     empresa_id: Mapped[int] = mapped_column(ForeignKey("empresa.id"), nullable=False, index=True)
     categoria_id: Mapped[int | None] = mapped_column(ForeignKey("chamado_categoria.id"), index=True)
     prioridade_id: Mapped[int | None] = mapped_column(ForeignKey("prioridade.id"), index=True)
+    # Optional extra criteria; NULL matches any origin / asset type
+    origem: Mapped[str | None] = mapped_column(Text)
+    tipo_ativo_id: Mapped[int | None] = mapped_column(ForeignKey("tipo_ativo.id"))
     agente_contato_id: Mapped[int | None] = mapped_column(ForeignKey("contato.id"))
     ativo: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
@@ -0,0 +1,91 @@
+"""
+DDL for the ticket full-text index.
+
+SQLite: an external-content FTS5 table `chamado_fts` over (titulo, descricao,
+numero), with accent folding, kept in sync by triggers on `chamado`.
+Postgres: a generated `search_vector` tsvector column with a GIN index
+(numero/titulo weighted above descricao). Its `portuguese_unaccent` text
+search configuration is Portuguese stemming behind the `unaccent`
+dictionary, so accents fold on both backends; queries must use the same
+configuration.
+
+The statements are attached to the `chamado` table's create/drop events so
+`metadata.create_all()` builds the index too; migrations carry their own copy.
+"""
+
+from sqlalchemy import DDL, Table, event
+
+TICKET_FTS_TABLE = "chamado_fts"
+TICKET_SEARCH_VECTOR = "search_vector"
+TICKET_SEARCH_CONFIG = "portuguese_unaccent"
+
+SQLITE_TICKET_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TICKET_FTS_TABLE} USING fts5(
+        titulo, descricao, numero,
+        content='chamado', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_ai AFTER INSERT ON chamado BEGIN
+        INSERT INTO {TICKET_FTS_TABLE}(rowid, titulo, descricao, numero)
+        VALUES (new.id, new.titulo, new.descricao, new.numero);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_ad AFTER DELETE ON chamado BEGIN
+        INSERT INTO {TICKET_FTS_TABLE}({TICKET_FTS_TABLE}, rowid, titulo, descricao, numero)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.numero);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_au AFTER UPDATE OF titulo, descricao, numero ON chamado BEGIN
+        INSERT INTO {TICKET_FTS_TABLE}({TICKET_FTS_TABLE}, rowid, titulo, descricao, numero)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.numero);
+        INSERT INTO {TICKET_FTS_TABLE}(rowid, titulo, descricao, numero)
+        VALUES (new.id, new.titulo, new.descricao, new.numero);
+    END
+    """,
+]
+
+# Needs the `unaccent` contrib module (CREATE EXTENSION privileges on first run)
+POSTGRES_TICKET_SEARCH_CONFIG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{TICKET_SEARCH_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {TICKET_SEARCH_CONFIG} (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION {TICKET_SEARCH_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END
+    $$
+    """,
+]
+
+POSTGRES_TICKET_FTS_DDL = POSTGRES_TICKET_SEARCH_CONFIG_DDL + [
+    f"""
+    ALTER TABLE chamado ADD COLUMN IF NOT EXISTS {TICKET_SEARCH_VECTOR} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TICKET_SEARCH_CONFIG}', coalesce(numero, '')), 'A') ||
+        setweight(to_tsvector('{TICKET_SEARCH_CONFIG}', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('{TICKET_SEARCH_CONFIG}', coalesce(descricao, '')), 'B')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS ix_chamado_{TICKET_SEARCH_VECTOR} ON chamado USING GIN ({TICKET_SEARCH_VECTOR})",
+]
+
+
+def install_ticket_search_ddl(chamado_table: Table) -> None:
+    """Create/drop the full-text index together with the `chamado` table."""
+    for statement in SQLITE_TICKET_FTS_DDL:
+        event.listen(chamado_table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_TICKET_FTS_DDL:
+        event.listen(chamado_table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    # The FTS5 table is not part of the metadata; drop it so a recreated chamado starts empty
+    event.listen(
+        chamado_table, "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {TICKET_FTS_TABLE}").execute_if(dialect="sqlite"),
+    )
@@ -1,22 +1,243 @@
-from typing import AsyncGenerator
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncGenerator, Dict, Optional
 import logging
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.pool import NullPool
-from app.core.config import get_settings
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
+from app.core.config import Settings, get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
-def get_engine() -> object:
+@dataclass(frozen=True)
+class EngineProfile:
+    """Connection pool settings applied when building the async engine.
+
+    Attributes:
+        name: Profile name as configured in `DB_ENGINE_PROFILE`.
+        pooled: When False the engine uses `NullPool` (connect per checkout).
+        pool_size: Persistent connections kept open by the pool.
+        max_overflow: Extra connections allowed above `pool_size` under burst.
+        pool_timeout: Seconds to wait for a free connection before failing.
+        pool_pre_ping: Test connections on checkout (drops stale server connections).
+        pool_recycle: Seconds after which a connection is replaced; -1 disables.
+        statement_cache_size: asyncpg prepared statement cache size (0 disables,
+            required behind pgbouncer in transaction mode).
+        connect_args: Extra DBAPI connect arguments.
+    """
+
+    name: str
+    pooled: bool = True
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_pre_ping: bool = False
+    pool_recycle: int = -1
+    statement_cache_size: Optional[int] = None
+    connect_args: Dict[str, Any] = field(default_factory=dict)
+
+
+# Per-dialect defaults for each profile. SQLite connections are local file
+# handles, so they are cheap to keep and never go stale; Postgres connections
+# cross the network and sit behind server/idle timeouts, so they get pre-ping
+# and a recycle window shorter than typical idle limits.
+_PROFILE_DEFAULTS: Dict[str, Dict[str, EngineProfile]] = {
+    "sqlite": {
+        "pooled": EngineProfile(name="pooled", pool_size=5, max_overflow=10),
+        "high_concurrency": EngineProfile(name="high_concurrency", pool_size=10, max_overflow=20),
+        "nullpool": EngineProfile(name="nullpool", pooled=False),
+    },
+    "postgresql": {
+        "pooled": EngineProfile(
+            name="pooled",
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            statement_cache_size=100,
+        ),
+        "high_concurrency": EngineProfile(
+            name="high_concurrency",
+            pool_size=30,
+            max_overflow=40,
+            pool_timeout=10.0,
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            statement_cache_size=500,
+        ),
+        "nullpool": EngineProfile(name="nullpool", pooled=False, statement_cache_size=100),
+    },
+}
+
+
+def resolve_engine_profile(db_url: str, cfg: Optional[Settings] = None) -> EngineProfile:
+    """Resolve the engine profile for a database URL.
+
+    The profile named by `DB_ENGINE_PROFILE` supplies per-dialect defaults;
+    any explicit `DB_POOL_*`/`DB_STATEMENT_CACHE_SIZE` setting overrides them.
+
+    Args:
+        db_url: Database URL the engine will connect to.
+        cfg: Settings instance (defaults to the application settings).
+
+    Returns:
+        EngineProfile: Effective pool configuration.
+    """
+
+    cfg = cfg or settings
+    backend = make_url(db_url).get_backend_name()
+    dialect_profiles = _PROFILE_DEFAULTS.get(backend, _PROFILE_DEFAULTS["postgresql"])
+    name = (cfg.DB_ENGINE_PROFILE or "pooled").strip().lower()
+    profile = dialect_profiles.get(name)
+    if profile is None:
+        logger.warning("Unknown DB_ENGINE_PROFILE %r; falling back to 'pooled'", name)
+        profile = dialect_profiles["pooled"]
+
+    overrides: Dict[str, Any] = {}
+    if cfg.DB_POOL_SIZE is not None:
+        overrides["pool_size"] = cfg.DB_POOL_SIZE
+    if cfg.DB_MAX_OVERFLOW is not None:
+        overrides["max_overflow"] = cfg.DB_MAX_OVERFLOW
+    if cfg.DB_POOL_TIMEOUT is not None:
+        overrides["pool_timeout"] = cfg.DB_POOL_TIMEOUT
+    if cfg.DB_POOL_PRE_PING is not None:
+        overrides["pool_pre_ping"] = cfg.DB_POOL_PRE_PING
+    if cfg.DB_POOL_RECYCLE is not None:
+        overrides["pool_recycle"] = cfg.DB_POOL_RECYCLE
+    if cfg.DB_STATEMENT_CACHE_SIZE is not None and backend == "postgresql":
+        overrides["statement_cache_size"] = cfg.DB_STATEMENT_CACHE_SIZE
+    return replace(profile, **overrides) if overrides else profile
+
+
+_SQLITE_PRAGMA_CHOICES: Dict[str, tuple] = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+}
+
+
+def sqlite_pragmas(cfg: Optional[Settings] = None) -> Dict[str, Any]:
+    """Return the SQLite pragmas configured in settings, in application order.
+
+    `journal_mode` goes first so the remaining pragmas apply to the WAL
+    connection. Enumerated values are validated since they are interpolated
+    into the PRAGMA statement.
+
+    Args:
+        cfg: Settings instance (defaults to the application settings).
+
+    Returns:
+        Dict[str, Any]: Pragma name to value.
+
+    Raises:
+        ValueError: If an enumerated pragma has an unsupported value.
+    """
+
+    cfg = cfg or settings
+    pragmas: Dict[str, Any] = {
+        "journal_mode": str(cfg.SQLITE_JOURNAL_MODE).upper(),
+        "synchronous": str(cfg.SQLITE_SYNCHRONOUS).upper(),
+        "cache_size": int(cfg.SQLITE_CACHE_SIZE),
+        "mmap_size": int(cfg.SQLITE_MMAP_SIZE),
+        "temp_store": str(cfg.SQLITE_TEMP_STORE).upper(),
+        "busy_timeout": int(cfg.SQLITE_BUSY_TIMEOUT_MS),
+    }
+    for name, choices in _SQLITE_PRAGMA_CHOICES.items():
+        if pragmas[name] not in choices:
+            raise ValueError(f"Invalid SQLite {name} {pragmas[name]!r}; expected one of {', '.join(choices)}")
+    return pragmas
+
+
+def install_sqlite_pragmas(async_engine: AsyncEngine, pragmas: Dict[str, Any]) -> None:
+    """Apply `pragmas` to every new DBAPI connection opened by `async_engine`.
+
+    Args:
+        async_engine: SQLite async engine.
+        pragmas: Pragma name to value, as returned by `sqlite_pragmas`.
+    """
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _engine_kwargs(db_url: str, profile: EngineProfile) -> Dict[str, Any]:
+    """Translate an `EngineProfile` into `create_async_engine` keyword arguments."""
+
+    url = make_url(db_url)
+    connect_args: Dict[str, Any] = dict(profile.connect_args)
+    kwargs: Dict[str, Any] = {"echo": False, "future": True}
+
+    if url.get_backend_name() == "sqlite":
+        connect_args.setdefault("check_same_thread", False)
+        database = url.database or ""
+        if database in ("", ":memory:") or "mode=memory" in database:
+            # Every new connection to an in-memory database is a new, empty
+            # database, so a single shared connection is the only sane pool.
+            kwargs["poolclass"] = StaticPool
+            kwargs["connect_args"] = connect_args
+            return kwargs
+
+    if url.get_driver_name() == "asyncpg" and profile.statement_cache_size is not None:
+        # SQLAlchemy's adapter keeps its own prepared statement cache on top of
+        # asyncpg's; both must follow the setting (0 disables them for pgbouncer).
+        connect_args.setdefault("prepared_statement_cache_size", profile.statement_cache_size)
+        connect_args.setdefault("statement_cache_size", profile.statement_cache_size)
+
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+
+    if not profile.pooled:
+        kwargs["poolclass"] = NullPool
+        return kwargs
+
+    kwargs.update(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_timeout=profile.pool_timeout,
+        pool_pre_ping=profile.pool_pre_ping,
+        pool_recycle=profile.pool_recycle,
+    )
+    return kwargs
+
+
+def build_engine(db_url: Optional[str] = None, profile: Optional[EngineProfile] = None) -> AsyncEngine:
+    """Build an async engine for `db_url` using the given (or configured) profile.
+
+    Args:
+        db_url: Database URL (defaults to `settings.DB_URL`).
+        profile: Explicit profile; resolved from settings when omitted.
+
+    Returns:
+        AsyncEngine: Configured engine.
+    """
+
+    url = db_url or str(settings.DB_URL)
+    profile = profile or resolve_engine_profile(url)
+    async_engine = create_async_engine(url, **_engine_kwargs(url, profile))
+    if make_url(url).get_backend_name() == "sqlite":
+        install_sqlite_pragmas(async_engine, sqlite_pragmas())
+    return async_engine
+
+
+def get_engine() -> AsyncEngine:
     """Create and return the async SQLAlchemy engine.
 
     Returns:
         Async engine instance.
     """
 
-    engine = create_async_engine(str(settings.DB_URL), echo=False, poolclass=NullPool, future=True)
-    return engine
+    profile = resolve_engine_profile(str(settings.DB_URL))
+    logger.debug("Creating DB engine with profile %s", profile)
+    return build_engine(str(settings.DB_URL), profile)
 
 
 engine = get_engine()
@@ -42,4 +263,4 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
                 logger.exception("DB session error: %s", exc)
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
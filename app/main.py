@@ -255,6 +255,29 @@ def create_app() -> FastAPI:
                     await session.commit()
         except Exception as exc:
             logging.getLogger(__name__).warning(f"Status seed failed: {exc}")
+        from app.services.email_templates import email_templates
+        email_templates.preload()
+        if settings.NOTIFY_ENABLED:
+            from app.services.notification_queue import email_worker
+            email_worker.start()
+        if settings.AUTO_CLOSE_SCHEDULE_ENABLED:
+            from app.services.ticket_auto_close import auto_close_scheduler
+            auto_close_scheduler.start()
+        if settings.SLA_SCHEDULER_ENABLED:
+            from app.services.sla_scheduler import sla_scheduler
+            sla_scheduler.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        from app.services.notification_queue import email_worker
+        from app.services.ticket_auto_close import auto_close_scheduler
+        from app.services.sla_scheduler import sla_scheduler
+        if email_worker.running:
+            await email_worker.stop()
+        if auto_close_scheduler.running:
+            await auto_close_scheduler.stop()
+        if sla_scheduler.running:
+            await sla_scheduler.stop()
 
     return app
 
@@ -1,28 +1,161 @@
 from __future__ import annotations
-from typing import Optional, List
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import Select, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Ativo, Estoque
+from app.core.exceptions import ValidationError
+from app.core.pagination import NEXT, PREV, decode_cursor, keyset_order, keyset_predicate, page_cursors
+from app.core.reference_data import normalize_name
+from app.db.models import Ativo, Contrato, Estoque, LocalInstalacao, StatusAtivo, TipoAtivo
+
+# Sortable listing columns. Optional text columns are coalesced so the keyset
+# seek sees every row; criado_em is NOT NULL and uses its index as is.
+ASSET_SORTS: Dict[str, Any] = {
+    "criado_em": Ativo.criado_em,
+    "serial_text": Ativo.serial_text,
+    "tag": func.coalesce(Ativo.tag, ""),
+    "descricao": func.coalesce(Ativo.descricao, ""),
+    "id": Ativo.id,
+}
+DEFAULT_ASSET_SORT = "-criado_em"
+
+# Name filter -> lookup table it names
+_NAME_FILTERS = (("tipo", TipoAtivo), ("status", StatusAtivo), ("local", LocalInstalacao))
+
+
+def _name_key(name: Any) -> str:
+    return normalize_name(name).replace(" ", "")
 
 
 class AtivoRepository:
     """Repository for Ativo (asset) operations with empresa scoping."""
 
-    async def list_by_empresa(self, session: AsyncSession, empresa_id: int) -> List[Ativo]:
-        stmt = (
-            select(Ativo)
-            .where(Ativo.empresa_id == empresa_id)
-            .options(
-                selectinload(Ativo.tipo),
-                selectinload(Ativo.status),
-                selectinload(Ativo.local_instalacao),
+    async def list_page(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        filters: Optional[Dict[str, Any]] = None,
+        sort: str = DEFAULT_ASSET_SORT,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """One page of the company's assets, projected to the summary columns.
+
+        Only the listed columns and the joined type/status/location/contract
+        names are selected (no ORM entities). With a cursor the page is read
+        with a keyset seek on `(sort column, id)`; without one `offset` is
+        honoured. Either way the returned cursors continue by keyset.
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            filters: See `_apply_filters`
+            sort: One of `ASSET_SORTS`, `-` prefixed for descending
+            limit: Page size
+            offset: Rows to skip when no cursor is given
+            cursor: Opaque cursor from a previous page's next/prev cursor
+
+        Returns:
+            Dict with `items` (rows), `next_cursor` and `prev_cursor`
+
+        Raises:
+            ValidationError: If the sort or the cursor is invalid
+        """
+        sort_column, descending = self._sort(sort)
+        decoded = decode_cursor(cursor, sort_key=sort) if cursor else None
+        direction = decoded["direction"] if decoded else NEXT
+        filters = await self._resolve_names(session, filters or {})
+
+        query = self._apply_filters(
+            select(
+                Ativo.id, Ativo.serial_text, Ativo.descricao, Ativo.tag, Ativo.criado_em,
+                Ativo.tipo_ativo_id, TipoAtivo.nome.label("tipo_nome"),
+                Ativo.status_ativo_id, StatusAtivo.nome.label("status_nome"),
+                Ativo.local_instalacao_id, LocalInstalacao.nome.label("local_nome"),
+                Ativo.contrato_id, Contrato.descricao.label("contrato_nome"),
+                sort_column.label("sort_value"),
             )
-            .limit(2000)
+            .outerjoin(TipoAtivo, Ativo.tipo_ativo_id == TipoAtivo.id)
+            .outerjoin(StatusAtivo, Ativo.status_ativo_id == StatusAtivo.id)
+            .outerjoin(LocalInstalacao, Ativo.local_instalacao_id == LocalInstalacao.id)
+            .outerjoin(Contrato, Ativo.contrato_id == Contrato.id),
+            empresa_id, filters,
         )
-        res = await session.execute(stmt)
-        return res.scalars().all()
+        if decoded:
+            query = query.where(keyset_predicate(sort_column, Ativo.id, decoded, descending=descending))
+        query = query.order_by(*keyset_order(sort_column, Ativo.id, descending=descending, direction=direction))
+        if not decoded and offset:
+            query = query.offset(offset)
+        rows = list((await session.execute(query.limit(limit + 1))).all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == PREV:
+            rows.reverse()
+
+        next_cursor, prev_cursor = page_cursors(
+            rows, "sort_value", has_more, direction,
+            had_cursor=bool(decoded) or offset > 0, sort_key=sort,
+        )
+        return {"items": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    async def count(self, session: AsyncSession, empresa_id: int, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of the company's assets matching `filters` (see `list_page`)."""
+        filters = await self._resolve_names(session, filters or {})
+        query = self._apply_filters(select(func.count(Ativo.id)), empresa_id, filters)
+        return int((await session.execute(query)).scalar_one())
+
+    @staticmethod
+    def _sort(sort: str) -> Tuple[Any, bool]:
+        descending = sort.startswith("-")
+        column = ASSET_SORTS.get(sort.lstrip("-"))
+        if column is None:
+            raise ValidationError(f"Invalid sort '{sort}'", {"supported": sorted(ASSET_SORTS)})
+        return column, descending
+
+    @staticmethod
+    async def _resolve_names(session: AsyncSession, filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the name filters `tipo` / `status` / `local` with the ids they name.
+
+        Names match ignoring case, accents and spaces, so the slugs the assets
+        page sends (`manutencao`, `datacenter`) find "Manutenção" and "Data
+        Center". The lookup tables are small and read whole.
+        """
+        resolved = dict(filters)
+        for key, model in _NAME_FILTERS:
+            if not filters.get(key):
+                continue
+            wanted = _name_key(filters[key])
+            rows = await session.execute(select(model.id, model.nome))
+            resolved[key] = [row.id for row in rows if _name_key(row.nome) == wanted]
+        return resolved
+
+    @staticmethod
+    def _apply_filters(query: Select, empresa_id: int, filters: Dict[str, Any]) -> Select:
+        """Tenant scope plus optional `tipo_ativo_id`, `status_ativo_id`, `local_instalacao_id`,
+        `contrato_id`, name filters `tipo` / `status` / `local` (as id lists, see `_resolve_names`)
+        and a text `search`."""
+        query = query.where(Ativo.empresa_id == empresa_id)
+        for key in ("tipo_ativo_id", "status_ativo_id", "local_instalacao_id", "contrato_id"):
+            if filters.get(key):
+                query = query.where(getattr(Ativo, key) == filters[key])
+        for key, column in (
+            ("tipo", Ativo.tipo_ativo_id),
+            ("status", Ativo.status_ativo_id),
+            ("local", Ativo.local_instalacao_id),
+        ):
+            if isinstance(filters.get(key), list):
+                query = query.where(column.in_(filters[key]))
+        if filters.get("search"):
+            term = f"%{filters['search'].strip()}%"
+            query = query.where(or_(Ativo.serial_text.ilike(term), Ativo.tag.ilike(term), Ativo.descricao.ilike(term)))
+        return query
+
+    async def list_version(self, session: AsyncSession, empresa_id: int) -> str:
+        """Newest `change_seq` and row count of the company's assets (ETag of `list_page`)."""
+        stmt = select(func.max(Ativo.change_seq), func.count(Ativo.id)).where(Ativo.empresa_id == empresa_id)
+        newest, count = (await session.execute(stmt)).one()
+        return f"{newest}:{count}"
 
     async def get_by_id(self, session: AsyncSession, empresa_id: int, ativo_id: int) -> Optional[Ativo]:
         stmt = select(Ativo).where(Ativo.id == ativo_id, Ativo.empresa_id == empresa_id)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import SerialCounter
+
+
+class SerialCounterRepository:
+    """Atomic per-empresa, per-kind serial block allocation backed by `serial_counter`.
+
+    Same scheme as `TicketCounterRepository`: a block of any size costs one
+    `UPDATE ... RETURNING` on the counter row, which serializes concurrent
+    allocations through the row lock (Postgres) or write lock (SQLite). The
+    reservation commits or rolls back with the caller's transaction, so a
+    value is never handed out twice.
+    """
+
+    async def reserve(self, session: AsyncSession, empresa_id: int, kind: str, count: int = 1) -> int:
+        """Reserve `count` consecutive values and return the first one.
+
+        Args:
+            session: Database session (the reservation commits with it).
+            empresa_id: Tenant owning the counter.
+            kind: Serial kind (`ATIVO` or `ESTOQUE`).
+            count: Size of the block to reserve.
+
+        Returns:
+            int: First value of the reserved block.
+        """
+
+        if count < 1:
+            raise ValueError("count must be >= 1")
+
+        for _ in range(3):
+            new_next = await self._increment(session, empresa_id, kind, count)
+            if new_next is not None:
+                return new_next - count
+            await self._create(session, empresa_id, kind)
+        raise RuntimeError(f"Could not allocate {kind} serials for empresa {empresa_id}")
+
+    async def _increment(self, session: AsyncSession, empresa_id: int, kind: str, count: int) -> int | None:
+        stmt = (
+            update(SerialCounter)
+            .where(SerialCounter.empresa_id == empresa_id, SerialCounter.kind == kind)
+            .values(next_value=SerialCounter.next_value + count)
+        )
+        if session.bind.dialect.update_returning:
+            res = await session.execute(stmt.returning(SerialCounter.next_value))
+            return res.scalar_one_or_none()
+        res = await session.execute(stmt)
+        if not res.rowcount:
+            return None
+        res = await session.execute(
+            select(SerialCounter.next_value).where(SerialCounter.empresa_id == empresa_id, SerialCounter.kind == kind)
+        )
+        return res.scalar_one()
+
+    async def _create(self, session: AsyncSession, empresa_id: int, kind: str) -> None:
+        # Block serials (EMP-{id}-{KIND}-{n}) cannot match the older timestamp-based ones, so start at 1
+        try:
+            async with session.begin_nested():
+                await session.execute(insert(SerialCounter).values(empresa_id=empresa_id, kind=kind, next_value=1))
+        except IntegrityError:
+            # Another transaction created it first
+            pass
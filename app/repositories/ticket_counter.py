@@ -0,0 +1,101 @@
+from __future__ import annotations
+import re
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Chamado, TicketCounter
+
+
+class TicketCounterRepository:
+    """Atomic per-empresa ticket number allocation backed by `ticket_counter`.
+
+    Each allocation is a single `UPDATE ... RETURNING` on the tenant's counter
+    row, which takes the row lock on Postgres and the write lock on SQLite, so
+    concurrent intakes never see the same value and the cost does not depend on
+    how many tickets the tenant already has.
+    """
+
+    async def reserve(self, session: AsyncSession, empresa_id: int, count: int = 1) -> int:
+        """Reserve `count` consecutive numbers and return the first one.
+
+        Args:
+            session: Database session (the reservation commits with it).
+            empresa_id: Tenant owning the counter.
+            count: Size of the block to reserve.
+
+        Returns:
+            int: First number of the reserved block.
+        """
+
+        if count < 1:
+            raise ValueError("count must be >= 1")
+
+        for _ in range(3):
+            new_next = await self._increment(session, empresa_id, count)
+            if new_next is not None:
+                return new_next - count
+            # No counter yet for this tenant: seed it once from existing numbers.
+            await self.seed_from_tickets(session, empresa_id)
+        raise RuntimeError(f"Could not allocate ticket number for empresa {empresa_id}")
+
+    async def _increment(self, session: AsyncSession, empresa_id: int, count: int) -> int | None:
+        stmt = (
+            update(TicketCounter)
+            .where(TicketCounter.empresa_id == empresa_id)
+            .values(next_value=TicketCounter.next_value + count)
+        )
+        if session.bind.dialect.update_returning:
+            res = await session.execute(stmt.returning(TicketCounter.next_value))
+            return res.scalar_one_or_none()
+        # Fallback for engines without RETURNING: the UPDATE holds the lock
+        # until the transaction ends, so reading back is still race-free.
+        res = await session.execute(stmt)
+        if not res.rowcount:
+            return None
+        res = await session.execute(select(TicketCounter.next_value).where(TicketCounter.empresa_id == empresa_id))
+        return res.scalar_one()
+
+    async def seed_from_tickets(self, session: AsyncSession, empresa_id: int) -> int:
+        """Create or fast-forward the counter past the tenant's highest ticket number.
+
+        This scans the tenant's ticket numbers, so it is only meant for first
+        use of a tenant without a counter row and for recovering from a
+        number collision (tickets inserted outside the allocator).
+
+        Returns:
+            int: The counter's next value after seeding.
+        """
+
+        next_value = await self.max_ticket_sequence(session, empresa_id) + 1
+        res = await session.execute(select(TicketCounter).where(TicketCounter.empresa_id == empresa_id))
+        counter = res.scalar_one_or_none()
+        if counter is None:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(TicketCounter).values(empresa_id=empresa_id, next_value=next_value))
+                return next_value
+            except IntegrityError:
+                # Another transaction seeded it first; fall through to fast-forward
+                pass
+        await session.execute(
+            update(TicketCounter)
+            .where(TicketCounter.empresa_id == empresa_id, TicketCounter.next_value < next_value)
+            .values(next_value=next_value)
+        )
+        res = await session.execute(select(TicketCounter.next_value).where(TicketCounter.empresa_id == empresa_id))
+        return res.scalar_one()
+
+    async def max_ticket_sequence(self, session: AsyncSession, empresa_id: int) -> int:
+        """Return the highest N among the tenant's `E{empresa}{ORIGIN}-{N}` numbers (0 if none)."""
+
+        pat = re.compile(rf"^E{empresa_id}[A-Z]+-(\d+)$")
+        res = await session.stream_scalars(select(Chamado.numero).where(Chamado.empresa_id == empresa_id))
+        max_n = 0
+        async for num_str in res:
+            if not isinstance(num_str, str):
+                continue
+            m = pat.match(num_str.strip())
+            if m:
+                max_n = max(max_n, int(m.group(1)))
+        return max_n
@@ -69,7 +69,7 @@ class InventoryIntakeResponse(BaseModel):
     serial: Optional[str] = Field(
         None,
         description="Serial number of the inventory item",
-        example="EMP-1-1698765432000-1234-ESTOQUE"
+        example="EMP-1-ESTOQUE-000123"
     )
 
     class Config:
@@ -77,11 +77,81 @@ class InventoryIntakeResponse(BaseModel):
             "example": {
                 "estoque_id": 123,
                 "asset_id": 456,
-                "serial": "EMP-1-1698765432000-1234-ESTOQUE"
+                "serial": "EMP-1-ESTOQUE-000123"
             }
         }
 
 
+class BulkIntakeUnit(BaseModel):
+    """One unit of a bulk intake."""
+    serial: Optional[constr(min_length=1, max_length=100)] = Field(  # type: ignore[valid-type]
+        None,
+        description="Serial number. Generated from the company's serial block if not provided",
+        example="SN123456789"
+    )
+    qtd: conint(ge=1, le=10000) = Field(1, description="Quantity of this unit", example=1)  # type: ignore[valid-type]
+
+
+class InventoryBulkIntakeRequest(BaseModel):
+    """Request model for receiving many units of one catalog item at once."""
+    
+    catalogo_peca_id: int = Field(..., gt=0, description="ID of the catalog item received", example=1)
+    units: List[BulkIntakeUnit] = Field(
+        default_factory=list,
+        description="Units to receive (serials are optional)"
+    )
+    quantity: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Number of additional units with generated serials",
+        example=100
+    )
+    status_estoque_id: Optional[int] = Field(None, gt=0, description="Inventory status of every unit", example=1)
+    auto_create_asset: bool = Field(True, description="Whether to create one asset per unit", example=True)
+    tipo_movimentacao_id: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Movement type recorded in the stock ledger (default: 'Entrada')"
+    )
+    observacao: Optional[constr(max_length=1000)] = Field(  # type: ignore[valid-type]
+        None,
+        description="Note recorded on the stock movements",
+        example="NF 12345"
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "catalogo_peca_id": 1,
+                "units": [{"serial": "SN123456789"}, {"serial": "SN123456790"}],
+                "quantity": 48,
+                "status_estoque_id": 1,
+                "auto_create_asset": True,
+                "observacao": "NF 12345"
+            }
+        }
+
+
+class InventoryBulkIntakeResponse(BaseModel):
+    """Summary of a bulk intake."""
+    
+    catalogo_peca_id: int = Field(..., description="ID of the catalog item received", example=1)
+    received: int = Field(..., description="Number of inventory items created", example=50)
+    quantity: int = Field(..., description="Total quantity received", example=50)
+    assets_created: int = Field(..., description="Number of assets created", example=50)
+    generated_serials: int = Field(..., description="Number of serials generated", example=48)
+    first_serial: Optional[str] = Field(None, description="Serial of the first unit", example="SN123456789")
+    last_serial: Optional[str] = Field(None, description="Serial of the last unit", example="EMP-1-ESTOQUE-000148")
+
+
+class StockLevelResponse(BaseModel):
+    """Quantity on hand of one catalog item in one inventory status."""
+    
+    catalogo_peca_id: int = Field(..., description="Catalog item ID", example=1)
+    status_estoque_id: Optional[int] = Field(None, description="Inventory status ID (null: no status)", example=1)
+    quantidade: int = Field(..., description="Quantity on hand", example=42)
+
+
 class NamedEntity(BaseModel):
     """Minimal entity carrying id and nome for UI rendering."""
     id: Optional[int] = Field(None, description="Entity ID", example=1)
@@ -107,7 +177,7 @@ class AssetSummary(BaseModel):
     """Summary model for asset information."""
     
     id: int = Field(..., description="Asset ID", example=123)
-    serial_text: Optional[str] = Field(None, description="Asset serial number", example="EMP-1-1698765432000-1234-ATIVO")
+    serial_text: Optional[str] = Field(None, description="Asset serial number", example="EMP-1-ATIVO-000123")
     descricao: Optional[str] = Field(None, description="Asset description", example="Laptop Dell Inspiron")
     tag: Optional[str] = Field(None, description="Asset tag", example="TAG-001")
     criado_em: Optional[str] = Field(None, description="Creation timestamp (ISO format)", example="2023-10-31T10:30:00")
@@ -115,6 +185,19 @@ class AssetSummary(BaseModel):
     tipo: NamedEntity | None = Field(None, description="Asset type (id and nome)")
     status: NamedEntity | None = Field(None, description="Asset status (id and nome)")
     local_instalacao: NamedEntity | None = Field(None, description="Installation location (id and nome)")
+    contrato: NamedEntity | None = Field(None, description="Contract (id and descricao as nome)")
+
+
+class AssetListResponse(BaseModel):
+    """Page of the company's assets."""
+    
+    assets: List[AssetSummary] = Field(..., description="Assets of this page")
+    total: int = Field(..., description="Number of assets matching the filters (page size when include_total is false)")
+    limit: int = Field(..., description="Applied limit")
+    page: Optional[int] = Field(None, description="Current page number (offset paging)")
+    total_pages: Optional[int] = Field(None, description="Total pages based on total and limit")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page (pass as `cursor`)")
+    prev_cursor: Optional[str] = Field(None, description="Opaque cursor for the previous page (pass as `cursor`)")
 
 
 class CreateTicketRequest(BaseModel):
@@ -184,7 +267,7 @@ class CreateTicketRequest(BaseModel):
     serial_text: Optional[constr(min_length=1, max_length=100)] = Field(  # type: ignore[valid-type]
         None,
         description="Asset serial number (alternative to ativo_id)",
-        example="EMP-1-1698765432000-1234-ATIVO"
+        example="EMP-1-ATIVO-000123"
     )
 
     @validator('titulo')
@@ -485,6 +568,76 @@ class TicketFilters(BaseModel):
         }
 
 
+class TicketChangeItem(BaseModel):
+    """Current state of a ticket returned by the change feed."""
+    
+    id: int = Field(..., description="Ticket ID")
+    numero: str = Field(..., description="Ticket number")
+    titulo: str = Field(..., description="Ticket title")
+    status: Optional[str] = Field(None, description="Status code")
+    status_id: Optional[int] = Field(None, description="Status ID")
+    prioridade: Optional[str] = Field(None, description="Priority code")
+    prioridade_id: Optional[int] = Field(None, description="Priority ID")
+    categoria_id: Optional[int] = Field(None, description="Category ID")
+    requisitante_contato_id: Optional[int] = Field(None, description="Requester contact ID")
+    agente_contato_id: Optional[int] = Field(None, description="Assigned agent contact ID")
+    criado_em: Optional[str] = Field(None, description="Creation timestamp")
+    atualizado_em: Optional[str] = Field(None, description="Last update timestamp")
+    change_seq: int = Field(..., description="Change sequence of the latest write")
+
+
+class TicketChangeComment(BaseModel):
+    """Comment written since the feed cursor."""
+    
+    id: int = Field(..., description="Comment ID")
+    chamado_id: int = Field(..., description="Ticket ID")
+    contato_id: Optional[int] = Field(None, description="Author contact ID")
+    comentario: str = Field(..., description="Comment text")
+    data_hora: Optional[str] = Field(None, description="Comment timestamp")
+    change_seq: int = Field(..., description="Change sequence of the comment")
+
+
+class TicketStatusChange(BaseModel):
+    """Status transition recorded since the feed cursor."""
+    
+    id: int = Field(..., description="Log entry ID")
+    chamado_id: int = Field(..., description="Ticket ID")
+    contato_id: Optional[int] = Field(None, description="Contact who made the change (null for automatic changes)")
+    de: Optional[str] = Field(None, description="Previous status code (null on creation)")
+    para: Optional[str] = Field(None, description="New status code")
+    de_id: Optional[int] = Field(None, description="Previous status ID")
+    para_id: Optional[int] = Field(None, description="New status ID")
+    data_hora: Optional[str] = Field(None, description="Change timestamp")
+    change_seq: int = Field(..., description="Change sequence of the transition")
+
+
+class TicketChangesResponse(BaseModel):
+    """Response model for the ticket change feed."""
+    
+    tickets: List[TicketChangeItem] = Field(..., description="Tickets changed since the cursor, oldest change first")
+    comments: List[TicketChangeComment] = Field(..., description="Comments on those tickets written since the cursor")
+    status_changes: List[TicketStatusChange] = Field(..., description="Status transitions of those tickets since the cursor")
+    cursor: str = Field(..., description="Pass as `cursor` on the next call")
+    has_more: bool = Field(..., description="More changes are waiting; call again right away")
+
+
+class TicketImportError(BaseModel):
+    """A record rejected by the bulk import."""
+    
+    row: int = Field(..., description="Row number in the uploaded file (header and blank lines excluded)")
+    error: str = Field(..., description="Why the record was not imported")
+
+
+class TicketImportResponse(BaseModel):
+    """Response model for the bulk ticket import."""
+    
+    imported: int = Field(..., description="Tickets created")
+    failed: int = Field(..., description="Records rejected")
+    batches: int = Field(..., description="Committed batches")
+    checkpoint: int = Field(..., description="Last row committed; pass as `resume_after` to continue an interrupted import")
+    errors: List[TicketImportError] = Field(default_factory=list, description="Rejected records (capped)")
+
+
 class TicketListResponse(BaseModel):
     """Response model for ticket listing."""
     
@@ -494,6 +647,8 @@ class TicketListResponse(BaseModel):
     offset: int = Field(..., description="Applied offset")
     page: Optional[int] = Field(None, description="Current page number")
     total_pages: Optional[int] = Field(None, description="Total pages based on total and limit")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page (pass as `cursor`)")
+    prev_cursor: Optional[str] = Field(None, description="Opaque cursor for the previous page (pass as `cursor`)")
 
     class Config:
         json_schema_extra = {
@@ -674,6 +829,27 @@ class AddActivityRequest(BaseModel):
         }
 
 
+class ServiceOrderActivityResponse(BaseModel):
+    """One entry of a service order's activity log."""
+
+    id: int = Field(..., description="Activity ID")
+    timestamp: Optional[str] = Field(None, description="When the activity was logged (UTC)")
+    user_id: Optional[int] = Field(None, description="Contact who logged it")
+    activity_type: str = Field(..., description="Type of activity", example="REPAIR")
+    description: Optional[str] = Field(None, description="Description of the activity")
+    duration_minutes: Optional[int] = Field(None, description="Duration in minutes")
+    billable: bool = Field(True, description="Whether the activity is billable")
+
+
+class ServiceOrderActivityListResponse(BaseModel):
+    """Page of a service order's activity log (oldest first)."""
+
+    activities: List[ServiceOrderActivityResponse] = Field(..., description="Activity entries")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page (pass as `cursor`)")
+    prev_cursor: Optional[str] = Field(None, description="Opaque cursor for the previous page (pass as `cursor`)")
+    time_tracking: Optional[Dict[str, Any]] = Field(None, description="Billable / non-billable totals of the whole log")
+
+
 class ServiceOrderFilters(BaseModel):
     """Filters for service order listing."""
     
@@ -0,0 +1,276 @@
+"""
+Streaming exports of tickets and service orders (CSV, NDJSON, Parquet).
+
+Rows are read with `AsyncSession.stream()` and `yield_per` (a server-side
+cursor on Postgres) and encoded chunk by chunk, so memory stays bounded by
+`EXPORT_CHUNK_SIZE` whatever the size of the export. Reference names
+(status, priority, category) come from the reference-data registry instead
+of joins. The generators open their own session: they run after the
+request handler has returned, while `StreamingResponse` sends the body.
+
+Parquet is written one row group per chunk through pyarrow (the pandas
+parquet engine) and is only offered when it is installed.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import performance_monitor
+from app.core.config import get_settings
+from app.core.exceptions import ValidationError
+from app.core.reference_data import reference_data
+from app.db.models import Chamado, OrdemServico, TipoOS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Column types: "int", "str", "datetime"
+Column = Tuple[str, str]
+
+TICKET_COLUMNS: List[Column] = [
+    ("id", "int"), ("numero", "str"), ("empresa_id", "int"), ("origem", "str"), ("titulo", "str"),
+    ("descricao", "str"), ("status_id", "int"), ("status", "str"), ("prioridade_id", "int"),
+    ("prioridade", "str"), ("categoria_id", "int"), ("categoria", "str"), ("requisitante_contato_id", "int"),
+    ("agente_contato_id", "int"), ("ativo_id", "int"), ("criado_em", "datetime"), ("atualizado_em", "datetime"),
+    ("fechado_em", "datetime"), ("sla_resposta_ate", "datetime"), ("sla_resolucao_ate", "datetime"),
+    ("sla_escalonamento_ate", "datetime"),
+]
+TICKET_DATE_FIELDS = ("criado_em", "atualizado_em", "fechado_em")
+
+SERVICE_ORDER_COLUMNS: List[Column] = [
+    ("id", "int"), ("numero_os", "str"), ("chamado_id", "int"), ("empresa_id", "int"), ("tipo_os_id", "int"),
+    ("tipo_os", "str"), ("data_hora_inicio", "datetime"), ("data_hora_fim", "datetime"), ("duracao", "str"),
+    ("numero_apr", "str"), ("atividades_realizadas", "str"), ("observacao", "str"),
+]
+
+
+def export_filename(name: str, fmt: str) -> str:
+    return f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+
+
+def _cell(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes out in chunks (for the Parquet writer)."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class _Encoder:
+    """Incremental encoder of row chunks for one format."""
+
+    def __init__(self, fmt: str, columns: List[Column]):
+        self.fmt = fmt
+        self.names = [name for name, _ in columns]
+        self._writer = None
+        if fmt == "parquet":
+            types = {"int": pa.int64(), "str": pa.string(), "datetime": pa.timestamp("us")}
+            self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+            self._sink = _ChunkSink()
+
+    def header(self) -> bytes:
+        if self.fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(self.names)
+            # BOM so spreadsheet tools pick UTF-8
+            return ("\ufeff" + buffer.getvalue()).encode("utf-8")
+        return b""
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        if self.fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([_cell(row[name]) for name in self.names])
+            return buffer.getvalue().encode("utf-8")
+        if self.fmt == "ndjson":
+            return "".join(
+                json.dumps({name: _cell(row[name]) for name in self.names}, ensure_ascii=False) + "\n"
+                for row in rows
+            ).encode("utf-8")
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._sink, self._schema)
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+        return self._sink.drain()
+
+    def footer(self) -> bytes:
+        if self.fmt != "parquet":
+            return b""
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._sink, self._schema)
+        self._writer.close()
+        return self._sink.drain()
+
+
+@dataclass
+class ExportRange:
+    """Optional [date_from, date_to) filter on one date column."""
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    def __post_init__(self) -> None:
+        # Columns hold naive UTC
+        for name in ("date_from", "date_to"):
+            value = getattr(self, name)
+            if value is not None and value.tzinfo is not None:
+                setattr(self, name, value.astimezone(timezone.utc).replace(tzinfo=None))
+        if self.date_from and self.date_to and self.date_from >= self.date_to:
+            raise ValidationError("date_from must be before date_to")
+
+
+class DataExporter:
+    """Streams tenant-scoped exports of tickets and service orders."""
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None, chunk_size: Optional[int] = None):
+        self._session_factory = session_factory
+        self._chunk_size = chunk_size
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def chunk_size(self) -> int:
+        return max(1, self._chunk_size or get_settings().EXPORT_CHUNK_SIZE)
+
+    @staticmethod
+    def check_format(fmt: str) -> str:
+        """Validate an export format (raises `ValidationError`)."""
+        fmt = (fmt or "csv").lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError(f"Unsupported export format '{fmt}'", {"supported": list(EXPORT_FORMATS)})
+        if fmt == "parquet" and not PARQUET_AVAILABLE:
+            raise ValidationError("Parquet export requires pyarrow to be installed")
+        return fmt
+
+    def tickets(
+        self, empresa_id: int, fmt: str, period: ExportRange, date_field: str = "criado_em"
+    ) -> AsyncIterator[bytes]:
+        """Tickets of the company (every tenant for empresa 1, as in listings) filtered on `date_field`."""
+        fmt = self.check_format(fmt)
+        if date_field not in TICKET_DATE_FIELDS:
+            raise ValidationError(f"Invalid date field '{date_field}'", {"supported": list(TICKET_DATE_FIELDS)})
+        column = getattr(Chamado, date_field)
+        table = Chamado.__table__.c
+        query = select(*(table[name] for name, _ in TICKET_COLUMNS if name in table)).order_by(Chamado.id)
+        if empresa_id != 1:
+            query = query.where(Chamado.empresa_id == empresa_id)
+        query = self._in_range(query, column, period)
+        return self._stream("tickets", query, fmt, TICKET_COLUMNS, self._ticket_rows)
+
+    def service_orders(self, empresa_id: int, fmt: str, period: ExportRange) -> AsyncIterator[bytes]:
+        """Service orders whose ticket belongs to the company, filtered on `data_hora_inicio`."""
+        fmt = self.check_format(fmt)
+        query = (
+            select(
+                OrdemServico.id, OrdemServico.numero_os, OrdemServico.chamado_id, Chamado.empresa_id,
+                OrdemServico.tipo_os_id, TipoOS.nome.label("tipo_os"), OrdemServico.data_hora_inicio,
+                OrdemServico.data_hora_fim, OrdemServico.duracao, OrdemServico.numero_apr,
+                OrdemServico.atividades_realizadas, OrdemServico.observacao,
+            )
+            .join(Chamado, OrdemServico.chamado_id == Chamado.id)
+            .outerjoin(TipoOS, OrdemServico.tipo_os_id == TipoOS.id)
+            .where(Chamado.empresa_id == empresa_id)
+            .order_by(OrdemServico.id)
+        )
+        query = self._in_range(query, OrdemServico.data_hora_inicio, period)
+        return self._stream("service_orders", query, fmt, SERVICE_ORDER_COLUMNS, None)
+
+    @staticmethod
+    def _in_range(query: Select, column: Any, period: ExportRange) -> Select:
+        if period.date_from is not None:
+            query = query.where(column >= period.date_from)
+        if period.date_to is not None:
+            query = query.where(column < period.date_to)
+        return query
+
+    @staticmethod
+    async def _ticket_rows(session: AsyncSession) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        reference = await reference_data.load(session)
+        statuses, priorities, categories = reference["status"], reference["priority"], reference["category"]
+
+        def _name(table: Any, entry_id: Optional[int]) -> Optional[str]:
+            entry = table.get(entry_id)
+            return entry.nome if entry else None
+
+        def _row(row: Dict[str, Any]) -> Dict[str, Any]:
+            row["status"] = _name(statuses, row["status_id"])
+            row["prioridade"] = _name(priorities, row["prioridade_id"])
+            row["categoria"] = _name(categories, row["categoria_id"])
+            return row
+
+        return _row
+
+    async def _stream(
+        self,
+        name: str,
+        query: Select,
+        fmt: str,
+        columns: List[Column],
+        row_builder: Optional[Callable[[AsyncSession], Any]],
+    ) -> AsyncIterator[bytes]:
+        # Arguments are validated by the public methods, before the response starts
+        encoder = _Encoder(fmt, columns)
+        started, exported = time.perf_counter(), 0
+        async with self.session_factory() as session:
+            build = await row_builder(session) if row_builder else None
+            yield encoder.header()
+            result = await session.stream(query.execution_options(yield_per=self.chunk_size))
+            async for partition in result.mappings().partitions():
+                rows = [dict(row) for row in partition]
+                if build:
+                    rows = [build(row) for row in rows]
+                exported += len(rows)
+                yield encoder.encode(rows)
+        yield encoder.footer()
+        elapsed = time.perf_counter() - started
+        performance_monitor.record_metric(f"export.{name}", elapsed)
+        logger.info(f"Exported {exported} {name} as {fmt} in {elapsed:.2f}s")
+
+
+data_exporter = DataExporter()
@@ -0,0 +1,137 @@
+"""
+Compiled email template rendering.
+
+All templates under `app/web/templates/email/` are compiled once (at startup
+via `preload()`, or on first use) and rendered through the compiled
+`jinja2.Template` objects. The rendered (html, text) pair is kept in a small
+LRU keyed by template and context, so identical renders - the same SLA alert
+broadcast to a whole team, retries of a queued message - are computed once.
+Render durations are recorded in `performance_monitor` as `email.render`.
+"""
+
+import html as html_lib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+from app.core.cache import performance_monitor
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "web", "templates")
+EMAIL_TEMPLATE_PREFIX = "email/"
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_BREAK_RE = re.compile(r"<\s*(br|/p|/h[1-6]|/div|/li|/tr)\s*/?>", re.IGNORECASE)
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def html_to_text(markup: str) -> str:
+    """Plain-text alternative of an email body (tags dropped, block ends become line breaks)."""
+    text = _TAG_RE.sub("", _BREAK_RE.sub("\n", markup))
+    lines = (" ".join(line.split()) for line in html_lib.unescape(text).splitlines())
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+class EmailTemplateEngine:
+    """Renders email templates from compiled objects with an LRU of rendered pairs."""
+
+    def __init__(self, directory: str = TEMPLATES_DIR, cache_size: Optional[int] = None):
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=False,
+        )
+        self._cache_size = cache_size
+        self._templates: Dict[str, Template] = {}
+        self._rendered: "OrderedDict[Tuple[str, str], Tuple[str, str]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache_size(self) -> int:
+        if self._cache_size is not None:
+            return self._cache_size
+        return get_settings().EMAIL_RENDER_CACHE_SIZE
+
+    def preload(self) -> int:
+        """Compile every email template; returns how many are loaded."""
+        names = self.env.list_templates(filter_func=lambda n: n.startswith(EMAIL_TEMPLATE_PREFIX))
+        for name in names:
+            self._templates[name[len(EMAIL_TEMPLATE_PREFIX):]] = self.env.get_template(name)
+        logger.info(f"Compiled {len(names)} email templates")
+        return len(names)
+
+    def template(self, name: str) -> Template:
+        tpl = self._templates.get(name)
+        if tpl is None:
+            tpl = self._templates[name] = self.env.get_template(EMAIL_TEMPLATE_PREFIX + name)
+        return tpl
+
+    @staticmethod
+    def _context_key(context: Dict[str, Any]) -> Optional[str]:
+        try:
+            return json.dumps(context, sort_keys=True, default=str, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+
+    def render(self, name: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Render template `name` (relative to `email/`).
+
+        Returns:
+            (html, text) where text is `context["text_fallback"]` or derived from the html
+        """
+        key = self._context_key(context)
+        cache_key = (name, key) if key is not None else None
+        if cache_key is not None:
+            with self._lock:
+                cached = self._rendered.get(cache_key)
+                if cached is not None:
+                    self._rendered.move_to_end(cache_key)
+                    self.hits += 1
+                    return cached
+
+        started = time.perf_counter()
+        body = self.template(name).render(**context)
+        pair = (body, context.get("text_fallback") or html_to_text(body))
+        elapsed = time.perf_counter() - started
+        performance_monitor.record_metric("email.render", elapsed)
+        performance_monitor.record_metric(f"email.render.{name}", elapsed)
+
+        with self._lock:
+            self.misses += 1
+            if cache_key is not None and self.cache_size > 0:
+                self._rendered[cache_key] = pair
+                while len(self._rendered) > self.cache_size:
+                    self._rendered.popitem(last=False)
+        return pair
+
+    def clear(self) -> None:
+        """Forget compiled templates and rendered pairs (e.g. after editing templates)."""
+        with self._lock:
+            self._templates.clear()
+            self._rendered.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "compiled_templates": len(self._templates),
+            "cached_renders": len(self._rendered),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "render_time": performance_monitor.get_stats("email.render"),
+        }
+
+
+email_templates = EmailTemplateEngine()
@@ -1,13 +1,20 @@
 from __future__ import annotations
 import logging
-from typing import Optional
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from sqlalchemy import bindparam, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
+from app.core.config import get_settings
 from app.repositories.estoque import EstoqueRepository
 from app.services.asset import AssetService
 from app.services.serial import SerialService
-from app.db.models import Estoque, Ativo, CatalogoPeca
+from app.services.stock_levels import (
+    INTAKE_MOVEMENT_TYPE, is_intake, open_unit_ledgers, stock_levels, sync_unit_statuses,
+)
+from app.services.ticket_changes import next_change_seq
+from app.db.models import Estoque, Ativo, CatalogoPeca, MovimentacaoEstoque, TipoMovimentacao
 from app.core.exceptions import (
     InventoryError, ValidationError, ConflictError, 
     ErrorHandler, NotFoundError
@@ -15,6 +22,9 @@ from app.core.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Serials per IN (...) conflict lookup
+SERIAL_LOOKUP_CHUNK = 500
+
 
 class InventoryService:
     def __init__(self) -> None:
@@ -31,6 +41,7 @@ class InventoryService:
         status_estoque_id: Optional[int] = None,
         qtd: Optional[int] = 1,
         auto_create_asset: bool = True,
+        user_auth_id: Optional[int] = None,
     ) -> tuple[Estoque, Optional[Ativo]]:
         """
         Process inventory intake with comprehensive validation and error handling.
@@ -43,6 +54,7 @@ class InventoryService:
             status_estoque_id: Optional inventory status ID
             qtd: Quantity (default 1)
             auto_create_asset: Whether to automatically create an asset
+            user_auth_id: User recorded on the intake movement
             
         Returns:
             Tuple of (Estoque, Optional[Ativo])
@@ -130,6 +142,14 @@ class InventoryService:
                     # Log the error and continue without the asset
                     logger.warning(f"Continuing without asset creation due to error: {e}")
             
+            await self.record_movements(session, empresa_id, catalogo_peca_id, [{
+                "estoque_id": estoque.id,
+                "tipo_movimentacao_id": await self._movement_type_id(session, None),
+                "destino_status_estoque_id": status_estoque_id,
+                "quantidade": qtd,
+                "user_auth_id": user_auth_id,
+                "destino_ativo_id": ativo.id if ativo else None,
+            }])
             return estoque, ativo
             
         except (ValidationError, NotFoundError, ConflictError, InventoryError):
@@ -142,21 +162,340 @@ class InventoryService:
                 {"error": str(e), "empresa_id": empresa_id}
             )
 
+    async def bulk_intake(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        catalogo_peca_id: int,
+        units: Optional[List[Dict[str, Any]]] = None,
+        quantity: Optional[int] = None,
+        status_estoque_id: Optional[int] = None,
+        auto_create_asset: bool = True,
+        tipo_movimentacao_id: Optional[int] = None,
+        observacao: Optional[str] = None,
+        user_auth_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Receive a whole shipment of one catalog item.
+        
+        The catalog item is checked once, missing serials come from one
+        serial block, and the `Estoque`, `Ativo` and `MovimentacaoEstoque`
+        rows are written with one batched INSERT each. Nothing is committed
+        here: the caller commits (or rolls back) the shipment as a whole.
+        
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            catalogo_peca_id: Catalog item ID
+            units: Units as dicts with optional `serial` and `qtd`
+            quantity: Number of extra units with generated serials
+            status_estoque_id: Optional inventory status ID for every unit
+            auto_create_asset: Whether to create one asset per unit
+            tipo_movimentacao_id: Movement type (default: the "Entrada" type)
+            observacao: Note stored on the movements
+            user_auth_id: User recorded on the movements
+            
+        Returns:
+            Summary with counts and the first/last serial
+            
+        Raises:
+            ValidationError: For invalid input parameters or duplicate serials in the shipment
+            NotFoundError: If the catalog item or movement type doesn't exist
+            ConflictError: If serials already exist for the company
+            InventoryError: For other inventory-specific errors
+        """
+        ErrorHandler.validate_positive_integer(empresa_id, "empresa_id")
+        ErrorHandler.validate_positive_integer(catalogo_peca_id, "catalogo_peca_id")
+        if status_estoque_id is not None:
+            ErrorHandler.validate_positive_integer(status_estoque_id, "status_estoque_id")
+        units = list(units or [])
+        if quantity is not None:
+            ErrorHandler.validate_positive_integer(quantity, "quantity")
+            units.extend({} for _ in range(quantity))
+        if not units:
+            raise ValidationError("Provide units or a quantity to receive")
+        max_units = get_settings().INVENTORY_BULK_MAX_UNITS
+        if len(units) > max_units:
+            raise ValidationError(
+                f"A bulk intake accepts at most {max_units} units", {"units": len(units), "max": max_units}
+            )
+
+        serials: List[Optional[str]] = []
+        for index, unit in enumerate(units):
+            serial = unit.get("serial")
+            if serial is not None:
+                serial = str(serial).strip()
+                if not serial:
+                    raise ValidationError("Serial number cannot be empty or whitespace", {"unit": index})
+            serials.append(serial)
+        given = [serial for serial in serials if serial]
+        duplicates = sorted(serial for serial, count in Counter(given).items() if count > 1)
+        if duplicates:
+            raise ValidationError("Duplicate serials in the shipment", {"serials": duplicates[:50]})
+
+        try:
+            if not await session.get(CatalogoPeca, catalogo_peca_id):
+                raise NotFoundError(
+                    f"Catalog item with ID {catalogo_peca_id} not found",
+                    {"catalogo_peca_id": catalogo_peca_id}
+                )
+            movement_type_id = await self._movement_type_id(session, tipo_movimentacao_id)
+            existing = await self._existing_serials(session, empresa_id, given)
+            if existing:
+                raise ConflictError(
+                    f"{len(existing)} serial number(s) already exist for this company",
+                    {"serials": existing[:50], "empresa_id": empresa_id}
+                )
+
+            missing = [index for index, serial in enumerate(serials) if not serial]
+            if missing:
+                generated = await self.serial_svc.reserve_serials(session, empresa_id, "ESTOQUE", len(missing))
+                for index, serial in zip(missing, generated):
+                    serials[index] = serial
+
+            stock_rows = [
+                {
+                    "empresa_id": empresa_id,
+                    "catalogo_peca_id": catalogo_peca_id,
+                    "serial": serial,
+                    "status_estoque_id": status_estoque_id,
+                    "qtd": int(unit.get("qtd") or 1),
+                }
+                for unit, serial in zip(units, serials)
+            ]
+            stock_ids = await self._insert_returning_ids(session, Estoque, stock_rows)
+
+            asset_ids: List[Optional[int]] = [None] * len(stock_ids)
+            if auto_create_asset:
+                asset_serials = await self.serial_svc.reserve_serials(session, empresa_id, "ATIVO", len(stock_ids))
+                # Core inserts bypass the flush listener; stamp the asset versions here
+                seq = await next_change_seq(session)
+                asset_ids = await self._insert_returning_ids(session, Ativo, [
+                    {"empresa_id": empresa_id, "serial_text": serial, "stock_unit_id": stock_id, "change_seq": seq}
+                    for serial, stock_id in zip(asset_serials, stock_ids)
+                ])
+                table = Estoque.__table__
+                await session.execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(vinculado_ativo_id=bindparam("b_ativo")),
+                    [{"b_id": stock_id, "b_ativo": asset_id} for stock_id, asset_id in zip(stock_ids, asset_ids)],
+                )
+
+            await self.record_movements(session, empresa_id, catalogo_peca_id, [
+                {
+                    "estoque_id": stock_id,
+                    "tipo_movimentacao_id": movement_type_id,
+                    "destino_status_estoque_id": status_estoque_id,
+                    "quantidade": row["qtd"],
+                    "observacao": observacao,
+                    "user_auth_id": user_auth_id,
+                    "destino_ativo_id": asset_id,
+                }
+                for stock_id, row, asset_id in zip(stock_ids, stock_rows, asset_ids)
+            ])
+        except (ValidationError, NotFoundError, ConflictError, InventoryError):
+            raise
+        except IntegrityError as e:
+            # A concurrent intake took one of the serials after the conflict check
+            logger.warning(f"Integrity error in bulk intake: {e}")
+            raise ConflictError("Serial number conflict during bulk intake", {"error": str(e)})
+        except Exception as e:
+            logger.exception(f"Unexpected error during bulk inventory intake: {e}")
+            raise InventoryError(
+                "An unexpected error occurred during bulk inventory intake",
+                {"error": str(e), "empresa_id": empresa_id}
+            )
+
+        logger.info(f"Bulk intake of {len(stock_ids)} units of catalog item {catalogo_peca_id} for empresa {empresa_id}")
+        return {
+            "catalogo_peca_id": catalogo_peca_id,
+            "received": len(stock_ids),
+            "quantity": sum(row["qtd"] for row in stock_rows),
+            "assets_created": sum(1 for asset_id in asset_ids if asset_id is not None),
+            "generated_serials": len(missing),
+            "first_serial": serials[0],
+            "last_serial": serials[-1],
+        }
+
+    async def record_movements(
+        self,
+        session: AsyncSession,
+        empresa_id: Optional[int],
+        catalogo_peca_id: int,
+        movements: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Append movements of one catalog item to the stock ledger.
+        
+        The rows are inserted in bulk, past the ORM flush, so `stock_level`
+        is updated here in the same transaction (see `movement_deltas` for
+        how a movement changes the levels; units without a tenant have no
+        levels). Pre-ledger units that move get their opening balance
+        recorded first, and status changes move their unit to the new status.
+        """
+        if not movements:
+            return
+        moving = {movement["estoque_id"] for movement in movements if not is_intake(movement)}
+        if moving:
+            await session.run_sync(lambda sync_session: open_unit_ledgers(sync_session.connection(), moving))
+        await session.execute(insert(MovimentacaoEstoque), movements)
+        if empresa_id is not None:
+            await stock_levels.apply_movements(session, empresa_id, catalogo_peca_id, movements)
+        if moving:
+            await session.run_sync(lambda sync_session: sync_unit_statuses(sync_session, movements))
+
+    async def record_unit_created(
+        self,
+        session: AsyncSession,
+        unit: Estoque,
+        user_auth_id: Optional[int] = None,
+    ) -> None:
+        """
+        Record the intake of a unit added outside `intake` (the admin CRUD).
+        
+        Args:
+            session: Database session (flushed to assign the unit id)
+            unit: New inventory unit
+            user_auth_id: User recorded on the movement
+        """
+        await session.flush()
+        await self.record_movements(session, unit.empresa_id, unit.catalogo_peca_id, [{
+            "estoque_id": unit.id,
+            "tipo_movimentacao_id": await self._movement_type_id(session, None),
+            "destino_status_estoque_id": unit.status_estoque_id,
+            "quantidade": unit.qtd if unit.qtd is not None else 1,
+            "user_auth_id": user_auth_id,
+        }])
+
+    async def record_unit_edit(
+        self,
+        session: AsyncSession,
+        unit: Estoque,
+        changes: Dict[str, Any],
+        user_auth_id: Optional[int] = None,
+    ) -> None:
+        """
+        Record an edit of a unit's quantity, status, catalog item or tenant.
+        
+        Call before applying `changes` to the unit. A new quantity is written
+        to the ledger as an adjustment and a new status as a status change;
+        a new catalog item or tenant carries the unit's stock over to it.
+        
+        Args:
+            session: Database session
+            unit: Inventory unit, still holding its current values
+            changes: Column name -> new value
+            user_auth_id: User recorded on the movements
+        """
+        def _int(value: Any) -> Optional[int]:
+            return None if value is None or value == "" else int(value)
+
+        status_id = unit.status_estoque_id
+        qtd = unit.qtd if unit.qtd is not None else 1
+        movements: List[Dict[str, Any]] = []
+        if "qtd" in changes:
+            new_qtd = _int(changes["qtd"])
+            new_qtd = new_qtd if new_qtd is not None else 1
+            if new_qtd != qtd:
+                movements.append({"destino_status_estoque_id": status_id, "quantidade": new_qtd - qtd})
+            qtd = new_qtd
+        new_status = _int(changes.get("status_estoque_id", status_id))
+        if new_status != status_id and qtd > 0:
+            if status_id is None:
+                # Units leave "no status" as an exit there and an intake at the new status
+                movements.append({"destino_status_estoque_id": None, "quantidade": -qtd})
+                movements.append({"destino_status_estoque_id": new_status, "quantidade": qtd})
+            else:
+                movements.append({
+                    "origem_status_estoque_id": status_id,
+                    "destino_status_estoque_id": new_status,
+                    "quantidade": qtd,
+                })
+        if movements:
+            tipo_movimentacao_id = await self._movement_type_id(session, None)
+            await self.record_movements(session, unit.empresa_id, unit.catalogo_peca_id, [
+                {"estoque_id": unit.id, "tipo_movimentacao_id": tipo_movimentacao_id, "user_auth_id": user_auth_id, **movement}
+                for movement in movements
+            ])
+
+        empresa_id = _int(changes.get("empresa_id", unit.empresa_id))
+        catalogo_peca_id = _int(changes.get("catalogo_peca_id", unit.catalogo_peca_id))
+        if (empresa_id, catalogo_peca_id) != (unit.empresa_id, unit.catalogo_peca_id):
+            levels = await stock_levels.unit_levels(session, unit.id)
+            if unit.empresa_id is not None:
+                await stock_levels.apply(
+                    session, unit.empresa_id, unit.catalogo_peca_id, {k: -v for k, v in levels.items()}
+                )
+            if empresa_id is not None:
+                await stock_levels.apply(session, empresa_id, catalogo_peca_id, levels)
+
+    async def record_unit_deleted(self, session: AsyncSession, unit: Estoque) -> None:
+        """Take a unit about to be deleted out of the stock levels."""
+        if unit.empresa_id is None:
+            return
+        levels = await stock_levels.unit_levels(session, unit.id)
+        await stock_levels.apply(session, unit.empresa_id, unit.catalogo_peca_id, {k: -v for k, v in levels.items()})
+
+    async def _movement_type_id(self, session: AsyncSession, tipo_movimentacao_id: Optional[int]) -> int:
+        if tipo_movimentacao_id is not None:
+            if not await session.get(TipoMovimentacao, tipo_movimentacao_id):
+                raise NotFoundError(
+                    f"Movement type with ID {tipo_movimentacao_id} not found",
+                    {"tipo_movimentacao_id": tipo_movimentacao_id}
+                )
+            return tipo_movimentacao_id
+        stmt = select(TipoMovimentacao.id).where(TipoMovimentacao.nome == INTAKE_MOVEMENT_TYPE)
+        found = (await session.execute(stmt)).scalar_one_or_none()
+        if found is None:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(TipoMovimentacao).values(nome=INTAKE_MOVEMENT_TYPE))
+            except IntegrityError:
+                # Created concurrently
+                pass
+            found = (await session.execute(stmt)).scalar_one()
+        return found
+
+    async def _existing_serials(self, session: AsyncSession, empresa_id: int, serials: List[str]) -> List[str]:
+        existing: List[str] = []
+        for start in range(0, len(serials), SERIAL_LOOKUP_CHUNK):
+            chunk = serials[start:start + SERIAL_LOOKUP_CHUNK]
+            res = await session.execute(
+                select(Estoque.serial).where(Estoque.empresa_id == empresa_id, Estoque.serial.in_(chunk))
+            )
+            existing.extend(res.scalars().all())
+        return sorted(existing)
+
+    @staticmethod
+    async def _insert_returning_ids(session: AsyncSession, model: Any, rows: List[Dict[str, Any]]) -> List[int]:
+        """Batched INSERT returning the new ids in input order."""
+        if session.bind.dialect.insert_executemany_returning:
+            res = await session.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+            return list(res.scalars().all())
+        return [
+            (await session.execute(insert(model.__table__).values(**row))).inserted_primary_key[0]
+            for row in rows
+        ]
+
     async def validate_stock_availability(
         self,
         session: AsyncSession,
         empresa_id: int,
         catalogo_peca_id: int,
-        required_qty: int = 1
+        required_qty: int = 1,
+        status_estoque_id: Optional[int] = None,
     ) -> bool:
         """
         Validate if sufficient stock is available for a catalog item.
         
+        Reads the `stock_level` summary (a primary-key lookup when a status
+        is given) instead of scanning inventory items.
+        
         Args:
             session: Database session
             empresa_id: Company ID for tenant scoping
             catalogo_peca_id: Catalog item ID
             required_qty: Required quantity
+            status_estoque_id: Only count stock in this status (default: any status)
             
         Returns:
             True if sufficient stock is available
@@ -166,8 +505,8 @@ class InventoryService:
             ErrorHandler.validate_positive_integer(catalogo_peca_id, "catalogo_peca_id")
             ErrorHandler.validate_positive_integer(required_qty, "required_qty")
             
-            available_qty = await self.estoque_repo.get_available_quantity(
-                session, empresa_id, catalogo_peca_id
+            available_qty = await stock_levels.available(
+                session, empresa_id, catalogo_peca_id, status_estoque_id
             )
             
             return available_qty >= required_qty
@@ -1,13 +1,52 @@
 import smtplib
 import ssl
 from email.message import EmailMessage
-from typing import List, Dict, Any, Optional
-from fastapi.templating import Jinja2Templates
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from app.core.config import get_settings
+from app.services.email_templates import email_templates
 
-templates = Jinja2Templates(directory="app/web/templates")
 settings = get_settings()
 
+# kind -> (settings flags that must all be on, template, subject builder)
+EMAIL_KINDS: Dict[str, Tuple[Tuple[str, ...], str, Callable[[Dict[str, Any]], str]]] = {
+    "ticket_created": (
+        ("NOTIFY_ON_CREATE",), "ticket_created.html",
+        lambda c: f"[Chamado] Criado · {c.get('numero')}",
+    ),
+    "status_changed": (
+        ("NOTIFY_ON_STATUS",), "ticket_status_changed.html",
+        lambda c: f"[Chamado] Status: {c.get('old_status')} → {c.get('new_status')} · {c.get('numero')}",
+    ),
+    "assigned": (
+        ("NOTIFY_ON_ASSIGN",), "ticket_assigned.html",
+        lambda c: f"[Chamado] Atribuído · {c.get('numero')}",
+    ),
+    "pending_customer": (
+        ("NOTIFY_ON_PENDING_CUSTOMER",), "ticket_pending_customer.html",
+        lambda c: f"[Chamado] Aguardando Cliente · {c.get('numero')}",
+    ),
+    "concluded": (
+        ("NOTIFY_ON_CONCLUDED",), "ticket_concluded.html",
+        lambda c: f"[Chamado] Concluído · {c.get('numero')}",
+    ),
+    "sla_response_breach": (
+        ("NOTIFY_SLA_ENABLED", "NOTIFY_SLA_ON_RESPONSE_BREACH"), "sla_breach_response.html",
+        lambda c: f"[SLA] Sem resposta no prazo · {c.get('numero')}",
+    ),
+    "sla_resolution_breach": (
+        ("NOTIFY_SLA_ENABLED", "NOTIFY_SLA_ON_RESOLUTION_BREACH"), "sla_breach_resolution.html",
+        lambda c: f"[SLA] Não resolvido no prazo · {c.get('numero')}",
+    ),
+    "sla_escalation_needed": (
+        ("NOTIFY_SLA_ENABLED", "NOTIFY_SLA_ON_ESCALATION"), "sla_escalation_needed.html",
+        lambda c: f"[SLA] Escalonamento necessário · {c.get('numero')}",
+    ),
+    "sla_overrides_updated": (
+        ("NOTIFY_SLA_ENABLED", "NOTIFY_SLA_ON_OVERRIDES_UPDATED"), "sla_overrides_updated.html",
+        lambda c: "[SLA] Política atualizada",
+    ),
+}
+
 class EmailNotifier:
     def __init__(self) -> None:
         self.enabled = bool(settings.NOTIFY_ENABLED)
@@ -20,17 +59,39 @@ class EmailNotifier:
         self.from_email = settings.SMTP_FROM_EMAIL or (self.smtp_user or "no-reply@example.com")
         self.from_name = settings.SMTP_FROM_NAME or "Sistema Boladão"
 
-    def _send_email(self, to: List[str], subject: str, html: str, text: Optional[str] = None) -> None:
-        if not self.enabled or not self.smtp_host or not to:
-            return
+    def is_enabled(self, kind: str) -> bool:
+        """Whether notifications of `kind` are switched on (SMTP configured and event flags set)."""
+        if not self.enabled or not self.smtp_host or kind not in EMAIL_KINDS:
+            return False
+        flags, _, _ = EMAIL_KINDS[kind]
+        return all(getattr(settings, flag) for flag in flags)
+
+    @staticmethod
+    def recipients(to: List[Optional[str]]) -> List[str]:
+        """Drop empty/invalid addresses and duplicates, keeping order."""
+        return list(dict.fromkeys(str(t) for t in to if t and "@" in str(t)))
+
+    def compose(self, kind: str, to: List[Optional[str]], context: Dict[str, Any]) -> Optional[EmailMessage]:
+        """Render a notification of `kind` into a message, or None when there is nothing to send."""
+        rcpts = self.recipients(to)
+        if not rcpts or kind not in EMAIL_KINDS:
+            return None
+        _, template_name, subject = EMAIL_KINDS[kind]
         msg = EmailMessage()
-        msg["Subject"] = subject
+        msg["Subject"] = subject(context)
         msg["From"] = f"{self.from_name} <{self.from_email}>"
-        msg["To"] = ", ".join([t for t in to if t and "@" in t])
-        if not msg["To"]:
-            return
-        msg.set_content(text or "")
+        msg["To"] = ", ".join(rcpts)
+        html, text = email_templates.render(template_name, context)
+        msg.set_content(text)
         msg.add_alternative(html, subtype="html")
+        return msg
+
+    def _send_email(self, msg: EmailMessage) -> None:
+        """Deliver one message over a fresh blocking SMTP connection.
+
+        Only for scripts and one-off sends; request handlers enqueue through
+        `app.services.notification_queue` instead.
+        """
         if self.use_ssl:
             context = ssl.create_default_context()
             with smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, context=context) as server:
@@ -46,64 +107,41 @@ class EmailNotifier:
                     server.login(self.smtp_user, self.smtp_password)
                 server.send_message(msg)
 
+    def send(self, kind: str, to: List[Optional[str]], context: Dict[str, Any]) -> None:
+        """Render and send a notification synchronously (blocking)."""
+        if not self.is_enabled(kind):
+            return
+        msg = self.compose(kind, to, context)
+        if msg is not None:
+            self._send_email(msg)
+
     def _render(self, request_ctx: Dict[str, Any], template_name: str, context: Dict[str, Any]) -> str:
-        # Simple render via Jinja2Templates, using a fake request
-        class _Req: pass
-        req = _Req()
-        setattr(req, "headers", {})
-        html = templates.get_template(f"email/{template_name}").render({"request": req, **context})
-        return html
+        """HTML body of `template_name` rendered from its compiled (and cached) template."""
+        return email_templates.render(template_name, context)[0]
 
     def send_ticket_created(self, to: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_ON_CREATE: return
-        html = self._render({}, "ticket_created.html", context)
-        subject = f"[Chamado] Criado · {context.get('numero')}"
-        self._send_email(to, subject, html, context.get("text_fallback"))
+        self.send("ticket_created", to, context)
 
     def send_status_changed(self, to: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_ON_STATUS: return
-        html = self._render({}, "ticket_status_changed.html", context)
-        subject = f"[Chamado] Status: {context.get('old_status')} → {context.get('new_status')} · {context.get('numero')}"
-        self._send_email(to, subject, html, context.get("text_fallback"))
+        self.send("status_changed", to, context)
 
     def send_assigned(self, to: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_ON_ASSIGN: return
-        html = self._render({}, "ticket_assigned.html", context)
-        subject = f"[Chamado] Atribuído · {context.get('numero')}"
-        self._send_email(to, subject, html, context.get("text_fallback"))
+        self.send("assigned", to, context)
 
     def send_pending_customer(self, to: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_ON_PENDING_CUSTOMER: return
-        html = self._render({}, "ticket_pending_customer.html", context)
-        subject = f"[Chamado] Aguardando Cliente · {context.get('numero')}"
-        self._send_email(to, subject, html, context.get("text_fallback"))
+        self.send("pending_customer", to, context)
 
     def send_concluded(self, to: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_ON_CONCLUDED: return
-        html = self._render({}, "ticket_concluded.html", context)
-        subject = f"[Chamado] Concluído · {context.get('numero')}"
-        self._send_email(to, subject, html, context.get("text_fallback"))
+        self.send("concluded", to, context)
 
     def send_sla_response_breach(self, to_team: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_SLA_ENABLED or not settings.NOTIFY_SLA_ON_RESPONSE_BREACH: return
-        html = self._render({}, "sla_breach_response.html", context)
-        subject = f"[SLA] Sem resposta no prazo · {context.get('numero')}"
-        self._send_email(to_team, subject, html, context.get("text_fallback"))
+        self.send("sla_response_breach", to_team, context)
 
     def send_sla_resolution_breach(self, to_team: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_SLA_ENABLED or not settings.NOTIFY_SLA_ON_RESOLUTION_BREACH: return
-        html = self._render({}, "sla_breach_resolution.html", context)
-        subject = f"[SLA] Não resolvido no prazo · {context.get('numero')}"
-        self._send_email(to_team, subject, html, context.get("text_fallback"))
+        self.send("sla_resolution_breach", to_team, context)
 
     def send_sla_escalation_needed(self, to_team: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_SLA_ENABLED or not settings.NOTIFY_SLA_ON_ESCALATION: return
-        html = self._render({}, "sla_escalation_needed.html", context)
-        subject = f"[SLA] Escalonamento necessário · {context.get('numero')}"
-        self._send_email(to_team, subject, html, context.get("text_fallback"))
+        self.send("sla_escalation_needed", to_team, context)
 
     def send_sla_overrides_updated(self, to_team: List[str], context: Dict[str, Any]) -> None:
-        if not settings.NOTIFY_SLA_ENABLED or not settings.NOTIFY_SLA_ON_OVERRIDES_UPDATED: return
-        html = self._render({}, "sla_overrides_updated.html", context)
-        subject = "[SLA] Política atualizada"
-        self._send_email(to_team, subject, html, context.get("text_fallback"))
+        self.send("sla_overrides_updated", to_team, context)
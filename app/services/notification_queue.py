@@ -0,0 +1,338 @@
+"""
+Outbox-backed email notification queue.
+
+Request handlers call `enqueue_email`, which stores the notification as an
+`OutboxEvent` (type `notification.email`) in the caller's transaction: it is
+only sent if the business change commits, survives restarts, and costs the
+request one INSERT regardless of how slow the mail server is.
+
+`EmailDispatchWorker` drains the queue in the background. It claims batches
+with a lease (so messages held by a crashed worker are picked up again),
+renders and sends them over one reused, authenticated aiosmtplib connection,
+and reschedules failures with exponential backoff until `max_retries`.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional
+
+import aiosmtplib
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.events import EmailNotificationEvent, event_dispatcher
+from app.db.event_models import EventStatus, EventType, OutboxEvent
+from app.services.notification_email import EmailNotifier
+
+logger = logging.getLogger(__name__)
+
+_ENQUEUED_KEY = "email_notifications_enqueued"
+
+# Errors after which the connection is dropped and rebuilt for the next message
+_CONNECTION_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+    ConnectionError,
+    OSError,
+)
+
+
+async def enqueue_email(
+    session: AsyncSession,
+    kind: str,
+    to: List[Optional[str]],
+    context: Dict[str, Any],
+    empresa_id: Optional[int] = None,
+    aggregate_type: str = "ticket",
+    aggregate_id: Optional[Any] = None,
+) -> bool:
+    """
+    Queue a notification of `kind` (see `EMAIL_KINDS`) in the caller's transaction.
+
+    Args:
+        session: Business transaction session (caller commits)
+        kind: Notification kind
+        to: Recipient addresses; empty and invalid entries are dropped
+        context: Template context (must be JSON serializable)
+        empresa_id: Tenant of the notification
+        aggregate_type: Outbox aggregate type
+        aggregate_id: Outbox aggregate id (e.g. the ticket id)
+
+    Returns:
+        True if a message was queued, False if disabled or without recipients
+    """
+    notifier = EmailNotifier()
+    recipients = notifier.recipients(to)
+    if not recipients or not notifier.is_enabled(kind):
+        return False
+    await event_dispatcher.publish_event(
+        session,
+        EmailNotificationEvent(
+            kind, recipients, context,
+            empresa_id=empresa_id,
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id,
+            max_retries=get_settings().NOTIFY_QUEUE_MAX_RETRIES,
+        ),
+    )
+    session.sync_session.info[_ENQUEUED_KEY] = True
+    return True
+
+
+class SMTPConnection:
+    """A lazily opened aiosmtplib connection reused across messages."""
+
+    def __init__(self, notifier: Optional[EmailNotifier] = None):
+        self.notifier = notifier or EmailNotifier()
+        self._client: Optional[aiosmtplib.SMTP] = None
+        self.last_used = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and self._client.is_connected
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        n = self.notifier
+        cfg = get_settings()
+        client = aiosmtplib.SMTP(
+            hostname=n.smtp_host,
+            port=n.smtp_port,
+            username=n.smtp_user if n.smtp_user and n.smtp_password else None,
+            password=n.smtp_password if n.smtp_user and n.smtp_password else None,
+            use_tls=n.use_ssl,
+            start_tls=(n.use_tls and not n.use_ssl) or None,
+            timeout=cfg.SMTP_TIMEOUT_SECONDS,
+        )
+        # connect() also runs STARTTLS and login when configured
+        await client.connect()
+        return client
+
+    async def send(self, msg: EmailMessage) -> None:
+        """Send over the open connection, reconnecting once if the server dropped it."""
+        for attempt in (1, 2):
+            if not self.connected:
+                self._client = await self._connect()
+            try:
+                await self._client.send_message(msg)
+                self.last_used = time.monotonic()
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                await self.close()
+                if attempt == 2:
+                    raise
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+class EmailDispatchWorker:
+    """Background consumer of queued email notifications."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        transport: Optional[Any] = None,
+    ):
+        self._session_factory = session_factory
+        self._transport = transport
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def transport(self) -> Any:
+        if self._transport is None:
+            self._transport = SMTPConnection()
+        return self._transport
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def wake(self) -> None:
+        """Signal that new messages were committed."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="email-dispatch-worker")
+            logger.info("Email dispatch worker started")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            finally:
+                self._task = None
+        await self.transport.close()
+        logger.info("Email dispatch worker stopped")
+
+    async def _run(self) -> None:
+        cfg = get_settings()
+        while not self._stopping:
+            try:
+                sent = await self.run_once()
+            except Exception as e:
+                logger.error(f"Email dispatch batch failed: {e}")
+                sent = 0
+            if sent:
+                # More may be waiting; drain before sleeping
+                continue
+            transport = self.transport
+            if transport.connected and time.monotonic() - transport.last_used > cfg.SMTP_IDLE_SECONDS:
+                await transport.close()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=cfg.NOTIFY_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim(self, session: AsyncSession, limit: int) -> List[Any]:
+        """Lease up to `limit` due messages to this worker (returned as detached rows)."""
+        now = datetime.utcnow()
+        due = and_(
+            OutboxEvent.event_type == EventType.NOTIFICATION_EMAIL,
+            or_(
+                and_(
+                    OutboxEvent.status.in_([EventStatus.PENDING, EventStatus.RETRYING]),
+                    or_(OutboxEvent.next_retry_at.is_(None), OutboxEvent.next_retry_at <= now),
+                ),
+                # Lease expired: the worker that claimed it did not finish
+                and_(OutboxEvent.status == EventStatus.PROCESSING, OutboxEvent.next_retry_at <= now),
+            ),
+        )
+        query = (
+            select(
+                OutboxEvent.id,
+                OutboxEvent.event_id,
+                OutboxEvent.payload,
+                OutboxEvent.retry_count,
+                OutboxEvent.max_retries,
+            )
+            .where(due)
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+        )
+        if session.bind.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        events = list((await session.execute(query)).all())
+        if not events:
+            return []
+        lease_until = now + timedelta(seconds=get_settings().NOTIFY_QUEUE_LEASE_SECONDS)
+        claimed = await session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_([e.id for e in events]), due)
+            .values(status=EventStatus.PROCESSING, next_retry_at=lease_until)
+            .returning(OutboxEvent.id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed_ids = set(claimed.scalars().all())
+        await session.commit()
+        return [e for e in events if e.id in claimed_ids]
+
+    def _retry_delay(self, retry_count: int) -> float:
+        cfg = get_settings()
+        return min(cfg.NOTIFY_QUEUE_BACKOFF_SECONDS * (2 ** max(0, retry_count - 1)), cfg.NOTIFY_QUEUE_BACKOFF_MAX_SECONDS)
+
+    async def run_once(self, limit: Optional[int] = None) -> int:
+        """
+        Claim one batch, send it and record the outcome.
+
+        Returns:
+            Number of messages handled (sent, rescheduled or failed)
+        """
+        limit = limit or get_settings().NOTIFY_QUEUE_BATCH_SIZE
+        notifier = EmailNotifier()
+        async with self.session_factory() as session:
+            events = await self._claim(session, limit)
+            if not events:
+                return 0
+
+            sent_ids: List[int] = []
+            failures: Dict[int, str] = {}
+            for ev in events:
+                payload = ev.payload or {}
+                try:
+                    msg = notifier.compose(payload.get("kind"), payload.get("to") or [], payload.get("context") or {})
+                    if msg is not None:
+                        await self.transport.send(msg)
+                    sent_ids.append(ev.id)
+                except _CONNECTION_ERRORS as e:
+                    await self.transport.close()
+                    failures[ev.id] = f"{type(e).__name__}: {e}"
+                except Exception as e:
+                    failures[ev.id] = f"{type(e).__name__}: {e}"
+
+            now = datetime.utcnow()
+            if sent_ids:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(sent_ids))
+                    .values(status=EventStatus.PUBLISHED, processed_at=now, next_retry_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for ev in events:
+                if ev.id not in failures:
+                    continue
+                retry_count = (ev.retry_count or 0) + 1
+                values: Dict[str, Any] = {"retry_count": retry_count, "last_error": failures[ev.id][:2000]}
+                if retry_count >= (ev.max_retries or 1):
+                    values.update(status=EventStatus.FAILED, processed_at=now, next_retry_at=None)
+                    logger.error(f"Email notification {ev.event_id} failed permanently: {failures[ev.id]}")
+                else:
+                    delay = self._retry_delay(retry_count)
+                    values.update(status=EventStatus.RETRYING, next_retry_at=now + timedelta(seconds=delay))
+                    logger.warning(
+                        f"Email notification {ev.event_id} failed ({retry_count}/{ev.max_retries}), retry in {delay:.0f}s"
+                    )
+                await session.execute(
+                    update(OutboxEvent).where(OutboxEvent.id == ev.id).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        if sent_ids:
+            logger.info(f"Sent {len(sent_ids)} email notifications ({len(failures)} failed)")
+        return len(events)
+
+    async def handle_outbox_event(self, ev: OutboxEvent) -> None:
+        """Handler for `EventDispatcher.process_event`, so manual outbox processing also delivers mail."""
+        payload = ev.payload or {}
+        msg = EmailNotifier().compose(payload.get("kind"), payload.get("to") or [], payload.get("context") or {})
+        if msg is not None:
+            await self.transport.send(msg)
+
+
+email_worker = EmailDispatchWorker()
+event_dispatcher.register_handler(EventType.NOTIFICATION_EMAIL, email_worker.handle_outbox_event)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_on_commit(session: Session) -> None:
+    if session.info.pop(_ENQUEUED_KEY, False):
+        email_worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_ENQUEUED_KEY, None)
@@ -1,15 +1,15 @@
 from __future__ import annotations
 import logging
-import json
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import Integer, select, and_, or_, case, cast, func, literal_column
 from sqlalchemy.orm import selectinload
 
 from app.repositories.ordem_servico import OrdemServicoRepository
 from app.repositories.chamado import ChamadoRepository
-from app.db.models import OrdemServico, TipoOS, Chamado
+from app.core.pagination import NEXT, PREV, decode_cursor, keyset_order, keyset_predicate, page_cursors
+from app.db.models import OrdemServico, OrdemServicoAtividade, TipoOS, Chamado
 from app.core.service_order_workflow import (
     ServiceOrderWorkflowEngine, ServiceOrderStatus, ActivityEntry
 )
@@ -262,35 +262,14 @@ class OrdemServicoService:
         try:
             ErrorHandler.validate_positive_integer(empresa_id, "empresa_id")
             
-            # Build query with tenant scoping through tickets and eager load relations
-            query = select(OrdemServico).options(
-                selectinload(OrdemServico.tipo),
-                selectinload(OrdemServico.chamado),
-            ).join(
-                Chamado, OrdemServico.chamado_id == Chamado.id
-            ).where(Chamado.empresa_id == empresa_id)
-            
-            if filters:
-                if "tipo_os_id" in filters:
-                    query = query.where(OrdemServico.tipo_os_id == filters["tipo_os_id"])
-                
-                if "chamado_id" in filters:
-                    query = query.where(OrdemServico.chamado_id == filters["chamado_id"])
-                
-                if "numero_apr" in filters and filters["numero_apr"]:
-                    query = query.where(OrdemServico.numero_apr.ilike(f"%{filters['numero_apr']}%"))
-                
-                if "search" in filters and filters["search"]:
-                    search_term = f"%{filters['search']}%"
-                    query = query.where(
-                        or_(
-                            OrdemServico.numero_os.ilike(search_term),
-                            OrdemServico.atividades_realizadas.ilike(search_term),
-                            OrdemServico.observacao.ilike(search_term)
-                        )
-                    )
-                if "requisitante_contato_id" in filters:
-                    query = query.where(Chamado.requisitante_contato_id == filters["requisitante_contato_id"])
+            query = self._apply_list_filters(
+                select(OrdemServico).options(
+                    selectinload(OrdemServico.tipo),
+                    selectinload(OrdemServico.chamado),
+                ),
+                empresa_id,
+                filters,
+            )
             
             # Apply pagination and ordering
             query = query.order_by(OrdemServico.id.desc()).offset(offset).limit(limit)
@@ -305,6 +284,80 @@ class OrdemServicoService:
             logger.error(f"Error listing service orders for empresa {empresa_id}: {e}")
             return []
 
+    @staticmethod
+    def _apply_list_filters(query: Any, empresa_id: int, filters: Optional[Dict[str, Any]] = None) -> Any:
+        """Tenant scoping (through the linked ticket) and listing filters shared by list and version reads."""
+        query = query.join(Chamado, OrdemServico.chamado_id == Chamado.id).where(Chamado.empresa_id == empresa_id)
+        if filters:
+            if "tipo_os_id" in filters:
+                query = query.where(OrdemServico.tipo_os_id == filters["tipo_os_id"])
+            
+            if "chamado_id" in filters:
+                query = query.where(OrdemServico.chamado_id == filters["chamado_id"])
+            
+            if "numero_apr" in filters and filters["numero_apr"]:
+                query = query.where(OrdemServico.numero_apr.ilike(f"%{filters['numero_apr']}%"))
+            
+            if "search" in filters and filters["search"]:
+                search_term = f"%{filters['search']}%"
+                query = query.where(
+                    or_(
+                        OrdemServico.numero_os.ilike(search_term),
+                        OrdemServico.atividades_realizadas.ilike(search_term),
+                        OrdemServico.observacao.ilike(search_term)
+                    )
+                )
+            if "requisitante_contato_id" in filters:
+                query = query.where(Chamado.requisitante_contato_id == filters["requisitante_contato_id"])
+            if filters.get("date_from") is not None:
+                query = query.where(OrdemServico.data_hora_inicio >= filters["date_from"])
+            if filters.get("date_to") is not None:
+                query = query.where(OrdemServico.data_hora_inicio < filters["date_to"])
+            if filters.get("technician_id") is not None:
+                # Assigned agent of the ticket, or anyone who logged work on the order
+                technician_id = filters["technician_id"]
+                query = query.where(
+                    or_(
+                        Chamado.agente_contato_id == technician_id,
+                        select(OrdemServicoAtividade.id).where(
+                            OrdemServicoAtividade.ordem_servico_id == OrdemServico.id,
+                            OrdemServicoAtividade.contato_id == technician_id,
+                        ).exists(),
+                    )
+                )
+        return query
+
+    async def service_order_version(
+        self, session: AsyncSession, empresa_id: int, service_order_id: int
+    ) -> Optional[int]:
+        """
+        Row version (`change_seq`) of a service order visible to the company, for ETags.
+        
+        Same visibility rule as `get_by_id`: orders without a ticket, or whose
+        ticket belongs to the company.
+        """
+        result = await session.execute(
+            select(OrdemServico.change_seq)
+            .outerjoin(Chamado, OrdemServico.chamado_id == Chamado.id)
+            .where(
+                OrdemServico.id == service_order_id,
+                or_(OrdemServico.chamado_id.is_(None), Chamado.empresa_id == empresa_id),
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def list_version(
+        self, session: AsyncSession, empresa_id: int, filters: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Newest `change_seq` and row count of a filtered listing, for ETags."""
+        result = await session.execute(
+            self._apply_list_filters(
+                select(func.max(OrdemServico.change_seq), func.count(OrdemServico.id)), empresa_id, filters
+            )
+        )
+        newest, count = result.one()
+        return f"{newest}:{count}"
+
     async def add_activity(
         self,
         session: AsyncSession,
@@ -346,72 +399,167 @@ class OrdemServicoService:
         self,
         session: AsyncSession,
         empresa_id: int,
-        user_id: Optional[int] = None
+        user_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        technician_id: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Get service order analytics for a company or user.
         
+        Computed by one grouped aggregate over every matching service order
+        (one row per type comes back), so the numbers are exact and memory
+        does not grow with the tenant.
+        
         Args:
             session: Database session
             empresa_id: Company ID for tenant scoping
             user_id: Optional user ID for personal analytics
+            date_from: Only orders started at or after this time
+            date_to: Only orders started before this time
+            technician_id: Only orders assigned to (or worked on by) this contact
             
         Returns:
             Analytics data including time tracking and completion rates
         """
+        # Columns hold naive UTC
+        date_from, date_to = (
+            d.astimezone(timezone.utc).replace(tzinfo=None) if d is not None and d.tzinfo else d
+            for d in (date_from, date_to)
+        )
+        if date_from and date_to and date_from >= date_to:
+            raise ValidationError("date_from must be before date_to")
         try:
-            # Get service orders for analysis
-            filters = {}
+            filters: Dict[str, Any] = {
+                "date_from": date_from, "date_to": date_to, "technician_id": technician_id,
+            }
             if user_id is not None:
                 filters["requisitante_contato_id"] = user_id
-            service_orders = await self.list_service_orders(session, empresa_id, filters, limit=1000)
-            
-            analytics = {
-                "total_service_orders": len(service_orders),
-                "by_type": {},
+
+            started = OrdemServico.data_hora_inicio.is_not(None)
+            finished = and_(started, OrdemServico.data_hora_fim.is_not(None))
+            minutes = self._duration_minutes(session.bind.dialect.name)
+            # Logged activity time when the order has any, the whole span otherwise
+            logged = (
+                select(func.sum(case(
+                    (OrdemServicoAtividade.billable, OrdemServicoAtividade.duration_minutes), else_=0
+                )))
+                .where(
+                    OrdemServicoAtividade.ordem_servico_id == OrdemServico.id,
+                    OrdemServicoAtividade.duration_minutes.is_not(None),
+                )
+                .scalar_subquery()
+            )
+            query = self._apply_list_filters(
+                select(
+                    TipoOS.nome,
+                    func.count(OrdemServico.id),
+                    func.sum(case((finished, 1), else_=0)),
+                    func.sum(case((and_(started, OrdemServico.data_hora_fim.is_(None)), 1), else_=0)),
+                    func.coalesce(func.sum(case((finished, minutes))), 0),
+                    func.coalesce(func.sum(case((finished, func.coalesce(logged, minutes)))), 0),
+                ).outerjoin(TipoOS, OrdemServico.tipo_os_id == TipoOS.id),
+                empresa_id,
+                filters,
+            ).group_by(TipoOS.nome)
+            rows = (await session.execute(query)).all()
+
+            total = completed = in_progress = total_minutes = billable_minutes = 0
+            by_type: Dict[str, int] = {}
+            for type_name, count, done, running, spent, billable in rows:
+                key = type_name or "unknown"
+                by_type[key] = by_type.get(key, 0) + int(count)
+                total += int(count)
+                completed += int(done or 0)
+                in_progress += int(running or 0)
+                total_minutes += int(spent or 0)
+                billable_minutes += int(billable or 0)
+
+            return {
+                "total_service_orders": total,
+                "by_type": by_type,
                 "completion_stats": {
-                    "completed": 0,
-                    "in_progress": 0,
-                    "pending": 0
+                    "completed": completed,
+                    "in_progress": in_progress,
+                    "pending": total - completed - in_progress,
                 },
                 "time_tracking": {
-                    "total_hours": 0,
-                    "billable_hours": 0,
-                    "average_duration": 0
-                }
+                    "total_hours": round(total_minutes / 60, 2),
+                    "billable_hours": round(billable_minutes / 60, 2),
+                    "average_duration": round(total_minutes / completed, 2) if completed else 0,
+                },
             }
-            
-            total_duration = 0
-            completed_count = 0
-            
-            for os in service_orders:
-                # Count by type
-                type_name = os.tipo.nome if os.tipo else "unknown"
-                analytics["by_type"][type_name] = analytics["by_type"].get(type_name, 0) + 1
-                
-                # Calculate duration if available
-                if os.data_hora_inicio and os.data_hora_fim:
-                    duration = self.workflow.calculate_duration(os.data_hora_inicio, os.data_hora_fim)
-                    total_duration += duration
-                    completed_count += 1
-                    analytics["completion_stats"]["completed"] += 1
-                elif os.data_hora_inicio:
-                    analytics["completion_stats"]["in_progress"] += 1
-                else:
-                    analytics["completion_stats"]["pending"] += 1
-            
-            # Calculate averages
-            if completed_count > 0:
-                analytics["time_tracking"]["average_duration"] = round(total_duration / completed_count, 2)
-                analytics["time_tracking"]["total_hours"] = round(total_duration / 60, 2)
-                # For now, assume all time is billable (would be calculated from activities in production)
-                analytics["time_tracking"]["billable_hours"] = analytics["time_tracking"]["total_hours"]
-            
-            return analytics
-            
+
         except Exception as e:
-            logger.error(f"Error generating service order analytics: {e}")
-            return {"error": str(e)}
+            logger.exception(f"Error generating service order analytics: {e}")
+            raise ServiceOrderError(
+                "Failed to generate service order analytics",
+                {"error": str(e), "empresa_id": empresa_id}
+            )
+
+    @staticmethod
+    def _duration_minutes(dialect: str) -> Any:
+        """Whole minutes from start to end in SQL (truncated like `calculate_duration`)."""
+        start, end = OrdemServico.data_hora_inicio, OrdemServico.data_hora_fim
+        if dialect == "sqlite":
+            return (cast(func.strftime("%s", end), Integer) - cast(func.strftime("%s", start), Integer)) // 60
+        if dialect == "postgresql":
+            return cast(func.trunc(func.extract("epoch", end - start) / 60), Integer)
+        return func.timestampdiff(literal_column("MINUTE"), start, end)
+
+    async def list_activities(
+        self,
+        session: AsyncSession,
+        service_order_id: int,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Page through a service order's activity log, oldest first.
+
+        Args:
+            session: Database session
+            service_order_id: Service order ID (tenant access is checked by the caller)
+            limit: Page size
+            cursor: Cursor returned by a previous call
+
+        Returns:
+            Dict with `activities`, `next_cursor` and `prev_cursor`
+
+        Raises:
+            ValidationError: If the cursor is malformed
+        """
+        decoded = decode_cursor(cursor, sort_key="timestamp") if cursor else None
+        direction = decoded["direction"] if decoded else NEXT
+        column, id_column = OrdemServicoAtividade.timestamp, OrdemServicoAtividade.id
+
+        query = select(OrdemServicoAtividade).where(OrdemServicoAtividade.ordem_servico_id == service_order_id)
+        if decoded:
+            query = query.where(keyset_predicate(column, id_column, decoded, descending=False))
+        query = query.order_by(*keyset_order(column, id_column, descending=False, direction=direction))
+        result = await session.execute(query.limit(limit + 1))
+        activities = list(result.scalars().all())
+        has_more = len(activities) > limit
+        activities = activities[:limit]
+        if direction == PREV:
+            activities.reverse()
+
+        next_cursor, prev_cursor = page_cursors(
+            activities, "timestamp", has_more, direction, had_cursor=bool(decoded), sort_key="timestamp",
+        )
+        return {"activities": activities, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    async def calculate_billable_time(self, session: AsyncSession, service_order_id: int) -> Dict[str, Any]:
+        """Billable / non-billable minutes of a service order, summed in SQL."""
+        minutes = func.coalesce(OrdemServicoAtividade.duration_minutes, 0)
+        result = await session.execute(
+            select(
+                func.coalesce(func.sum(case((OrdemServicoAtividade.billable, minutes), else_=0)), 0),
+                func.coalesce(func.sum(case((OrdemServicoAtividade.billable, 0), else_=minutes)), 0),
+            ).where(OrdemServicoAtividade.ordem_servico_id == service_order_id)
+        )
+        billable, non_billable = result.one()
+        return self.workflow.billable_summary(int(billable), int(non_billable))
 
     async def _log_activity(
         self,
@@ -424,41 +572,21 @@ class OrdemServicoService:
         billable: bool = True
     ) -> None:
         """
-        Log an activity entry for a service order.
-        
-        Note: This is a simplified implementation. In production, this would
-        store activities in a dedicated table with proper relationships.
+        Append an activity entry to a service order's log.
+
+        A single INSERT: the cost does not grow with the history and
+        concurrent entries cannot overwrite each other.
         """
-        # For now, we'll store activities as JSON in the observacao field
-        # In production, this would use a dedicated activities table
-        try:
-            os = await session.get(OrdemServico, service_order_id)
-            if os:
-                activity_entry = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "user_id": user_id,
-                    "activity_type": activity_type,
-                    "description": description,
-                    "duration_minutes": duration_minutes,
-                    "billable": billable
-                }
-                
-                # Append to existing activities (stored as JSON in observacao for now)
-                current_activities = []
-                if os.observacao:
-                    try:
-                        current_activities = json.loads(os.observacao)
-                        if not isinstance(current_activities, list):
-                            current_activities = []
-                    except json.JSONDecodeError:
-                        # If observacao is not JSON, preserve it as a text entry
-                        current_activities = [{"description": os.observacao, "type": "note"}]
-                
-                current_activities.append(activity_entry)
-                os.observacao = json.dumps(current_activities)
-                
-        except Exception as e:
-            logger.error(f"Error logging activity for service order {service_order_id}: {e}")
+        session.add(OrdemServicoAtividade(
+            ordem_servico_id=service_order_id,
+            timestamp=datetime.utcnow(),
+            contato_id=user_id,
+            activity_type=activity_type,
+            description=description,
+            duration_minutes=duration_minutes,
+            billable=billable,
+        ))
+        await session.flush()
 
 # Backwards-compatibility alias for tests and external imports
 # Some test modules expect `ServiceOrderService` in this module
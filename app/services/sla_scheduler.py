@@ -0,0 +1,426 @@
+"""
+Proactive SLA breach alerts driven by a deadline heap.
+
+Open tickets store their next deadlines in `chamado.sla_resposta_ate`,
+`sla_resolucao_ate` and `sla_escalonamento_ate` (see
+`TicketService.refresh_sla_deadlines`). `SLAScheduler` keeps every pending
+deadline in a min-heap:
+
+- at startup it is seeded per tenant and kind through the
+  `ix_chamado_empresa_sla_*` indexes, skipping alerts already fired;
+- ORM flushes that change a ticket's deadlines (create, update, macros,
+  auto-close) re-schedule that ticket once the transaction commits, at
+  O(log n) per changed deadline; superseded heap entries are dropped lazily;
+- a background task sleeps until the earliest deadline, re-checks it against
+  the database, records the alert in `chamado_sla_alerta` and queues the
+  `TICKET_SLA_BREACHED` event plus the team email in one transaction.
+
+The unique (ticket, kind, deadline) alert row makes firing idempotent, so
+restarts and several application processes never send an alert twice.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, exists, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.events import TicketSlaBreachedEvent, event_dispatcher
+from app.core.helpdesk_config import load_notifications_config
+from app.core.reference_data import reference_data
+from app.core.ticket_workflow import TicketWorkflowEngine
+from app.db.models import Chamado, ChamadoSlaAlerta, Contato, Empresa
+from app.services.notification_queue import enqueue_email
+
+logger = logging.getLogger(__name__)
+
+# kind -> (deadline column, email notification kind)
+SLA_KINDS: Dict[str, Tuple[str, str]] = {
+    "response": ("sla_resposta_ate", "sla_response_breach"),
+    "resolution": ("sla_resolucao_ate", "sla_resolution_breach"),
+    "escalation": ("sla_escalonamento_ate", "sla_escalation_needed"),
+}
+
+# (ticket_id, empresa_id, kind, deadline)
+DueDeadline = Tuple[int, Optional[int], str, datetime]
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def resolved_status_ids(session: AsyncSession) -> Set[int]:
+    """Ids of the statuses that count as resolved (their tickets never alert)."""
+    statuses = await reference_data.statuses(session)
+    return {entry.id for entry in statuses.entries if TicketWorkflowEngine.is_resolved_status(entry.nome)}
+
+
+class SLADeadlineHeap:
+    """Min-heap of (deadline, ticket, kind) with lazy invalidation of superseded entries."""
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._current: Dict[Tuple[int, str], Tuple[datetime, Optional[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def _valid(self, entry: Tuple[datetime, int, str]) -> bool:
+        current = self._current.get((entry[1], entry[2]))
+        return current is not None and current[0] == entry[0]
+
+    def _prune(self) -> None:
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def set(self, ticket_id: int, empresa_id: Optional[int], kind: str, deadline: Optional[datetime]) -> bool:
+        """
+        Schedule (or clear, with None) one deadline of a ticket.
+
+        Returns:
+            True if the deadline is now the earliest one in the heap
+        """
+        key = (ticket_id, kind)
+        deadline = _naive_utc(deadline)
+        if deadline is None:
+            self._current.pop(key, None)
+            return False
+        current = self._current.get(key)
+        if current is not None and current[0] == deadline:
+            return False
+        self._current[key] = (deadline, empresa_id)
+        heapq.heappush(self._heap, (deadline, ticket_id, kind))
+        # Superseded entries stay in the heap until popped; rebuild when they dominate
+        if len(self._heap) > 2 * len(self._current) + 1024:
+            self._heap = [(d, t, k) for (t, k), (d, _) in self._current.items()]
+            heapq.heapify(self._heap)
+        self._prune()
+        return self._heap[0] == (deadline, ticket_id, kind)
+
+    def get(self, ticket_id: int, kind: str) -> Optional[datetime]:
+        """Scheduled deadline of one ticket and kind, or None."""
+        current = self._current.get((ticket_id, kind))
+        return current[0] if current else None
+
+    def discard(self, ticket_id: int, kinds: Iterable[str] = SLA_KINDS) -> None:
+        for kind in kinds:
+            self._current.pop((ticket_id, kind), None)
+
+    def peek(self) -> Optional[datetime]:
+        """Earliest pending deadline, or None when empty."""
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime, limit: int) -> List[DueDeadline]:
+        """Remove and return up to `limit` deadlines at or before `now`, earliest first."""
+        due: List[DueDeadline] = []
+        while len(due) < limit:
+            self._prune()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            deadline, ticket_id, kind = heapq.heappop(self._heap)
+            _, empresa_id = self._current.pop((ticket_id, kind))
+            due.append((ticket_id, empresa_id, kind, deadline))
+        return due
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._current.clear()
+
+
+class SLAScheduler:
+    """Fires SLA breach alerts when ticket deadlines pass."""
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self._session_factory = session_factory
+        self.heap = SLADeadlineHeap()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.seeded = 0
+        self.fired = 0
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def schedule(self, ticket_id: int, empresa_id: Optional[int], deadlines: Dict[str, Optional[datetime]]) -> None:
+        """Replace the given deadlines of a ticket (None clears one)."""
+        earliest = False
+        for kind, deadline in deadlines.items():
+            earliest = self.heap.set(ticket_id, empresa_id, kind, deadline) or earliest
+        if earliest:
+            self._wakeup.set()
+
+    def discard(self, ticket_id: int, kinds: Iterable[str] = SLA_KINDS) -> None:
+        self.heap.discard(ticket_id, kinds)
+
+    async def seed(self, session: AsyncSession) -> int:
+        """Load every pending deadline that has not fired yet; returns how many were scheduled."""
+        tenants: List[Optional[int]] = list((await session.execute(select(Empresa.id))).scalars().all())
+        tenants.append(None)
+        # Resolved tickets may keep a response deadline (never answered) but do not alert
+        resolved = await resolved_status_ids(session)
+        unresolved = or_(Chamado.status_id.is_(None), Chamado.status_id.not_in(resolved)) if resolved else None
+        count = 0
+        for kind, (column_name, _) in SLA_KINDS.items():
+            column = getattr(Chamado, column_name)
+            fired = exists().where(
+                ChamadoSlaAlerta.chamado_id == Chamado.id,
+                ChamadoSlaAlerta.tipo == kind,
+                ChamadoSlaAlerta.prazo == column,
+            )
+            for empresa_id in tenants:
+                tenant = Chamado.empresa_id.is_(None) if empresa_id is None else Chamado.empresa_id == empresa_id
+                query = select(Chamado.id, column).where(tenant, column.is_not(None), ~fired)
+                if unresolved is not None:
+                    query = query.where(unresolved)
+                res = await session.execute(query)
+                for ticket_id, deadline in res.all():
+                    self.heap.set(ticket_id, empresa_id, kind, deadline)
+                    count += 1
+        self.seeded = count
+        self._wakeup.set()
+        logger.info(f"SLA scheduler seeded with {count} deadlines")
+        return count
+
+    async def fire_due(self, now: Optional[datetime] = None) -> int:
+        """
+        Fire alerts for one batch of due deadlines.
+
+        Returns:
+            Number of due deadlines handled (fired or found superseded)
+        """
+        now = now or datetime.utcnow()
+        due = self.heap.pop_due(now, max(1, get_settings().SLA_SCHEDULER_BATCH_SIZE))
+        if not due:
+            return 0
+        try:
+            async with self.session_factory() as session:
+                fired = await self._fire(session, due, now)
+                await session.commit()
+        except Exception:
+            # Put the batch back so it is retried on the next pass
+            for ticket_id, empresa_id, kind, deadline in due:
+                self.heap.set(ticket_id, empresa_id, kind, deadline)
+            raise
+        self.fired += fired
+        if fired:
+            logger.info(f"Fired {fired} SLA alerts")
+        return len(due)
+
+    async def _fire(self, session: AsyncSession, due: List[DueDeadline], now: datetime) -> int:
+        columns = [getattr(Chamado, column_name) for column_name, _ in SLA_KINDS.values()]
+        res = await session.execute(
+            select(
+                Chamado.id, Chamado.empresa_id, Chamado.numero, Chamado.titulo,
+                Chamado.descricao, Chamado.prioridade_id, Chamado.status_id, *columns,
+            ).where(Chamado.id.in_({d[0] for d in due}))
+        )
+        resolved = await resolved_status_ids(session)
+        # Tickets resolved meanwhile drop out (a kept response deadline included)
+        tickets = {row.id: row for row in res.all() if row.status_id not in resolved}
+
+        # Only fire deadlines the database still holds; follow ones that moved
+        pending: List[Tuple[Any, str, datetime]] = []
+        for ticket_id, _, kind, deadline in due:
+            row = tickets.get(ticket_id)
+            stored = _naive_utc(getattr(row, SLA_KINDS[kind][0])) if row is not None else None
+            if stored is None:
+                continue
+            if stored != deadline:
+                self.schedule(ticket_id, row.empresa_id, {kind: stored})
+                continue
+            pending.append((row, kind, deadline))
+        if not pending:
+            return 0
+
+        claimed = await self._claim_alerts(session, pending)
+        if not claimed:
+            return 0
+        priorities = await reference_data.priorities(session)
+        teams: Dict[Optional[int], List[str]] = {}
+        for row, kind, deadline in claimed:
+            await event_dispatcher.publish_event(
+                session, TicketSlaBreachedEvent(row.id, row.empresa_id, kind, deadline, numero=row.numero)
+            )
+            if row.empresa_id not in teams:
+                teams[row.empresa_id] = await sla_team_emails(session, row.empresa_id)
+            priority = priorities.get(row.prioridade_id)
+            ctx = {
+                "numero": str(row.numero or ""),
+                "titulo": str(row.titulo or ""),
+                "descricao": row.descricao,
+                "prioridade": priority.nome if priority else None,
+                "prazo": deadline.isoformat(),
+            }
+            await enqueue_email(
+                session, SLA_KINDS[kind][1], teams[row.empresa_id], ctx,
+                empresa_id=row.empresa_id, aggregate_type="ticket", aggregate_id=row.id,
+            )
+        return len(claimed)
+
+    async def _claim_alerts(
+        self, session: AsyncSession, pending: List[Tuple[Any, str, datetime]]
+    ) -> List[Tuple[Any, str, datetime]]:
+        """Insert the alert rows; returns the entries this call inserted (not fired before)."""
+        values = [
+            {"chamado_id": row.id, "empresa_id": row.empresa_id or 0, "tipo": kind, "prazo": deadline}
+            for row, kind, deadline in pending
+        ]
+        table = ChamadoSlaAlerta.__table__
+        dialect = session.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            res = await session.execute(
+                dialect_insert(table).values(values)
+                .on_conflict_do_nothing(index_elements=["chamado_id", "tipo", "prazo"])
+                .returning(table.c.chamado_id, table.c.tipo)
+            )
+            inserted = {(r.chamado_id, r.tipo) for r in res.all()}
+        else:
+            # Generic fallback: skip alerts that already exist, insert the rest
+            res = await session.execute(
+                select(table.c.chamado_id, table.c.tipo, table.c.prazo).where(
+                    table.c.chamado_id.in_({v["chamado_id"] for v in values})
+                )
+            )
+            existing = {(r.chamado_id, r.tipo, _naive_utc(r.prazo)) for r in res.all()}
+            values = [v for v in values if (v["chamado_id"], v["tipo"], v["prazo"]) not in existing]
+            if values:
+                await session.execute(table.insert(), values)
+            inserted = {(v["chamado_id"], v["tipo"]) for v in values}
+        return [(row, kind, deadline) for row, kind, deadline in pending if (row.id, kind) in inserted]
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="sla-scheduler")
+            logger.info("SLA scheduler started")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await self._task
+            finally:
+                self._task = None
+        logger.info("SLA scheduler stopped")
+
+    async def _run(self) -> None:
+        try:
+            async with self.session_factory() as session:
+                await self.seed(session)
+        except Exception as e:
+            logger.error(f"SLA scheduler seed failed: {e}")
+        while not self._stopping:
+            self._wakeup.clear()
+            timeout = get_settings().SLA_SCHEDULER_MAX_SLEEP_SECONDS
+            try:
+                if await self.fire_due():
+                    continue
+            except Exception as e:
+                logger.error(f"SLA scheduler pass failed: {e}")
+            else:
+                next_due = self.heap.peek()
+                if next_due is not None:
+                    timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        next_due = self.heap.peek()
+        return {
+            "running": self.running,
+            "scheduled": len(self.heap),
+            "next_due": next_due.isoformat() if next_due else None,
+            "seeded": self.seeded,
+            "fired": self.fired,
+        }
+
+
+async def sla_team_emails(session: AsyncSession, empresa_id: Optional[int]) -> List[str]:
+    """Recipients of a tenant's SLA alerts: configured team contacts plus `NOTIFY_SLA_TEAM_EMAILS`."""
+    cfg = load_notifications_config().get("sla", {})
+    team_ids: Set[int] = set()
+    for value in cfg.get("team_contact_ids") or []:
+        try:
+            team_ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    for rule in cfg.get("company_rules") or []:
+        try:
+            if empresa_id is not None and int(rule.get("empresa_id")) == int(empresa_id):
+                team_ids.update(int(c) for c in rule.get("contact_ids") or [])
+        except (TypeError, ValueError):
+            continue
+    emails = list(get_settings().NOTIFY_SLA_TEAM_EMAILS)
+    if team_ids:
+        res = await session.execute(select(Contato.email).where(Contato.id.in_(team_ids)))
+        emails.extend(str(email) for email in res.scalars().all() if email and "@" in str(email))
+    return emails
+
+
+sla_scheduler = SLAScheduler()
+
+
+_PENDING_KEY = "sla_deadlines_changed"
+
+
+def stage_deadlines(
+    session: Session, ticket_id: int, empresa_id: Optional[int], deadlines: Dict[str, Optional[datetime]]
+) -> None:
+    """Re-schedule a ticket's deadlines when `session` commits (for writes that bypass the ORM)."""
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    staged = pending.setdefault(ticket_id, (empresa_id, {}))[1]
+    staged.update(deadlines)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_on_flush(session: Session, flush_context: Any) -> None:
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, Chamado) or obj.id is None:
+            continue
+        state = inspect(obj)
+        changed = {
+            kind: getattr(obj, column_name)
+            for kind, (column_name, _) in SLA_KINDS.items()
+            if obj in session.new or state.attrs[column_name].history.has_changes()
+        }
+        if changed:
+            stage_deadlines(session, obj.id, obj.empresa_id, changed)
+    for obj in session.deleted:
+        if isinstance(obj, Chamado) and obj.id is not None:
+            stage_deadlines(session, obj.id, obj.empresa_id, {kind: None for kind in SLA_KINDS})
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_on_commit(session: Session) -> None:
+    for ticket_id, (empresa_id, deadlines) in session.info.pop(_PENDING_KEY, {}).items():
+        sla_scheduler.schedule(ticket_id, empresa_id, deadlines)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,407 @@
+from __future__ import annotations
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, exists, func, insert, literal, select, union_all, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history, set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.db.models import Estoque, MovimentacaoEstoque, StockLevel, TipoMovimentacao
+
+logger = logging.getLogger(__name__)
+
+_KEY_COLUMNS = ("empresa_id", "catalogo_peca_id", "status_estoque_id")
+
+# Movement type recorded for intakes when the caller does not pass one
+INTAKE_MOVEMENT_TYPE = "Entrada"
+# Note on the intake movement that records a pre-ledger unit's opening balance
+OPENING_BALANCE_NOTE = "Saldo inicial"
+
+
+def movement_deltas(movements: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """
+    Net stock change per status (0 for "no status") of a set of movements.
+
+    A movement adds `quantidade` to its destination status and, when it has
+    an origin status, takes it from there: an intake has no origin, a status
+    change has both, and an exit is a negative quantity at the status the
+    units leave.
+    """
+    deltas: Dict[int, int] = {}
+    for movement in movements:
+        quantity = int(movement.get("quantidade") or 0)
+        if not quantity:
+            continue
+        target = int(movement.get("destino_status_estoque_id") or 0)
+        deltas[target] = deltas.get(target, 0) + quantity
+        if movement.get("origem_status_estoque_id") is not None:
+            source = int(movement["origem_status_estoque_id"])
+            deltas[source] = deltas.get(source, 0) - quantity
+    return {status: delta for status, delta in deltas.items() if delta}
+
+
+def apply_deltas(connection: Connection, empresa_id: int, catalogo_peca_id: int, deltas: Dict[int, int]) -> None:
+    """Add `deltas` (status id, 0 for none -> quantity) to an item's levels inside the connection's transaction."""
+    table = StockLevel.__table__
+    dialect = connection.dialect.name
+    for status_id, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        key = {"empresa_id": empresa_id, "catalogo_peca_id": catalogo_peca_id, "status_estoque_id": int(status_id or 0)}
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(table).values(**key, quantidade=delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_KEY_COLUMNS),
+                set_={"quantidade": table.c.quantidade + stmt.excluded.quantidade, "atualizado_em": func.now()},
+            )
+            connection.execute(stmt)
+            continue
+
+        # Generic fallback: update the row, insert it when missing.
+        res = connection.execute(
+            update(table)
+            .where(*[table.c[col] == val for col, val in key.items()])
+            .values(quantidade=table.c.quantidade + delta, atualizado_em=func.now())
+        )
+        if not res.rowcount:
+            connection.execute(insert(table).values(**key, quantidade=delta))
+
+
+def is_intake(movement: Dict[str, Any]) -> bool:
+    """Whether a movement brings units in (no origin status, positive quantity)."""
+    return movement.get("origem_status_estoque_id") is None and int(movement.get("quantidade") or 0) > 0
+
+
+def is_status_change(movement: Dict[str, Any]) -> bool:
+    """Whether a movement moves units from one status to another."""
+    return movement.get("origem_status_estoque_id") is not None and int(movement.get("quantidade") or 0) > 0
+
+
+def intake_type_id(connection: Connection) -> int:
+    """Id of the intake movement type, created when missing."""
+    stmt = select(TipoMovimentacao.id).where(TipoMovimentacao.nome == INTAKE_MOVEMENT_TYPE)
+    found = connection.execute(stmt).scalar_one_or_none()
+    if found is None:
+        connection.execute(insert(TipoMovimentacao.__table__).values(nome=INTAKE_MOVEMENT_TYPE))
+        found = connection.execute(stmt).scalar_one()
+    return found
+
+
+def open_unit_ledgers(connection: Connection, unit_ids: Iterable[int]) -> Set[int]:
+    """
+    Write the opening balance of pre-ledger units as an intake movement.
+
+    A unit without an intake movement counts its `qtd` at its current status
+    (see `StockLevelProjection.rebuild`). Once the unit moves, its status no
+    longer says where that balance sits, so it is recorded in the ledger
+    first, at the status the unit has now. The levels do not change.
+
+    Returns:
+        Ids of the units whose ledger was opened
+    """
+    unit_ids = {unit_id for unit_id in unit_ids if unit_id is not None}
+    if not unit_ids:
+        return set()
+    rows = connection.execute(
+        select(Estoque.id, Estoque.status_estoque_id, Estoque.qtd).where(
+            Estoque.id.in_(unit_ids),
+            func.coalesce(Estoque.qtd, 1) > 0,
+            ~exists().where(
+                MovimentacaoEstoque.estoque_id == Estoque.id,
+                MovimentacaoEstoque.origem_status_estoque_id.is_(None),
+                MovimentacaoEstoque.quantidade > 0,
+            ),
+        )
+    ).all()
+    if not rows:
+        return set()
+    type_id = intake_type_id(connection)
+    connection.execute(insert(MovimentacaoEstoque.__table__), [
+        {
+            "estoque_id": row.id,
+            "tipo_movimentacao_id": type_id,
+            "destino_status_estoque_id": row.status_estoque_id,
+            "quantidade": int(row.qtd if row.qtd is not None else 1),
+            "observacao": OPENING_BALANCE_NOTE,
+        }
+        for row in rows
+    ])
+    return {row.id for row in rows}
+
+
+def sync_unit_statuses(session: Session, movements: Iterable[Dict[str, Any]]) -> None:
+    """Move units to the destination status of their status-change movements."""
+    targets: Dict[int, Optional[int]] = {}
+    for movement in movements:
+        if is_status_change(movement) and movement.get("estoque_id") is not None:
+            targets[int(movement["estoque_id"])] = movement.get("destino_status_estoque_id")
+    if not targets:
+        return
+    by_status: Dict[Optional[int], List[int]] = {}
+    for unit_id, status_id in targets.items():
+        by_status.setdefault(status_id, []).append(unit_id)
+    table = Estoque.__table__
+    connection = session.connection()
+    for status_id, unit_ids in by_status.items():
+        connection.execute(update(table).where(table.c.id.in_(unit_ids)).values(status_estoque_id=status_id))
+    # Keep loaded units in step, unless the caller is changing their status itself
+    for unit_id, status_id in targets.items():
+        unit = session.identity_map.get(identity_key(Estoque, unit_id))
+        if unit is not None and not get_history(unit, "status_estoque_id").has_changes():
+            set_committed_value(unit, "status_estoque_id", status_id)
+
+
+class StockLevelProjection:
+    """Maintains `stock_level`, the on-hand quantity per tenant/catalog item/status.
+
+    Bulk writers that insert movements with Core statements apply them here
+    in the same transaction; movements written through the ORM (the admin
+    CRUD) are applied by a `before_flush` listener. Either way the levels
+    agree with the committed ledger.
+    """
+
+    async def apply(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        catalogo_peca_id: int,
+        deltas: Dict[int, int],
+    ) -> None:
+        """Add `deltas` (status id, 0 for none -> quantity) to the item's levels."""
+        await session.run_sync(
+            lambda sync_session: apply_deltas(sync_session.connection(), empresa_id, catalogo_peca_id, deltas)
+        )
+
+    async def apply_movements(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        catalogo_peca_id: int,
+        movements: Iterable[Dict[str, Any]],
+    ) -> None:
+        """Apply movements of one catalog item (one upsert per touched status)."""
+        await self.apply(session, empresa_id, catalogo_peca_id, movement_deltas(movements))
+
+    async def available(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        catalogo_peca_id: int,
+        status_estoque_id: Optional[int] = None,
+    ) -> int:
+        """
+        Quantity on hand of a catalog item.
+
+        With a status this is a single primary-key lookup; without one the
+        item's levels (one row per status) are summed over the key prefix.
+        """
+        stmt = select(func.coalesce(func.sum(StockLevel.quantidade), 0)).where(
+            StockLevel.empresa_id == empresa_id, StockLevel.catalogo_peca_id == catalogo_peca_id
+        )
+        if status_estoque_id is not None:
+            stmt = stmt.where(StockLevel.status_estoque_id == status_estoque_id)
+        return int((await session.execute(stmt)).scalar_one())
+
+    async def levels(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        catalogo_peca_id: Optional[int] = None,
+    ) -> List[StockLevel]:
+        """Non-zero levels of a tenant (optionally of one catalog item), in key order."""
+        stmt = select(StockLevel).where(StockLevel.empresa_id == empresa_id, StockLevel.quantidade != 0)
+        if catalogo_peca_id is not None:
+            stmt = stmt.where(StockLevel.catalogo_peca_id == catalogo_peca_id)
+        stmt = stmt.order_by(StockLevel.catalogo_peca_id, StockLevel.status_estoque_id)
+        return list((await session.execute(stmt)).scalars().all())
+
+    async def unit_levels(self, session: AsyncSession, estoque_id: int) -> Dict[int, int]:
+        """Stock one unit contributes to its item's levels (status id, 0 for none -> quantity)."""
+        flows = union_all(*[part.where(Estoque.id == estoque_id) for part in _unit_flows()]).subquery()
+        rows = await session.execute(
+            select(flows.c.status_estoque_id, func.sum(flows.c.quantidade)).group_by(flows.c.status_estoque_id)
+        )
+        return {int(status_id or 0): int(quantity) for status_id, quantity in rows if quantity}
+
+    async def rebuild(self, session: AsyncSession, empresa_id: Optional[int] = None) -> int:
+        """
+        Recompute the levels from the `movimentacao_estoque` ledger.
+
+        Units recorded before intakes wrote movements have no intake entry
+        in the ledger (they may have later status changes); they count as an
+        opening balance of their `qtd` in their current status.
+
+        Args:
+            session: Database session (caller commits)
+            empresa_id: Restrict to one tenant; None rebuilds every tenant
+
+        Returns:
+            Number of stock level rows written
+        """
+        parts = []
+        for part in _unit_flows():
+            part = part.where(Estoque.empresa_id.is_not(None))
+            if empresa_id is not None:
+                part = part.where(Estoque.empresa_id == empresa_id)
+            parts.append(part)
+        flows = union_all(*parts).subquery()
+        key_cols = [flows.c[col] for col in _KEY_COLUMNS]
+        aggregate = (
+            select(*key_cols, func.sum(flows.c.quantidade))
+            .group_by(*key_cols)
+            .having(func.sum(flows.c.quantidade) != 0)
+        )
+
+        purge = delete(StockLevel)
+        if empresa_id is not None:
+            purge = purge.where(StockLevel.empresa_id == empresa_id)
+        await session.execute(purge)
+        await session.execute(insert(StockLevel).from_select(list(_KEY_COLUMNS) + ["quantidade"], aggregate))
+
+        count_q = select(func.count()).select_from(StockLevel)
+        if empresa_id is not None:
+            count_q = count_q.where(StockLevel.empresa_id == empresa_id)
+        rows = int((await session.execute(count_q)).scalar_one())
+        logger.info(f"Rebuilt stock_level ({rows} rows, empresa={empresa_id or 'all'})")
+        return rows
+
+
+def _unit_flows() -> Tuple[Any, Any, Any]:
+    """Per-unit stock flows: movement inflows, movement outflows and opening balances."""
+    quantity = func.coalesce(MovimentacaoEstoque.quantidade, 0)
+    moved = MovimentacaoEstoque.estoque_id == Estoque.id
+    inflow = (
+        select(
+            Estoque.empresa_id.label("empresa_id"), Estoque.catalogo_peca_id.label("catalogo_peca_id"),
+            func.coalesce(MovimentacaoEstoque.destino_status_estoque_id, 0).label("status_estoque_id"),
+            quantity.label("quantidade"),
+        )
+        .join(MovimentacaoEstoque, moved)
+    )
+    outflow = (
+        select(
+            Estoque.empresa_id, Estoque.catalogo_peca_id,
+            MovimentacaoEstoque.origem_status_estoque_id, -quantity,
+        )
+        .join(MovimentacaoEstoque, moved)
+        .where(MovimentacaoEstoque.origem_status_estoque_id.is_not(None))
+    )
+    opening = select(
+        Estoque.empresa_id, Estoque.catalogo_peca_id,
+        func.coalesce(Estoque.status_estoque_id, 0), func.coalesce(Estoque.qtd, literal(1)),
+    ).where(~exists().where(
+        moved,
+        MovimentacaoEstoque.origem_status_estoque_id.is_(None),
+        MovimentacaoEstoque.quantidade > 0,
+    ))
+    return inflow, outflow, opening
+
+
+stock_levels = StockLevelProjection()
+
+
+_MOVEMENT_FIELDS = ("estoque_id", "origem_status_estoque_id", "destino_status_estoque_id", "quantidade")
+
+
+def _movement_values(obj: MovimentacaoEstoque, committed: bool) -> Dict[str, Any]:
+    """Ledger fields of a movement, as flushed before (`committed`) or after this flush."""
+    values: Dict[str, Any] = {}
+    for field in _MOVEMENT_FIELDS:
+        history = get_history(obj, field)
+        if committed:
+            values[field] = (history.deleted or history.unchanged or [getattr(obj, field)])[0]
+        else:
+            values[field] = getattr(obj, field)
+    if values["estoque_id"] is None and obj.__dict__.get("estoque") is not None:
+        values["estoque_id"] = obj.estoque.id
+    return values
+
+
+@event.listens_for(Session, "before_flush")
+def _apply_movement_writes(session: Session, flush_context: Any, instances: Any) -> None:
+    """Apply movements created, edited or deleted through the ORM to `stock_level`.
+
+    Besides the movement deltas, a unit that gains its first (or loses its
+    last) intake movement drops (or regains) its opening balance, as in
+    `StockLevelProjection.rebuild`. A pre-ledger unit that moves gets its
+    opening balance written first, and status changes move their unit.
+    """
+    removed: List[Tuple[Any, Dict[str, Any]]] = []
+    added: List[Tuple[Any, Dict[str, Any]]] = []
+    for obj in session.new:
+        if isinstance(obj, MovimentacaoEstoque):
+            added.append((obj, _movement_values(obj, committed=False)))
+    for obj in session.deleted:
+        if isinstance(obj, MovimentacaoEstoque):
+            removed.append((obj, _movement_values(obj, committed=True)))
+    for obj in session.dirty:
+        if isinstance(obj, MovimentacaoEstoque) and session.is_modified(obj, include_collections=False):
+            removed.append((obj, _movement_values(obj, committed=True)))
+            added.append((obj, _movement_values(obj, committed=False)))
+    unit_ids = {values["estoque_id"] for _, values in removed + added if values["estoque_id"] is not None}
+    if not unit_ids:
+        return
+
+    connection = session.connection()
+    units = {
+        row.id: row
+        for row in connection.execute(
+            select(Estoque.id, Estoque.empresa_id, Estoque.catalogo_peca_id, Estoque.status_estoque_id, Estoque.qtd)
+            .where(Estoque.id.in_(unit_ids), Estoque.empresa_id.is_not(None))
+        )
+    }
+    if not units:
+        sync_unit_statuses(session, [values for _, values in added])
+        return
+    intakes: Dict[int, Set[Any]] = {unit_id: set() for unit_id in units}
+    for row in connection.execute(
+        select(MovimentacaoEstoque.id, MovimentacaoEstoque.estoque_id).where(
+            MovimentacaoEstoque.estoque_id.in_(list(units)),
+            MovimentacaoEstoque.origem_status_estoque_id.is_(None),
+            MovimentacaoEstoque.quantidade > 0,
+        )
+    ):
+        intakes[row.estoque_id].add(row.id)
+    had_intake = {unit_id for unit_id, ids in intakes.items() if ids}
+    gaining = {values["estoque_id"] for _, values in added if is_intake(values)}
+    for unit_id in open_unit_ledgers(connection, {
+        values["estoque_id"] for _, values in added
+        if not is_intake(values) and values["estoque_id"] in units
+        and values["estoque_id"] not in had_intake | gaining
+    }):
+        intakes[unit_id].add(OPENING_BALANCE_NOTE)
+        had_intake.add(unit_id)
+
+    deltas: Dict[Tuple[int, int], Dict[int, int]] = {}
+
+    def _add(unit: Any, status_deltas: Dict[int, int], sign: int) -> None:
+        item = deltas.setdefault((unit.empresa_id, unit.catalogo_peca_id), {})
+        for status_id, delta in status_deltas.items():
+            item[status_id] = item.get(status_id, 0) + sign * delta
+
+    for sign, changes in ((-1, removed), (1, added)):
+        for obj, values in changes:
+            unit = units.get(values["estoque_id"])
+            if unit is None:
+                continue
+            _add(unit, movement_deltas([values]), sign)
+            if sign < 0:
+                intakes[unit.id].discard(obj.id)
+            elif is_intake(values):
+                intakes[unit.id].add(obj if obj.id is None else obj.id)
+    for unit_id, unit in units.items():
+        has_intake = bool(intakes[unit_id])
+        if has_intake != (unit_id in had_intake):
+            opening = {int(unit.status_estoque_id or 0): int(unit.qtd if unit.qtd is not None else 1)}
+            _add(unit, opening, -1 if has_intake else 1)
+
+    for (empresa_id, catalogo_peca_id), item in sorted(deltas.items()):
+        apply_deltas(connection, empresa_id, catalogo_peca_id, item)
+    sync_unit_statuses(session, [values for _, values in added])
@@ -5,76 +5,73 @@ from typing import Optional, List, Dict, Any
 import time
 import random
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, case, func, exists, inspect as sa_inspect
 from sqlalchemy.orm import selectinload
 
 from app.repositories.chamado import ChamadoRepository
-from app.db.models import Chamado, StatusChamado, Prioridade, ChamadoComentario, ChamadoLog
+from app.repositories.ticket_counter import TicketCounterRepository
+from app.services.ticket_analytics import TicketAnalyticsService, sla_state_condition
+from app.services.ticket_metrics import ticket_bucket
+from app.services.ticket_routing import routing_engine
+from app.services.ticket_search import ticket_search
+# Session listeners: SLA deadline scheduling and change-feed stamping of ticket writes
+from app.services import sla_scheduler, ticket_changes  # noqa: F401
+from app.db.models import Chamado, ChamadoComentario, ChamadoLog
 from app.core.ticket_workflow import TicketWorkflowEngine, TicketStatus, TicketPriority
 from app.core.exceptions import (
     TicketError, ValidationError, NotFoundError, ConflictError,
     ErrorHandler, TenantScopeError
 )
-from app.services.notification_email import EmailNotifier
-from app.core.helpdesk_config import load_notifications_config
+from app.services.notification_queue import enqueue_email
+from app.core.config import get_settings
+from app.core.cache import cache_manager, cache_key
+from app.core.reference_data import ReferenceEntry, reference_data, status_code
+from app.core.events import publish_ticket_created, publish_ticket_status_changed, publish_ticket_updated
+from app.core.pagination import NEXT, PREV, decode_cursor, encode_cursor, keyset_order, keyset_predicate, page_cursors
 from sqlalchemy import select
-from app.db.models import Contato, Empresa
+from app.db.models import Empresa
 
 logger = logging.getLogger(__name__)
 
+TICKET_COUNT_CACHE_PREFIX = "tickets:count"
+TICKET_COUNT_CACHE_TTL = 30
+
+# Stored SLA deadlines (see `refresh_sla_deadlines`)
+SLA_DEADLINE_COLUMNS = ("sla_resposta_ate", "sla_resolucao_ate", "sla_escalonamento_ate")
+
 
 class TicketService:
     """Enhanced ticket service with workflow management, SLA tracking, and full CRUD operations."""
     
     def __init__(self) -> None:
         self.repo = ChamadoRepository()
+        self.counter_repo = TicketCounterRepository()
         self.workflow = TicketWorkflowEngine()
 
-    async def _get_next_counter(self, session: AsyncSession, empresa_id: int) -> int:
-        from sqlalchemy import select, update, insert
-        from app.db.models import TicketCounter, Chamado
-        row = await session.execute(select(TicketCounter).where(TicketCounter.empresa_id == empresa_id))
-        counter = row.scalars().first()
-
-        # Determine max in new format: E{empresa}{ORIGIN}-{N}
-        import re as _re
-        pat = _re.compile(rf"^E{empresa_id}[A-Z]+-(\d+)$")
-        nums_res = await session.execute(select(Chamado.numero).where(Chamado.empresa_id == empresa_id))
-        max_n = 0
-        for (num_str,) in nums_res.all():
-            if not isinstance(num_str, str):
-                continue
-            m = pat.match(num_str.strip())
-            if not m:
-                continue
-            try:
-                n = int(m.group(1))
-                if n > max_n:
-                    max_n = n
-            except Exception:
-                continue
+    @staticmethod
+    def _number_prefix(origin: str) -> str:
+        origin = (origin or "web").lower()
+        return "WEB" if origin == "web" else ("WPP" if origin == "wpp" else origin.upper())
 
-        if not counter:
-            next_val = (max_n + 1) if max_n else 1
-            await session.execute(insert(TicketCounter).values(empresa_id=empresa_id, next_value=next_val))
-            await session.flush()
-            await session.execute(update(TicketCounter).where(TicketCounter.empresa_id == empresa_id).values(next_value=next_val + 1))
-            return next_val
+    async def _gen_number(self, session: AsyncSession, empresa_id: int, origin: str = "web") -> str:
+        seq = await self.counter_repo.reserve(session, empresa_id)
+        return f"E{empresa_id}{self._number_prefix(origin)}-{seq}"
 
-        # If no new-format tickets exist, reset counter to 1
-        if max_n == 0:
-            await session.execute(update(TicketCounter).where(TicketCounter.id == counter.id).values(next_value=2))
-            return 1
+    async def reserve_numbers(self, session: AsyncSession, empresa_id: int, count: int, origin: str = "web") -> List[str]:
+        """Reserve a block of `count` consecutive ticket numbers in one allocation.
 
-        # Otherwise, ensure we continue from max_n + 1
-        next_val = max(counter.next_value or 1, max_n + 1)
-        await session.execute(update(TicketCounter).where(TicketCounter.id == counter.id).values(next_value=next_val + 1))
-        return next_val
+        Args:
+            session: Database session
+            empresa_id: Company ID owning the numbering sequence
+            count: Number of ticket numbers to reserve
+            origin: Ticket origin used for the number prefix
 
-    async def _gen_number(self, session: AsyncSession, empresa_id: int, origin: str) -> str:
-        prefix = "WEB" if origin.lower() == "web" else ("WPP" if origin.lower() == "wpp" else origin.upper())
-        seq = await self._get_next_counter(session, empresa_id)
-        return f"E{empresa_id}{prefix}-{seq}"
+        Returns:
+            List of ticket numbers, in order
+        """
+        first = await self.counter_repo.reserve(session, empresa_id, count)
+        prefix = self._number_prefix(origin)
+        return [f"E{empresa_id}{prefix}-{n}" for n in range(first, first + count)]
 
     async def create_with_asset(
         self,
@@ -117,6 +114,7 @@ class TicketService:
                 raise ValidationError("Ticket title is required")
             
             # Validate asset belongs to company if provided
+            tipo_ativo_id = None
             if ativo_id:
                 from app.repositories.ativo import AtivoRepository
                 ativo_repo = AtivoRepository()
@@ -126,6 +124,7 @@ class TicketService:
                         "Asset does not belong to the current company",
                         {"ativo_id": ativo_id, "empresa_id": empresa_id}
                     )
+                tipo_ativo_id = ativo.tipo_ativo_id
             
             # Set default status to 'open' (Aberto) if not provided
             if not status_id:
@@ -162,17 +161,27 @@ class TicketService:
                     await session.rollback()
                     if attempts > 5:
                         raise
+                    # Number already taken by a ticket created outside the allocator:
+                    # move the counter past the tenant's highest number and retry.
+                    await self.counter_repo.seed_from_tickets(session, empresa_id)
                     numero = await self._gen_number(session, empresa_id, origem)
             
             await self._log_ticket_action(
                 session, ticket.id, solicitante_id,
-                "CREATED", f"Ticket created: {titulo}"
+                "CREATED", f"Ticket created: {titulo}",
+                status_change=(None, ticket.status_id),
             )
             try:
-                await self._apply_routing_rules(session, ticket)
+                await self._apply_routing_rules(session, ticket, tipo_ativo_id)
             except Exception:
                 pass
+            await self.refresh_sla_deadlines(session, ticket, has_comment=False)
             
+            await publish_ticket_created(
+                session, ticket.id, empresa_id, ticket.numero, ticket.titulo,
+                origem=origem, bucket=ticket_bucket(ticket),
+            )
+            await self._invalidate_ticket_counts(empresa_id)
             logger.info(f"Created ticket {ticket.numero} for empresa {empresa_id}")
             return ticket
             
@@ -266,6 +275,7 @@ class TicketService:
             
             # Track changes for audit log
             changes = {}
+            bucket_before = ticket_bucket(ticket)
             
             # Handle status changes without strict workflow validation
             if "status_id" in updates:
@@ -274,9 +284,8 @@ class TicketService:
                     changes["status_id"] = {"from": ticket.status_id, "to": new_status_id}
                     ticket.status_id = new_status_id
                     try:
-                        tgt = await session.get(StatusChamado, new_status_id)
-                        tgt_name = (tgt.nome or "").strip().lower() if tgt else ""
-                        if tgt_name in ["in_progress", "em andamento", "em atendimento"]:
+                        tgt = (await reference_data.statuses(session)).get(new_status_id)
+                        if tgt and tgt.code == "in_progress":
                             if not ticket.agente_contato_id and user_role in ["admin", "agent"]:
                                 ticket.agente_contato_id = user_id
                                 changes["agente_contato_id"] = {"from": None, "to": user_id}
@@ -323,17 +332,32 @@ class TicketService:
                 except Exception:
                     pass
             
+            commented = bool(comment and comment.strip())
+            if commented or changes.keys() & {"status_id", "prioridade_id", "agente_contato_id"}:
+                await self.refresh_sla_deadlines(session, ticket, has_comment=True if commented else None)
+            
             # Log the update
             if changes:
+                status_change = changes.get("status_id")
                 await self._log_ticket_action(
                     session, ticket.id, user_id,
-                    "UPDATED", f"Ticket updated: {', '.join(changes.keys())}"
+                    "UPDATED", f"Ticket updated: {', '.join(changes.keys())}",
+                    status_change=(status_change["from"], status_change["to"]) if status_change else None,
                 )
             
             await session.flush()
+            if changes:
+                await self.publish_ticket_change(session, ticket, bucket_before, list(changes.keys()))
+                await self._invalidate_ticket_counts(ticket.empresa_id or empresa_id)
             logger.info(f"Updated ticket {ticket.numero} by user {user_id}")
             try:
-                notifier = EmailNotifier()
+                # Notifications are queued in this transaction and sent by the email worker
+                if not get_settings().NOTIFY_ENABLED:
+                    return ticket
+                # Recipients and the agent name come from relationships not loaded by get_by_id
+                await session.refresh(ticket, ["agente", "requisitante"])
+                statuses = await reference_data.statuses(session)
+                current_status = statuses.get(ticket.status_id)
                 # Build common context
                 ctx = {
                     "numero": str(ticket.numero or ""),
@@ -361,61 +385,22 @@ class TicketService:
                 agent = _email_of(ticket.agente_contato_id)
                 # Event notifications
                 if "status_id" in changes:
-                    ctx["old_status"] = (await session.get(StatusChamado, changes["status_id"]["from"])).nome if changes["status_id"]["from"] else None
-                    ctx["new_status"] = (await session.get(StatusChamado, changes["status_id"]["to"])).nome if changes["status_id"]["to"] else None
+                    old_row, new_row = statuses.get(changes["status_id"]["from"]), statuses.get(changes["status_id"]["to"])
+                    ctx["old_status"] = old_row.nome if old_row else None
+                    ctx["new_status"] = new_row.nome if new_row else None
                     to = [agent, requester]
-                    notifier.send_status_changed([t for t in to if t], ctx)
-                    # SLA checks for support team alerts
-                    try:
-                        sla = self.workflow.check_sla_breaches(ticket)
-                        cfg = load_notifications_config()
-                        team_ids = (cfg.get("sla", {}).get("team_contact_ids") or [])
-                        # company-specific rules
-                        try:
-                            rules = cfg.get("sla", {}).get("company_rules") or []
-                            for r in rules:
-                                try:
-                                    if int(r.get("empresa_id")) == int(getattr(ticket, "empresa_id", 0)):
-                                        team_ids = list(set(team_ids + (r.get("contact_ids") or [])))
-                                except Exception:
-                                    continue
-                        except Exception:
-                            pass
-                        # resolve emails
-                        team = []
-                        if team_ids:
-                            try:
-                                res = await session.execute(select(Contato).where(Contato.id.in_(team_ids)))
-                                for c in res.scalars().all():
-                                    if c and getattr(c, "email", None) and "@" in str(c.email):
-                                        team.append(str(c.email))
-                            except Exception:
-                                pass
-                        if sla.get("response_breach"):
-                            notifier.send_sla_response_breach(team, ctx)
-                        if sla.get("resolution_breach"):
-                            notifier.send_sla_resolution_breach(team, ctx)
-                        if sla.get("escalation_needed"):
-                            notifier.send_sla_escalation_needed(team, ctx)
-                    except Exception:
-                        pass
+                    await self._queue_email(session, "status_changed", to, ctx, ticket)
                 if "agente_contato_id" in changes:
                     to = [agent]
-                    notifier.send_assigned([t for t in to if t], ctx)
+                    await self._queue_email(session, "assigned", to, ctx, ticket)
                 # Pending customer
-                try:
-                    if ticket.status and str(ticket.status.nome).strip().lower() in ["pendente cliente", "pending_customer", "em espera", "aguardando cliente"]:
-                        to = [requester]
-                        notifier.send_pending_customer([t for t in to if t], ctx)
-                except Exception:
-                    pass
+                if current_status and current_status.code == "pending_customer":
+                    to = [requester]
+                    await self._queue_email(session, "pending_customer", to, ctx, ticket)
                 # Concluded
-                try:
-                    if ticket.status and str(ticket.status.nome).strip().lower() in ["concluído", "concluido", "closed", "fechado"]:
-                        to = [agent, requester]
-                        notifier.send_concluded([t for t in to if t], ctx)
-                except Exception:
-                    pass
+                if current_status and current_status.code == "closed":
+                    to = [agent, requester]
+                    await self._queue_email(session, "concluded", to, ctx, ticket)
             except Exception:
                 pass
             
@@ -430,6 +415,59 @@ class TicketService:
                 {"error": str(e), "ticket_id": ticket_id}
             )
 
+    def _apply_list_filters(
+        self,
+        query,
+        empresa_id: int,
+        filters: Optional[Dict[str, Any]],
+        search_backend: Optional[str] = None,
+    ):
+        """Apply tenant scoping and listing filters shared by list and count queries.
+
+        `search_backend` (from `ticket_search.backend`) selects the full-text
+        index for the `search` filter; without it the filter uses ILIKE.
+        """
+        if empresa_id != 1:
+            query = query.where(Chamado.empresa_id == empresa_id)
+
+        if filters:
+            if "status_id" in filters:
+                query = query.where(Chamado.status_id == filters["status_id"])
+
+            if "prioridade_id" in filters:
+                query = query.where(Chamado.prioridade_id == filters["prioridade_id"])
+
+            if "categoria_id" in filters:
+                query = query.where(Chamado.categoria_id == filters["categoria_id"])
+
+            if "agente_contato_id" in filters:
+                query = query.where(Chamado.agente_contato_id == filters["agente_contato_id"])
+            elif filters.get("unassigned"):
+                query = query.where(Chamado.agente_contato_id.is_(None))
+
+            if "requisitante_contato_id" in filters:
+                query = query.where(Chamado.requisitante_contato_id == filters["requisitante_contato_id"])
+
+            if "ativo_id" in filters:
+                query = query.where(Chamado.ativo_id == filters["ativo_id"])
+
+            if filters.get("sla"):
+                query = query.where(sla_state_condition(filters["sla"]))
+
+            if "search" in filters and filters["search"]:
+                query = query.where(ticket_search.filter_condition(search_backend, filters["search"]))
+        return query
+
+    def _list_query(self):
+        return select(Chamado).options(
+            selectinload(Chamado.status),
+            selectinload(Chamado.prioridade),
+            selectinload(Chamado.categoria),
+            selectinload(Chamado.requisitante),
+            selectinload(Chamado.agente),
+            selectinload(Chamado.comentarios),
+        )
+
     async def list_tickets(
         self,
         session: AsyncSession,
@@ -454,49 +492,9 @@ class TicketService:
         try:
             ErrorHandler.validate_positive_integer(empresa_id, "empresa_id")
             
-            # Build query with filters and eager loading of relations
-            query = (
-                select(Chamado)
-                .options(
-                    selectinload(Chamado.status),
-                    selectinload(Chamado.prioridade),
-                    selectinload(Chamado.categoria),
-                    selectinload(Chamado.requisitante),
-                    selectinload(Chamado.agente),
-                    selectinload(Chamado.comentarios),
-                )
-            )
-            if empresa_id != 1:
-                query = query.where(Chamado.empresa_id == empresa_id)
-            
-            if filters:
-                if "status_id" in filters:
-                    query = query.where(Chamado.status_id == filters["status_id"])
-                
-                if "prioridade_id" in filters:
-                    query = query.where(Chamado.prioridade_id == filters["prioridade_id"])
-                
-                if "agente_contato_id" in filters:
-                    query = query.where(Chamado.agente_contato_id == filters["agente_contato_id"])
-                
-                if "requisitante_contato_id" in filters:
-                    query = query.where(Chamado.requisitante_contato_id == filters["requisitante_contato_id"])
-                
-                if "ativo_id" in filters:
-                    query = query.where(Chamado.ativo_id == filters["ativo_id"])
-                
-                if "search" in filters and filters["search"]:
-                    search_term = f"%{filters['search']}%"
-                    query = query.where(
-                        or_(
-                            Chamado.titulo.ilike(search_term),
-                            Chamado.descricao.ilike(search_term),
-                            Chamado.numero.ilike(search_term)
-                        )
-                    )
-            
-            # Apply pagination and ordering
-            query = query.order_by(Chamado.criado_em.desc()).offset(offset).limit(limit)
+            search_backend = await ticket_search.backend(session) if (filters or {}).get("search") else None
+            query = self._apply_list_filters(self._list_query(), empresa_id, filters, search_backend)
+            query = query.order_by(Chamado.criado_em.desc(), Chamado.id.desc()).offset(offset).limit(limit)
             
             result = await session.execute(query)
             tickets = result.scalars().all()
@@ -508,6 +506,326 @@ class TicketService:
             logger.error(f"Error listing tickets for empresa {empresa_id}: {e}")
             return []
 
+    async def list_tickets_page(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        List one page of tickets ordered by (criado_em, id) descending.
+
+        With a cursor the page is read with a keyset seek, so its cost does not
+        grow with depth; without one, `offset` is honoured for backward
+        compatibility. Either way the returned cursors continue by keyset.
+        Only ticket columns are loaded; relationships are left unloaded.
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            filters: Optional filters (see `list_tickets`)
+            limit: Page size
+            offset: Rows to skip when no cursor is given
+            cursor: Opaque cursor from a previous page's next/prev cursor
+
+        Returns:
+            Dict with `tickets`, `next_cursor` and `prev_cursor`
+
+        Raises:
+            ValidationError: If the cursor is malformed
+        """
+        ErrorHandler.validate_positive_integer(empresa_id, "empresa_id")
+        if (filters or {}).get("search"):
+            search_backend = await ticket_search.backend(session)
+            ranked = ticket_search.ranked_matches(search_backend, filters["search"]) if search_backend else None
+            if ranked is not None:
+                return await self._search_page(session, empresa_id, filters, ranked, limit, offset, cursor)
+
+        decoded = decode_cursor(cursor, sort_key="criado_em") if cursor else None
+        direction = decoded["direction"] if decoded else NEXT
+
+        # Relations are not loaded here; list builders resolve them per page in batch
+        query = self._apply_list_filters(select(Chamado), empresa_id, filters)
+        if decoded:
+            query = query.where(keyset_predicate(Chamado.criado_em, Chamado.id, decoded))
+        query = query.order_by(*keyset_order(Chamado.criado_em, Chamado.id, direction=direction))
+        if not decoded and offset:
+            query = query.offset(offset)
+        query = query.limit(limit + 1)
+
+        result = await session.execute(query)
+        tickets = list(result.scalars().all())
+        has_more = len(tickets) > limit
+        tickets = tickets[:limit]
+        if direction == PREV:
+            tickets.reverse()
+
+        next_cursor, prev_cursor = page_cursors(
+            tickets, "criado_em", has_more, direction,
+            had_cursor=bool(decoded) or offset > 0, sort_key="criado_em",
+        )
+        return {"tickets": tickets, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    async def _search_page(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        filters: Dict[str, Any],
+        ranked: Any,
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+    ) -> Dict[str, Any]:
+        """Read one page of full-text matches ordered by relevance.
+
+        Relevance is not a stored column, so ranked pages are addressed by
+        position: the cursor carries the offset of the page it points to.
+        Matches are already narrowed by the index, so the skipped rows are
+        bounded by the result set, not the ticket table.
+        """
+        if cursor:
+            decoded = decode_cursor(cursor, sort_key="search_rank")
+            try:
+                start = max(0, int(decoded["value"]))
+            except (TypeError, ValueError):
+                raise ValidationError("Invalid pagination cursor", {"cursor": cursor})
+        else:
+            start = max(0, offset)
+
+        rest = {k: v for k, v in filters.items() if k != "search"}
+        query = (
+            self._apply_list_filters(select(Chamado), empresa_id, rest)
+            .join(ranked, ranked.c.id == Chamado.id)
+            .order_by(ranked.c.rank, Chamado.id.desc())
+            .offset(start)
+            .limit(limit + 1)
+        )
+        tickets = list((await session.execute(query)).scalars().all())
+        has_more = len(tickets) > limit
+        tickets = tickets[:limit]
+
+        next_cursor = prev_cursor = None
+        if tickets and has_more:
+            next_cursor = encode_cursor(start + limit, tickets[-1].id, NEXT, "search_rank")
+        if tickets and start > 0:
+            prev_cursor = encode_cursor(max(0, start - limit), tickets[0].id, PREV, "search_rank")
+        return {"tickets": tickets, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+    @staticmethod
+    def _decode_feed_cursor(cursor: str) -> int:
+        """The change_seq a change-feed cursor points after."""
+        if cursor.isdigit():
+            return int(cursor)
+        # Cursor from before the global counter: resume from its lowest position (may resend, never skips)
+        value = decode_cursor(cursor, sort_key="change_seq")["value"]
+        try:
+            if not isinstance(value, dict):
+                return int(value or 0)
+            positions = [seq for seq, _ in value.get("t", {}).values()] + [value.get("*", (0, 0))[0]]
+            return min(int(seq) for seq in positions)
+        except (AttributeError, TypeError, ValueError):
+            raise ValidationError("Invalid pagination cursor", {"cursor": cursor})
+
+    async def list_ticket_changes(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        latest: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Tickets changed after `cursor`, with the comments and status changes written since.
+
+        Tickets are read in `(change_seq, id)` order from the change-sequence
+        index, with the tenant scope as a plain filter, so an incremental sync
+        costs what changed, not the size of the ticket table. A ticket changed
+        several times since the cursor is returned once, in its latest state.
+        Without a cursor the feed starts from the beginning (initial sync), or
+        with `latest` just returns the cursor of the newest change (for clients
+        that already hold a list).
+
+        The cursor is the last `change_seq` returned. One value can stamp many
+        tickets (bulk writers), so a page never ends inside a value: it runs
+        past `limit` to the last ticket stamped with it.
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            cursor: `cursor` returned by the previous call
+            limit: Maximum tickets per call (exceeded only to finish a change_seq)
+            filters: Optional listing filters (see `list_tickets`)
+            latest: Without a cursor, skip to the newest change
+
+        Returns:
+            Dict with `tickets`, `comments`, `status_changes`, `cursor` (pass it
+            to the next call; unchanged when nothing changed) and `has_more`
+
+        Raises:
+            ValidationError: If the cursor is malformed
+        """
+        ErrorHandler.validate_positive_integer(empresa_id, "empresa_id")
+        after = self._decode_feed_cursor(cursor) if cursor else 0
+        if latest and not cursor:
+            newest = (await session.execute(
+                self._apply_list_filters(select(func.max(Chamado.change_seq)), empresa_id, filters)
+            )).scalar_one()
+            return {
+                "tickets": [], "comments": [], "status_changes": [], "has_more": False,
+                "cursor": str(newest or 0),
+            }
+
+        def changed(query, above: int):
+            return self._apply_list_filters(query, empresa_id, filters).where(Chamado.change_seq > above)
+
+        tickets = list((await session.execute(
+            changed(select(Chamado), after).order_by(Chamado.change_seq, Chamado.id).limit(limit + 1)
+        )).scalars().all())
+        if not tickets:
+            return {"tickets": [], "comments": [], "status_changes": [], "has_more": False, "cursor": str(after)}
+
+        has_more = len(tickets) > limit
+        if has_more and tickets[limit].change_seq == tickets[limit - 1].change_seq:
+            # Finish the change_seq the page ended in, so the cursor can move past it
+            last = tickets[limit - 1]
+            tickets = tickets[:limit] + list((await session.execute(
+                changed(select(Chamado), after)
+                .where(Chamado.change_seq == last.change_seq, Chamado.id > last.id)
+                .order_by(Chamado.id)
+            )).scalars().all())
+            has_more = (await session.execute(
+                changed(select(Chamado.id), last.change_seq).limit(1)
+            )).first() is not None
+        else:
+            tickets = tickets[:limit]
+        last_seq = tickets[-1].change_seq
+
+        # Everything written for these tickets since the cursor, up to the page's last change_seq
+        ids = [ticket.id for ticket in tickets]
+
+        def since(model):
+            return and_(model.chamado_id.in_(ids), model.change_seq > after, model.change_seq <= last_seq)
+
+        comments = (await session.execute(
+            select(
+                ChamadoComentario.id, ChamadoComentario.chamado_id, ChamadoComentario.contato_id,
+                ChamadoComentario.comentario, ChamadoComentario.data_hora, ChamadoComentario.change_seq,
+            )
+            .where(since(ChamadoComentario))
+            .order_by(ChamadoComentario.change_seq, ChamadoComentario.id)
+        )).all()
+        status_changes = (await session.execute(
+            select(
+                ChamadoLog.id, ChamadoLog.chamado_id, ChamadoLog.contato_id, ChamadoLog.status_de_id,
+                ChamadoLog.status_para_id, ChamadoLog.data_hora, ChamadoLog.change_seq,
+            )
+            .where(ChamadoLog.status_para_id.is_not(None), since(ChamadoLog))
+            .order_by(ChamadoLog.change_seq, ChamadoLog.id)
+        )).all()
+        return {
+            "tickets": tickets,
+            "comments": comments,
+            "status_changes": status_changes,
+            "cursor": str(last_seq),
+            "has_more": has_more,
+        }
+
+    async def ticket_version(
+        self, session: AsyncSession, empresa_id: int, ticket_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cheap version of one ticket's detail, for ETags.
+
+        One indexed row read: the ticket's `change_seq` plus which of its stored
+        SLA deadlines have passed (the SLA state in the body changes with time
+        alone).
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            ticket_id: Ticket ID
+
+        Returns:
+            Dict with `version` and `requisitante_contato_id`, or None if not visible
+        """
+        now = datetime.utcnow()
+        query = select(
+            Chamado.change_seq,
+            Chamado.requisitante_contato_id,
+            *(getattr(Chamado, col) for col in SLA_DEADLINE_COLUMNS),
+        ).where(Chamado.id == ticket_id)
+        if empresa_id != 1:
+            query = query.where(Chamado.empresa_id == empresa_id)
+        row = (await session.execute(query)).first()
+        if row is None:
+            return None
+        passed = "".join("1" if deadline is not None and deadline < now else "0" for deadline in row[2:])
+        return {"version": f"{row.change_seq}:{passed}", "requisitante_contato_id": row.requisitante_contato_id}
+
+    async def list_version(
+        self, session: AsyncSession, empresa_id: int, filters: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Cheap version of a filtered ticket listing, for ETags.
+
+        Aggregates over the same filters as `list_tickets`: the newest
+        `change_seq` (any write to a matching ticket or its comments), the row
+        count (deletions) and the latest SLA deadline already passed per kind
+        (breach indicators flip with time alone).
+        """
+        now = datetime.utcnow()
+        columns = [func.max(Chamado.change_seq), func.count(Chamado.id)]
+        for col in SLA_DEADLINE_COLUMNS:
+            deadline = getattr(Chamado, col)
+            columns.append(func.max(case((deadline < now, deadline))))
+        search_backend = await ticket_search.backend(session) if (filters or {}).get("search") else None
+        row = (await session.execute(
+            self._apply_list_filters(select(*columns), empresa_id, filters, search_backend)
+        )).first()
+        return ":".join(str(v) for v in row)
+
+    async def count_tickets(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        filters: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+    ) -> int:
+        """
+        Count tickets matching the same filters as `list_tickets`.
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            filters: Optional filters (see `list_tickets`)
+            use_cache: Serve from / store in the cache for `TICKET_COUNT_CACHE_TTL` seconds
+
+        Returns:
+            Number of matching tickets
+        """
+        key = f"{TICKET_COUNT_CACHE_PREFIX}:{empresa_id}:{cache_key(**(filters or {}))}"
+        if use_cache:
+            cached_total = await cache_manager.get(key)
+            if cached_total is not None:
+                return cached_total
+
+        search_backend = await ticket_search.backend(session) if (filters or {}).get("search") else None
+        query = self._apply_list_filters(select(func.count(Chamado.id)), empresa_id, filters, search_backend)
+        total = (await session.execute(query)).scalar_one()
+
+        if use_cache:
+            await cache_manager.set(key, total, TICKET_COUNT_CACHE_TTL)
+        return total
+
+    async def _invalidate_ticket_counts(self, empresa_id: int) -> None:
+        # Empresa 1 counts across all tenants, so its entries go stale too
+        for tenant in {empresa_id, 1}:
+            await cache_manager.invalidate_pattern(f"{TICKET_COUNT_CACHE_PREFIX}:{tenant}:*")
+
     async def get_ticket_analytics(
         self,
         session: AsyncSession,
@@ -526,56 +844,7 @@ class TicketService:
             Analytics data including SLA breaches and recommendations
         """
         try:
-            # Get tickets for analysis
-            filters = {"agente_contato_id": user_id} if user_id else {}
-            tickets = await self.list_tickets(session, empresa_id, filters, limit=1000)
-            
-            analytics = {
-                "total_tickets": len(tickets),
-                "by_status": {},
-                "by_priority": {},
-                "sla_breaches": {
-                    "response_breaches": 0,
-                    "resolution_breaches": 0,
-                    "escalation_needed": 0
-                },
-                "escalation_recommendations": []
-            }
-            
-            current_time = datetime.utcnow()
-            
-            for ticket in tickets:
-                # Count by status
-                status_name = ticket.status.nome if ticket.status else "unknown"
-                analytics["by_status"][status_name] = analytics["by_status"].get(status_name, 0) + 1
-                
-                # Count by priority
-                priority_name = ticket.prioridade.nome if ticket.prioridade else "normal"
-                analytics["by_priority"][priority_name] = analytics["by_priority"].get(priority_name, 0) + 1
-                
-                # Check SLA breaches
-                sla_breaches = self.workflow.check_sla_breaches(ticket, current_time)
-                
-                if sla_breaches["response_breach"]:
-                    analytics["sla_breaches"]["response_breaches"] += 1
-                
-                if sla_breaches["resolution_breach"]:
-                    analytics["sla_breaches"]["resolution_breaches"] += 1
-                
-                if sla_breaches["escalation_needed"]:
-                    analytics["sla_breaches"]["escalation_needed"] += 1
-                    
-                    # Get escalation recommendations
-                    recommendations = self.workflow.get_escalation_recommendations(ticket, sla_breaches)
-                    for rec in recommendations:
-                        analytics["escalation_recommendations"].append({
-                            "ticket_id": ticket.id,
-                            "ticket_number": ticket.numero,
-                            "recommendation": rec
-                        })
-            
-            return analytics
-            
+            return await TicketAnalyticsService().get_ticket_analytics(session, empresa_id, user_id)
         except Exception as e:
             logger.error(f"Error generating ticket analytics: {e}")
             return {"error": str(e)}
@@ -588,30 +857,13 @@ class TicketService:
         user_role: str,
         comment: Optional[str] = None
     ) -> None:
-        norm = lambda s: {
-            "novo": "new",
-            "new": "new",
-            "aberto": "open",
-            "open": "open",
-            "em andamento": "in_progress",
-            "em atendimento": "in_progress",
-            "in_progress": "in_progress",
-            "em espera": "pending_customer",
-            "espera": "pending_customer",
-            "aguardando": "pending_customer",
-            "aguardando cliente": "pending_customer",
-            "pending_customer": "pending_customer",
-            "resolvido": "resolved",
-            "resolved": "resolved",
-            "fechado": "closed",
-            "closed": "closed",
-        }.get((s or "").strip().lower(), (s or "").strip().lower())
-
-        current_status_name = norm(ticket.status.nome if ticket.status else "new")
-        new_status = await session.get(StatusChamado, new_status_id)
+        statuses = await reference_data.statuses(session)
+        current = statuses.get(ticket.status_id)
+        current_status_name = status_code(current.nome if current else "new")
+        new_status = statuses.get(new_status_id)
         if not new_status:
             raise ValidationError(f"Invalid status ID: {new_status_id}")
-        new_status_name = norm(new_status.nome)
+        new_status_name = status_code(new_status.nome)
 
         try:
             current_status = TicketStatus(current_status_name)
@@ -621,130 +873,37 @@ class TicketService:
 
         self.workflow.validate_transition(current_status, new_status_enum, user_role, comment)
 
-    async def _get_default_status(self, session: AsyncSession, status_name: str) -> Optional[StatusChamado]:
-        """Get a status by name (supports EN/PT)."""
-        # Try exact English
-        result = await session.execute(select(StatusChamado).where(StatusChamado.nome == status_name))
-        status = result.scalars().first()
-        if status:
-            return status
-        # Try exact Portuguese common label
-        if status_name.lower() == "open":
-            result_pt = await session.execute(select(StatusChamado).where(StatusChamado.nome == "Aberto"))
-            status = result_pt.scalars().first()
-            if status:
-                return status
-        if status_name.lower() == "in_progress":
-            # Common Portuguese labels: "Em Andamento" or "Em atendimento"
-            result_pt2 = await session.execute(select(StatusChamado).where(StatusChamado.nome == "Em Andamento"))
-            status = result_pt2.scalars().first()
-            if status:
-                return status
-            result_pt3 = await session.execute(select(StatusChamado).where(StatusChamado.nome == "Em atendimento"))
-            status = result_pt3.scalars().first()
-            if status:
-                return status
-        if status_name.lower() == "pending_customer":
-            # Common Portuguese labels for waiting: "Aguardando Cliente", "Em espera"
-            result_wc1 = await session.execute(select(StatusChamado).where(StatusChamado.nome == "Aguardando Cliente"))
-            status = result_wc1.scalars().first()
-            if status:
-                return status
-            result_wc2 = await session.execute(select(StatusChamado).where(StatusChamado.nome == "Em espera"))
-            status = result_wc2.scalars().first()
-            if status:
-                return status
-        # Fallback contains
-        result2 = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike(f"%{status_name}%")))
-        status = result2.scalars().first()
-        if status:
-            return status
-        if status_name.lower() == "open":
-            result2_pt = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike("%aberto%")))
-            return result2_pt.scalars().first()
-        if status_name.lower() == "in_progress":
-            result2_pt2 = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike("%andamento%")))
-            status = result2_pt2.scalars().first()
-            if status:
-                return status
-            result2_pt3 = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike("%atendimento%")))
-            return result2_pt3.scalars().first()
-        if status_name.lower() == "pending_customer":
-            result2_wc1 = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike("%aguardando%")))
-            status = result2_wc1.scalars().first()
-            if status:
-                return status
-            result2_wc2 = await session.execute(select(StatusChamado).where(StatusChamado.nome.ilike("%espera%")))
-            return result2_wc2.scalars().first()
-        return None
-
-    async def _get_default_priority(self, session: AsyncSession, priority_name: str) -> Optional[Prioridade]:
-        from sqlalchemy import select
-        # Try exact English
-        mapping_en_pt = {
-            "low": "Baixa",
-            "normal": "Normal",
-            "high": "Alta",
-            "urgent": "Urgente",
-        }
-        name = priority_name.strip().lower()
-        # Exact match by English
-        for en, pt in mapping_en_pt.items():
-            if name == en:
-                result = await session.execute(select(Prioridade).where(Prioridade.nome == pt))
-                prow = result.scalars().first()
-                if prow:
-                    return prow
-        # Try exact Portuguese provided
-        result_pt = await session.execute(select(Prioridade).where(Prioridade.nome.ilike(f"%{priority_name}%")))
-        prow = result_pt.scalars().first()
-        if prow:
-            return prow
-        # Fallback contains common terms
-        terms = ["baixa", "normal", "alta", "urgente"]
-        for term in terms:
-            result = await session.execute(select(Prioridade).where(Prioridade.nome.ilike(f"%{term}%")))
-            prow = result.scalars().first()
-            if prow:
-                return prow
-        return None
-
-    async def _apply_routing_rules(self, session: AsyncSession, ticket: Chamado) -> None:
-        from sqlalchemy import select
-        from app.db.models import HelpdeskRoutingRule
+    async def _get_default_status(self, session: AsyncSession, status_name: str) -> Optional[ReferenceEntry]:
+        """Get a status by name or EN/PT alias from the reference-data registry."""
+        return await reference_data.status_by_name(session, status_name)
+
+    async def _get_default_priority(self, session: AsyncSession, priority_name: str) -> Optional[ReferenceEntry]:
+        """Get a priority by name or EN/PT alias, falling back to the first common PT priority."""
+        priorities = await reference_data.priorities(session)
+        return priorities.resolve(priority_name) or priorities.first_containing(["baixa", "normal", "alta", "urgente"])
+
+    async def _queue_email(
+        self, session: AsyncSession, kind: str, to: List[Optional[str]], ctx: Dict[str, Any], ticket: Chamado
+    ) -> None:
+        """Queue a ticket notification in the ticket's transaction (sent by the email worker)."""
+        try:
+            await enqueue_email(session, kind, to, ctx, empresa_id=ticket.empresa_id, aggregate_id=ticket.id)
+        except Exception as e:
+            logger.warning(f"Could not queue {kind} notification for ticket {ticket.id}: {e}")
+
+    async def _apply_routing_rules(
+        self, session: AsyncSession, ticket: Chamado, tipo_ativo_id: Optional[int] = None
+    ) -> None:
+        """Assign the agent chosen by the tenant's compiled routing table (see `ticket_routing`)."""
         empresa_id = getattr(ticket, "empresa_id", None) or 1
-        agent_id = None
-        if ticket.categoria_id:
-            res = await session.execute(
-                select(HelpdeskRoutingRule).where(
-                    HelpdeskRoutingRule.empresa_id == empresa_id,
-                    HelpdeskRoutingRule.categoria_id == ticket.categoria_id,
-                    HelpdeskRoutingRule.ativo == True,
-                )
-            )
-            row = res.scalars().first()
-            agent_id = row.agente_contato_id if row else None
-        if not agent_id and ticket.prioridade_id:
-            res2 = await session.execute(
-                select(HelpdeskRoutingRule).where(
-                    HelpdeskRoutingRule.empresa_id == empresa_id,
-                    HelpdeskRoutingRule.prioridade_id == ticket.prioridade_id,
-                    HelpdeskRoutingRule.ativo == True,
-                )
-            )
-            row2 = res2.scalars().first()
-            agent_id = row2.agente_contato_id if row2 else None
-        if not agent_id:
-            res3 = await session.execute(
-                select(HelpdeskRoutingRule).where(
-                    HelpdeskRoutingRule.empresa_id == empresa_id,
-                    HelpdeskRoutingRule.categoria_id.is_(None),
-                    HelpdeskRoutingRule.prioridade_id.is_(None),
-                    HelpdeskRoutingRule.ativo == True,
-                )
-            )
-            row3 = res3.scalars().first()
-            agent_id = row3.agente_contato_id if row3 else None
+        agent_id = await routing_engine.route(
+            session,
+            empresa_id,
+            categoria_id=ticket.categoria_id,
+            prioridade_id=ticket.prioridade_id,
+            tipo_ativo_id=tipo_ativo_id,
+            origem=ticket.origem,
+        )
         if agent_id:
             old = ticket.agente_contato_id
             ticket.agente_contato_id = int(agent_id)
@@ -761,7 +920,7 @@ class TicketService:
         user_role: str,
     ) -> Chamado:
         from sqlalchemy import select
-        from app.db.models import HelpdeskMacro, StatusChamado, ChamadoCategoria, Prioridade
+        from app.db.models import HelpdeskMacro, ChamadoCategoria, Prioridade
         ticket = await self.get_by_id(session, empresa_id, ticket_id)
         if not ticket:
             raise NotFoundError("Ticket not found", {"ticket_id": ticket_id})
@@ -770,6 +929,7 @@ class TicketService:
         if not macro:
             raise NotFoundError("Macro not found", {"macro_id": macro_id})
         actions = macro.actions or {}
+        bucket_before = ticket_bucket(ticket)
         if isinstance(actions, list):
             seq = actions
         else:
@@ -779,6 +939,7 @@ class TicketService:
         for act in seq:
             t = str(act.get("type") or "").strip().lower()
             v = act.get("value")
+            status_before = ticket.status_id
             if t == "set_status":
                 new_id = None
                 if isinstance(v, int):
@@ -790,9 +951,8 @@ class TicketService:
                     await self._validate_status_transition(session, ticket, new_id, user_role, None)
                     ticket.status_id = new_id
                     try:
-                        tgt = await session.get(StatusChamado, new_id)
-                        tgt_name = (tgt.nome or "").strip().lower() if tgt else ""
-                        if tgt_name in ["in_progress", "em andamento", "em atendimento"] and not ticket.agente_contato_id and user_role in ["admin", "agent"]:
+                        tgt = (await reference_data.statuses(session)).get(new_id)
+                        if tgt and tgt.code == "in_progress" and not ticket.agente_contato_id and user_role in ["admin", "agent"]:
                             ticket.agente_contato_id = user_id
                     except Exception:
                         pass
@@ -811,11 +971,100 @@ class TicketService:
             elif t == "set_category":
                 if isinstance(v, int):
                     ticket.categoria_id = v
-            await self._log_ticket_action(session, ticket.id, user_id, "MACRO", t)
+            await self._log_ticket_action(
+                session, ticket.id, user_id, "MACRO", t,
+                status_change=(status_before, ticket.status_id) if ticket.status_id != status_before else None,
+            )
+        if seq:
+            commented = any(str(act.get("type") or "").strip().lower() == "add_comment" for act in seq)
+            await self.refresh_sla_deadlines(session, ticket, has_comment=True if commented else None)
         ticket.atualizado_em = datetime.utcnow()
         await session.flush()
+        if seq:
+            await self.publish_ticket_change(
+                session, ticket, bucket_before,
+                [str(act.get("type") or "") for act in seq], log_entries=len(seq),
+            )
+            await self._invalidate_ticket_counts(ticket.empresa_id or empresa_id)
         return ticket
 
+    async def refresh_sla_deadlines(
+        self,
+        session: AsyncSession,
+        ticket: Chamado,
+        has_comment: Optional[bool] = None,
+    ) -> None:
+        """
+        Recompute the stored `sla_*_ate` deadlines of a ticket.
+
+        Deadlines follow `TicketWorkflowEngine.evaluate_sla`: the response
+        deadline is cleared once the ticket has an agent or a comment, the
+        resolution/escalation deadlines while its status counts as resolved.
+
+        Args:
+            session: Database session
+            ticket: Ticket to update (not flushed here)
+            has_comment: Whether the ticket has comments; queried when None
+        """
+        if "criado_em" in sa_inspect(ticket).unloaded:
+            await session.refresh(ticket, ["criado_em"])
+        if has_comment is None:
+            has_comment = bool(ticket.id) and bool((await session.execute(
+                select(exists().where(ChamadoComentario.chamado_id == ticket.id))
+            )).scalar())
+        priority = (await reference_data.priorities(session)).get(ticket.prioridade_id)
+        status = (await reference_data.statuses(session)).get(ticket.status_id)
+        values = self.sla_deadline_values(
+            priority, status, ticket.criado_em, ticket.agente_contato_id is not None or has_comment
+        )
+        for column, deadline in values.items():
+            setattr(ticket, column, deadline)
+
+    def sla_deadline_values(
+        self,
+        priority: Optional[ReferenceEntry],
+        status: Optional[ReferenceEntry],
+        criado_em: Optional[datetime],
+        responded: bool,
+    ) -> Dict[str, Optional[datetime]]:
+        """Stored SLA deadline columns (`SLA_DEADLINE_COLUMNS`) for the given ticket state."""
+        deadlines = self.workflow.calculate_sla_deadlines(
+            self.workflow.priority_from_name(priority.nome if priority else None),
+            criado_em or datetime.utcnow(),
+        )
+        resolved = self.workflow.is_resolved_status(status.nome if status else None)
+        return {
+            "sla_resposta_ate": None if responded else deadlines["response_deadline"],
+            "sla_resolucao_ate": None if resolved else deadlines["resolution_deadline"],
+            "sla_escalonamento_ate": None if resolved else deadlines["escalation_deadline"],
+        }
+
+    async def publish_ticket_change(
+        self,
+        session: AsyncSession,
+        ticket: Chamado,
+        bucket_before: Dict[str, int],
+        changed_fields: List[str],
+        log_entries: int = 1,
+    ) -> None:
+        """Publish the status-changed or updated event for a ticket change."""
+        bucket_after = ticket_bucket(ticket)
+        empresa_id = ticket.empresa_id
+        if bucket_before["status_id"] != bucket_after["status_id"]:
+            statuses = await reference_data.statuses(session)
+            old, new = statuses.get(bucket_before["status_id"]), statuses.get(bucket_after["status_id"])
+            await publish_ticket_status_changed(
+                session, ticket.id, empresa_id,
+                old.nome if old else None, new.nome if new else None,
+                changed_fields=changed_fields, bucket_from=bucket_before, bucket_to=bucket_after,
+                log_entries=log_entries,
+            )
+        else:
+            await publish_ticket_updated(
+                session, ticket.id, empresa_id, changed_fields,
+                bucket_from=bucket_before, bucket_to=bucket_after, log_entries=log_entries,
+            )
+
     async def _add_comment(
         self,
         session: AsyncSession,
@@ -838,13 +1087,16 @@ class TicketService:
         ticket_id: int,
         user_id: Optional[int],
         action: str,
-        details: str
+        details: str,
+        status_change: Optional[tuple] = None
     ) -> None:
-        """Log a ticket action for audit purposes."""
+        """Log a ticket action for audit purposes (`status_change` is a `(from_id, to_id)` transition)."""
         log_entry = ChamadoLog(
             chamado_id=ticket_id,
             contato_id=user_id,
             id_alteracao=action,
-            data_hora=datetime.utcnow()
+            data_hora=datetime.utcnow(),
+            status_de_id=status_change[0] if status_change else None,
+            status_para_id=status_change[1] if status_change else None,
         )
         session.add(log_entry)
@@ -0,0 +1,283 @@
+from __future__ import annotations
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, exists, func, literal, not_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.exceptions import ValidationError
+from app.core.ticket_workflow import TicketPriority, TicketWorkflowEngine
+from app.db.models import Chamado, ChamadoComentario, Prioridade, StatusChamado, TicketMetricsDaily
+
+logger = logging.getLogger(__name__)
+
+# Cap on the escalation list; counters are always exact.
+ESCALATION_RECOMMENDATION_LIMIT = 50
+
+# Same precedence as TicketWorkflowEngine.priority_from_name: first enum value
+# contained in the priority name wins, anything else is NORMAL.
+_PRIORITY_MATCH_ORDER = [p for p in TicketPriority]
+
+
+def _sla_cutoff(priority_name: Any, kind: str, now: datetime) -> Any:
+    """CASE expression giving `now - <SLA hours>` for the ticket's priority tier.
+
+    A ticket breaches an SLA when `criado_em + hours < now`, i.e. when
+    `criado_em < now - hours`; the subtraction is done per tier on the bound
+    parameters, so the comparison stays on the bare `criado_em` column.
+    """
+    attr = {
+        "response": "response_time_hours",
+        "resolution": "resolution_time_hours",
+        "escalation": "escalation_time_hours",
+    }[kind]
+    configs = TicketWorkflowEngine.SLA_CONFIGS
+    lowered = func.lower(func.coalesce(priority_name, ""))
+    whens = [
+        (lowered.like(f"%{p.value}%"), literal(now - timedelta(hours=getattr(configs[p], attr))))
+        for p in _PRIORITY_MATCH_ORDER
+    ]
+    default = literal(now - timedelta(hours=getattr(configs[TicketPriority.NORMAL], attr)))
+    return case(*whens, else_=default)
+
+
+def sla_breach_conditions(priority_name: Any, status_name: Any, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """SQL equivalents of `TicketWorkflowEngine.check_sla_breaches` for `Chamado` rows.
+
+    Args:
+        priority_name: Column/expression holding the ticket's Prioridade.nome.
+        status_name: Column/expression holding the ticket's StatusChamado.nome.
+        now: Evaluation time (defaults to utcnow).
+
+    Returns:
+        Dict with `response_breach`, `resolution_breach` and `escalation_needed`
+        boolean SQL expressions.
+    """
+    now = now or datetime.utcnow()
+    has_comment = exists().where(ChamadoComentario.chamado_id == Chamado.id)
+    has_response = or_(Chamado.agente_contato_id.is_not(None), has_comment)
+    is_resolved = func.lower(func.coalesce(status_name, "")).in_(["resolved", "closed"])
+    return {
+        "response_breach": and_(not_(has_response), Chamado.criado_em < _sla_cutoff(priority_name, "response", now)),
+        "resolution_breach": and_(not_(is_resolved), Chamado.criado_em < _sla_cutoff(priority_name, "resolution", now)),
+        "escalation_needed": and_(not_(is_resolved), Chamado.criado_em < _sla_cutoff(priority_name, "escalation", now)),
+    }
+
+
+# `sla` list filter values (as reported in `sla_status`) and accepted aliases
+SLA_FILTER_STATES = {"breach": "breach", "breached": "breach", "warning": "warning", "ok": "ok"}
+
+
+def _overdue(column: Any, now: datetime) -> Any:
+    return and_(column.is_not(None), column < now)
+
+
+def sla_state_condition(state: str, now: Optional[datetime] = None) -> Any:
+    """SQL predicate selecting tickets whose list `sla_status` is `state`.
+
+    Uses the stored `sla_*_ate` deadlines, which are cleared once the SLA is
+    met, so each branch is a range scan on an (empresa_id, deadline) index.
+
+    Args:
+        state: `breach` (or `breached`), `warning` or `ok`.
+        now: Evaluation time (defaults to utcnow).
+
+    Raises:
+        ValidationError: For an unknown state.
+    """
+    key = SLA_FILTER_STATES.get((state or "").strip().lower())
+    if key is None:
+        raise ValidationError(
+            f"Invalid SLA filter: {state}",
+            {"sla": state, "allowed": sorted(SLA_FILTER_STATES)},
+        )
+    now = now or datetime.utcnow()
+    breach = or_(_overdue(Chamado.sla_resposta_ate, now), _overdue(Chamado.sla_resolucao_ate, now))
+    escalation = _overdue(Chamado.sla_escalonamento_ate, now)
+    if key == "breach":
+        return breach
+    if key == "warning":
+        return and_(escalation, not_(breach))
+    return and_(not_(breach), not_(escalation))
+
+
+class TicketAnalyticsService:
+    """Ticket analytics computed in the database over the full tenant dataset."""
+
+    def __init__(self) -> None:
+        self.workflow = TicketWorkflowEngine()
+
+    def _scope(self, query, empresa_id: int, agente_contato_id: Optional[int]):
+        if empresa_id != 1:
+            query = query.where(Chamado.empresa_id == empresa_id)
+        if agente_contato_id:
+            query = query.where(Chamado.agente_contato_id == agente_contato_id)
+        return query
+
+    async def get_ticket_analytics(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        user_id: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compute ticket counts by status/priority and SLA breach counters.
+
+        Status/priority counts are summed from the `ticket_metrics_daily`
+        rollup when it is enabled and populated (cost grows with days, not
+        tickets), otherwise grouped over `chamado`. SLA counters depend on the
+        evaluation time and always come from conditional SUMs over `chamado`.
+        Only the (capped) escalation candidates are evaluated in Python.
+
+        Args:
+            session: Database session
+            empresa_id: Company ID for tenant scoping
+            user_id: Optional agent contact ID for personal analytics
+            now: Evaluation time (defaults to utcnow)
+
+        Returns:
+            Analytics dict matching `TicketAnalyticsResponse`
+        """
+        now = now or datetime.utcnow()
+
+        if get_settings().TICKET_METRICS_ROLLUP and await self._has_rollup(session, empresa_id):
+            by_status, by_priority = await self._counts_from_rollup(session, empresa_id, user_id)
+        else:
+            by_status, by_priority = await self._counts_from_tickets(session, empresa_id, user_id)
+
+        conditions = sla_breach_conditions(Prioridade.nome, StatusChamado.nome, now)
+
+        def _sum(cond: Any) -> Any:
+            return func.coalesce(func.sum(case((cond, 1), else_=0)), 0)
+
+        sla_q = self._scope(
+            select(
+                _sum(conditions["response_breach"]),
+                _sum(conditions["resolution_breach"]),
+                _sum(conditions["escalation_needed"]),
+            )
+            .select_from(Chamado)
+            .outerjoin(Prioridade, Prioridade.id == Chamado.prioridade_id)
+            .outerjoin(StatusChamado, StatusChamado.id == Chamado.status_id),
+            empresa_id, user_id,
+        )
+        response_breaches, resolution_breaches, escalation_needed = (await session.execute(sla_q)).one()
+
+        recommendations = await self._escalation_recommendations(session, empresa_id, user_id, conditions, now)
+
+        return {
+            "total_tickets": sum(by_status.values()),
+            "by_status": by_status,
+            "by_priority": by_priority,
+            "sla_breaches": {
+                "response_breaches": int(response_breaches),
+                "resolution_breaches": int(resolution_breaches),
+                "escalation_needed": int(escalation_needed),
+            },
+            "escalation_recommendations": recommendations,
+        }
+
+    async def _has_rollup(self, session: AsyncSession, empresa_id: int) -> bool:
+        query = select(TicketMetricsDaily.id).limit(1)
+        if empresa_id != 1:
+            query = query.where(TicketMetricsDaily.empresa_id == empresa_id)
+        return (await session.execute(query)).first() is not None
+
+    async def _counts_from_rollup(
+        self, session: AsyncSession, empresa_id: int, user_id: Optional[int]
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Current counts by status/priority name, summed over the rollup's days."""
+        net = func.sum(
+            TicketMetricsDaily.created_count + TicketMetricsDaily.moved_in_count - TicketMetricsDaily.moved_out_count
+        )
+
+        def _scoped(query):
+            if empresa_id != 1:
+                query = query.where(TicketMetricsDaily.empresa_id == empresa_id)
+            if user_id:
+                query = query.where(TicketMetricsDaily.agente_contato_id == user_id)
+            return query
+
+        status_label = func.coalesce(StatusChamado.nome, "unknown")
+        status_q = _scoped(
+            select(status_label, net)
+            .select_from(TicketMetricsDaily)
+            .outerjoin(StatusChamado, StatusChamado.id == TicketMetricsDaily.status_id)
+        ).group_by(status_label).having(net > 0)
+
+        priority_label = func.coalesce(Prioridade.nome, "normal")
+        priority_q = _scoped(
+            select(priority_label, net)
+            .select_from(TicketMetricsDaily)
+            .outerjoin(Prioridade, Prioridade.id == TicketMetricsDaily.prioridade_id)
+        ).group_by(priority_label).having(net > 0)
+
+        by_status = {name: int(count) for name, count in (await session.execute(status_q)).all()}
+        by_priority = {name: int(count) for name, count in (await session.execute(priority_q)).all()}
+        return by_status, by_priority
+
+    async def _counts_from_tickets(
+        self, session: AsyncSession, empresa_id: int, user_id: Optional[int]
+    ) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Current counts by status/priority name, grouped over `chamado`."""
+        status_label = func.coalesce(StatusChamado.nome, "unknown")
+        status_q = self._scope(
+            select(status_label, func.count(Chamado.id))
+            .select_from(Chamado)
+            .outerjoin(StatusChamado, StatusChamado.id == Chamado.status_id),
+            empresa_id, user_id,
+        ).group_by(status_label)
+        by_status = {name: count for name, count in (await session.execute(status_q)).all()}
+
+        priority_label = func.coalesce(Prioridade.nome, "normal")
+        priority_q = self._scope(
+            select(priority_label, func.count(Chamado.id))
+            .select_from(Chamado)
+            .outerjoin(Prioridade, Prioridade.id == Chamado.prioridade_id),
+            empresa_id, user_id,
+        ).group_by(priority_label)
+        by_priority = {name: count for name, count in (await session.execute(priority_q)).all()}
+        return by_status, by_priority
+
+    async def _escalation_recommendations(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        user_id: Optional[int],
+        conditions: Dict[str, Any],
+        now: datetime,
+    ) -> List[Dict[str, Any]]:
+        """Recommendations for the oldest tickets needing escalation (capped)."""
+        query = self._scope(
+            select(
+                Chamado.id,
+                Chamado.numero,
+                Chamado.agente_contato_id,
+                Prioridade.nome.label("priority_name"),
+                conditions["response_breach"].label("response_breach"),
+                conditions["resolution_breach"].label("resolution_breach"),
+            )
+            .select_from(Chamado)
+            .outerjoin(Prioridade, Prioridade.id == Chamado.prioridade_id)
+            .outerjoin(StatusChamado, StatusChamado.id == Chamado.status_id)
+            .where(conditions["escalation_needed"]),
+            empresa_id, user_id,
+        ).order_by(Chamado.criado_em.asc(), Chamado.id.asc()).limit(ESCALATION_RECOMMENDATION_LIMIT)
+
+        recommendations: List[Dict[str, Any]] = []
+        for row in (await session.execute(query)).all():
+            sla_breaches = {
+                "response_breach": bool(row.response_breach),
+                "resolution_breach": bool(row.resolution_breach),
+                "escalation_needed": True,
+            }
+            for rec in self.workflow.recommend_escalations(sla_breaches, row.priority_name, row.agente_contato_id):
+                recommendations.append({
+                    "ticket_id": row.id,
+                    "ticket_number": row.numero,
+                    "recommendation": rec,
+                })
+        return recommendations
@@ -0,0 +1,306 @@
+"""
+Scheduled, set-based auto-close of stale tickets.
+
+For each tenant with an enabled `HelpdeskAutoClosePolicy`, tickets sitting in
+"pending customer" or "resolved" longer than the policy allows are closed in
+chunks of `AUTO_CLOSE_BATCH_SIZE`:
+
+    UPDATE chamado SET status_id = :closed, ...
+    WHERE id IN (SELECT id ... LIMIT :batch) AND status_id = :src AND atualizado_em < :cutoff
+    RETURNING id, prioridade_id, agente_contato_id
+
+Each chunk writes its `AUTO_CLOSED` log rows and status-changed outbox events
+in bulk, updates the ticket metrics rollup in aggregate and commits, so a
+large backlog never holds one long transaction. `AutoCloseScheduler` runs
+every enabled tenant on an interval; progress is kept per tenant for the
+admin API.
+"""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.events import TicketStatusChangedEvent, event_dispatcher
+from app.core.reference_data import ReferenceEntry, reference_data
+from app.db.models import Chamado, ChamadoLog, HelpdeskAutoClosePolicy
+from app.services.sla_scheduler import stage_deadlines
+from app.services.ticket_changes import next_change_seq
+from app.services.ticket import TicketService
+from app.services.ticket_metrics import BUCKET_DIMENSIONS, ticket_metrics_rollup
+
+logger = logging.getLogger(__name__)
+
+AUTO_CLOSE_LOG_ACTION = "AUTO_CLOSED"
+
+
+@dataclass
+class AutoCloseProgress:
+    """State of the latest auto-close run of one tenant."""
+    empresa_id: int
+    status: str = "idle"  # idle | running | done | failed | skipped
+    closed: int = 0
+    batches: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for key in ("started_at", "finished_at"):
+            data[key] = data[key].isoformat() if data[key] else None
+        return data
+
+
+class TicketAutoCloser:
+    """Closes one tenant's stale tickets in bounded, committed chunks."""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self._batch_size = batch_size
+        self.ticket_service = TicketService()
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, self._batch_size or get_settings().AUTO_CLOSE_BATCH_SIZE)
+
+    async def run_tenant(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        progress: Optional[AutoCloseProgress] = None,
+        on_progress: Optional[Callable[[AutoCloseProgress], None]] = None,
+        now: Optional[datetime] = None,
+    ) -> AutoCloseProgress:
+        """
+        Apply the tenant's auto-close policy.
+
+        Args:
+            session: Database session; committed after every chunk
+            empresa_id: Tenant to process
+            progress: Progress object to update (a new one when omitted)
+            on_progress: Called after every committed chunk
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Final progress of the run
+        """
+        progress = progress or AutoCloseProgress(empresa_id)
+        progress.status, progress.started_at, progress.finished_at = "running", datetime.utcnow(), None
+        progress.closed, progress.batches, progress.by_status, progress.error = 0, 0, {}, None
+        now = now or datetime.utcnow()
+
+        policy = (await session.execute(
+            select(HelpdeskAutoClosePolicy).where(HelpdeskAutoClosePolicy.empresa_id == empresa_id)
+        )).scalars().first()
+        statuses = await reference_data.statuses(session)
+
+        def _first(code: str) -> Optional[ReferenceEntry]:
+            matches = statuses.by_code.get(code)
+            return matches[0] if matches else None
+
+        closed = _first("closed")
+        if not policy or not policy.enabled or not closed:
+            progress.status, progress.finished_at = "skipped", datetime.utcnow()
+            return progress
+
+        rules: List[Tuple[ReferenceEntry, datetime]] = []
+        pending, resolved = _first("pending_customer"), _first("resolved")
+        if pending:
+            rules.append((pending, now - timedelta(days=int(policy.pending_customer_days))))
+        if resolved:
+            rules.append((resolved, now - timedelta(days=int(policy.resolved_days))))
+        clears_resolution_sla = self.ticket_service.workflow.is_resolved_status(closed.nome)
+
+        for source, cutoff in rules:
+            while True:
+                closed_now = await self._close_chunk(
+                    session, empresa_id, source, closed, cutoff, now, clears_resolution_sla
+                )
+                if not closed_now:
+                    break
+                await session.commit()
+                progress.closed += closed_now
+                progress.batches += 1
+                progress.by_status[source.nome] = progress.by_status.get(source.nome, 0) + closed_now
+                if on_progress:
+                    on_progress(progress)
+                if closed_now < self.batch_size:
+                    break
+
+        if progress.closed:
+            await self.ticket_service._invalidate_ticket_counts(empresa_id)
+        progress.status, progress.finished_at = "done", datetime.utcnow()
+        logger.info(f"Auto-close empresa {empresa_id}: {progress.closed} tickets in {progress.batches} batches")
+        return progress
+
+    async def _close_chunk(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        source: ReferenceEntry,
+        closed: ReferenceEntry,
+        cutoff: datetime,
+        now: datetime,
+        clears_resolution_sla: bool,
+    ) -> int:
+        """Close up to `batch_size` due tickets in `source`; returns how many were closed."""
+        due = and_(
+            Chamado.empresa_id == empresa_id,
+            Chamado.status_id == source.id,
+            Chamado.atualizado_em < cutoff,
+        )
+        seq = await next_change_seq(session)
+        values: Dict[str, Any] = {"status_id": closed.id, "atualizado_em": now, "change_seq": seq}
+        if clears_resolution_sla:
+            values.update(sla_resolucao_ate=None, sla_escalonamento_ate=None)
+
+        chunk = select(Chamado.id).where(due).order_by(Chamado.id).limit(self.batch_size)
+        if session.bind.dialect.update_returning:
+            res = await session.execute(
+                update(Chamado)
+                .where(Chamado.id.in_(chunk.scalar_subquery()), due)
+                .values(**values)
+                .returning(Chamado.id, Chamado.prioridade_id, Chamado.agente_contato_id)
+                .execution_options(synchronize_session=False)
+            )
+            rows = res.all()
+        else:
+            rows = (await session.execute(
+                select(Chamado.id, Chamado.prioridade_id, Chamado.agente_contato_id)
+                .where(Chamado.id.in_(chunk.scalar_subquery()))
+                .with_for_update()
+            )).all()
+            if rows:
+                await session.execute(
+                    update(Chamado).where(Chamado.id.in_([r.id for r in rows]), due).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+        if not rows:
+            return 0
+
+        await session.execute(
+            insert(ChamadoLog),
+            [
+                {
+                    "chamado_id": r.id, "contato_id": None, "id_alteracao": AUTO_CLOSE_LOG_ACTION, "data_hora": now,
+                    "status_de_id": source.id, "status_para_id": closed.id, "change_seq": seq,
+                }
+                for r in rows
+            ],
+        )
+
+        events = []
+        moves: Dict[tuple, int] = {}
+        for r in rows:
+            rest = (int(r.prioridade_id or 0), int(r.agente_contato_id or 0))
+            bucket_from = dict(zip(BUCKET_DIMENSIONS, (source.id,) + rest))
+            bucket_to = dict(zip(BUCKET_DIMENSIONS, (closed.id,) + rest))
+            events.append(TicketStatusChangedEvent(
+                r.id, empresa_id, source.nome, closed.nome,
+                changed_fields=["status_id"], bucket_from=bucket_from, bucket_to=bucket_to,
+            ))
+            key = ((source.id,) + rest, (closed.id,) + rest)
+            moves[key] = moves.get(key, 0) + 1
+        await event_dispatcher.record_events(session, events)
+        await ticket_metrics_rollup.apply_moves(session, empresa_id, now.date(), moves)
+        if clears_resolution_sla:
+            # The bulk UPDATE bypasses the ORM; drop the cleared deadlines from the SLA scheduler on commit
+            for r in rows:
+                stage_deadlines(session.sync_session, r.id, empresa_id, {"resolution": None, "escalation": None})
+        return len(rows)
+
+
+class AutoCloseScheduler:
+    """Runs the auto-close job for every enabled tenant on an interval."""
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None):
+        self._session_factory = session_factory
+        self.closer = TicketAutoCloser()
+        self.progress: Dict[int, AutoCloseProgress] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._tenant_tasks: Dict[int, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+
+    @property
+    def session_factory(self) -> Callable[[], AsyncSession]:
+        if self._session_factory is None:
+            from app.db.session import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def status(self, empresa_id: int) -> AutoCloseProgress:
+        return self.progress.get(empresa_id) or AutoCloseProgress(empresa_id)
+
+    async def run_tenant(self, empresa_id: int) -> AutoCloseProgress:
+        """Run one tenant now; concurrent calls for the same tenant wait for the running one."""
+        lock = self._locks.setdefault(empresa_id, asyncio.Lock())
+        progress = self.progress.setdefault(empresa_id, AutoCloseProgress(empresa_id))
+        if lock.locked():
+            async with lock:
+                return progress
+        async with lock:
+            try:
+                async with self.session_factory() as session:
+                    await self.closer.run_tenant(session, empresa_id, progress)
+            except Exception as e:
+                progress.status, progress.error, progress.finished_at = "failed", str(e), datetime.utcnow()
+                logger.exception(f"Auto-close failed for empresa {empresa_id}: {e}")
+        return progress
+
+    def trigger(self, empresa_id: int) -> AutoCloseProgress:
+        """Start a run for one tenant in the background (no-op while one is running)."""
+        task = self._tenant_tasks.get(empresa_id)
+        if task is None or task.done():
+            self.progress.setdefault(empresa_id, AutoCloseProgress(empresa_id)).status = "running"
+            self._tenant_tasks[empresa_id] = asyncio.get_running_loop().create_task(self.run_tenant(empresa_id))
+        return self.status(empresa_id)
+
+    async def run_all(self) -> Dict[int, AutoCloseProgress]:
+        """Run every tenant whose policy is enabled, one after another."""
+        async with self.session_factory() as session:
+            tenants = (await session.execute(
+                select(HelpdeskAutoClosePolicy.empresa_id).where(HelpdeskAutoClosePolicy.enabled == True)
+            )).scalars().all()
+        for empresa_id in tenants:
+            if self._stopping.is_set():
+                break
+            await self.run_tenant(empresa_id)
+        return {empresa_id: self.status(empresa_id) for empresa_id in tenants}
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="auto-close-scheduler")
+            logger.info("Auto-close scheduler started")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        logger.info("Auto-close scheduler stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.run_all()
+            except Exception as e:
+                logger.error(f"Auto-close scheduler pass failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=get_settings().AUTO_CLOSE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+auto_close_scheduler = AutoCloseScheduler()
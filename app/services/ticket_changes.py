@@ -0,0 +1,143 @@
+"""
+Change-sequence stamping for the ticket change feed and conditional reads.
+
+Every write to a ticket, one of its comments or one of its log entries
+stamps the written rows - and the ticket itself - with the next value of the
+global `change_seq` counter in `change_sequence`. "What changed since cursor
+N" is then an index range read on `change_seq` (tenant scope is a plain
+filter on top), and clients sync with payloads proportional to what changed
+(`TicketService.list_ticket_changes`). Assets and service orders are stamped
+from the same counter; their `change_seq` serves as the row version behind
+ETags.
+
+The counter is bumped with a single UPDATE, which holds the row lock
+(Postgres) or the write lock (SQLite) until the writing transaction ends, so
+values become visible in commit order: a reader that has seen N never later
+finds a newly committed row stamped below N. That guarantee is what lets the
+feed cursor skip everything at or below N, and it is why this is not a
+database sequence: `nextval` never blocks, but a transaction that drew N can
+commit after one that drew N+1, and a client that synced in between would
+never see it. The price is that stamping writers are serialized from their
+first stamping flush to commit. ORM writes are stamped by a `before_flush`
+listener (one value per flush); bulk writers call `next_change_seq` and
+stamp their rows themselves.
+"""
+
+import logging
+from typing import Any, List, Set
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from app.db.models import (
+    Ativo, ChangeSequence, Chamado, ChamadoComentario, ChamadoLog, OrdemServico, OrdemServicoAtividade,
+)
+
+logger = logging.getLogger(__name__)
+
+# `change_sequence` row of the change-feed counter
+CHANGE_SEQ = "change_seq"
+
+# Stamped columns (where a missing counter row starts from)
+_STAMPED_COLUMNS = (Chamado.change_seq, Ativo.change_seq, OrdemServico.change_seq)
+
+# Row-versioned models stamped on their own (no parent to bump)
+_ROW_VERSIONED = (Ativo, OrdemServico)
+
+
+def allocate_change_seq(connection: Connection) -> int:
+    """Take the next change-feed value inside the connection's transaction (locked until it ends)."""
+    table = ChangeSequence.__table__
+    bump = update(table).where(table.c.nome == CHANGE_SEQ).values(valor=table.c.valor + 1)
+    for _ in range(2):
+        if connection.dialect.update_returning:
+            value = connection.execute(bump.returning(table.c.valor)).scalar_one_or_none()
+        elif connection.execute(bump).rowcount:
+            value = connection.execute(select(table.c.valor).where(table.c.nome == CHANGE_SEQ)).scalar_one()
+        else:
+            value = None
+        if value is not None:
+            return int(value)
+        # No counter row yet (schema created without the migration): start after the stamps in use
+        start = max(
+            connection.execute(select(func.coalesce(func.max(column), 0))).scalar_one()
+            for column in _STAMPED_COLUMNS
+        )
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(nome=CHANGE_SEQ, valor=int(start)))
+        except IntegrityError:
+            # Another transaction created it first
+            pass
+    raise RuntimeError(f"Could not allocate change sequence '{CHANGE_SEQ}'")
+
+
+async def next_change_seq(session: AsyncSession) -> int:
+    """Async wrapper of `allocate_change_seq` for bulk writers."""
+    return await session.run_sync(lambda sync_session: allocate_change_seq(sync_session.connection()))
+
+
+def _stamp_tickets(session: Session, seq: int, stamped: List[Any], removed: List[Any]) -> None:
+    # Stamp every row and its ticket: the loaded object, or just its id (bumped with one UPDATE)
+    unloaded: Set[int] = set()
+    for obj in stamped:
+        obj.change_seq = seq
+    for obj in stamped + removed:
+        parent = obj if isinstance(obj, Chamado) else obj.__dict__.get("chamado")
+        if parent is None and obj.chamado_id is not None:
+            parent = session.identity_map.get(identity_key(Chamado, obj.chamado_id))
+            if parent is None:
+                unloaded.add(obj.chamado_id)
+                continue
+        if parent is not None:
+            parent.change_seq = seq
+    if unloaded:
+        table = Chamado.__table__
+        session.connection().execute(update(table).where(table.c.id.in_(unloaded)).values(change_seq=seq))
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    tickets: List[Any] = []
+    # Deleted comments still change their ticket (its detail and ETag)
+    removed: List[Any] = [obj for obj in session.deleted if isinstance(obj, ChamadoComentario)]
+    rows: List[Any] = []
+    # New activity entries change their service order (its detail and ETag)
+    activity_orders: Set[int] = set()
+    for obj in session.new:
+        if isinstance(obj, (Chamado, ChamadoComentario, ChamadoLog)):
+            tickets.append(obj)
+        elif isinstance(obj, _ROW_VERSIONED):
+            rows.append(obj)
+        elif isinstance(obj, OrdemServicoAtividade) and obj.ordem_servico_id is not None:
+            activity_orders.add(obj.ordem_servico_id)
+    for obj in session.dirty:
+        if isinstance(obj, (Chamado, ChamadoComentario) + _ROW_VERSIONED):
+            if not session.is_modified(obj, include_collections=False):
+                continue
+            if isinstance(obj, _ROW_VERSIONED):
+                rows.append(obj)
+            else:
+                tickets.append(obj)
+    if not (tickets or removed or rows or activity_orders):
+        return
+
+    seq = allocate_change_seq(session.connection())
+    if tickets or removed:
+        _stamp_tickets(session, seq, tickets, removed)
+    for obj in rows:
+        obj.change_seq = seq
+    unloaded: Set[int] = set()
+    for os_id in activity_orders:
+        order = session.identity_map.get(identity_key(OrdemServico, os_id))
+        if order is None:
+            unloaded.add(os_id)
+        else:
+            order.change_seq = seq
+    if unloaded:
+        table = OrdemServico.__table__
+        session.connection().execute(update(table).where(table.c.id.in_(unloaded)).values(change_seq=seq))
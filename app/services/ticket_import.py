@@ -0,0 +1,491 @@
+"""
+Streaming bulk ticket import (CSV / NDJSON).
+
+Records are parsed one at a time from a text stream and imported in batches
+of `TICKET_IMPORT_BATCH_SIZE`. Per batch:
+
+- statuses, priorities and categories resolve through the reference-data
+  registry (names, EN/PT aliases or ids); contacts and assets are checked
+  with one `IN` query each;
+- ticket numbers come from one `reserve_numbers` block, agents from the
+  compiled routing table and SLA deadlines from `sla_deadline_values`;
+- `chamado`, `chamado_comentario` and `chamado_log` rows are written with one
+  executemany INSERT each, stamped with one change sequence;
+- created events go to the outbox in bulk and the metrics rollup is updated
+  in aggregate (as the auto-close job does), then the batch commits.
+
+A record that fails validation is reported with its row number and skipped;
+if a batch INSERT fails, its rows are retried one by one so only the
+offending rows are reported. `TicketImportResult.checkpoint` is the last row
+of the last committed batch: pass it back as `resume_after` to continue an
+interrupted import without duplicating tickets.
+
+SLA deadlines that already passed when a ticket is imported are recorded as
+alerted, so loading legacy backlogs does not flood the team with breach
+alerts; pending ones are handed to the SLA scheduler on commit.
+
+CSV columns / NDJSON keys: `titulo` (required), `descricao`, `status` or
+`status_id`, `prioridade` or `prioridade_id`, `categoria` or `categoria_id`,
+`requisitante_contato_id`, `agente_contato_id`, `proprietario_contato_id`,
+`ativo_id`, `origem`, `criado_em`, `atualizado_em`, `fechado_em` and
+`comentarios` (a list of texts or `{"comentario", "contato_id",
+"data_hora"}` objects; in CSV a JSON array or a single text).
+"""
+
+import csv
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.events import TicketCreatedEvent, event_dispatcher
+from app.core.exceptions import ValidationError
+from app.core.reference_data import ReferenceEntry, ReferenceTable, reference_data
+from app.db.models import Ativo, Chamado, ChamadoComentario, ChamadoLog, ChamadoSlaAlerta, Contato
+from app.services.sla_scheduler import SLA_KINDS, stage_deadlines
+from app.services.ticket import TicketService
+from app.services.ticket_changes import next_change_seq
+from app.services.ticket_metrics import BUCKET_DIMENSIONS, ticket_bucket_key, ticket_metrics_rollup
+from app.services.ticket_routing import routing_engine
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# (row number, parsed record or None, parse error or None)
+ImportRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+_DATETIME_FORMATS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+_CONTACT_FIELDS = ("requisitante_contato_id", "agente_contato_id", "proprietario_contato_id")
+# Contact fields that may also hold an agent-company (empresa 1) contact
+_AGENT_CONTACT_FIELDS = ("agente_contato_id",)
+
+
+def iter_csv_records(stream: TextIO) -> Iterator[ImportRecord]:
+    """Parse CSV with a header row; rows are numbered from 1 (header excluded)."""
+    reader = csv.DictReader(stream)
+    row_no = 0
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            row_no += 1
+            yield row_no, None, f"Invalid CSV: {e}"
+            continue
+        row_no += 1
+        if None in row:
+            yield row_no, None, "More fields than header columns"
+            continue
+        yield row_no, {k.strip(): v for k, v in row.items() if k and v not in (None, "")}, None
+
+
+def iter_ndjson_records(stream: TextIO) -> Iterator[ImportRecord]:
+    """Parse one JSON object per line; blank lines are skipped and not numbered."""
+    row_no = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_no, None, "Expected a JSON object"
+            continue
+        yield row_no, data, None
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[ImportRecord]:
+    """Record iterator for `fmt` (one of `IMPORT_FORMATS`)."""
+    if fmt == "csv":
+        return iter_csv_records(stream)
+    if fmt == "ndjson":
+        return iter_ndjson_records(stream)
+    raise ValidationError(f"Unsupported import format '{fmt}'", {"supported": list(IMPORT_FORMATS)})
+
+
+def _int(data: Dict[str, Any], name: str) -> Optional[int]:
+    value = data.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+
+
+def _datetime(value: Any, name: str) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            for fmt in _DATETIME_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"{name} is not a valid date/time")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _comments(value: Any) -> List[Dict[str, Any]]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if not text.startswith("["):
+            return [{"comentario": text, "contato_id": None, "data_hora": None}]
+        try:
+            value = json.loads(text)
+        except ValueError:
+            raise ValueError("comentarios is not a valid JSON array")
+    if not isinstance(value, list):
+        raise ValueError("comentarios must be a list")
+    comments = []
+    for item in value:
+        if isinstance(item, dict):
+            text = str(item.get("comentario") or "").strip()
+            contato_id = _int(item, "contato_id")
+            data_hora = _datetime(item.get("data_hora"), "comentarios.data_hora")
+        else:
+            text, contato_id, data_hora = str(item or "").strip(), None, None
+        if text:
+            comments.append({"comentario": text, "contato_id": contato_id, "data_hora": data_hora})
+    return comments
+
+
+@dataclass
+class TicketImportResult:
+    """Outcome of one import call."""
+    imported: int = 0
+    failed: int = 0
+    batches: int = 0
+    checkpoint: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < get_settings().TICKET_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _PreparedTicket:
+    row: int
+    values: Dict[str, Any]
+    comments: List[Dict[str, Any]]
+    routed: bool = False
+
+
+class TicketImporter:
+    """Imports ticket records in validated, batched and committed chunks."""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self._batch_size = batch_size
+        self.ticket_service = TicketService()
+
+    @property
+    def batch_size(self) -> int:
+        return max(1, self._batch_size or get_settings().TICKET_IMPORT_BATCH_SIZE)
+
+    async def run(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        records: Iterable[ImportRecord],
+        origem: str = "import",
+        resume_after: int = 0,
+        on_checkpoint: Optional[Callable[[TicketImportResult], None]] = None,
+    ) -> TicketImportResult:
+        """
+        Import `records` for one tenant.
+
+        Args:
+            session: Database session; committed after every batch
+            empresa_id: Tenant owning the imported tickets
+            records: Parsed records (see `iter_records`)
+            origem: Default ticket origin (also the number prefix)
+            resume_after: Skip records up to this row (a previous `checkpoint`)
+            on_checkpoint: Called after every committed batch
+
+        Returns:
+            Counts, row errors and the checkpoint of the last committed batch
+        """
+        result = TicketImportResult(checkpoint=resume_after)
+        batch: List[ImportRecord] = []
+        for record in records:
+            if record[0] <= resume_after:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                await self._run_batch(session, empresa_id, batch, origem, result, on_checkpoint)
+                batch = []
+        if batch:
+            await self._run_batch(session, empresa_id, batch, origem, result, on_checkpoint)
+        if result.imported:
+            await self.ticket_service._invalidate_ticket_counts(empresa_id)
+        logger.info(
+            f"Ticket import empresa {empresa_id}: {result.imported} imported, {result.failed} failed "
+            f"in {result.batches} batches (checkpoint row {result.checkpoint})"
+        )
+        return result
+
+    async def _run_batch(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        batch: List[ImportRecord],
+        origem: str,
+        result: TicketImportResult,
+        on_checkpoint: Optional[Callable[[TicketImportResult], None]],
+    ) -> None:
+        prepared = await self._prepare(session, empresa_id, batch, origem, result)
+        inserted: List[Tuple[_PreparedTicket, int]] = []
+        if prepared:
+            numbers = await self.ticket_service.reserve_numbers(session, empresa_id, len(prepared), origem)
+            for ticket, numero in zip(prepared, numbers):
+                ticket.values["numero"] = numero
+            try:
+                async with session.begin_nested():
+                    inserted = list(zip(prepared, await self._insert(session, empresa_id, prepared)))
+            except SQLAlchemyError:
+                # Isolate the rows the database rejected
+                for ticket in prepared:
+                    try:
+                        async with session.begin_nested():
+                            inserted.append((ticket, (await self._insert(session, empresa_id, [ticket]))[0]))
+                    except SQLAlchemyError as e:
+                        result.add_error(ticket.row, f"Database error: {getattr(e, 'orig', None) or e}")
+            if inserted:
+                await self._record_side_effects(session, empresa_id, inserted)
+        await session.commit()
+        result.imported += len(inserted)
+        result.batches += 1
+        result.checkpoint = batch[-1][0]
+        if on_checkpoint:
+            on_checkpoint(result)
+
+    async def _prepare(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        batch: List[ImportRecord],
+        origem: str,
+        result: TicketImportResult,
+    ) -> List[_PreparedTicket]:
+        """Validate and resolve a batch; invalid records are reported and dropped."""
+        reference = await reference_data.load(session)
+        statuses, priorities, categories = reference["status"], reference["priority"], reference["category"]
+        default_status = statuses.resolve("open")
+
+        def _lookup(table: ReferenceTable, data: Dict[str, Any], name: str, label: str) -> Optional[ReferenceEntry]:
+            entry_id = _int(data, f"{name}_id")
+            if entry_id is not None:
+                entry = table.get(entry_id)
+                if entry is None:
+                    raise ValueError(f"Unknown {label} id {entry_id}")
+                return entry
+            if data.get(name) in (None, ""):
+                return None
+            entry = table.resolve(str(data[name]))
+            if entry is None:
+                raise ValueError(f"Unknown {label} '{data[name]}'")
+            return entry
+
+        parsed: List[Tuple[int, Dict[str, Any], List[Dict[str, Any]]]] = []
+        contact_ids: Set[int] = set()
+        asset_ids: Set[int] = set()
+        now = datetime.utcnow()
+        for row_no, data, error in batch:
+            if error or data is None:
+                result.add_error(row_no, error or "Empty record")
+                continue
+            try:
+                titulo = str(data.get("titulo") or "").strip()
+                if not titulo:
+                    raise ValueError("titulo is required")
+                status = _lookup(statuses, data, "status", "status") or default_status
+                priority = _lookup(priorities, data, "prioridade", "priority")
+                category = _lookup(categories, data, "categoria", "category")
+                criado_em = _datetime(data.get("criado_em"), "criado_em") or now
+                values = {
+                    "empresa_id": empresa_id,
+                    "numero": None,
+                    "origem": str(data.get("origem") or origem),
+                    "titulo": titulo,
+                    "descricao": data.get("descricao"),
+                    "status_id": status.id if status else None,
+                    "prioridade_id": priority.id if priority else None,
+                    "categoria_id": category.id if category else None,
+                    "ativo_id": _int(data, "ativo_id"),
+                    "criado_em": criado_em,
+                    "atualizado_em": _datetime(data.get("atualizado_em"), "atualizado_em") or criado_em,
+                    "fechado_em": _datetime(data.get("fechado_em"), "fechado_em"),
+                    **{name: _int(data, name) for name in _CONTACT_FIELDS},
+                }
+                comments = _comments(data.get("comentarios"))
+            except ValueError as e:
+                result.add_error(row_no, str(e))
+                continue
+            contact_ids.update(values[name] for name in _CONTACT_FIELDS if values[name])
+            contact_ids.update(c["contato_id"] for c in comments if c["contato_id"])
+            if values["ativo_id"]:
+                asset_ids.add(values["ativo_id"])
+            parsed.append((row_no, values, comments))
+
+        # Requesters and owners belong to the tenant; agents (and their comments) may be agent-company
+        # (empresa 1) contacts, who work every tenant's tickets
+        tenant_contacts: Set[int] = set()
+        agent_contacts: Set[int] = set()
+        if contact_ids:
+            res = await session.execute(
+                select(Contato.id, Contato.empresa_id).where(
+                    Contato.id.in_(contact_ids), Contato.empresa_id.in_({empresa_id, 1})
+                )
+            )
+            for contato_id, contato_empresa_id in res.all():
+                agent_contacts.add(contato_id)
+                if contato_empresa_id == empresa_id:
+                    tenant_contacts.add(contato_id)
+        asset_types: Dict[int, Optional[int]] = {}
+        if asset_ids:
+            res = await session.execute(
+                select(Ativo.id, Ativo.tipo_ativo_id).where(Ativo.id.in_(asset_ids), Ativo.empresa_id == empresa_id)
+            )
+            asset_types = {row.id: row.tipo_ativo_id for row in res.all()}
+        routing = await routing_engine.table(session, empresa_id)
+
+        prepared: List[_PreparedTicket] = []
+        for row_no, values, comments in parsed:
+            missing = [
+                str(contato_id)
+                for contato_id, allowed in [
+                    (values[name], agent_contacts if name in _AGENT_CONTACT_FIELDS else tenant_contacts)
+                    for name in _CONTACT_FIELDS
+                ] + [(c["contato_id"], agent_contacts) for c in comments]
+                if contato_id and contato_id not in allowed
+            ]
+            if missing:
+                result.add_error(row_no, f"Contact id(s) {', '.join(missing)} do not belong to the company")
+                continue
+            if values["ativo_id"] and values["ativo_id"] not in asset_types:
+                result.add_error(row_no, f"Asset {values['ativo_id']} does not belong to the company")
+                continue
+            ticket = _PreparedTicket(row_no, values, comments)
+            if not values["agente_contato_id"]:
+                agent_id = routing.route(
+                    categoria_id=values["categoria_id"],
+                    prioridade_id=values["prioridade_id"],
+                    tipo_ativo_id=asset_types.get(values["ativo_id"]),
+                    origem=values["origem"],
+                )
+                if agent_id:
+                    values["agente_contato_id"] = int(agent_id)
+                    ticket.routed = True
+            values.update(self.ticket_service.sla_deadline_values(
+                priorities.get(values["prioridade_id"]),
+                statuses.get(values["status_id"]),
+                values["criado_em"],
+                values["agente_contato_id"] is not None or bool(comments),
+            ))
+            prepared.append(ticket)
+        return prepared
+
+    async def _insert(self, session: AsyncSession, empresa_id: int, tickets: List[_PreparedTicket]) -> List[int]:
+        """Insert tickets, comments and creation logs; returns the ticket ids in input order."""
+        seq = await next_change_seq(session)
+        rows = [dict(ticket.values, change_seq=seq) for ticket in tickets]
+        if session.bind.dialect.insert_executemany_returning:
+            res = await session.execute(insert(Chamado).returning(Chamado.id, sort_by_parameter_order=True), rows)
+            ids = list(res.scalars().all())
+        else:
+            ids = [
+                (await session.execute(insert(Chamado.__table__).values(**row))).inserted_primary_key[0]
+                for row in rows
+            ]
+
+        comments: List[Dict[str, Any]] = []
+        logs: List[Dict[str, Any]] = []
+        for ticket, ticket_id in zip(tickets, ids):
+            created = ticket.values["criado_em"]
+            for comment in ticket.comments:
+                comments.append({
+                    "chamado_id": ticket_id,
+                    "contato_id": comment["contato_id"],
+                    "comentario": comment["comentario"],
+                    "data_hora": comment["data_hora"] or created,
+                    "change_seq": seq,
+                })
+            log = {
+                "chamado_id": ticket_id, "contato_id": ticket.values["requisitante_contato_id"],
+                "data_hora": created, "change_seq": seq,
+            }
+            logs.append(dict(log, id_alteracao="CREATED", status_de_id=None, status_para_id=ticket.values["status_id"]))
+            if ticket.routed:
+                logs.append(dict(log, contato_id=None, id_alteracao="ROUTED", status_de_id=None, status_para_id=None))
+        if comments:
+            await session.execute(insert(ChamadoComentario), comments)
+        await session.execute(insert(ChamadoLog), logs)
+        return ids
+
+    async def _record_side_effects(
+        self, session: AsyncSession, empresa_id: int, inserted: List[Tuple[_PreparedTicket, int]]
+    ) -> None:
+        """Created events, metrics rollup and SLA scheduling for inserted tickets."""
+        now = datetime.utcnow()
+        events = []
+        created: Dict[Tuple[Any, tuple], int] = {}
+        alerted: List[Dict[str, Any]] = []
+        for ticket, ticket_id in inserted:
+            values = ticket.values
+            bucket = dict(zip(BUCKET_DIMENSIONS, ticket_bucket_key(values)))
+            events.append(TicketCreatedEvent(
+                ticket_id, empresa_id, values["numero"], values["titulo"],
+                origem=values["origem"], bucket=bucket, imported=True,
+            ))
+            # Counted on the creation day, as `TicketMetricsRollup.rebuild` does
+            key = (values["criado_em"].date(), ticket_bucket_key(values))
+            created[key] = created.get(key, 0) + 1
+
+            pending: Dict[str, Optional[datetime]] = {}
+            for kind, (column_name, _) in SLA_KINDS.items():
+                deadline = values[column_name]
+                if deadline is not None and deadline <= now:
+                    alerted.append({
+                        "chamado_id": ticket_id, "empresa_id": empresa_id, "tipo": kind,
+                        "prazo": deadline, "disparado_em": now,
+                    })
+                elif deadline is not None:
+                    pending[kind] = deadline
+            if pending:
+                stage_deadlines(session.sync_session, ticket_id, empresa_id, pending)
+
+        await event_dispatcher.record_events(session, events)
+        for (day, key), count in created.items():
+            await ticket_metrics_rollup.apply(
+                session, empresa_id, day, dict(zip(BUCKET_DIMENSIONS, key)), created_count=count
+            )
+        if alerted:
+            await session.execute(insert(ChamadoSlaAlerta), alerted)
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.events import DomainEvent, EventDispatcher, event_dispatcher
+from app.db.event_models import EventType
+from app.db.models import Chamado, ChamadoLog, TicketMetricsDaily
+
+logger = logging.getLogger(__name__)
+
+# Dimensions of a rollup bucket, in key order.
+BUCKET_DIMENSIONS = ("status_id", "prioridade_id", "agente_contato_id")
+_KEY_COLUMNS = ("empresa_id", "day") + BUCKET_DIMENSIONS
+_COUNTER_COLUMNS = ("created_count", "moved_in_count", "moved_out_count", "updated_count")
+
+# chamado_log actions that correspond to a published ticket change event.
+CHANGE_LOG_ACTIONS = ("UPDATED", "MACRO", "AUTO_CLOSED")
+
+
+def ticket_bucket(ticket: Chamado) -> Dict[str, int]:
+    """Return the rollup bucket of a ticket (0 stands for an unset dimension)."""
+    return {dim: int(getattr(ticket, dim, None) or 0) for dim in BUCKET_DIMENSIONS}
+
+
+def ticket_bucket_key(bucket: Dict[str, Any]) -> tuple:
+    return tuple(int(bucket.get(dim) or 0) for dim in BUCKET_DIMENSIONS)
+
+
+class TicketMetricsRollup:
+    """Maintains `ticket_metrics_daily`, the per-day ticket flow rollup.
+
+    Rows are upserted from ticket events inside the publishing transaction, so
+    analytics can sum a tenant's days instead of scanning its tickets.
+    """
+
+    async def apply(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        day: date,
+        bucket: Dict[str, Any],
+        **deltas: int,
+    ) -> None:
+        """Add `deltas` (counter name -> increment) to one bucket/day row."""
+        key = {"empresa_id": empresa_id, "day": day}
+        key.update({dim: int(bucket.get(dim) or 0) for dim in BUCKET_DIMENSIONS})
+        deltas = {name: int(value) for name, value in deltas.items() if value}
+        if not deltas:
+            return
+        unknown = set(deltas) - set(_COUNTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown rollup counters: {sorted(unknown)}")
+
+        table = TicketMetricsDaily.__table__
+        dialect = session.bind.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            values = {name: 0 for name in _COUNTER_COLUMNS}
+            values.update(deltas)
+            stmt = dialect_insert(table).values(**key, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_KEY_COLUMNS),
+                set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+            )
+            await session.execute(stmt)
+            return
+
+        # Generic fallback: update the row, insert it when missing.
+        res = await session.execute(
+            update(table)
+            .where(*[table.c[col] == val for col, val in key.items()])
+            .values({name: table.c[name] + inc for name, inc in deltas.items()})
+        )
+        if not res.rowcount:
+            values = {name: 0 for name in _COUNTER_COLUMNS}
+            values.update(deltas)
+            await session.execute(insert(table).values(**key, **values))
+
+    async def apply_moves(
+        self,
+        session: AsyncSession,
+        empresa_id: int,
+        day: date,
+        moves: Dict[tuple, int],
+        log_entries: int = 1,
+    ) -> None:
+        """Record many bucket moves at once.
+
+        Equivalent to one `on_ticket_changed` per moved ticket, with one upsert
+        per distinct bucket instead of two per ticket.
+
+        Args:
+            moves: (source bucket key, target bucket key) -> number of tickets
+            log_entries: Change-log entries written per moved ticket
+        """
+        moved_out: Dict[tuple, int] = {}
+        moved_in: Dict[tuple, int] = {}
+        updated: Dict[tuple, int] = {}
+        for (src, dst), count in moves.items():
+            if src != dst:
+                moved_out[src] = moved_out.get(src, 0) + count
+                moved_in[dst] = moved_in.get(dst, 0) + count
+            updated[dst] = updated.get(dst, 0) + count * log_entries
+        for key, count in moved_out.items():
+            await self.apply(session, empresa_id, day, dict(zip(BUCKET_DIMENSIONS, key)), moved_out_count=count)
+        for key, count in updated.items():
+            await self.apply(
+                session, empresa_id, day, dict(zip(BUCKET_DIMENSIONS, key)),
+                moved_in_count=moved_in.get(key, 0), updated_count=count,
+            )
+
+    async def on_ticket_created(self, session: AsyncSession, event: DomainEvent) -> None:
+        """Projector for `TicketCreatedEvent` (needs a `bucket` payload entry)."""
+        bucket = (event.payload or {}).get("bucket")
+        if bucket is None or not event.empresa_id:
+            return
+        await self.apply(session, event.empresa_id, _event_day(event), bucket, created_count=1)
+
+    async def on_ticket_changed(self, session: AsyncSession, event: DomainEvent) -> None:
+        """Projector for ticket status/field changes carrying `bucket_from`/`bucket_to`."""
+        payload = event.payload or {}
+        src, dst = payload.get("bucket_from"), payload.get("bucket_to")
+        if src is None or dst is None or not event.empresa_id:
+            return
+        day = _event_day(event)
+        log_entries = int(payload.get("log_entries", 1))
+        if ticket_bucket_key(src) != ticket_bucket_key(dst):
+            await self.apply(session, event.empresa_id, day, src, moved_out_count=1)
+            await self.apply(session, event.empresa_id, day, dst, moved_in_count=1, updated_count=log_entries)
+        else:
+            await self.apply(session, event.empresa_id, day, dst, updated_count=log_entries)
+
+    async def on_ticket_deleted(self, session: AsyncSession, event: DomainEvent) -> None:
+        """Projector for `TicketDeletedEvent`: the ticket leaves its `bucket`."""
+        bucket = (event.payload or {}).get("bucket")
+        if bucket is None or not event.empresa_id:
+            return
+        await self.apply(session, event.empresa_id, _event_day(event), bucket, moved_out_count=1)
+
+    async def rebuild(self, session: AsyncSession, empresa_id: Optional[int] = None) -> int:
+        """
+        Recompute the rollup from `chamado` and `chamado_log`.
+
+        History of past moves is not recorded anywhere, so every ticket is
+        counted as created on its creation day directly in its current bucket;
+        logged changes are attributed to that bucket on the day they happened.
+        Current per-bucket totals are therefore exact after a rebuild.
+
+        Args:
+            session: Database session (caller commits)
+            empresa_id: Restrict to one tenant; None rebuilds every tenant
+
+        Returns:
+            Number of rollup rows written
+        """
+        dims = [func.coalesce(getattr(Chamado, dim), 0).label(dim) for dim in BUCKET_DIMENSIONS]
+        created = select(
+            Chamado.empresa_id.label("empresa_id"),
+            func.date(Chamado.criado_em).label("day"),
+            *dims,
+            literal(1).label("created_count"),
+            literal(0).label("updated_count"),
+        ).where(Chamado.empresa_id.is_not(None))
+        changed = (
+            select(
+                Chamado.empresa_id.label("empresa_id"),
+                func.date(ChamadoLog.data_hora).label("day"),
+                *dims,
+                literal(0).label("created_count"),
+                literal(1).label("updated_count"),
+            )
+            .join(ChamadoLog, ChamadoLog.chamado_id == Chamado.id)
+            .where(Chamado.empresa_id.is_not(None), ChamadoLog.id_alteracao.in_(CHANGE_LOG_ACTIONS))
+        )
+        if empresa_id is not None:
+            created = created.where(Chamado.empresa_id == empresa_id)
+            changed = changed.where(Chamado.empresa_id == empresa_id)
+        flows = union_all(created, changed).subquery()
+        key_cols = [flows.c[col] for col in _KEY_COLUMNS]
+        aggregate = select(
+            *key_cols,
+            func.sum(flows.c.created_count),
+            literal(0),
+            literal(0),
+            func.sum(flows.c.updated_count),
+        ).group_by(*key_cols)
+
+        purge = delete(TicketMetricsDaily)
+        if empresa_id is not None:
+            purge = purge.where(TicketMetricsDaily.empresa_id == empresa_id)
+        await session.execute(purge)
+        await session.execute(
+            insert(TicketMetricsDaily).from_select(list(_KEY_COLUMNS + _COUNTER_COLUMNS), aggregate)
+        )
+
+        count_q = select(func.count(TicketMetricsDaily.id))
+        if empresa_id is not None:
+            count_q = count_q.where(TicketMetricsDaily.empresa_id == empresa_id)
+        rows = int((await session.execute(count_q)).scalar_one())
+        logger.info(f"Rebuilt ticket_metrics_daily ({rows} rows, empresa={empresa_id or 'all'})")
+        return rows
+
+
+def _event_day(event: DomainEvent) -> date:
+    return (event.occurred_at or datetime.utcnow()).date()
+
+
+ticket_metrics_rollup = TicketMetricsRollup()
+
+
+def register_ticket_metrics_projectors(dispatcher: EventDispatcher = event_dispatcher) -> None:
+    """Keep `ticket_metrics_daily` in step with ticket events published on `dispatcher`."""
+    dispatcher.register_projector(EventType.TICKET_CREATED, ticket_metrics_rollup.on_ticket_created)
+    dispatcher.register_projector(EventType.TICKET_STATUS_CHANGED, ticket_metrics_rollup.on_ticket_changed)
+    dispatcher.register_projector(EventType.TICKET_UPDATED, ticket_metrics_rollup.on_ticket_changed)
+    dispatcher.register_projector(EventType.TICKET_DELETED, ticket_metrics_rollup.on_ticket_deleted)
+
+
+register_ticket_metrics_projectors()
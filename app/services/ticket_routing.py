@@ -0,0 +1,256 @@
+"""
+Compiled per-tenant routing tables for new tickets.
+
+Each rule in `helpdesk_routing_rule` names an agent and up to four criteria
+(category, priority, asset type, origin); a NULL criterion matches anything.
+A tenant's active rules are compiled once into dicts keyed by the criteria
+tuple (with None standing for "any"), so routing a ticket is at most sixteen
+dict probes, most specific pattern first, and never touches the database.
+
+When several rules match, the most specific wins, with criteria weighted
+category > priority > asset type > origin (so a category rule still beats a
+priority rule, and both beat the catch-all rule); equally specific rules
+resolve to the lowest id. Rules without an asset type or origin keep their
+original meaning: one with a category matches tickets of that category, and
+one with a priority matches tickets of that priority, so a rule with both
+matches a ticket on either. Tables are versioned per tenant and invalidated
+by ORM writes to the rules (`PUT /admin/helpdesk/routing`); a TTL bounds
+staleness for writes made by other processes.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from itertools import chain, product
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db.models import HelpdeskRoutingRule
+
+logger = logging.getLogger(__name__)
+
+# Criteria in precedence order (most significant first)
+ROUTING_CRITERIA = ("categoria_id", "prioridade_id", "tipo_ativo_id", "origem")
+
+RoutingKey = Tuple[Any, ...]
+
+# Wildcard masks (True = criterion must match) ordered from most to least specific
+_MASKS: List[Tuple[bool, ...]] = sorted(product((True, False), repeat=len(ROUTING_CRITERIA)), reverse=True)
+
+# Category-only and priority-only masks stand for the category and priority
+# stages of rules without asset type or origin (criterion index per stage)
+_LEGACY_STAGES = {(True, False, False, False): 0, (False, True, False, False): 1}
+
+
+def _normalize_origin(origem: Optional[str]) -> Optional[str]:
+    value = (origem or "").strip().lower()
+    return value or None
+
+
+@dataclass(frozen=True)
+class RoutingRuleEntry:
+    """Detached snapshot of one active routing rule."""
+    id: int
+    agente_contato_id: int
+    categoria_id: Optional[int] = None
+    prioridade_id: Optional[int] = None
+    tipo_ativo_id: Optional[int] = None
+    origem: Optional[str] = None
+
+    @property
+    def key(self) -> RoutingKey:
+        return tuple(getattr(self, name) for name in ROUTING_CRITERIA)
+
+    @property
+    def legacy(self) -> bool:
+        """Whether the rule only uses category and/or priority (matched one of the two at a time)."""
+        return (
+            self.tipo_ativo_id is None and self.origem is None
+            and (self.categoria_id is not None or self.prioridade_id is not None)
+        )
+
+
+class RoutingTable:
+    """A tenant's routing rules compiled into a wildcard lookup."""
+
+    def __init__(self, empresa_id: int, rules: List[RoutingRuleEntry], version: int = 0):
+        self.empresa_id = empresa_id
+        self.version = version
+        self.rules = sorted(rules, key=lambda r: r.id)
+        self._by_key: Dict[RoutingKey, RoutingRuleEntry] = {}
+        self._legacy: Dict[int, Dict[Any, RoutingRuleEntry]] = {stage: {} for stage in _LEGACY_STAGES.values()}
+        for rule in self.rules:
+            if rule.legacy:
+                for stage, value in enumerate((rule.categoria_id, rule.prioridade_id)):
+                    if value is not None:
+                        self._legacy[stage].setdefault(value, rule)
+            else:
+                self._by_key.setdefault(rule.key, rule)
+        # Only probe the wildcard patterns some rule actually uses. Each pattern
+        # becomes a (dict, itemgetter over (values..., None)) pair that builds its
+        # lookup key, and the applicable patterns are precomputed per set of
+        # present attributes.
+        used = {tuple(value is not None for value in key) for key in self._by_key}
+        wildcard = len(ROUTING_CRITERIA)
+        self._probes: Dict[Tuple[bool, ...], List[Tuple[Dict[Any, RoutingRuleEntry], Any]]] = {}
+        for present in product((True, False), repeat=wildcard):
+            probes = []
+            for mask in _MASKS:
+                if not all(p or not wanted for wanted, p in zip(mask, present)):
+                    continue
+                stage = _LEGACY_STAGES.get(mask)
+                if stage is not None:
+                    if self._legacy[stage]:
+                        probes.append((self._legacy[stage], itemgetter(stage)))
+                elif mask in used:
+                    probes.append((
+                        self._by_key,
+                        itemgetter(*(i if wanted else wildcard for i, wanted in enumerate(mask))),
+                    ))
+            self._probes[present] = probes
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(
+        self,
+        categoria_id: Optional[int] = None,
+        prioridade_id: Optional[int] = None,
+        tipo_ativo_id: Optional[int] = None,
+        origem: Optional[str] = None,
+    ) -> Optional[RoutingRuleEntry]:
+        """Return the most specific rule matching the ticket attributes, or None."""
+        values = (categoria_id or None, prioridade_id or None, tipo_ativo_id or None, _normalize_origin(origem), None)
+        for lookup, key_of in self._probes[tuple(value is not None for value in values[:-1])]:
+            rule = lookup.get(key_of(values))
+            if rule is not None:
+                return rule
+        return None
+
+    def route(self, **criteria: Any) -> Optional[int]:
+        """Agent id for the ticket attributes in `criteria`, or None."""
+        rule = self.match(**criteria)
+        return rule.agente_contato_id if rule else None
+
+
+class RoutingEngine:
+    """Process-wide cache of compiled per-tenant routing tables."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self._ttl_seconds = ttl_seconds
+        self._tables: Dict[int, Tuple[RoutingTable, float]] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return get_settings().ROUTING_TABLE_TTL_SECONDS
+
+    def version(self, empresa_id: int) -> int:
+        """Current rules version of a tenant (bumped on every invalidation)."""
+        return self._versions.get(empresa_id, 0)
+
+    def invalidate(self, empresa_id: Optional[int] = None) -> None:
+        """Drop the compiled table of one tenant (or all tenants)."""
+        targets = list(self._tables) if empresa_id is None else [empresa_id]
+        if empresa_id is None:
+            targets.extend(self._versions)
+        for tenant in set(targets):
+            self._versions[tenant] = self._versions.get(tenant, 0) + 1
+            self._tables.pop(tenant, None)
+
+    def _fresh(self, empresa_id: int) -> Optional[RoutingTable]:
+        cached = self._tables.get(empresa_id)
+        if cached is None:
+            return None
+        table, loaded_at = cached
+        ttl = self.ttl_seconds
+        if ttl and time.monotonic() - loaded_at > ttl:
+            return None
+        return table
+
+    async def table(self, session: AsyncSession, empresa_id: int) -> RoutingTable:
+        """Return the tenant's compiled table, compiling it through `session` when missing or stale."""
+        table = self._fresh(empresa_id)
+        if table is not None:
+            return table
+        async with self._lock:
+            table = self._fresh(empresa_id)
+            if table is not None:
+                return table
+            version = self.version(empresa_id)
+            res = await session.execute(
+                select(
+                    HelpdeskRoutingRule.id,
+                    HelpdeskRoutingRule.agente_contato_id,
+                    HelpdeskRoutingRule.categoria_id,
+                    HelpdeskRoutingRule.prioridade_id,
+                    HelpdeskRoutingRule.tipo_ativo_id,
+                    HelpdeskRoutingRule.origem,
+                ).where(
+                    HelpdeskRoutingRule.empresa_id == empresa_id,
+                    HelpdeskRoutingRule.ativo == True,
+                    HelpdeskRoutingRule.agente_contato_id.is_not(None),
+                )
+            )
+            rules = [
+                RoutingRuleEntry(
+                    id=r.id,
+                    agente_contato_id=int(r.agente_contato_id),
+                    categoria_id=r.categoria_id,
+                    prioridade_id=r.prioridade_id,
+                    tipo_ativo_id=r.tipo_ativo_id,
+                    origem=_normalize_origin(r.origem),
+                )
+                for r in res.all()
+            ]
+            table = RoutingTable(empresa_id, rules, version)
+            # Only publish the table if no write invalidated it while compiling
+            if version == self.version(empresa_id):
+                self._tables[empresa_id] = (table, time.monotonic())
+            logger.debug(f"Compiled routing table v{version} for empresa {empresa_id} ({len(table)} rules)")
+            return table
+
+    async def route(self, session: AsyncSession, empresa_id: int, **criteria: Any) -> Optional[int]:
+        """Agent id for a ticket with the given attributes, or None."""
+        return (await self.table(session, empresa_id)).route(**criteria)
+
+
+routing_engine = RoutingEngine()
+
+
+_DIRTY_KEY = "routing_rules_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_flush(session: Session, flush_context: Any) -> None:
+    tenants = {
+        obj.empresa_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, HelpdeskRoutingRule)
+    }
+    if tenants:
+        session.info.setdefault(_DIRTY_KEY, set()).update(tenants)
+        for empresa_id in tenants:
+            routing_engine.invalidate(empresa_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    # Readers may have compiled the uncommitted rules between flush and commit
+    for empresa_id in session.info.pop(_DIRTY_KEY, ()):
+        routing_engine.invalidate(empresa_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _invalidate_on_rollback(session: Session) -> None:
+    for empresa_id in session.info.pop(_DIRTY_KEY, ()):
+        routing_engine.invalidate(empresa_id)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, Integer, func, literal_column, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.models import Chamado
+from app.db.search_ddl import TICKET_FTS_TABLE, TICKET_SEARCH_CONFIG, TICKET_SEARCH_VECTOR
+
+logger = logging.getLogger(__name__)
+
+SQLITE_FTS = "sqlite_fts5"
+POSTGRES_FTS = "postgres_tsvector"
+
+# Longer inputs are truncated; each token adds a posting-list intersection.
+MAX_SEARCH_TOKENS = 8
+
+# bm25 column weights for (titulo, descricao, numero)
+_SQLITE_BM25_WEIGHTS = (10.0, 1.0, 10.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_tokens(term: Optional[str]) -> List[str]:
+    """Split free text into lower-case word tokens (punctuation and query syntax dropped)."""
+    return [t.lower() for t in _TOKEN_RE.findall(term or "")][:MAX_SEARCH_TOKENS]
+
+
+class TicketSearch:
+    """Full-text ticket search over the index built by `app.db.search_ddl`.
+
+    Every token is prefix-matched and all tokens must match. Results are
+    ranked by bm25 on SQLite and ts_rank_cd on Postgres, exposed as an
+    ascending `rank` column (lower is better) so callers sort the same way on
+    both backends. Without an index (other dialects, un-migrated databases or
+    `TICKET_SEARCH_FTS=False`) callers fall back to `ilike_condition`.
+    """
+
+    def __init__(self) -> None:
+        self._available: Dict[str, bool] = {}
+
+    async def backend(self, session: AsyncSession) -> Optional[str]:
+        """Return the full-text backend usable through `session`, or None."""
+        if not get_settings().TICKET_SEARCH_FTS:
+            return None
+        bind = session.bind
+        dialect = bind.dialect.name
+        key = f"{dialect}:{bind.url}"
+        if key not in self._available:
+            if dialect == "sqlite":
+                probe = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name").bindparams(
+                    name=TICKET_FTS_TABLE
+                )
+            elif dialect == "postgresql":
+                probe = text(
+                    "SELECT 1 FROM information_schema.columns WHERE table_name = 'chamado' AND column_name = :name"
+                ).bindparams(name=TICKET_SEARCH_VECTOR)
+            else:
+                probe = None
+            found = probe is not None and (await session.execute(probe)).first() is not None
+            if not found:
+                logger.warning(f"Ticket full-text index not found for {dialect}; search falls back to ILIKE")
+            self._available[key] = found
+        if not self._available[key]:
+            return None
+        return SQLITE_FTS if dialect == "sqlite" else POSTGRES_FTS
+
+    def ranked_matches(self, backend: str, term: str) -> Optional[Any]:
+        """Subquery of matching ticket ids with an ascending `rank` (None if `term` has no words)."""
+        tokens = search_tokens(term)
+        if not tokens:
+            return None
+        if backend == SQLITE_FTS:
+            weights = ", ".join(str(w) for w in _SQLITE_BM25_WEIGHTS)
+            return (
+                text(
+                    f"SELECT rowid AS id, bm25({TICKET_FTS_TABLE}, {weights}) AS rank "
+                    f"FROM {TICKET_FTS_TABLE} WHERE {TICKET_FTS_TABLE} MATCH :fts_query"
+                )
+                .bindparams(fts_query=" ".join(f'"{t}"*' for t in tokens))
+                .columns(id=Integer, rank=Float)
+                .subquery("ticket_fts")
+            )
+        vector = literal_column(f"chamado.{TICKET_SEARCH_VECTOR}")
+        tsquery = func.to_tsquery(TICKET_SEARCH_CONFIG, " & ".join(f"{t}:*" for t in tokens))
+        return (
+            select(Chamado.id.label("id"), (-func.ts_rank_cd(vector, tsquery)).label("rank"))
+            .where(vector.op("@@")(tsquery))
+            .subquery("ticket_fts")
+        )
+
+    def filter_condition(self, backend: Optional[str], term: str) -> Any:
+        """Boolean filter for the `search` list parameter (full-text when available)."""
+        ranked = self.ranked_matches(backend, term) if backend else None
+        if ranked is None:
+            return self.ilike_condition(term)
+        return Chamado.id.in_(select(ranked.c.id))
+
+    @staticmethod
+    def ilike_condition(term: str) -> Any:
+        search_term = f"%{term}%"
+        return or_(
+            Chamado.titulo.ilike(search_term),
+            Chamado.descricao.ilike(search_term),
+            Chamado.numero.ilike(search_term),
+        )
+
+
+ticket_search = TicketSearch()
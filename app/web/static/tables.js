@@ -20,6 +20,13 @@ document.addEventListener('DOMContentLoaded', async () => {
       'Support Tickets': ['StatusChamado', 'Prioridade', 'ChamadoCategoria', 'Chamado', 'ChamadoComentario', 'ChamadoLog', 'ChamadoDefeito']
     };
     
+    // Stock levels derive from the stock ledger, ticket metrics from ticket
+    // events: no generic create
+    const ledgerModels = ['StockLevel', 'TicketMetricsDaily'];
+    const createLink = model => ledgerModels.includes(model)
+      ? ''
+      : `<a href="/admin/${model}/create" class="action-link create-link">[create]</a>`;
+    
     // Create grouped sections
     Object.entries(groups).forEach(([groupName, groupModels]) => {
       const availableModels = groupModels.filter(model => models.includes(model));
@@ -43,7 +50,7 @@ document.addEventListener('DOMContentLoaded', async () => {
           <span class="model-name">${model}</span>
           <div class="model-actions">
             <a href="/admin/${model}" class="action-link list-link">[list]</a>
-            <a href="/admin/${model}/create" class="action-link create-link">[create]</a>
+            ${createLink(model)}
           </div>
         `;
         list.appendChild(li);
@@ -76,7 +83,7 @@ document.addEventListener('DOMContentLoaded', async () => {
           <span class="model-name">${model}</span>
           <div class="model-actions">
             <a href="/admin/${model}" class="action-link list-link">[list]</a>
-            <a href="/admin/${model}/create" class="action-link create-link">[create]</a>
+            ${createLink(model)}
           </div>
         `;
         list.appendChild(li);
@@ -0,0 +1,51 @@
+"""
+Seed ticket_counter from existing chamado.numero values.
+
+Ticket numbers are now allocated only from ticket_counter (UPDATE ... RETURNING),
+so every tenant's counter must start past its highest E{empresa}{ORIGIN}-{N}.
+One-time scan; counters already ahead are left untouched.
+"""
+
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251210_seed_ticket_counters'
+down_revision = '20251205_add_kb_tables'
+branch_labels = None
+depends_on = None
+
+_NUMERO_RE = re.compile(r"^E(\d+)[A-Z]+-(\d+)$")
+
+
+def upgrade():
+    conn = op.get_bind()
+    max_by_empresa = {}
+    rows = conn.execute(sa.text("SELECT empresa_id, numero FROM chamado WHERE empresa_id IS NOT NULL"))
+    for empresa_id, numero in rows:
+        m = _NUMERO_RE.match((numero or "").strip())
+        if not m or int(m.group(1)) != empresa_id:
+            continue
+        n = int(m.group(2))
+        if n > max_by_empresa.get(empresa_id, 0):
+            max_by_empresa[empresa_id] = n
+
+    existing = dict(conn.execute(sa.text("SELECT empresa_id, next_value FROM ticket_counter")).fetchall())
+    for empresa_id, max_n in max_by_empresa.items():
+        next_value = max_n + 1
+        if empresa_id not in existing:
+            conn.execute(
+                sa.text("INSERT INTO ticket_counter (empresa_id, next_value) VALUES (:e, :n)"),
+                {"e": empresa_id, "n": next_value},
+            )
+        elif (existing[empresa_id] or 0) < next_value:
+            conn.execute(
+                sa.text("UPDATE ticket_counter SET next_value = :n WHERE empresa_id = :e"),
+                {"e": empresa_id, "n": next_value},
+            )
+
+
+def downgrade():
+    # Counters stay valid for the previous allocator, which re-derives the max itself.
+    pass
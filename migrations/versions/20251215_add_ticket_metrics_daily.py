@@ -0,0 +1,69 @@
+"""
+Add ticket_metrics_daily rollup (per tenant/day/status/priority/agent) and backfill it.
+
+The backfill mirrors TicketMetricsRollup.rebuild: every ticket is counted as
+created on its creation day in its current bucket, and logged changes are
+counted on the day they happened. `python scripts/rebuild_ticket_metrics.py`
+recomputes it later if needed.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251215_add_ticket_metrics_daily'
+down_revision = '20251210_seed_ticket_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ticket_metrics_daily',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('empresa_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('prioridade_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('agente_contato_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('moved_in_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('moved_out_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint(
+            'empresa_id', 'day', 'status_id', 'prioridade_id', 'agente_contato_id',
+            name='uq_ticket_metrics_daily_bucket',
+        ),
+    )
+    op.create_index('ix_ticket_metrics_daily_empresa_day', 'ticket_metrics_daily', ['empresa_id', 'day'])
+
+    op.get_bind().execute(sa.text(
+        """
+        INSERT INTO ticket_metrics_daily
+            (empresa_id, day, status_id, prioridade_id, agente_contato_id,
+             created_count, moved_in_count, moved_out_count, updated_count)
+        SELECT empresa_id, day, status_id, prioridade_id, agente_contato_id,
+               SUM(created_count), 0, 0, SUM(updated_count)
+        FROM (
+            SELECT c.empresa_id AS empresa_id, date(c.criado_em) AS day,
+                   COALESCE(c.status_id, 0) AS status_id,
+                   COALESCE(c.prioridade_id, 0) AS prioridade_id,
+                   COALESCE(c.agente_contato_id, 0) AS agente_contato_id,
+                   1 AS created_count, 0 AS updated_count
+            FROM chamado c
+            WHERE c.empresa_id IS NOT NULL
+            UNION ALL
+            SELECT c.empresa_id, date(l.data_hora),
+                   COALESCE(c.status_id, 0), COALESCE(c.prioridade_id, 0), COALESCE(c.agente_contato_id, 0),
+                   0, 1
+            FROM chamado c
+            JOIN chamado_log l ON l.chamado_id = c.id
+            WHERE c.empresa_id IS NOT NULL AND l.id_alteracao IN ('UPDATED', 'MACRO', 'AUTO_CLOSED')
+        ) flows
+        GROUP BY empresa_id, day, status_id, prioridade_id, agente_contato_id
+        """
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_ticket_metrics_daily_empresa_day', table_name='ticket_metrics_daily')
+    op.drop_table('ticket_metrics_daily')
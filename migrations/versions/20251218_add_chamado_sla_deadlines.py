@@ -0,0 +1,81 @@
+"""
+Store pending SLA deadlines on chamado and index them per tenant.
+
+sla_resposta_ate / sla_resolucao_ate / sla_escalonamento_ate hold the
+deadlines still to be met (NULL once responded / resolved), so the `sla`
+ticket list filter is a range scan instead of a Python post-filter.
+The backfill applies TicketWorkflowEngine.SLA_CONFIGS: the first priority
+code contained in the Prioridade name wins, anything else is normal.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251218_add_chamado_sla_deadlines'
+down_revision = '20251215_add_ticket_metrics_daily'
+branch_labels = None
+depends_on = None
+
+# priority code -> (response, resolution, escalation) hours; keep in sync with SLA_CONFIGS
+_SLA_HOURS = [
+    ('low', (48, 168, 72)),
+    ('normal', (24, 72, 48)),
+    ('high', (8, 24, 16)),
+    ('urgent', (4, 12, 8)),
+    ('critical', (1, 4, 2)),
+]
+_DEFAULT_HOURS = (24, 72, 48)
+
+
+def _hours_case(idx):
+    whens = " ".join(
+        f"WHEN lower(p.nome) LIKE '%{code}%' THEN {hours[idx]}" for code, hours in _SLA_HOURS
+    )
+    return (
+        f"COALESCE((SELECT CASE {whens} ELSE {_DEFAULT_HOURS[idx]} END "
+        f"FROM prioridade p WHERE p.id = chamado.prioridade_id), {_DEFAULT_HOURS[idx]})"
+    )
+
+
+def upgrade():
+    op.add_column('chamado', sa.Column('sla_resposta_ate', sa.DateTime(), nullable=True))
+    op.add_column('chamado', sa.Column('sla_resolucao_ate', sa.DateTime(), nullable=True))
+    op.add_column('chamado', sa.Column('sla_escalonamento_ate', sa.DateTime(), nullable=True))
+    op.create_index('ix_chamado_empresa_sla_resposta', 'chamado', ['empresa_id', 'sla_resposta_ate'])
+    op.create_index('ix_chamado_empresa_sla_resolucao', 'chamado', ['empresa_id', 'sla_resolucao_ate'])
+    op.create_index('ix_chamado_empresa_sla_escalonamento', 'chamado', ['empresa_id', 'sla_escalonamento_ate'])
+
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        def deadline(idx):
+            return f"datetime(chamado.criado_em, '+' || {_hours_case(idx)} || ' hours')"
+    else:
+        def deadline(idx):
+            return f"chamado.criado_em + make_interval(hours => {_hours_case(idx)})"
+
+    responded = (
+        "chamado.agente_contato_id IS NOT NULL OR "
+        "EXISTS (SELECT 1 FROM chamado_comentario cc WHERE cc.chamado_id = chamado.id)"
+    )
+    resolved = (
+        "EXISTS (SELECT 1 FROM status_chamado s WHERE s.id = chamado.status_id "
+        "AND lower(s.nome) IN ('resolved', 'closed'))"
+    )
+    conn.execute(sa.text(
+        f"""
+        UPDATE chamado SET
+            sla_resposta_ate = CASE WHEN {responded} THEN NULL ELSE {deadline(0)} END,
+            sla_resolucao_ate = CASE WHEN {resolved} THEN NULL ELSE {deadline(1)} END,
+            sla_escalonamento_ate = CASE WHEN {resolved} THEN NULL ELSE {deadline(2)} END
+        """
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_chamado_empresa_sla_escalonamento', table_name='chamado')
+    op.drop_index('ix_chamado_empresa_sla_resolucao', table_name='chamado')
+    op.drop_index('ix_chamado_empresa_sla_resposta', table_name='chamado')
+    with op.batch_alter_table('chamado') as batch:
+        batch.drop_column('sla_escalonamento_ate')
+        batch.drop_column('sla_resolucao_ate')
+        batch.drop_column('sla_resposta_ate')
@@ -0,0 +1,79 @@
+"""
+Full-text index for ticket search (titulo, descricao, numero).
+
+SQLite: external-content FTS5 table `chamado_fts` (unicode61 with diacritics
+removed, so "manutencao" matches "manutenção") kept in sync by triggers,
+populated with the FTS5 'rebuild' command.
+Postgres: generated tsvector column `search_vector` using the 'portuguese'
+configuration (numero/titulo weighted A, descricao B) plus a GIN index.
+
+The statements mirror app/db/search_ddl.py.
+"""
+
+from alembic import op
+
+revision = '20251220_add_ticket_fulltext_search'
+down_revision = '20251218_add_chamado_sla_deadlines'
+branch_labels = None
+depends_on = None
+
+_SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS chamado_fts USING fts5(
+        titulo, descricao, numero,
+        content='chamado', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_ai AFTER INSERT ON chamado BEGIN
+        INSERT INTO chamado_fts(rowid, titulo, descricao, numero)
+        VALUES (new.id, new.titulo, new.descricao, new.numero);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_ad AFTER DELETE ON chamado BEGIN
+        INSERT INTO chamado_fts(chamado_fts, rowid, titulo, descricao, numero)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.numero);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS chamado_fts_au AFTER UPDATE OF titulo, descricao, numero ON chamado BEGIN
+        INSERT INTO chamado_fts(chamado_fts, rowid, titulo, descricao, numero)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.numero);
+        INSERT INTO chamado_fts(rowid, titulo, descricao, numero)
+        VALUES (new.id, new.titulo, new.descricao, new.numero);
+    END
+    """,
+    "INSERT INTO chamado_fts(chamado_fts) VALUES ('rebuild')",
+]
+
+_POSTGRES_UPGRADE = [
+    """
+    ALTER TABLE chamado ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', coalesce(numero, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_chamado_search_vector ON chamado USING GIN (search_vector)",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    statements = {'sqlite': _SQLITE_UPGRADE, 'postgresql': _POSTGRES_UPGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('chamado_fts_ai', 'chamado_fts_ad', 'chamado_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS chamado_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_chamado_search_vector")
+        op.execute("ALTER TABLE chamado DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,30 @@
+"""
+Add origin and asset-type criteria to helpdesk_routing_rule.
+
+NULL keeps the previous meaning (rule applies to any origin / asset type),
+so existing rules route exactly as before.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251222_add_routing_rule_criteria'
+down_revision = '20251220_add_ticket_fulltext_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('helpdesk_routing_rule') as batch:
+        batch.add_column(sa.Column('origem', sa.Text(), nullable=True))
+        batch.add_column(sa.Column('tipo_ativo_id', sa.Integer(), nullable=True))
+        batch.create_foreign_key(
+            'fk_helpdesk_routing_rule_tipo_ativo', 'tipo_ativo', ['tipo_ativo_id'], ['id']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('helpdesk_routing_rule') as batch:
+        batch.drop_constraint('fk_helpdesk_routing_rule_tipo_ativo', type_='foreignkey')
+        batch.drop_column('tipo_ativo_id')
+        batch.drop_column('origem')
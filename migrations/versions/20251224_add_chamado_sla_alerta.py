@@ -0,0 +1,32 @@
+"""
+Add chamado_sla_alerta: SLA deadline alerts already fired.
+
+The SLA scheduler inserts one row per (ticket, kind, deadline) when it fires
+an alert; the unique constraint makes firing idempotent across restarts and
+processes, and a deadline that moves gets a new row.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251224_add_chamado_sla_alerta'
+down_revision = '20251222_add_routing_rule_criteria'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'chamado_sla_alerta',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('chamado_id', sa.Integer(), sa.ForeignKey('chamado.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('empresa_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.Text(), nullable=False),
+        sa.Column('prazo', sa.DateTime(), nullable=False),
+        sa.Column('disparado_em', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.UniqueConstraint('chamado_id', 'tipo', 'prazo', name='uq_chamado_sla_alerta'),
+    )
+
+
+def downgrade():
+    op.drop_table('chamado_sla_alerta')
@@ -0,0 +1,68 @@
+"""
+Add the ticket change feed: change_seq columns and the change_sequence counter.
+
+chamado, chamado_comentario and chamado_log get a change_seq stamped from
+the 'ticket_changes' counter on every write, indexed for "changed since"
+reads. chamado_log also records status transitions (status_de_id ->
+status_para_id). Existing rows are backfilled with their ticket id, so a
+first sync from an empty cursor still returns everything; the counter starts
+after the highest value used.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251226_add_ticket_change_feed'
+down_revision = '20251224_add_chamado_sla_alerta'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'change_sequence',
+        sa.Column('nome', sa.Text(), primary_key=True),
+        sa.Column('valor', sa.BigInteger(), nullable=False),
+    )
+    with op.batch_alter_table('chamado') as batch:
+        batch.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default=sa.text('0')))
+    with op.batch_alter_table('chamado_comentario') as batch:
+        batch.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default=sa.text('0')))
+    with op.batch_alter_table('chamado_log') as batch:
+        batch.add_column(sa.Column('status_de_id', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('status_para_id', sa.Integer(), nullable=True))
+        batch.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default=sa.text('0')))
+        batch.create_foreign_key('fk_chamado_log_status_de', 'status_chamado', ['status_de_id'], ['id'])
+        batch.create_foreign_key('fk_chamado_log_status_para', 'status_chamado', ['status_para_id'], ['id'])
+
+    conn = op.get_bind()
+    conn.execute(sa.text("UPDATE chamado SET change_seq = id"))
+    conn.execute(sa.text("UPDATE chamado_comentario SET change_seq = chamado_id"))
+    conn.execute(sa.text("UPDATE chamado_log SET change_seq = chamado_id"))
+    conn.execute(sa.text(
+        "INSERT INTO change_sequence (nome, valor) "
+        "SELECT 'ticket_changes', COALESCE(MAX(id), 0) FROM chamado"
+    ))
+
+    op.create_index('ix_chamado_empresa_change_seq', 'chamado', ['empresa_id', 'change_seq'])
+    op.create_index('ix_chamado_change_seq', 'chamado', ['change_seq'])
+    op.create_index('ix_chamado_comentario_chamado_change_seq', 'chamado_comentario', ['chamado_id', 'change_seq'])
+    op.create_index('ix_chamado_log_chamado_change_seq', 'chamado_log', ['chamado_id', 'change_seq'])
+
+
+def downgrade():
+    op.drop_index('ix_chamado_log_chamado_change_seq', table_name='chamado_log')
+    op.drop_index('ix_chamado_comentario_chamado_change_seq', table_name='chamado_comentario')
+    op.drop_index('ix_chamado_change_seq', table_name='chamado')
+    op.drop_index('ix_chamado_empresa_change_seq', table_name='chamado')
+    with op.batch_alter_table('chamado_log') as batch:
+        batch.drop_constraint('fk_chamado_log_status_para', type_='foreignkey')
+        batch.drop_constraint('fk_chamado_log_status_de', type_='foreignkey')
+        batch.drop_column('change_seq')
+        batch.drop_column('status_para_id')
+        batch.drop_column('status_de_id')
+    with op.batch_alter_table('chamado_comentario') as batch:
+        batch.drop_column('change_seq')
+    with op.batch_alter_table('chamado') as batch:
+        batch.drop_column('change_seq')
+    op.drop_table('change_sequence')
@@ -0,0 +1,48 @@
+"""
+Add change_seq row versions to ativo and ordem_servico.
+
+Stamped from the 'ativo_changes' / 'ordem_servico_changes' counters in
+change_sequence on every write; the helpdesk API derives ETags from them
+(and from the indexed max per tenant for listings). Existing rows are
+backfilled with their id and the counters start after the highest one.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251228_add_asset_service_order_change_seq'
+down_revision = '20251226_add_ticket_change_feed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('ativo') as batch:
+        batch.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default=sa.text('0')))
+    with op.batch_alter_table('ordem_servico') as batch:
+        batch.add_column(sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default=sa.text('0')))
+
+    conn = op.get_bind()
+    conn.execute(sa.text("UPDATE ativo SET change_seq = id"))
+    conn.execute(sa.text("UPDATE ordem_servico SET change_seq = id"))
+    conn.execute(sa.text(
+        "INSERT INTO change_sequence (nome, valor) SELECT 'ativo_changes', COALESCE(MAX(id), 0) FROM ativo"
+    ))
+    conn.execute(sa.text(
+        "INSERT INTO change_sequence (nome, valor) "
+        "SELECT 'ordem_servico_changes', COALESCE(MAX(id), 0) FROM ordem_servico"
+    ))
+
+    op.create_index('ix_ativo_empresa_change_seq', 'ativo', ['empresa_id', 'change_seq'])
+    op.create_index('ix_ordem_servico_change_seq', 'ordem_servico', ['change_seq'])
+
+
+def downgrade():
+    op.drop_index('ix_ordem_servico_change_seq', table_name='ordem_servico')
+    op.drop_index('ix_ativo_empresa_change_seq', table_name='ativo')
+    conn = op.get_bind()
+    conn.execute(sa.text("DELETE FROM change_sequence WHERE nome IN ('ativo_changes', 'ordem_servico_changes')"))
+    with op.batch_alter_table('ordem_servico') as batch:
+        batch.drop_column('change_seq')
+    with op.batch_alter_table('ativo') as batch:
+        batch.drop_column('change_seq')
@@ -0,0 +1,174 @@
+"""
+Add ordem_servico_atividade (append-only service-order activity log).
+
+Activities used to be kept as a JSON list in ordem_servico.observacao,
+rewritten in full on every entry. Existing lists are exploded into rows
+(in id batches); a leading plain-text note - the original observacao the
+old code wrapped into the list - is put back into observacao.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20251230_add_service_order_activity'
+down_revision = '20251228_add_asset_service_order_change_seq'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+activity = sa.table(
+    'ordem_servico_atividade',
+    sa.column('id', sa.Integer()),
+    sa.column('ordem_servico_id', sa.Integer()),
+    sa.column('timestamp', sa.DateTime()),
+    sa.column('contato_id', sa.Integer()),
+    sa.column('activity_type', sa.Text()),
+    sa.column('description', sa.Text()),
+    sa.column('duration_minutes', sa.Integer()),
+    sa.column('billable', sa.Boolean()),
+)
+ordem_servico = sa.table(
+    'ordem_servico',
+    sa.column('id', sa.Integer()),
+    sa.column('observacao', sa.Text()),
+    sa.column('data_hora_inicio', sa.DateTime()),
+)
+contato = sa.table('contato', sa.column('id', sa.Integer()))
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        # Stored as naive UTC
+        return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+    return None
+
+
+def _int(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _explode(os_id, entries, started):
+    """Split a legacy list into (restored observacao, activity rows)."""
+    notes, rows = [], []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        if not rows and entry.get('type') == 'note' and 'activity_type' not in entry:
+            notes.append(str(entry.get('description') or ''))
+            continue
+        rows.append({
+            'ordem_servico_id': os_id,
+            'timestamp': _timestamp(entry.get('timestamp')),
+            'contato_id': _int(entry.get('user_id')),
+            'activity_type': str(entry.get('activity_type') or entry.get('type') or 'OTHER'),
+            'description': entry.get('description'),
+            'duration_minutes': _int(entry.get('duration_minutes')),
+            'billable': bool(entry.get('billable', True)),
+        })
+    # Entries without a usable timestamp inherit their predecessor's (or the OS start)
+    previous = next((row['timestamp'] for row in rows if row['timestamp']), None) or started or datetime.utcnow()
+    for row in rows:
+        row['timestamp'] = row['timestamp'] or previous
+        previous = row['timestamp']
+    return ('\n'.join(note for note in notes if note) or None), rows
+
+
+def upgrade():
+    op.create_table(
+        'ordem_servico_atividade',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('ordem_servico_id', sa.Integer(), sa.ForeignKey('ordem_servico.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('contato_id', sa.Integer(), sa.ForeignKey('contato.id'), nullable=True),
+        sa.Column('activity_type', sa.Text(), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('duration_minutes', sa.Integer(), nullable=True),
+        sa.Column('billable', sa.Boolean(), nullable=False, server_default=sa.true()),
+    )
+    op.create_index(
+        'ix_ordem_servico_atividade_os_timestamp', 'ordem_servico_atividade',
+        ['ordem_servico_id', 'timestamp', 'id'],
+    )
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        batch = conn.execute(
+            sa.select(ordem_servico.c.id, ordem_servico.c.observacao, ordem_servico.c.data_hora_inicio)
+            .where(ordem_servico.c.id > last_id, ordem_servico.c.observacao.like('[%'))
+            .order_by(ordem_servico.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        exploded = []
+        for os_id, observacao, started in batch:
+            try:
+                entries = json.loads(observacao)
+            except ValueError:
+                continue
+            if isinstance(entries, list):
+                exploded.append((os_id, *_explode(os_id, entries, started)))
+        rows = [row for _, _, activity_rows in exploded for row in activity_rows]
+        # Drop references to contacts that no longer exist
+        referenced = {row['contato_id'] for row in rows if row['contato_id'] is not None}
+        if referenced:
+            known = set(conn.execute(sa.select(contato.c.id).where(contato.c.id.in_(referenced))).scalars())
+            for row in rows:
+                if row['contato_id'] not in known:
+                    row['contato_id'] = None
+        if rows:
+            conn.execute(activity.insert(), rows)
+        for os_id, note, _ in exploded:
+            conn.execute(ordem_servico.update().where(ordem_servico.c.id == os_id).values(observacao=note))
+
+
+def downgrade():
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        os_ids = conn.execute(
+            sa.select(activity.c.ordem_servico_id).distinct()
+            .where(activity.c.ordem_servico_id > last_id)
+            .order_by(activity.c.ordem_servico_id)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not os_ids:
+            break
+        last_id = os_ids[-1]
+        notes = dict(conn.execute(
+            sa.select(ordem_servico.c.id, ordem_servico.c.observacao).where(ordem_servico.c.id.in_(os_ids))
+        ).all())
+        histories = {os_id: ([{'description': notes[os_id], 'type': 'note'}] if notes.get(os_id) else [])
+                     for os_id in os_ids}
+        for row in conn.execute(
+            sa.select(activity).where(activity.c.ordem_servico_id.in_(os_ids))
+            .order_by(activity.c.ordem_servico_id, activity.c.timestamp, activity.c.id)
+        ).mappings():
+            histories[row['ordem_servico_id']].append({
+                'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None,
+                'user_id': row['contato_id'],
+                'activity_type': row['activity_type'],
+                'description': row['description'],
+                'duration_minutes': row['duration_minutes'],
+                'billable': bool(row['billable']),
+            })
+        for os_id, history in histories.items():
+            conn.execute(
+                ordem_servico.update().where(ordem_servico.c.id == os_id).values(observacao=json.dumps(history))
+            )
+
+    op.drop_index('ix_ordem_servico_atividade_os_timestamp', table_name='ordem_servico_atividade')
+    op.drop_table('ordem_servico_atividade')
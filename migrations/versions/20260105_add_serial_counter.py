@@ -0,0 +1,30 @@
+"""
+Add serial_counter table for block-allocated asset / stock serials.
+
+One row per (empresa, kind); SerialService reserves whole blocks with a
+single UPDATE ... RETURNING and formats EMP-{empresa}-{KIND}-{n} serials,
+which cannot collide with the older timestamp-based ones.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260105_add_serial_counter'
+down_revision = '20251230_add_service_order_activity'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'serial_counter',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('empresa_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.UniqueConstraint('empresa_id', 'kind', name='uq_serial_counter_empresa_kind'),
+    )
+
+
+def downgrade():
+    op.drop_table('serial_counter')
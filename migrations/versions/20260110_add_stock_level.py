@@ -0,0 +1,64 @@
+"""
+Add stock_level summary (per tenant/catalog item/status) and backfill it.
+
+The backfill mirrors StockLevelProjection.rebuild: movements add their
+quantity to the destination status and take it from the origin status,
+and inventory items without an intake movement (pre-ledger units, possibly
+with later status changes) count as an opening balance of their qtd in
+their current status. `python scripts/rebuild_stock_levels.py` recomputes
+it later if needed.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260110_add_stock_level'
+down_revision = '20260105_add_serial_counter'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stock_level',
+        sa.Column('empresa_id', sa.Integer(), nullable=False),
+        sa.Column('catalogo_peca_id', sa.Integer(), nullable=False),
+        sa.Column('status_estoque_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quantidade', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('atualizado_em', sa.DateTime(), nullable=True, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.PrimaryKeyConstraint('empresa_id', 'catalogo_peca_id', 'status_estoque_id'),
+    )
+
+    op.get_bind().execute(sa.text(
+        """
+        INSERT INTO stock_level (empresa_id, catalogo_peca_id, status_estoque_id, quantidade)
+        SELECT empresa_id, catalogo_peca_id, status_estoque_id, SUM(quantidade)
+        FROM (
+            SELECT e.empresa_id AS empresa_id, e.catalogo_peca_id AS catalogo_peca_id,
+                   COALESCE(m.destino_status_estoque_id, 0) AS status_estoque_id,
+                   COALESCE(m.quantidade, 0) AS quantidade
+            FROM estoque e
+            JOIN movimentacao_estoque m ON m.estoque_id = e.id
+            WHERE e.empresa_id IS NOT NULL
+            UNION ALL
+            SELECT e.empresa_id, e.catalogo_peca_id, m.origem_status_estoque_id, -COALESCE(m.quantidade, 0)
+            FROM estoque e
+            JOIN movimentacao_estoque m ON m.estoque_id = e.id
+            WHERE e.empresa_id IS NOT NULL AND m.origem_status_estoque_id IS NOT NULL
+            UNION ALL
+            SELECT e.empresa_id, e.catalogo_peca_id, COALESCE(e.status_estoque_id, 0), COALESCE(e.qtd, 1)
+            FROM estoque e
+            WHERE e.empresa_id IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM movimentacao_estoque m
+                  WHERE m.estoque_id = e.id AND m.origem_status_estoque_id IS NULL AND m.quantidade > 0
+              )
+        ) flows
+        GROUP BY empresa_id, catalogo_peca_id, status_estoque_id
+        HAVING SUM(quantidade) <> 0
+        """
+    ))
+
+
+def downgrade():
+    op.drop_table('stock_level')
@@ -0,0 +1,34 @@
+"""
+Add ix_ativo_empresa_criado_em for the paginated asset listing.
+
+GET /api/helpdesk/assets reads pages by keyset on (criado_em, id) within a
+tenant, newest first by default; this index serves that seek and order. The
+seek never matches NULLs, so ativo.criado_em becomes NOT NULL: assets
+without one are backfilled with the oldest creation time on record (they
+predate the column default), or the current time when there is none.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260112_add_ativo_listing_index'
+down_revision = '20260110_add_stock_level'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "UPDATE ativo SET criado_em = COALESCE("
+        "(SELECT MIN(criado_em) FROM ativo WHERE criado_em IS NOT NULL), CURRENT_TIMESTAMP"
+        ") WHERE criado_em IS NULL"
+    )
+    with op.batch_alter_table('ativo') as batch:
+        batch.alter_column('criado_em', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_ativo_empresa_criado_em', 'ativo', ['empresa_id', 'criado_em', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_ativo_empresa_criado_em', table_name='ativo')
+    with op.batch_alter_table('ativo') as batch:
+        batch.alter_column('criado_em', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,42 @@
+"""
+Split the ticket and asset change counters per tenant.
+
+Tickets and assets are now stamped from 'ticket_changes:<empresa_id>' /
+'ativo_changes:<empresa_id>' rows of change_sequence, so writers of
+different tenants no longer wait on one counter row. Each tenant's counters
+start at the shared counter's current value, above every stamp handed out so
+far; the shared rows stay for rows without a tenant. Tenants created later
+get their rows on first write.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260114_split_change_sequence_by_tenant'
+down_revision = '20260112_add_ativo_listing_index'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('ticket_changes', 'ativo_changes')
+
+
+def upgrade():
+    conn = op.get_bind()
+    for name in COUNTERS:
+        conn.execute(sa.text(
+            "INSERT INTO change_sequence (nome, valor) "
+            "SELECT :name || ':' || CAST(e.id AS TEXT), s.valor FROM empresa e "
+            "JOIN change_sequence s ON s.nome = :name"
+        ), {"name": name})
+
+
+def downgrade():
+    # The shared counters must end above every per-tenant value before those rows go
+    conn = op.get_bind()
+    for name in COUNTERS:
+        conn.execute(sa.text(
+            "UPDATE change_sequence SET valor = ("
+            "SELECT MAX(valor) FROM change_sequence WHERE nome = :name OR nome LIKE :prefix"
+            ") WHERE nome = :name"
+        ), {"name": name, "prefix": f"{name}:%"})
+        conn.execute(sa.text("DELETE FROM change_sequence WHERE nome LIKE :prefix"), {"prefix": f"{name}:%"})
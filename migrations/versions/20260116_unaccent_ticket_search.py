@@ -0,0 +1,61 @@
+"""
+Fold accents in the Postgres ticket search index.
+
+The 'portuguese' configuration kept diacritics, so "manutencao" matched
+"Manutenção" on SQLite (FTS5 remove_diacritics) but not on Postgres. The
+`search_vector` column is regenerated with `portuguese_unaccent`, Portuguese
+stemming behind the `unaccent` dictionary (needs the unaccent contrib
+module). SQLite is unchanged.
+
+The statements mirror app/db/search_ddl.py.
+"""
+
+from alembic import op
+
+revision = '20260116_unaccent_ticket_search'
+down_revision = '20260114_split_change_sequence_by_tenant'
+branch_labels = None
+depends_on = None
+
+_SEARCH_VECTOR = """
+    ALTER TABLE chamado ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{config}', coalesce(numero, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(descricao, '')), 'B')
+    ) STORED
+"""
+
+
+def _regenerate(config):
+    op.execute("DROP INDEX IF EXISTS ix_chamado_search_vector")
+    op.execute("ALTER TABLE chamado DROP COLUMN IF EXISTS search_vector")
+    op.execute(_SEARCH_VECTOR.format(config=config))
+    op.execute("CREATE INDEX ix_chamado_search_vector ON chamado USING GIN (search_vector)")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portuguese_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+                ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+            END IF;
+        END
+        $$
+        """
+    )
+    _regenerate('portuguese_unaccent')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _regenerate('portuguese')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS portuguese_unaccent")
@@ -0,0 +1,58 @@
+"""
+Stamp every change_seq from one global counter.
+
+The per-tenant 'ticket_changes:<empresa_id>' / 'ativo_changes:<empresa_id>'
+counters and the shared 'ticket_changes', 'ativo_changes' and
+'ordem_servico_changes' rows are replaced by the single 'change_seq' row of
+change_sequence. It starts above every counter value and stamp handed out so
+far, so feed cursors issued before the upgrade stay valid.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '20260118_global_change_seq'
+down_revision = '20260116_unaccent_ticket_search'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ('ticket_changes', 'ativo_changes', 'ordem_servico_changes')
+TENANT_COUNTERS = ('ticket_changes', 'ativo_changes')
+STAMPED_TABLES = ('chamado', 'ativo', 'ordem_servico')
+
+
+def _highest(conn):
+    values = [conn.execute(sa.text("SELECT COALESCE(MAX(valor), 0) FROM change_sequence")).scalar()]
+    for table in STAMPED_TABLES:
+        values.append(conn.execute(sa.text(f"SELECT COALESCE(MAX(change_seq), 0) FROM {table}")).scalar())
+    return max(int(v or 0) for v in values)
+
+
+def upgrade():
+    conn = op.get_bind()
+    start = _highest(conn)
+    conn.execute(sa.text("DELETE FROM change_sequence WHERE nome IN :names").bindparams(
+        sa.bindparam('names', expanding=True)
+    ), {"names": list(COUNTERS)})
+    for name in TENANT_COUNTERS:
+        conn.execute(sa.text("DELETE FROM change_sequence WHERE nome LIKE :prefix"), {"prefix": f"{name}:%"})
+    conn.execute(
+        sa.text("INSERT INTO change_sequence (nome, valor) VALUES ('change_seq', :valor)"), {"valor": start}
+    )
+
+
+def downgrade():
+    # Every restored counter must start above every value handed out by the global one
+    conn = op.get_bind()
+    start = _highest(conn)
+    conn.execute(sa.text("DELETE FROM change_sequence WHERE nome = 'change_seq'"))
+    for name in COUNTERS:
+        conn.execute(
+            sa.text("INSERT INTO change_sequence (nome, valor) VALUES (:name, :valor)"),
+            {"name": name, "valor": start},
+        )
+    for name in TENANT_COUNTERS:
+        conn.execute(sa.text(
+            "INSERT INTO change_sequence (nome, valor) "
+            "SELECT :name || ':' || CAST(e.id AS TEXT), :valor FROM empresa e"
+        ), {"name": name, "valor": start})
@@ -0,0 +1,138 @@
+"""Benchmark `/api/helpdesk/tickets` throughput with NullPool vs pooled engines.
+
+Seeds a throwaway database, then drives the ticket list endpoint in-process
+(httpx + ASGI, no network) with a fixed number of concurrent clients for each
+engine profile and prints requests/sec and latency percentiles.
+
+Usage:
+    python scripts/bench_engine_pool.py
+    python scripts/bench_engine_pool.py --tickets 2000 --concurrency 32 --duration 15
+    python scripts/bench_engine_pool.py --db-url postgresql+asyncpg://user:pw@host/bench
+
+The target database is dropped/recreated, so never point --db-url at real data.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.main import app
+from app.db.base import Base
+from app.db.models import Chamado, Empresa
+from app.db.session import build_engine, get_db, resolve_engine_profile
+from app.services.auth import AuthService
+
+PROFILES = ("nullpool", "pooled")
+
+
+async def _seed(db_url: str, tickets: int) -> Dict[str, str]:
+    """Create schema, a user and `tickets` tickets; return auth headers."""
+
+    engine = build_engine(db_url, replace(resolve_engine_profile(db_url), name="seed", pooled=False))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with maker() as session:
+        svc = AuthService()
+        await svc.register(session, nome="Bench", email="bench@example.com", password="bench12345", empresa_nome="Bench Co")
+        empresa_id = (await session.execute(select(Empresa.id).where(Empresa.nome == "Bench Co"))).scalar_one()
+        session.add_all(
+            Chamado(numero=f"E{empresa_id}WEB-{i + 1}", titulo=f"Bench ticket {i + 1}", empresa_id=empresa_id, origem="web")
+            for i in range(tickets)
+        )
+        await session.commit()
+        token, _, _ = await svc.authenticate(session, email="bench@example.com", password="bench12345")
+    await engine.dispose()
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _run_profile(db_url: str, profile_name: str, headers: Dict[str, str], concurrency: int, duration: float, page_size: int) -> Dict[str, float]:
+    """Hammer the ticket list endpoint using an engine built from `profile_name`."""
+
+    base = resolve_engine_profile(db_url)
+    profile = replace(base, name=profile_name, pooled=profile_name != "nullpool")
+    engine = build_engine(db_url, profile)
+    maker = async_sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with maker() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        # Warm up (first request pays import/compile costs for both profiles)
+        await client.get("/api/helpdesk/tickets", params={"limit": page_size}, headers=headers)
+
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                resp = await client.get("/api/helpdesk/tickets", params={"limit": page_size}, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 200:
+                    errors += 1
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started_at
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+    latencies.sort()
+    p99_index = max(0, int(len(latencies) * 0.99) - 1)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[p99_index] * 1000 if latencies else 0.0,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="Database URL (default: temporary SQLite file)")
+    parser.add_argument("--tickets", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--page-size", type=int, default=25)
+    args = parser.parse_args()
+
+    # Per-request access logs would dominate the measurement
+    logging.disable(logging.INFO)
+
+    db_url = args.db_url
+    if not db_url:
+        tmpdir = tempfile.mkdtemp(prefix="bench_pool_")
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    headers = await _seed(db_url, args.tickets)
+    print(f"DB: {db_url} | tickets={args.tickets} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'profile':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in PROFILES:
+        r = await _run_profile(db_url, name, headers, args.concurrency, args.duration, args.page_size)
+        print(f"{name:<10} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
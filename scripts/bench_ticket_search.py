@@ -0,0 +1,142 @@
+"""Benchmark ticket `search` with the full-text index vs the ILIKE scan.
+
+Seeds a throwaway database with synthetic tickets (Portuguese titles and
+descriptions), then times the list filter for a set of search terms through
+both paths: the FTS5/tsvector match used by TicketService and the former
+`titulo/descricao/numero ILIKE '%term%'` predicate. Each timing covers one
+page of results plus the total count, like the ticket list endpoint.
+
+Usage:
+    python scripts/bench_ticket_search.py
+    python scripts/bench_ticket_search.py --tickets 50000 --repeat 10
+    python scripts/bench_ticket_search.py --db-url postgresql+asyncpg://user:pw@host/bench
+
+The target database is dropped/recreated, so never point --db-url at real data.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.base import Base
+from app.db.models import Chamado, Empresa
+from app.db.session import build_engine, resolve_engine_profile
+from app.services.ticket import TicketService
+from app.services.ticket_search import ticket_search
+
+_SUBJECTS = ["Impressora", "Notebook", "Servidor", "Switch", "Monitor", "Telefone", "VPN", "E-mail", "Sistema ERP"]
+_PROBLEMS = ["não liga", "travando", "sem conexão", "lentidão", "manutenção preventiva", "troca de peça",
+             "senha expirada", "atualização pendente", "erro de autenticação", "configuração"]
+_WORDS = ["usuário", "setor", "financeiro", "recepção", "urgente", "cliente", "após", "reinício", "cabo",
+          "rede", "backup", "licença", "instalação", "relatório", "filial", "técnico", "visita", "garantia"]
+
+TERMS = ["manutencao", "impressora travando", "autenticação", "garantia filial", "4242", "inexistente"]
+
+
+async def _seed(db_url: str, tickets: int, batch: int) -> int:
+    engine = build_engine(db_url, replace(resolve_engine_profile(db_url), name="seed", pooled=False))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    rnd = random.Random(42)
+    maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with maker() as session:
+        empresa = Empresa(nome="Bench Co")
+        session.add(empresa)
+        await session.flush()
+        empresa_id = empresa.id
+        for start in range(0, tickets, batch):
+            rows = [
+                {
+                    "numero": f"E{empresa_id}WEB-{i + 1}",
+                    "titulo": f"{rnd.choice(_SUBJECTS)} {rnd.choice(_PROBLEMS)}",
+                    "descricao": " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(8, 30))),
+                    "empresa_id": empresa_id,
+                    "origem": "web",
+                }
+                for i in range(start, min(start + batch, tickets))
+            ]
+            await session.execute(insert(Chamado), rows)
+        await session.commit()
+    await engine.dispose()
+    return empresa_id
+
+
+async def _timed(coro_factory, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _search_page(session: AsyncSession, service: TicketService, empresa_id: int, term: str,
+                       backend: Optional[str], page_size: int) -> int:
+    filters = {"search": term}
+    if backend:
+        await service.list_tickets_page(session, empresa_id, filters, limit=page_size)
+    else:
+        page = service._apply_list_filters(select(Chamado), empresa_id, filters, None)
+        await session.execute(page.order_by(Chamado.criado_em.desc(), Chamado.id.desc()).limit(page_size + 1))
+    count = service._apply_list_filters(select(func.count(Chamado.id)), empresa_id, filters, backend)
+    return int((await session.execute(count)).scalar_one())
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="Database URL (default: temporary SQLite file)")
+    parser.add_argument("--tickets", type=int, default=500_000)
+    parser.add_argument("--batch", type=int, default=5_000, help="Rows per seed INSERT")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per term and path")
+    parser.add_argument("--page-size", type=int, default=25)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    db_url = args.db_url
+    if not db_url:
+        tmpdir = tempfile.mkdtemp(prefix="bench_search_")
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    started = time.perf_counter()
+    empresa_id = await _seed(db_url, args.tickets, args.batch)
+    print(f"DB: {db_url} | tickets={args.tickets} seeded in {time.perf_counter() - started:.1f}s")
+
+    engine = build_engine(db_url, replace(resolve_engine_profile(db_url), name="bench", pooled=False))
+    maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    service = TicketService()
+    async with maker() as session:
+        backend = await ticket_search.backend(session)
+        if not backend:
+            print("No full-text index on this database; only ILIKE can be measured")
+        print(f"{'term':<24} {'matches':>8} {'ilike p50 ms':>13} {'fts p50 ms':>11} {'speedup':>8}")
+        for term in TERMS:
+            matches = await _search_page(session, service, empresa_id, term, backend, args.page_size)
+            ilike = await _timed(lambda: _search_page(session, service, empresa_id, term, None, args.page_size), args.repeat)
+            ilike_ms = statistics.median(ilike) * 1000
+            if backend:
+                fts = await _timed(lambda: _search_page(session, service, empresa_id, term, backend, args.page_size), args.repeat)
+                fts_ms = statistics.median(fts) * 1000
+                print(f"{term:<24} {matches:>8} {ilike_ms:>13.1f} {fts_ms:>11.1f} {ilike_ms / fts_ms:>7.1f}x")
+            else:
+                print(f"{term:<24} {matches:>8} {ilike_ms:>13.1f} {'-':>11} {'-':>8}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
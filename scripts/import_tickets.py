@@ -0,0 +1,79 @@
+"""Bulk import tickets from a CSV or NDJSON file.
+
+Streams the file in batches (see `app.services.ticket_import` for the
+columns). After every committed batch the checkpoint file is rewritten; run
+again with `--resume` to continue after an interruption.
+
+Usage:
+    python scripts/import_tickets.py legacy.csv --empresa-id 1
+    python scripts/import_tickets.py legacy.ndjson --empresa-id 1 --origem sam --resume
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.session import SessionLocal
+from app.services.ticket_import import TicketImporter, TicketImportResult, iter_records
+
+
+def _load_checkpoint(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return int(json.load(fh).get("checkpoint") or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _save_checkpoint(path: str, source: str, result: TicketImportResult) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"file": source, **result.to_dict()}, fh, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+async def run(args: argparse.Namespace) -> TicketImportResult:
+    fmt = args.format or ("ndjson" if args.path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+    checkpoint_file = args.checkpoint_file or f"{args.path}.checkpoint.json"
+    resume_after = _load_checkpoint(checkpoint_file) if args.resume else 0
+    if resume_after:
+        print(f"Resuming after row {resume_after}")
+
+    def on_checkpoint(result: TicketImportResult) -> None:
+        _save_checkpoint(checkpoint_file, args.path, result)
+        print(f"  row {result.checkpoint}: {result.imported} imported, {result.failed} rejected")
+
+    importer = TicketImporter(batch_size=args.batch_size)
+    with open(args.path, encoding="utf-8-sig", newline="") as stream:
+        async with SessionLocal() as session:  # type: ignore[call-arg]
+            return await importer.run(
+                session, args.empresa_id, iter_records(stream, fmt),
+                origem=args.origem, resume_after=resume_after, on_checkpoint=on_checkpoint,
+            )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="CSV (with header) or NDJSON file")
+    parser.add_argument("--empresa-id", type=int, required=True, help="Tenant receiving the tickets")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None, help="Default: from the file extension")
+    parser.add_argument("--origem", default="import", help="Origin (and number prefix) of rows without `origem`")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per batch (default: TICKET_IMPORT_BATCH_SIZE)")
+    parser.add_argument("--checkpoint-file", default=None, help="Default: <path>.checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="Skip rows committed by a previous run")
+    args = parser.parse_args()
+
+    result = await run(args)
+    print(f"Imported {result.imported} tickets, {result.failed} rejected, {result.batches} batches")
+    for error in result.errors[:20]:
+        print(f"  row {error['row']}: {error['error']}")
+    if result.failed > 20:
+        print("  ... see the checkpoint file for the full error list")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+"""Rebuild the `stock_level` summary from the `movimentacao_estoque` ledger.
+
+Use after bulk data fixes or imports that bypassed InventoryService, or if
+the summary drifted. Inventory items without an intake movement count as
+an opening balance in their current status. The rebuild runs in a single
+transaction per invocation.
+
+Usage:
+    python scripts/rebuild_stock_levels.py
+    python scripts/rebuild_stock_levels.py --empresa-id 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.session import SessionLocal
+from app.services.stock_levels import stock_levels
+
+
+async def rebuild(empresa_id: int | None) -> int:
+    async with SessionLocal() as session:  # type: ignore[call-arg]
+        rows = await stock_levels.rebuild(session, empresa_id)
+        await session.commit()
+    return rows
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--empresa-id", type=int, default=None, help="Rebuild a single tenant (default: all)")
+    args = parser.parse_args()
+
+    rows = await rebuild(args.empresa_id)
+    scope = f"empresa {args.empresa_id}" if args.empresa_id else "all tenants"
+    print(f"stock_level rebuilt for {scope}: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""Rebuild the `ticket_metrics_daily` rollup from `chamado` and `chamado_log`.
+
+Use after bulk data fixes or imports that bypassed TicketService, or if the
+rollup drifted. The rebuild runs in a single transaction per invocation.
+
+Usage:
+    python scripts/rebuild_ticket_metrics.py
+    python scripts/rebuild_ticket_metrics.py --empresa-id 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.session import SessionLocal
+from app.services.ticket_metrics import ticket_metrics_rollup
+
+
+async def rebuild(empresa_id: int | None) -> int:
+    async with SessionLocal() as session:  # type: ignore[call-arg]
+        rows = await ticket_metrics_rollup.rebuild(session, empresa_id)
+        await session.commit()
+    return rows
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--empresa-id", type=int, default=None, help="Rebuild a single tenant (default: all)")
+    args = parser.parse_args()
+
+    rows = await rebuild(args.empresa_id)
+    scope = f"empresa {args.empresa_id}" if args.empresa_id else "all tenants"
+    print(f"ticket_metrics_daily rebuilt for {scope}: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
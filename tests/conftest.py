@@ -8,6 +8,7 @@ import pytest
 import pytest_asyncio
 from typing import AsyncGenerator, Generator
 from httpx import AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -292,6 +293,31 @@ def performance_timer():
     return PerformanceTimer()
 
 
+class QueryCounter:
+    """Collects the SQL statements sent to the test database."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def clear(self):
+        self.statements.clear()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries():
+    """Record every statement executed during the test; `clear()` before the part being measured."""
+    counter = QueryCounter()
+    event.listen(test_engine.sync_engine, "before_cursor_execute", counter._record)
+    yield counter
+    event.remove(test_engine.sync_engine, "before_cursor_execute", counter._record)
+
+
 # Mock data for external integrations
 @pytest.fixture
 def mock_whatsapp_response():
@@ -3,14 +3,53 @@ Comprehensive tests for helpdesk API endpoints.
 Tests tickets, assets, service orders, and inventory management.
 """
 
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
 import pytest
 from httpx import AsyncClient
-from fastapi import status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from starlette.requests import Request
 
-from app.services.ticket import TicketService
+from app.api.admin import create_item, delete_item, get_item, update_item
+from app.api.helpdesk import _build_ticket_list_responses
+from app.core.config import get_settings
+from app.core.exceptions import ConflictError, SerialGenerationError, ServiceOrderError, ValidationError
+from app.core.http_cache import etag_matches, make_etag
+from app.core.reference_data import reference_data
+from app.core.ticket_workflow import TicketWorkflowEngine
+from app.db.base import Base
+from app.db.event_models import EventStatus, EventType, OutboxEvent
+from app.db.models import (
+    Ativo, CatalogoPeca, Chamado, ChamadoCategoria, ChamadoComentario, ChamadoLog, ChamadoSlaAlerta, ChangeSequence,
+    Estoque, HelpdeskAutoClosePolicy, HelpdeskRoutingRule, LocalInstalacao, MovimentacaoEstoque, OrdemServico,
+    OrdemServicoAtividade, Prioridade, StatusAtivo, StatusChamado, StatusEstoque, StockLevel, TicketMetricsDaily,
+    TipoAtivo, TipoMovimentacao, TipoOS,
+)
+from app.repositories.ativo import AtivoRepository
 from app.services.asset import AssetService
-from app.services.ordem_servico import ServiceOrderService
+from app.services.data_export import DataExporter, ExportRange
+from app.services.email_templates import EmailTemplateEngine
+from app.services.inventory import InventoryService
+from app.services.notification_queue import EmailDispatchWorker
+from app.services.ordem_servico import OrdemServicoService, ServiceOrderService
+from app.services.serial import SerialService
+from app.services.sla_scheduler import SLADeadlineHeap, SLAScheduler, sla_scheduler
+from app.services.stock_levels import stock_levels
+from app.services.ticket import TicketService
+from app.services.ticket_analytics import TicketAnalyticsService
+from app.services.ticket_auto_close import AutoCloseProgress, TicketAutoCloser
+from app.services.ticket_changes import CHANGE_SEQ
+from app.services.ticket_import import TicketImporter, iter_records
+from app.services.ticket_metrics import ticket_metrics_rollup
+from app.services.ticket_routing import routing_engine
+from app.services.ticket_search import SQLITE_FTS, ticket_search
 
 
 @pytest.mark.integration
@@ -230,6 +269,107 @@ class TestServiceOrderAPI:
         assert "total_service_orders" in data
         assert "completion_rate" in data
 
+    async def test_service_order_activities_are_rows(self, db_session: AsyncSession, test_factory):
+        """Activities are appended as rows, paged by cursor and summed in SQL."""
+        empresa = await test_factory.create_empresa(db_session)
+        tech = await test_factory.create_contato(db_session, empresa.id, nome="Tech")
+        tech_id = tech.id
+        order = OrdemServico(numero_os="OS-ACT-1", observacao="Customer note")
+        db_session.add(order)
+        await db_session.flush()
+        order_id, version = order.id, order.change_seq
+        await db_session.commit()
+
+        service = OrdemServicoService()
+        entries = [("DIAGNOSTIC", 30, True), ("TRAVEL", 45, False), ("REPAIR", 60, True), ("TESTING", None, True)]
+        for activity_type, minutes, billable in entries:
+            await service.add_activity(db_session, order_id, tech_id, {
+                "activity_type": activity_type, "description": activity_type.lower(),
+                "duration_minutes": minutes, "billable": billable,
+            })
+        await db_session.commit()
+        await db_session.refresh(order)
+        assert order.observacao == "Customer note"
+        assert order.change_seq > version
+
+        first = await service.list_activities(db_session, order_id, limit=3)
+        assert [a.activity_type for a in first["activities"]] == ["DIAGNOSTIC", "TRAVEL", "REPAIR"]
+        assert first["prev_cursor"] is None and first["next_cursor"]
+        second = await service.list_activities(db_session, order_id, limit=3, cursor=first["next_cursor"])
+        assert [a.activity_type for a in second["activities"]] == ["TESTING"]
+        assert second["next_cursor"] is None
+        back = await service.list_activities(db_session, order_id, limit=3, cursor=second["prev_cursor"])
+        assert [a.id for a in back["activities"]] == [a.id for a in first["activities"]]
+
+        totals = await service.calculate_billable_time(db_session, order_id)
+        assert totals == service.workflow.calculate_billable_time(
+            [service.workflow.validate_activity_entry(
+                {"user_id": tech_id, "activity_type": t, "description": t, "duration_minutes": m, "billable": b}
+            ) for t, m, b in entries]
+        )
+        assert (totals["billable_minutes"], totals["non_billable_minutes"]) == (90, 45)
+        assert await service.calculate_billable_time(db_session, order_id + 1) == \
+            service.workflow.billable_summary(0, 0)
+
+        with pytest.raises(ServiceOrderError):
+            await service.add_activity(db_session, order_id, tech_id, {"activity_type": "NOPE", "description": "x"})
+        rows = await db_session.execute(
+            select(func.count(OrdemServicoAtividade.id)).where(OrdemServicoAtividade.ordem_servico_id == order_id)
+        )
+        assert rows.scalar_one() == 4
+
+    async def test_service_order_analytics_aggregate_in_sql(self, db_session: AsyncSession, test_factory):
+        """Analytics count every order in SQL and honour the date and technician filters."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        tech = await test_factory.create_contato(db_session, empresa_id, nome="Tech")
+        tech_id = tech.id
+        ticket = await test_factory.create_chamado(db_session, empresa_id)
+        ticket.agente_contato_id = tech_id
+        other_ticket = await test_factory.create_chamado(db_session, empresa_id, titulo="Other")
+        repair = TipoOS(nome="repair")
+        db_session.add(repair)
+        await db_session.flush()
+        ticket_id, other_ticket_id, repair_id = ticket.id, other_ticket.id, repair.id
+
+        start = datetime(2025, 3, 1, 8, 0, 0)
+        db_session.add_all([
+            OrdemServico(numero_os="A-1", chamado_id=ticket_id, tipo_os_id=repair_id,
+                         data_hora_inicio=start, data_hora_fim=start + timedelta(minutes=90, seconds=30)),
+            OrdemServico(numero_os="A-2", chamado_id=ticket_id, tipo_os_id=repair_id,
+                         data_hora_inicio=start + timedelta(days=10), data_hora_fim=start + timedelta(days=10, minutes=30)),
+            OrdemServico(numero_os="A-3", chamado_id=other_ticket_id, data_hora_inicio=start + timedelta(days=1)),
+            OrdemServico(numero_os="A-4", chamado_id=other_ticket_id),
+        ] + [OrdemServico(numero_os=f"B-{i}", chamado_id=other_ticket_id, tipo_os_id=repair_id) for i in range(1005)])
+        await db_session.commit()
+
+        service = OrdemServicoService()
+        stats = await service.get_service_order_analytics(db_session, empresa_id)
+        assert stats["total_service_orders"] == 1009
+        assert stats["by_type"] == {"repair": 1007, "unknown": 2}
+        assert stats["completion_stats"] == {"completed": 2, "in_progress": 1, "pending": 1006}
+        assert stats["time_tracking"] == {"total_hours": 2.0, "billable_hours": 2.0, "average_duration": 60.0}
+
+        order_id = (await db_session.execute(
+            select(OrdemServico.id).where(OrdemServico.numero_os == "A-2")
+        )).scalar_one()
+        await service.add_activity(db_session, order_id, tech_id, {
+            "activity_type": "REPAIR", "description": "fix", "duration_minutes": 6, "billable": True,
+        })
+        await db_session.commit()
+        in_march = await service.get_service_order_analytics(
+            db_session, empresa_id, date_from=start, date_to=start + timedelta(days=5)
+        )
+        assert in_march["total_service_orders"] == 2
+        assert in_march["completion_stats"] == {"completed": 1, "in_progress": 1, "pending": 0}
+        by_tech = await service.get_service_order_analytics(db_session, empresa_id, technician_id=tech_id)
+        assert by_tech["total_service_orders"] == 2
+        # A-1 has no logged time (whole span counts), A-2 bills its 6 logged minutes
+        assert by_tech["time_tracking"]["billable_hours"] == round((90 + 6) / 60, 2)
+
+        with pytest.raises(ValidationError):
+            await service.get_service_order_analytics(db_session, empresa_id, date_from=start, date_to=start)
+
 
 @pytest.mark.integration
 class TestInventoryAPI:
@@ -302,6 +442,961 @@ class TestTicketService:
             assert number.startswith("TKT-")
             assert len(number) > 10
 
+    async def test_reserve_numbers_returns_contiguous_block(self, db_session: AsyncSession, test_factory):
+        """Block reservation hands out consecutive numbers and advances the counter once."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        await db_session.commit()
+
+        ticket_service = TicketService()
+        first = await ticket_service._gen_number(db_session, empresa_id, "web")
+        block = await ticket_service.reserve_numbers(db_session, empresa_id, 5, origin="wpp")
+        after = await ticket_service._gen_number(db_session, empresa_id, "web")
+
+        assert first == f"E{empresa_id}WEB-1"
+        assert block == [f"E{empresa_id}WPP-{n}" for n in range(2, 7)]
+        assert after == f"E{empresa_id}WEB-7"
+
+    async def test_counter_seeds_past_existing_numbers(self, db_session: AsyncSession, test_factory):
+        """A tenant without a counter row continues after its highest existing number."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        db_session.add(Chamado(numero=f"E{empresa_id}WEB-41", empresa_id=empresa_id, titulo="Legacy"))
+        await db_session.commit()
+
+        number = await TicketService()._gen_number(db_session, empresa_id, "web")
+        assert number == f"E{empresa_id}WEB-42"
+
+    async def test_cursor_pagination_walks_all_tickets(self, db_session: AsyncSession, test_factory):
+        """Next/prev cursors visit every ticket exactly once, even with tied timestamps."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        for i in range(7):
+            db_session.add(Chamado(
+                numero=f"E{empresa_id}WEB-{i + 1}", empresa_id=empresa_id, titulo=f"T{i}",
+                criado_em=base + timedelta(minutes=i // 2),
+            ))
+        await db_session.commit()
+
+        ticket_service = TicketService()
+        seen, pages, cursor = [], [], None
+        while True:
+            page = await ticket_service.list_tickets_page(db_session, empresa_id, limit=3, cursor=cursor)
+            ids = [t.id for t in page["tickets"]]
+            pages.append(ids)
+            seen.extend(ids)
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        offset_ids = [t.id for t in await ticket_service.list_tickets(db_session, empresa_id, limit=100)]
+        assert seen == offset_ids
+        assert len(set(seen)) == 7
+
+        back = await ticket_service.list_tickets_page(db_session, empresa_id, limit=3, cursor=page["prev_cursor"])
+        assert [t.id for t in back["tickets"]] == pages[-2]
+
+        assert await ticket_service.count_tickets(db_session, empresa_id, use_cache=False) == 7
+
+    async def test_sql_analytics_match_workflow_sla_rules(self, db_session: AsyncSession, test_factory):
+        """SQL-side analytics agree with TicketWorkflowEngine.check_sla_breaches per ticket."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        statuses = [StatusChamado(nome="Aberto"), StatusChamado(nome="closed")]
+        priorities = [Prioridade(nome="low"), Prioridade(nome="high"), Prioridade(nome="critical")]
+        db_session.add_all(statuses + priorities)
+        await db_session.flush()
+
+        now = datetime(2025, 6, 1, 12, 0, 0)
+        n = 0
+        for status_row in statuses + [None]:
+            for priority_row in priorities + [None]:
+                for age_hours in (0.5, 3, 10, 30, 100, 200):
+                    for responded in (False, True):
+                        n += 1
+                        ticket = Chamado(
+                            numero=f"E{empresa_id}WEB-{n}", empresa_id=empresa_id, titulo=f"T{n}",
+                            status_id=status_row.id if status_row else None,
+                            prioridade_id=priority_row.id if priority_row else None,
+                            criado_em=now - timedelta(hours=age_hours),
+                        )
+                        db_session.add(ticket)
+                        await db_session.flush()
+                        if responded:
+                            db_session.add(ChamadoComentario(chamado_id=ticket.id, contato_id=agent.id, comentario="ok"))
+        await db_session.commit()
+
+        analytics = await TicketAnalyticsService().get_ticket_analytics(db_session, empresa_id, now=now)
+
+        res = await db_session.execute(
+            select(Chamado).where(Chamado.empresa_id == empresa_id).options(
+                selectinload(Chamado.status), selectinload(Chamado.prioridade), selectinload(Chamado.comentarios)
+            )
+        )
+        workflow = TicketWorkflowEngine()
+        expected = {"response_breaches": 0, "resolution_breaches": 0, "escalation_needed": 0}
+        for ticket in res.scalars().all():
+            breaches = workflow.check_sla_breaches(ticket, now)
+            expected["response_breaches"] += breaches["response_breach"]
+            expected["resolution_breaches"] += breaches["resolution_breach"]
+            expected["escalation_needed"] += breaches["escalation_needed"]
+
+        assert analytics["total_tickets"] == n
+        assert analytics["by_status"] == {"Aberto": n // 3, "closed": n // 3, "unknown": n // 3}
+        assert sum(analytics["by_priority"].values()) == n
+        assert analytics["sla_breaches"] == expected
+        assert analytics["escalation_recommendations"]
+
+    async def test_metrics_rollup_follows_ticket_events(self, db_session: AsyncSession, test_factory):
+        """ticket_metrics_daily mirrors live counts after events and after a rebuild."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        agent_id = agent.id
+        open_status, closed_status = StatusChamado(nome="open"), StatusChamado(nome="closed")
+        high = Prioridade(nome="high")
+        db_session.add_all([open_status, closed_status, high])
+        await db_session.flush()
+        open_id, closed_id, high_id = open_status.id, closed_status.id, high.id
+
+        service = TicketService()
+        tickets = [
+            await service.create_with_asset(db_session, empresa_id, titulo=f"Rollup {i}", status_id=open_status.id)
+            for i in range(5)
+        ]
+        ticket_ids = [t.id for t in tickets]
+        await db_session.commit()
+
+        await service.update_ticket(db_session, empresa_id, ticket_ids[0], agent_id, "agent", {"status_id": closed_id})
+        await service.update_ticket(db_session, empresa_id, ticket_ids[1], agent_id, "agent", {"prioridade_id": high_id})
+        await service.update_ticket(
+            db_session, empresa_id, ticket_ids[2], agent_id, "agent", {"agente_contato_id": agent_id}
+        )
+        await db_session.commit()
+
+        analytics_service = TicketAnalyticsService()
+        live = await analytics_service._counts_from_tickets(db_session, empresa_id, None)
+        rollup = await analytics_service._counts_from_rollup(db_session, empresa_id, None)
+        assert rollup == live
+        assert live[0] == {"open": 4, "closed": 1}
+        assert await analytics_service._counts_from_rollup(db_session, empresa_id, agent_id) == (
+            await analytics_service._counts_from_tickets(db_session, empresa_id, agent_id)
+        )
+
+        await ticket_metrics_rollup.rebuild(db_session, empresa_id)
+        await db_session.commit()
+        assert await analytics_service._counts_from_rollup(db_session, empresa_id, None) == live
+        updated = await db_session.execute(
+            select(func.sum(TicketMetricsDaily.updated_count)).where(TicketMetricsDaily.empresa_id == empresa_id)
+        )
+        assert updated.scalar_one() == 3
+
+        # Admin CRUD writes publish ticket events, so the rollup follows them too
+        moved = await update_item("Chamado", ticket_ids[3], {"status_id": closed_id, "titulo": "Moved"}, db_session, None)
+        created = await create_item(
+            "Chamado", {"empresa_id": empresa_id, "numero": "ADM-1", "titulo": "Admin", "status_id": open_id}, db_session, None
+        )
+        # ... and keep the stored SLA deadlines current
+        assert moved["sla_resolucao_ate"] is None and moved["sla_escalonamento_ate"] is None
+        assert all(created[col] is not None for col in ("sla_resposta_ate", "sla_resolucao_ate", "sla_escalonamento_ate"))
+        await delete_item("Chamado", ticket_ids[4], db_session, None)
+        with pytest.raises(HTTPException) as exc:
+            await delete_item("TicketMetricsDaily", 1, db_session, None)
+        assert exc.value.status_code == 405
+        live = await analytics_service._counts_from_tickets(db_session, empresa_id, None)
+        assert live[0] == {"open": 3, "closed": 2}
+        assert await analytics_service._counts_from_rollup(db_session, empresa_id, None) == live
+        await delete_item("Chamado", created["id"], db_session, None)
+        assert await analytics_service._counts_from_rollup(db_session, empresa_id, None) == (
+            await analytics_service._counts_from_tickets(db_session, empresa_id, None)
+        )
+
+    async def test_auto_close_job_closes_in_chunks_with_bulk_side_effects(self, db_session: AsyncSession, test_factory):
+        """Auto-close updates stale tickets in bounded chunks, logging, publishing and rolling up in bulk."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        rows = {name: StatusChamado(nome=name) for name in ("open", "pending_customer", "resolved", "closed")}
+        high = Prioridade(nome="high")
+        db_session.add_all([*rows.values(), high])
+        await db_session.flush()
+        status_ids = {name: row.id for name, row in rows.items()}
+        db_session.add(HelpdeskAutoClosePolicy(empresa_id=empresa_id, enabled=True, pending_customer_days=14, resolved_days=7))
+
+        service = TicketService()
+        now = datetime.utcnow()
+        # (status, days since last update): due = pending > 14d, resolved > 7d
+        shapes = [("pending_customer", 20)] * 3 + [("resolved", 8)] * 2 + [
+            ("pending_customer", 10), ("resolved", 3), ("open", 60),
+        ]
+        ids = {}
+        for i, (name, age) in enumerate(shapes):
+            ticket = await service.create_with_asset(
+                db_session, empresa_id, titulo=f"Stale {i}", status_id=status_ids[name], prioridade_id=high.id
+            )
+            ids[ticket.id] = (name, age)
+        await db_session.flush()
+        for ticket_id, (_, age) in ids.items():
+            await db_session.execute(
+                update(Chamado).where(Chamado.id == ticket_id).values(atualizado_em=now - timedelta(days=age))
+            )
+        await db_session.commit()
+
+        seen = []
+        progress = await TicketAutoCloser(batch_size=2).run_tenant(
+            db_session, empresa_id, AutoCloseProgress(empresa_id), on_progress=lambda p: seen.append(p.closed), now=now,
+        )
+        assert (progress.status, progress.closed, progress.batches) == ("done", 5, 3)
+        assert progress.by_status == {"pending_customer": 3, "resolved": 2}
+        assert seen == [2, 3, 5]
+
+        db_session.expire_all()
+        closed = (await db_session.execute(
+            select(Chamado.id, Chamado.sla_resolucao_ate).where(Chamado.status_id == status_ids["closed"])
+        )).all()
+        due = {tid for tid, (name, age) in ids.items() if (name, age) in {("pending_customer", 20), ("resolved", 8)}}
+        assert {r.id for r in closed} == due
+        assert all(r.sla_resolucao_ate is None for r in closed)
+        logs = await db_session.execute(select(func.count(ChamadoLog.id)).where(ChamadoLog.id_alteracao == "AUTO_CLOSED"))
+        assert logs.scalar_one() == 5
+        events = await db_session.execute(
+            select(func.count(OutboxEvent.id)).where(OutboxEvent.event_type == EventType.TICKET_STATUS_CHANGED)
+        )
+        assert events.scalar_one() == 5
+
+        analytics = TicketAnalyticsService()
+        live = await analytics._counts_from_tickets(db_session, empresa_id, None)
+        assert await analytics._counts_from_rollup(db_session, empresa_id, None) == live
+        assert live[0] == {"open": 1, "pending_customer": 1, "resolved": 1, "closed": 5}
+
+        again = await TicketAutoCloser(batch_size=2).run_tenant(db_session, empresa_id, now=now)
+        assert (again.closed, again.batches) == (0, 0)
+
+    async def test_sla_scheduler_fires_due_deadlines_once(self, db_session: AsyncSession, test_factory):
+        """Committed deadlines reach the heap; due ones fire one event per (ticket, kind, deadline)."""
+        heap = SLADeadlineHeap()
+        t0 = datetime(2025, 1, 1)
+        assert heap.set(1, 1, "response", t0 + timedelta(hours=2))
+        assert heap.set(2, 1, "response", t0 + timedelta(hours=1))
+        assert not heap.set(1, 1, "response", t0 + timedelta(hours=3))
+        heap.set(2, 1, "response", None)
+        assert heap.peek() == t0 + timedelta(hours=3) and len(heap) == 1
+        assert heap.pop_due(t0 + timedelta(hours=3), 10) == [(1, 1, "response", t0 + timedelta(hours=3))]
+
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        open_status, high = StatusChamado(nome="open"), Prioridade(nome="high")
+        db_session.add_all([open_status, high])
+        await db_session.flush()
+        service = TicketService()
+        ids = []
+        for i in range(3):
+            ticket = await service.create_with_asset(
+                db_session, empresa_id, titulo=f"SLA {i}", status_id=open_status.id, prioridade_id=high.id
+            )
+            ids.append(ticket.id)
+        await db_session.commit()
+
+        stored = (await db_session.execute(select(Chamado.id, Chamado.sla_resposta_ate).where(Chamado.id.in_(ids)))).all()
+        assert all(r.sla_resposta_ate and sla_scheduler.heap.get(r.id, "response") == r.sla_resposta_ate for r in stored)
+
+        now = datetime.utcnow()
+        for ticket_id in ids[:2]:
+            await db_session.execute(
+                update(Chamado).where(Chamado.id == ticket_id).values(sla_resposta_ate=now - timedelta(minutes=5))
+            )
+        await db_session.commit()
+
+        factory = async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        scheduler = SLAScheduler(factory)
+        async with factory() as session:
+            seeded = await scheduler.seed(session)
+        assert seeded >= 9
+        assert await scheduler.fire_due(now) == 2
+        assert scheduler.fired == 2
+        assert await scheduler.fire_due(now) == 0
+
+        alerts = (await db_session.execute(
+            select(ChamadoSlaAlerta.chamado_id, ChamadoSlaAlerta.tipo).where(ChamadoSlaAlerta.empresa_id == empresa_id)
+        )).all()
+        assert sorted(alerts) == [(ids[0], "response"), (ids[1], "response")]
+        breached = await db_session.execute(
+            select(func.count(OutboxEvent.id)).where(
+                OutboxEvent.event_type == EventType.TICKET_SLA_BREACHED, OutboxEvent.empresa_id == empresa_id
+            )
+        )
+        assert breached.scalar_one() == 2
+
+        # A restarted scheduler skips fired alerts, and re-firing the same deadline is a no-op
+        restarted = SLAScheduler(factory)
+        async with factory() as session:
+            assert await restarted.seed(session) == seeded - 2
+        restarted.schedule(ids[0], empresa_id, {"response": now - timedelta(minutes=5)})
+        assert await restarted.fire_due(now) == 1
+        assert restarted.fired == 0
+
+    async def test_sla_scheduler_skips_resolved_tickets(self, db_session: AsyncSession, test_factory):
+        """A closed ticket that was never answered keeps its response deadline but never alerts."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        open_status, closed, high = StatusChamado(nome="open"), StatusChamado(nome="closed"), Prioridade(nome="high")
+        db_session.add_all([open_status, closed, high])
+        await db_session.flush()
+        closed_id = closed.id
+        service = TicketService()
+        ids = []
+        for i in range(2):
+            ticket = await service.create_with_asset(
+                db_session, empresa_id, titulo=f"Closed SLA {i}", status_id=open_status.id, prioridade_id=high.id
+            )
+            ids.append(ticket.id)
+        await db_session.commit()
+
+        now = datetime.utcnow()
+        overdue = now - timedelta(minutes=5)
+        await db_session.execute(update(Chamado).where(Chamado.id.in_(ids)).values(sla_resposta_ate=overdue))
+        await db_session.execute(update(Chamado).where(Chamado.id == ids[0]).values(status_id=closed_id))
+        await db_session.commit()
+
+        factory = async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        scheduler = SLAScheduler(factory)
+        async with factory() as session:
+            await scheduler.seed(session)
+        assert scheduler.heap.get(ids[0], "response") is None
+        assert scheduler.heap.get(ids[1], "response") == overdue
+
+        # Closed after it was scheduled: dropped when due
+        scheduler.schedule(ids[0], empresa_id, {"response": overdue})
+        await scheduler.fire_due(now)
+        alerts = (await db_session.execute(
+            select(ChamadoSlaAlerta.chamado_id).where(ChamadoSlaAlerta.empresa_id == empresa_id)
+        )).scalars().all()
+        assert alerts == [ids[1]]
+
+    async def test_ticket_change_feed_returns_only_what_changed(self, db_session: AsyncSession, test_factory):
+        """The change feed pages by change sequence and returns tickets, comments and status changes since the cursor."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        agent_id = agent.id
+        open_status, working = StatusChamado(nome="open"), StatusChamado(nome="in_progress")
+        high = Prioridade(nome="high")
+        db_session.add_all([open_status, working, high])
+        await db_session.flush()
+        open_id, working_id = open_status.id, working.id
+        service = TicketService()
+        ids = []
+        for i in range(3):
+            ticket = await service.create_with_asset(
+                db_session, empresa_id, titulo=f"Feed {i}", status_id=open_id, prioridade_id=high.id
+            )
+            ids.append(ticket.id)
+        await db_session.commit()
+
+        first = await service.list_ticket_changes(db_session, empresa_id, limit=2)
+        assert [t.id for t in first["tickets"]] == ids[:2] and first["has_more"]
+        assert {(c.chamado_id, c.status_de_id, c.status_para_id) for c in first["status_changes"]} == {
+            (ids[0], None, open_id), (ids[1], None, open_id)
+        }
+        rest = await service.list_ticket_changes(db_session, empresa_id, first["cursor"], limit=2)
+        assert [t.id for t in rest["tickets"]] == ids[2:] and not rest["has_more"]
+        cursor = rest["cursor"]
+        idle = await service.list_ticket_changes(db_session, empresa_id, cursor)
+        assert (idle["tickets"], idle["cursor"]) == ([], cursor)
+        assert (await service.list_ticket_changes(db_session, empresa_id, latest=True))["cursor"] == cursor
+        synced_seq = max(t.change_seq for t in rest["tickets"])
+
+        await service.update_ticket(
+            db_session, empresa_id, ids[1], agent_id, "agent", {"status_id": working_id}, comment="On it"
+        )
+        await db_session.commit()
+
+        delta = await service.list_ticket_changes(db_session, empresa_id, cursor)
+        assert [t.id for t in delta["tickets"]] == [ids[1]]
+        assert [(c.chamado_id, c.comentario) for c in delta["comments"]] == [(ids[1], "On it")]
+        assert [(c.chamado_id, c.status_de_id, c.status_para_id) for c in delta["status_changes"]] == [
+            (ids[1], open_id, working_id)
+        ]
+        assert delta["tickets"][0].change_seq > synced_seq
+        assert (await service.list_ticket_changes(db_session, empresa_id, delta["cursor"]))["tickets"] == []
+
+    async def test_change_sequence_is_global_across_tenants(self, db_session: AsyncSession, test_factory):
+        """Ticket, comment and asset writes of every tenant draw from one increasing change sequence."""
+        first, second = await test_factory.create_empresa(db_session), await test_factory.create_empresa(db_session)
+        first_id, second_id = first.id, second.id
+        service = TicketService()
+
+        async def seq_of(model, row_id):
+            return (await db_session.execute(select(model.change_seq).where(model.id == row_id))).scalar_one()
+
+        ticket = await service.create_with_asset(db_session, first_id, titulo="Tenant one")
+        ticket_id = ticket.id
+        asset = Ativo(empresa_id=first_id, serial_text="SEQ-1")
+        db_session.add(asset)
+        await db_session.flush()
+        asset_id = asset.id
+        await db_session.commit()
+        first_seqs = [await seq_of(Chamado, ticket_id), await seq_of(Ativo, asset_id)]
+
+        other = await service.create_with_asset(db_session, second_id, titulo="Tenant two")
+        other_id = other.id
+        await db_session.commit()
+        other_asset = Ativo(empresa_id=second_id, serial_text="SEQ-1")
+        db_session.add(other_asset)
+        await db_session.flush()
+        other_asset_id = other_asset.id
+        await db_session.commit()
+        second_seqs = [await seq_of(Chamado, other_id), await seq_of(Ativo, other_asset_id)]
+        assert max(first_seqs) < second_seqs[0] < second_seqs[1]
+
+        db_session.expunge_all()
+        db_session.add(ChamadoComentario(chamado_id=ticket_id, comentario="Still tenant one"))
+        await db_session.commit()
+        assert await seq_of(Chamado, ticket_id) > max(second_seqs)
+        # One counter row for everything (SQLite has no sequences)
+        counters = dict((await db_session.execute(select(ChangeSequence.nome, ChangeSequence.valor))).all())
+        assert counters == {CHANGE_SEQ: await seq_of(Chamado, ticket_id)}
+
+    async def test_change_feed_never_skips_a_stamp_committed_late(self, tmp_path, test_factory):
+        """A writer that stamped first but commits last still reaches a client that polled in between."""
+        # Separate connections, so the two writers really run in separate transactions
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'feed.db'}", connect_args={"timeout": 10})
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+        service = TicketService()
+        try:
+            async with sessions() as setup:
+                empresa = await test_factory.create_empresa(setup)
+                empresa_id = empresa.id
+                await setup.commit()
+
+            async def write_and_commit(session):
+                ticket = await service.create_with_asset(session, empresa_id, titulo="Fast")
+                await session.commit()
+                return ticket.id, ticket.change_seq
+
+            async with sessions() as slow_session, sessions() as fast_session, sessions() as reader:
+                slow = await service.create_with_asset(slow_session, empresa_id, titulo="Slow")
+                await slow_session.flush()
+                slow_id, slow_seq = slow.id, slow.change_seq
+
+                # The second writer waits for the first one's transaction instead of committing a later stamp first
+                fast = asyncio.create_task(write_and_commit(fast_session))
+                await asyncio.sleep(0.3)
+                assert not fast.done()
+                polled = await service.list_ticket_changes(reader, empresa_id)
+                assert polled["tickets"] == []
+
+                await slow_session.commit()
+                fast_id, fast_seq = await fast
+                assert fast_seq > slow_seq
+                delta = await service.list_ticket_changes(reader, empresa_id, polled["cursor"])
+                assert [t.id for t in delta["tickets"]] == [slow_id, fast_id]
+        finally:
+            await engine.dispose()
+
+    async def test_agent_change_feed_reads_every_tenant(self, db_session: AsyncSession, test_factory):
+        """Empresa 1 reads all tenants with one integer cursor; its listing version moves with any tenant's writes."""
+        busy, quiet = await test_factory.create_empresa(db_session), await test_factory.create_empresa(db_session)
+        busy_id, quiet_id = busy.id, quiet.id
+        working = StatusChamado(nome="in_progress")
+        db_session.add(working)
+        await db_session.flush()
+        working_id = working.id
+        service = TicketService()
+        busy_ticket = await service.create_with_asset(db_session, busy_id, titulo="Busy")
+        busy_ticket_id = busy_ticket.id
+        await db_session.commit()
+        for i in range(5):
+            await service.update_ticket(db_session, busy_id, busy_ticket_id, None, "agent", {"titulo": f"Busy {i}"})
+            await db_session.commit()
+
+        synced = await service.list_ticket_changes(db_session, 1, latest=True)
+        version = await service.list_version(db_session, 1)
+
+        assert synced["cursor"].isdigit()
+        quiet_ticket = await service.create_with_asset(db_session, quiet_id, titulo="Quiet")
+        quiet_ticket_id = quiet_ticket.id
+        await db_session.commit()
+        await service.update_ticket(db_session, quiet_id, quiet_ticket_id, None, "agent", {"status_id": working_id})
+        await db_session.commit()
+        db_session.expire_all()
+
+        delta = await service.list_ticket_changes(db_session, 1, synced["cursor"])
+        assert [t.id for t in delta["tickets"]] == [quiet_ticket_id]
+        busy_seq = (await db_session.execute(select(Chamado.change_seq).where(Chamado.id == busy_ticket_id))).scalar_one()
+        assert busy_seq <= int(synced["cursor"]) < delta["tickets"][0].change_seq == int(delta["cursor"])
+        assert [c.chamado_id for c in delta["status_changes"] if c.status_para_id == working_id] == [quiet_ticket_id]
+        assert await service.list_version(db_session, 1) != version
+
+        await service.update_ticket(db_session, busy_id, busy_ticket_id, None, "agent", {"titulo": "Busy again"})
+        await db_session.commit()
+        again = await service.list_ticket_changes(db_session, 1, delta["cursor"])
+        assert [t.id for t in again["tickets"]] == [busy_ticket_id]
+        assert (await service.list_ticket_changes(db_session, 1, again["cursor"]))["tickets"] == []
+
+    async def test_ticket_change_feed_keeps_same_seq_tickets_on_one_page(
+        self, db_session: AsyncSession, test_factory
+    ):
+        """A page never ends inside a change_seq: tickets stamped together come back together with their status changes."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        pending, closed = StatusChamado(nome="pending_customer"), StatusChamado(nome="closed")
+        db_session.add_all([pending, closed])
+        await db_session.flush()
+        pending_id, closed_id = pending.id, closed.id
+        db_session.add(HelpdeskAutoClosePolicy(empresa_id=empresa_id, enabled=True, pending_customer_days=14, resolved_days=7))
+        service = TicketService()
+        ids = []
+        for i in range(5):
+            ticket = await service.create_with_asset(db_session, empresa_id, titulo=f"Batch {i}", status_id=pending_id)
+            ids.append(ticket.id)
+        now = datetime.utcnow()
+        await db_session.execute(
+            update(Chamado).where(Chamado.id.in_(ids)).values(atualizado_em=now - timedelta(days=30))
+        )
+        await db_session.commit()
+        cursor = (await service.list_ticket_changes(db_session, empresa_id, latest=True))["cursor"]
+
+        # One chunk closes all five tickets under a single change_seq
+        await TicketAutoCloser(batch_size=10).run_tenant(db_session, empresa_id, now=now)
+        db_session.expire_all()
+
+        page = await service.list_ticket_changes(db_session, empresa_id, cursor, limit=2)
+        assert [t.id for t in page["tickets"]] == ids and not page["has_more"]
+
+        seen, seqs, closes = [], set(), []
+        while True:
+            page = await service.list_ticket_changes(db_session, empresa_id, cursor, limit=2)
+            seen += [t.id for t in page["tickets"]]
+            seqs |= {t.change_seq for t in page["tickets"]}
+            closes += [c.chamado_id for c in page["status_changes"] if c.status_para_id == closed_id]
+            assert {c.chamado_id for c in page["status_changes"]} <= {t.id for t in page["tickets"]}
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+        assert seen == ids and len(seqs) == 1
+        assert sorted(closes) == ids
+
+    async def test_read_versions_change_only_on_writes(self, db_session: AsyncSession, test_factory):
+        """ETag versions of tickets, listings and assets are stable across reads and move on every write."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        service = TicketService()
+        ticket = await service.create_with_asset(db_session, empresa_id, titulo="Versioned")
+        ticket_id = ticket.id
+        asset = Ativo(empresa_id=empresa_id, serial_text="ETAG-1", descricao="Router")
+        db_session.add(asset)
+        await db_session.flush()
+        asset_id = asset.id
+        await db_session.commit()
+        asset_repo = AtivoRepository()
+
+        detail = await service.ticket_version(db_session, empresa_id, ticket_id)
+        listing = await service.list_version(db_session, empresa_id)
+        assets = await asset_repo.list_version(db_session, empresa_id)
+        assert detail == await service.ticket_version(db_session, empresa_id, ticket_id)
+        assert listing == await service.list_version(db_session, empresa_id)
+        assert await service.ticket_version(db_session, empresa_id + 1, ticket_id) is None
+
+        db_session.add(ChamadoComentario(chamado_id=ticket_id, comentario="ping"))
+        await db_session.commit()
+        assert (await service.ticket_version(db_session, empresa_id, ticket_id))["version"] != detail["version"]
+        assert await service.list_version(db_session, empresa_id) != listing
+        assert await asset_repo.list_version(db_session, empresa_id) == assets
+
+        asset = await asset_repo.get_by_id(db_session, empresa_id, asset_id)
+        asset.descricao = "Core router"
+        await db_session.commit()
+        assert await asset_repo.list_version(db_session, empresa_id) != assets
+
+        etag = make_etag("assets", empresa_id, assets)
+        request = Request({"type": "http", "headers": [(b"if-none-match", f'"x", {etag[2:]}'.encode())]})
+        assert etag_matches(request, etag)
+        assert not etag_matches(request, make_etag("assets", empresa_id, "other"))
+
+    async def test_bulk_import_batches_rows_and_resumes(self, db_session: AsyncSession, test_factory):
+        """The importer writes batches in bulk, reports bad rows, and resumes from its checkpoint."""
+        agency = await test_factory.create_empresa(db_session, nome="Agency")
+        assert agency.id == 1
+        agency_agent = await test_factory.create_contato(db_session, agency.id, nome="Agency agent")
+        agency_agent_id = agency_agent.id
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        agent_id = agent.id
+        other = await test_factory.create_empresa(db_session)
+        outsider = await test_factory.create_contato(db_session, other.id, nome="Outsider")
+        outsider_id = outsider.id
+        db_session.add_all([StatusChamado(nome="open"), StatusChamado(nome="closed"), Prioridade(nome="high")])
+        await db_session.commit()
+
+        old = (datetime.utcnow() - timedelta(days=30)).isoformat()
+        lines = [
+            {"titulo": "Legacy 1", "status": "aberto", "prioridade": "alta", "criado_em": old},
+            {"titulo": "Legacy 2", "status": "closed", "comentarios": ["first", {"comentario": "second", "contato_id": agent_id}]},
+            {"titulo": "Bad status", "status": "nope"},
+            {"titulo": "Legacy 3", "agente_contato_id": agent_id},
+            {"descricao": "no title"},
+            {"titulo": "Legacy 4", "requisitante_contato_id": 999999, "agente_contato_id": outsider_id},
+            {"titulo": "Legacy 5", "agente_contato_id": agency_agent_id, "comentarios": [
+                {"comentario": "on it", "contato_id": agency_agent_id},
+            ]},
+            {"titulo": "Legacy 6", "requisitante_contato_id": agency_agent_id},
+        ]
+        payload = "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+        seen = []
+        result = await TicketImporter(batch_size=3).run(
+            db_session, empresa_id, iter_records(io.StringIO(payload), "ndjson"),
+            on_checkpoint=lambda r: seen.append(r.checkpoint),
+        )
+        assert (result.imported, result.failed, result.batches, result.checkpoint) == (4, 5, 3, 9)
+        assert seen == [3, 6, 9]
+        errors = {e["row"]: e["error"] for e in result.errors}
+        assert sorted(errors) == [3, 5, 6, 8, 9]
+        # Another tenant's contact is rejected like an unknown one
+        assert errors[6] == f"Contact id(s) 999999, {outsider_id} do not belong to the company"
+        # Agent-company contacts may work the ticket, but not request it
+        assert errors[8] == f"Contact id(s) {agency_agent_id} do not belong to the company"
+
+        tickets = (await db_session.execute(
+            select(Chamado).where(Chamado.empresa_id == empresa_id).order_by(Chamado.id)
+        )).scalars().all()
+        assert [t.titulo for t in tickets] == ["Legacy 1", "Legacy 2", "Legacy 3", "Legacy 5"]
+        assert len({t.numero for t in tickets}) == 4 and all(t.change_seq > 0 for t in tickets)
+        legacy_1 = tickets[0]
+        assert legacy_1.sla_resposta_ate is not None and legacy_1.criado_em < datetime.utcnow() - timedelta(days=29)
+        closed_ticket = tickets[1]
+        assert closed_ticket.sla_resolucao_ate is None and closed_ticket.sla_resposta_ate is None
+        assert tickets[3].agente_contato_id == agency_agent_id
+        comments = (await db_session.execute(
+            select(ChamadoComentario.comentario, ChamadoComentario.contato_id)
+            .where(ChamadoComentario.chamado_id == closed_ticket.id).order_by(ChamadoComentario.id)
+        )).all()
+        assert comments == [("first", None), ("second", agent_id)]
+        created_logs = await db_session.execute(
+            select(func.count(ChamadoLog.id)).where(ChamadoLog.id_alteracao == "CREATED", ChamadoLog.status_para_id.is_not(None))
+        )
+        assert created_logs.scalar_one() == 4
+        events = await db_session.execute(
+            select(func.count(OutboxEvent.id)).where(OutboxEvent.event_type == EventType.TICKET_CREATED)
+        )
+        assert events.scalar_one() == 4
+        # Deadlines already past at import are recorded as alerted instead of firing
+        alerted = await db_session.execute(
+            select(func.count(ChamadoSlaAlerta.id)).where(ChamadoSlaAlerta.chamado_id == legacy_1.id)
+        )
+        assert alerted.scalar_one() == 3
+
+        analytics = TicketAnalyticsService()
+        assert await analytics._counts_from_rollup(db_session, empresa_id, None) == \
+            await analytics._counts_from_tickets(db_session, empresa_id, None)
+
+        resumed = await TicketImporter(batch_size=3).run(
+            db_session, empresa_id, iter_records(io.StringIO(payload), "ndjson"), resume_after=6,
+        )
+        assert (resumed.imported, resumed.failed, resumed.checkpoint) == (1, 2, 9)
+
+    async def test_sla_filter_runs_in_sql_and_fills_pages(self, db_session: AsyncSession, test_factory):
+        """`sla` filtering uses the stored deadlines and agrees with the list `sla_status`."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        agent_id = agent.id
+        open_status, resolved_status = StatusChamado(nome="open"), StatusChamado(nome="resolved")
+        high = Prioridade(nome="high")
+        db_session.add_all([open_status, resolved_status, high])
+        await db_session.flush()
+
+        service = TicketService()
+        now = datetime.utcnow()
+        # (age in hours, assign agent, resolved): high = 8h response, 16h escalation, 24h resolution
+        shapes = [(1, False, False), (10, False, False), (10, True, False), (20, True, False),
+                  (30, True, False), (30, False, True), (50, True, True)] * 2
+        for i, (age, assigned, resolved) in enumerate(shapes):
+            ticket = await service.create_with_asset(
+                db_session, empresa_id, titulo=f"SLA {i}", prioridade_id=high.id,
+                status_id=resolved_status.id if resolved else open_status.id,
+            )
+            ticket.criado_em = now - timedelta(hours=age)
+            ticket.agente_contato_id = agent_id if assigned else None
+            await service.refresh_sla_deadlines(db_session, ticket, has_comment=False)
+        await db_session.commit()
+
+        everything = await service.list_tickets_page(db_session, empresa_id, limit=100)
+        expected = {}
+        for row in await _build_ticket_list_responses(db_session, everything["tickets"]):
+            expected.setdefault(row.sla_status, set()).add(row.id)
+        assert set(expected) == {"ok", "warning", "breach"}
+
+        for state in ("ok", "warning", "breach"):
+            seen, cursor = [], None
+            while True:
+                page = await service.list_tickets_page(db_session, empresa_id, {"sla": state}, limit=2, cursor=cursor)
+                assert len(page["tickets"]) == 2 or page["next_cursor"] is None
+                seen.extend(t.id for t in page["tickets"])
+                cursor = page["next_cursor"]
+                if not cursor:
+                    break
+            assert set(seen) == expected[state]
+            assert await service.count_tickets(db_session, empresa_id, {"sla": state}, use_cache=False) == len(seen)
+
+        with pytest.raises(ValidationError):
+            await service.list_tickets_page(db_session, empresa_id, {"sla": "late"})
+
+    async def test_ticket_search_uses_fulltext_index_ranked(self, db_session: AsyncSession, test_factory):
+        """`search` matches accent-insensitive word prefixes, ranks title hits first and follows updates."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        service = TicketService()
+        assert await ticket_search.backend(db_session) == SQLITE_FTS
+
+        body_hit = await service.create_with_asset(
+            db_session, empresa_id, titulo="Troca de toner", descricao="Agendar manutenção da impressora"
+        )
+        title_hit = await service.create_with_asset(db_session, empresa_id, titulo="Manutenção preventiva")
+        for i in range(3):
+            await service.create_with_asset(db_session, empresa_id, titulo=f"Impressora travada {i}")
+        miss = await service.create_with_asset(db_session, empresa_id, titulo="Senha expirada")
+        body_id, title_id, miss_id = body_hit.id, title_hit.id, miss.id
+        await db_session.commit()
+
+        page = await service.list_tickets_page(db_session, empresa_id, {"search": "manutencao"}, limit=10)
+        assert [t.id for t in page["tickets"]] == [title_id, body_id]
+        assert await service.count_tickets(db_session, empresa_id, {"search": "manut"}, use_cache=False) == 2
+
+        seen, cursor = [], None
+        while True:
+            page = await service.list_tickets_page(db_session, empresa_id, {"search": "impressora"}, limit=2, cursor=cursor)
+            seen.extend(t.id for t in page["tickets"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 4
+
+        await service.update_ticket(db_session, empresa_id, miss_id, 1, "admin", {"titulo": "Impressora sem senha"})
+        await db_session.commit()
+        assert miss_id in {t.id for t in await service.list_tickets(db_session, empresa_id, {"search": "IMPRESSORA"})}
+        assert await service.list_tickets(db_session, empresa_id, {"search": "expirada"}) == []
+
+    async def test_reference_registry_resolves_aliases_without_queries(self, db_session: AsyncSession, count_queries):
+        """Status/priority names resolve by EN/PT alias from memory and reload after writes."""
+        db_session.add_all([
+            StatusChamado(nome="Aberto"), StatusChamado(nome="Em Andamento"), StatusChamado(nome="Aguardando Cliente"),
+            Prioridade(nome="Baixa"), Prioridade(nome="Alta"),
+        ])
+        await db_session.commit()
+        await reference_data.load(db_session)
+
+        count_queries.clear()
+        assert (await reference_data.status_by_name(db_session, "open")).nome == "Aberto"
+        assert (await reference_data.status_by_name(db_session, "IN_PROGRESS")).nome == "Em Andamento"
+        assert (await reference_data.status_by_name(db_session, "pending_customer")).nome == "Aguardando Cliente"
+        assert (await reference_data.status_by_name(db_session, "andamento")).nome == "Em Andamento"
+        assert (await reference_data.priority_by_name(db_session, "high")).nome == "Alta"
+        assert (await reference_data.priority_by_name(db_session, "baixa")).nome == "Baixa"
+        assert await reference_data.status_by_name(db_session, "closed") is None
+        assert count_queries.statements == []
+
+        db_session.add(StatusChamado(nome="Fechado"))
+        await db_session.commit()
+        assert (await reference_data.status_by_name(db_session, "closed")).nome == "Fechado"
+
+        row = (await reference_data.priorities(db_session)).resolve("alta")
+        prioridade = await db_session.get(Prioridade, row.id)
+        prioridade.nome = "Urgente"
+        await db_session.commit()
+        assert (await reference_data.priority_by_name(db_session, "urgent")).id == row.id
+
+    async def test_routing_table_matches_multi_criteria_without_queries(
+        self, db_session: AsyncSession, test_factory, count_queries
+    ):
+        """Routing picks the most specific active rule from the compiled table and recompiles after writes."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        agents = [(await test_factory.create_contato(db_session, empresa_id, nome=f"Agent {i}")).id for i in range(5)]
+        hardware, high, printer = ChamadoCategoria(nome="Hardware"), Prioridade(nome="high"), TipoAtivo(nome="Impressora")
+        network, low = ChamadoCategoria(nome="Rede"), Prioridade(nome="low")
+        db_session.add_all([hardware, high, printer, network, low])
+        await db_session.flush()
+        hardware_id, high_id, printer_id = hardware.id, high.id, printer.id
+        network_id, low_id = network.id, low.id
+        ativo = Ativo(empresa_id=empresa_id, tag="PRN-001", serial_text="PRN-001", tipo_ativo_id=printer_id)
+        db_session.add(ativo)
+        await db_session.flush()
+        ativo_id = ativo.id
+        db_session.add_all([
+            HelpdeskRoutingRule(empresa_id=empresa_id, agente_contato_id=agents[0]),
+            HelpdeskRoutingRule(empresa_id=empresa_id, prioridade_id=high_id, agente_contato_id=agents[1]),
+            HelpdeskRoutingRule(empresa_id=empresa_id, categoria_id=hardware_id, agente_contato_id=agents[2]),
+            HelpdeskRoutingRule(
+                empresa_id=empresa_id, categoria_id=hardware_id, tipo_ativo_id=printer_id, agente_contato_id=agents[3]
+            ),
+            HelpdeskRoutingRule(empresa_id=empresa_id, origem="email", prioridade_id=high_id, agente_contato_id=agents[4]),
+            HelpdeskRoutingRule(empresa_id=empresa_id, categoria_id=hardware_id, agente_contato_id=agents[4], ativo=False),
+            HelpdeskRoutingRule(empresa_id=empresa_id, categoria_id=network_id, prioridade_id=low_id, agente_contato_id=agents[3]),
+        ])
+        await db_session.commit()
+
+        table = await routing_engine.table(db_session, empresa_id)
+        count_queries.clear()
+        assert table.route() == agents[0]
+        assert table.route(prioridade_id=high_id) == agents[1]
+        assert table.route(categoria_id=hardware_id, prioridade_id=high_id) == agents[2]
+        assert table.route(categoria_id=hardware_id, tipo_ativo_id=printer_id) == agents[3]
+        assert table.route(prioridade_id=high_id, origem="EMAIL") == agents[4]
+        # A category + priority rule matches a ticket on either criterion
+        assert table.route(categoria_id=network_id) == agents[3]
+        assert table.route(prioridade_id=low_id) == agents[3]
+        assert table.route(categoria_id=hardware_id, prioridade_id=low_id) == agents[2]
+        assert table.route(categoria_id=network_id, prioridade_id=high_id) == agents[3]
+        assert (await routing_engine.table(db_session, empresa_id)) is table
+        assert count_queries.statements == []
+
+        service = TicketService()
+        ticket = await service.create_with_asset(
+            db_session, empresa_id, ativo_id=ativo_id, titulo="Papel atolado", categoria_id=hardware_id
+        )
+        assert ticket.agente_contato_id == agents[3]
+
+        version = routing_engine.version(empresa_id)
+        rule = (await db_session.execute(
+            select(HelpdeskRoutingRule).where(HelpdeskRoutingRule.empresa_id == empresa_id, HelpdeskRoutingRule.ativo == False)
+        )).scalar_one()
+        rule.ativo = True
+        rule.origem = "web"
+        await db_session.commit()
+        assert routing_engine.version(empresa_id) > version
+        assert await routing_engine.route(db_session, empresa_id, categoria_id=hardware_id, origem="web") == agents[4]
+
+    async def test_ticket_notifications_are_queued_and_sent_in_batches(
+        self, db_session: AsyncSession, test_factory, monkeypatch
+    ):
+        """Updates only enqueue outbox rows; the worker sends them and backs off on SMTP failures."""
+        settings = get_settings()
+        monkeypatch.setattr(settings, "NOTIFY_ENABLED", True)
+        monkeypatch.setattr(settings, "SMTP_HOST", "smtp.example.com")
+
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        requester = await test_factory.create_contato(db_session, empresa_id, nome="Requester")
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        requester.email, agent.email = "req@example.com", "agent@example.com"
+        requester_id, agent_id = requester.id, agent.id
+        open_status, closed_status = StatusChamado(nome="Aberto"), StatusChamado(nome="Fechado")
+        db_session.add_all([open_status, closed_status])
+        await db_session.flush()
+        closed_id = closed_status.id
+
+        service = TicketService()
+        ticket = await service.create_with_asset(
+            db_session, empresa_id, solicitante_id=requester_id, titulo="Mouse", status_id=open_status.id
+        )
+        ticket_id = ticket.id
+        await service.update_ticket(db_session, empresa_id, ticket_id, agent_id, "agent", {"agente_contato_id": agent_id})
+        await service.update_ticket(db_session, empresa_id, ticket_id, agent_id, "agent", {"status_id": closed_id})
+        await db_session.commit()
+
+        queued = (await db_session.execute(
+            select(OutboxEvent).where(OutboxEvent.event_type == EventType.NOTIFICATION_EMAIL).order_by(OutboxEvent.id)
+        )).scalars().all()
+        assert [e.payload["kind"] for e in queued] == ["assigned", "status_changed", "concluded"]
+        assert queued[1].payload["to"] == ["agent@example.com", "req@example.com"]
+
+        class _Transport:
+            def __init__(self, fail: bool):
+                self.fail, self.sent, self.connected, self.last_used = fail, [], True, 0.0
+
+            async def send(self, msg):
+                if self.fail:
+                    raise ConnectionRefusedError("smtp down")
+                self.sent.append(msg)
+
+            async def close(self):
+                pass
+
+        factory = async_sessionmaker(bind=db_session.bind, expire_on_commit=False)
+        down = _Transport(fail=True)
+        assert await EmailDispatchWorker(factory, down).run_once() == 3
+        db_session.expire_all()
+        rows = (await db_session.execute(
+            select(OutboxEvent).where(OutboxEvent.event_type == EventType.NOTIFICATION_EMAIL)
+        )).scalars().all()
+        assert {(r.status, r.retry_count) for r in rows} == {(EventStatus.RETRYING, 1)}
+        assert all(r.next_retry_at > datetime.utcnow() for r in rows)
+        assert await EmailDispatchWorker(factory, down).run_once() == 0
+
+        await db_session.execute(update(OutboxEvent).values(next_retry_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db_session.commit()
+        up = _Transport(fail=False)
+        assert await EmailDispatchWorker(factory, up).run_once() == 3
+        assert [m["To"] for m in up.sent] == ["agent@example.com", "agent@example.com, req@example.com", "agent@example.com, req@example.com"]
+        assert up.sent[1]["Subject"].startswith("[Chamado] Status: Aberto → Fechado")
+        db_session.expire_all()
+        statuses = (await db_session.execute(
+            select(OutboxEvent.status).where(OutboxEvent.event_type == EventType.NOTIFICATION_EMAIL)
+        )).scalars().all()
+        assert set(statuses) == {EventStatus.PUBLISHED}
+
+
+@pytest.mark.unit
+class TestDataExport:
+    """Unit tests for DataExporter."""
+
+    async def test_export_streams_tenant_rows_in_chunks(self, db_session: AsyncSession, test_factory):
+        """Exports stream CSV / NDJSON in chunks, scoped to the tenant and the date range."""
+        # empresa 1 exports every tenant, so export from the second one
+        other = await test_factory.create_empresa(db_session, nome="Other")
+        other_id = other.id
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        open_status = StatusChamado(nome="open")
+        db_session.add(open_status)
+        await db_session.flush()
+        now = datetime.utcnow()
+        ticket_ids = []
+        for days in (10, 3, 2, 1, 0):
+            ticket = await test_factory.create_chamado(db_session, empresa_id, titulo=f"Ticket {days}")
+            ticket.criado_em = now - timedelta(days=days)
+            ticket.status_id = open_status.id
+            ticket_ids.append(ticket.id)
+        foreign = await test_factory.create_chamado(db_session, other_id, titulo="Foreign")
+        db_session.add_all([
+            OrdemServico(numero_os="OS-1", chamado_id=ticket_ids[1], data_hora_inicio=now - timedelta(days=3)),
+            OrdemServico(numero_os="OS-2", chamado_id=ticket_ids[2], data_hora_inicio=now - timedelta(days=20)),
+            OrdemServico(numero_os="OS-3", chamado_id=foreign.id, data_hora_inicio=now),
+        ])
+        await db_session.commit()
+
+        exporter = DataExporter(
+            session_factory=async_sessionmaker(bind=db_session.bind, expire_on_commit=False), chunk_size=2
+        )
+
+        async def collect(stream):
+            return [chunk async for chunk in stream]
+
+        period = ExportRange(date_from=now - timedelta(days=5))
+        chunks = await collect(exporter.tickets(empresa_id, "csv", period))
+        # header, one chunk per 2 rows, footer
+        assert len(chunks) == 1 + 2 + 1
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+        assert [int(r["id"]) for r in rows] == ticket_ids[1:]
+        assert {r["status"] for r in rows} == {"open"} and {r["empresa_id"] for r in rows} == {str(empresa_id)}
+
+        lines = b"".join(await collect(exporter.service_orders(empresa_id, "ndjson", ExportRange()))).splitlines()
+        assert [json.loads(line)["numero_os"] for line in lines] == ["OS-1", "OS-2"]
+        recent = await collect(exporter.service_orders(empresa_id, "ndjson", period))
+        assert [json.loads(line)["numero_os"] for line in b"".join(recent).splitlines()] == ["OS-1"]
+
+        with pytest.raises(ValidationError):
+            exporter.tickets(empresa_id, "xlsx", period)
+        with pytest.raises(ValidationError):
+            exporter.tickets(empresa_id, "csv", period, date_field="titulo")
+        with pytest.raises(ValidationError):
+            ExportRange(date_from=now, date_to=now - timedelta(days=1))
+
 
 @pytest.mark.unit
 class TestAssetService:
@@ -327,6 +1422,266 @@ class TestAssetService:
         assert asset.empresa_id == empresa.id
         assert asset.stock_unit_id == 1
 
+    async def test_serials_are_allocated_in_blocks(self, db_session: AsyncSession, test_factory):
+        """Serials come from per-tenant, per-kind counter blocks and roll back with the transaction."""
+        empresa = await test_factory.create_empresa(db_session)
+        other = await test_factory.create_empresa(db_session, nome="Other")
+        empresa_id, other_id = empresa.id, other.id
+        await db_session.commit()
+
+        serials = SerialService()
+        block = await serials.reserve_serials(db_session, empresa_id, "ESTOQUE", 3)
+        assert block == [f"EMP-{empresa_id}-ESTOQUE-00000{n}" for n in (1, 2, 3)]
+        assert await serials.generate_estoque_serial(db_session, empresa_id) == f"EMP-{empresa_id}-ESTOQUE-000004"
+        assert await serials.generate_ativo_serial(db_session, empresa_id) == f"EMP-{empresa_id}-ATIVO-000001"
+        assert await serials.generate_estoque_serial(db_session, other_id) == f"EMP-{other_id}-ESTOQUE-000001"
+        await db_session.commit()
+
+        await serials.reserve_serials(db_session, empresa_id, "ESTOQUE", 10)
+        await db_session.rollback()
+        assert await serials.generate_estoque_serial(db_session, empresa_id) == f"EMP-{empresa_id}-ESTOQUE-000005"
+
+        assert await serials.validate_serial_format(block[0], "ESTOQUE")
+        assert await serials.validate_serial_format("EMP-1-1698765432000-1234-ATIVO", "ATIVO")
+        assert not await serials.validate_serial_format(block[0], "ATIVO")
+        with pytest.raises(SerialGenerationError):
+            await serials.reserve_serials(db_session, empresa_id, "OTHER", 1)
+
+    async def test_bulk_intake_inserts_a_shipment_in_batches(self, db_session: AsyncSession, test_factory):
+        """A bulk intake writes stock, assets and movements together and rejects conflicting serials."""
+        empresa = await test_factory.create_empresa(db_session)
+        catalogo = CatalogoPeca(nome="Notebook")
+        db_session.add(catalogo)
+        await db_session.flush()
+        empresa_id, catalogo_id = empresa.id, catalogo.id
+        await db_session.commit()
+
+        svc = InventoryService()
+        summary = await svc.bulk_intake(
+            db_session, empresa_id, catalogo_id,
+            units=[{"serial": "SN-A"}, {"serial": "SN-B", "qtd": 2}], quantity=3, observacao="NF 1",
+        )
+        await db_session.commit()
+        assert summary == {
+            "catalogo_peca_id": catalogo_id, "received": 5, "quantity": 6, "assets_created": 5,
+            "generated_serials": 3, "first_serial": "SN-A", "last_serial": f"EMP-{empresa_id}-ESTOQUE-000003",
+        }
+
+        stock = (await db_session.execute(
+            select(Estoque.id, Estoque.serial, Estoque.vinculado_ativo_id).where(Estoque.empresa_id == empresa_id).order_by(Estoque.id)
+        )).all()
+        assert [row.serial for row in stock][:3] == ["SN-A", "SN-B", f"EMP-{empresa_id}-ESTOQUE-000001"]
+        assets = dict((await db_session.execute(
+            select(Ativo.stock_unit_id, Ativo.id).where(Ativo.empresa_id == empresa_id)
+        )).all())
+        assert {row.vinculado_ativo_id for row in stock} == set(assets.values())
+        assert all(assets[row.id] == row.vinculado_ativo_id for row in stock)
+        movements = (await db_session.execute(
+            select(MovimentacaoEstoque.destino_ativo_id, MovimentacaoEstoque.quantidade, TipoMovimentacao.nome)
+            .join(TipoMovimentacao).where(MovimentacaoEstoque.estoque_id.in_([row.id for row in stock]))
+        )).all()
+        assert len(movements) == 5 and {m.nome for m in movements} == {"Entrada"}
+        assert sum(m.quantidade for m in movements) == 6
+
+        with pytest.raises(ConflictError):
+            await svc.bulk_intake(db_session, empresa_id, catalogo_id, units=[{"serial": "SN-C"}, {"serial": "SN-B"}])
+        await db_session.rollback()
+        with pytest.raises(ValidationError):
+            await svc.bulk_intake(db_session, empresa_id, catalogo_id, units=[{"serial": "SN-D"}, {"serial": "SN-D"}])
+        assert await db_session.scalar(select(func.count(Estoque.id)).where(Estoque.empresa_id == empresa_id)) == 5
+
+    async def test_stock_levels_follow_movements_and_rebuild(self, db_session: AsyncSession, test_factory):
+        """Intakes and movements keep stock_level current; a rebuild from the ledger gives the same levels."""
+        empresa = await test_factory.create_empresa(db_session)
+        catalogo = CatalogoPeca(nome="Monitor")
+        novo, reparo = StatusEstoque(nome="Novo (stock test)"), StatusEstoque(nome="Reparo (stock test)")
+        db_session.add_all([catalogo, novo, reparo])
+        await db_session.flush()
+        empresa_id, catalogo_id, novo_id, reparo_id = empresa.id, catalogo.id, novo.id, reparo.id
+        # Legacy unit recorded before intakes wrote movements; the backfill gives it an opening balance
+        legacy = Estoque(empresa_id=empresa_id, catalogo_peca_id=catalogo_id, serial="OLD-1", status_estoque_id=novo_id, qtd=2)
+        db_session.add(legacy)
+        await db_session.flush()
+        legacy_id = legacy.id
+        assert await stock_levels.rebuild(db_session, empresa_id) == 1
+        await db_session.commit()
+
+        svc = InventoryService()
+        await svc.bulk_intake(db_session, empresa_id, catalogo_id, quantity=4, status_estoque_id=novo_id, auto_create_asset=False)
+        estoque, _ = await svc.intake(db_session, empresa_id, catalogo_id, status_estoque_id=novo_id, qtd=3, auto_create_asset=False)
+        moves = [
+            {"estoque_id": unit_id, "tipo_movimentacao_id": await svc._movement_type_id(db_session, None),
+             "origem_status_estoque_id": novo_id, "destino_status_estoque_id": reparo_id, "quantidade": 1}
+            for unit_id in (estoque.id, legacy_id)
+        ]
+        await svc.record_movements(db_session, empresa_id, catalogo_id, moves)
+        await db_session.commit()
+
+        assert await stock_levels.available(db_session, empresa_id, catalogo_id, novo_id) == 7
+        assert await stock_levels.available(db_session, empresa_id, catalogo_id, reparo_id) == 2
+        assert await stock_levels.available(db_session, empresa_id, catalogo_id) == 9
+        assert await svc.validate_stock_availability(db_session, empresa_id, catalogo_id, 9)
+        assert not await svc.validate_stock_availability(db_session, empresa_id, catalogo_id, 3, reparo_id)
+
+        def _snapshot(levels):
+            return {(level.status_estoque_id, level.quantidade) for level in levels}
+
+        before = _snapshot(await stock_levels.levels(db_session, empresa_id, catalogo_id))
+        await db_session.execute(delete(StockLevel).where(StockLevel.empresa_id == empresa_id))
+        assert await stock_levels.rebuild(db_session, empresa_id) == 2
+        await db_session.commit()
+        db_session.expire_all()
+        after = _snapshot(await stock_levels.levels(db_session, empresa_id, catalogo_id))
+        # The moved legacy unit keeps its opening balance: 2 - 1 in novo, +1 in reparo
+        assert before == {(novo_id, 7), (reparo_id, 2)}
+        assert after == before
+
+    async def test_stock_levels_follow_orm_ledger_edits(self, db_session: AsyncSession, test_factory):
+        """Movements and units written through the ORM (admin CRUD) keep stock_level equal to a rebuild."""
+        empresa = await test_factory.create_empresa(db_session)
+        catalogo = CatalogoPeca(nome="Teclado")
+        novo, reparo = StatusEstoque(nome="Novo (ledger test)"), StatusEstoque(nome="Reparo (ledger test)")
+        db_session.add_all([catalogo, novo, reparo])
+        await db_session.flush()
+        empresa_id, catalogo_id, novo_id, reparo_id = empresa.id, catalogo.id, novo.id, reparo.id
+        legacy = Estoque(empresa_id=empresa_id, catalogo_peca_id=catalogo_id, serial="OLD-K", status_estoque_id=novo_id, qtd=2)
+        db_session.add(legacy)
+        await db_session.flush()
+        legacy_id = legacy.id
+        await stock_levels.rebuild(db_session, empresa_id)
+        svc = InventoryService()
+        estoque, _ = await svc.intake(db_session, empresa_id, catalogo_id, status_estoque_id=novo_id, qtd=3, auto_create_asset=False)
+        estoque_id = estoque.id
+        tipo_id = await svc._movement_type_id(db_session, None)
+        await db_session.commit()
+
+        async def _levels():
+            return {(level.status_estoque_id, level.quantidade) for level in await stock_levels.levels(db_session, empresa_id)}
+
+        async def _assert_matches_rebuild(expected):
+            live = await _levels()
+            await db_session.execute(delete(StockLevel).where(StockLevel.empresa_id == empresa_id))
+            await stock_levels.rebuild(db_session, empresa_id)
+            db_session.expire_all()
+            assert live == await _levels() == expected
+            await db_session.rollback()
+
+        move = await create_item("MovimentacaoEstoque", {
+            "estoque_id": estoque_id, "tipo_movimentacao_id": tipo_id,
+            "origem_status_estoque_id": novo_id, "destino_status_estoque_id": reparo_id, "quantidade": 2,
+        }, db_session, None)
+        await _assert_matches_rebuild({(novo_id, 3), (reparo_id, 2)})
+        await update_item("MovimentacaoEstoque", move["id"], {"quantidade": 1}, db_session, None)
+        await _assert_matches_rebuild({(novo_id, 4), (reparo_id, 1)})
+        await delete_item("MovimentacaoEstoque", move["id"], db_session, None)
+        await _assert_matches_rebuild({(novo_id, 5)})
+
+        # An intake recorded for the legacy unit replaces its opening balance
+        db_session.add(MovimentacaoEstoque(
+            estoque_id=legacy_id, tipo_movimentacao_id=tipo_id, destino_status_estoque_id=reparo_id, quantidade=2,
+        ))
+        await db_session.commit()
+        await _assert_matches_rebuild({(novo_id, 3), (reparo_id, 2)})
+
+        # A status change moves its unit
+        await create_item("MovimentacaoEstoque", {
+            "estoque_id": estoque_id, "tipo_movimentacao_id": tipo_id,
+            "origem_status_estoque_id": novo_id, "destino_status_estoque_id": reparo_id, "quantidade": 3,
+        }, db_session, None)
+        assert (await get_item("Estoque", estoque_id, db_session, None))["status_estoque_id"] == reparo_id
+        await _assert_matches_rebuild({(reparo_id, 5)})
+
+        # Admin unit writes go through the ledger; a pre-ledger unit keeps its opening balance when it moves
+        spare = Estoque(empresa_id=empresa_id, catalogo_peca_id=catalogo_id, serial="OLD-M", status_estoque_id=novo_id, qtd=4)
+        db_session.add(spare)
+        await db_session.flush()
+        spare_id = spare.id
+        await stock_levels.rebuild(db_session, empresa_id)
+        await db_session.commit()
+        await update_item("Estoque", spare_id, {"status_estoque_id": reparo_id}, db_session, None)
+        await _assert_matches_rebuild({(reparo_id, 9)})
+        created = await create_item(
+            "Estoque", {"empresa_id": empresa_id, "catalogo_peca_id": catalogo_id, "status_estoque_id": novo_id, "qtd": 5},
+            db_session, None,
+        )
+        await _assert_matches_rebuild({(novo_id, 5), (reparo_id, 9)})
+        renamed = await update_item("Estoque", created["id"], {"serial": "RENAMED", "qtd": 7}, db_session, None)
+        assert renamed["serial"] == "RENAMED"
+        await _assert_matches_rebuild({(novo_id, 7), (reparo_id, 9)})
+        await update_item("Estoque", created["id"], {"qtd": 2, "status_estoque_id": reparo_id}, db_session, None)
+        await _assert_matches_rebuild({(reparo_id, 11)})
+        await update_item("Estoque", spare_id, {"qtd": 1}, db_session, None)
+        await _assert_matches_rebuild({(reparo_id, 8)})
+        scrap = Estoque(empresa_id=empresa_id, catalogo_peca_id=catalogo_id, serial="OLD-S", status_estoque_id=novo_id, qtd=6)
+        db_session.add(scrap)
+        await db_session.flush()
+        scrap_id = scrap.id
+        await stock_levels.rebuild(db_session, empresa_id)
+        await db_session.commit()
+        await delete_item("Estoque", scrap_id, db_session, None)
+        await _assert_matches_rebuild({(reparo_id, 8)})
+
+        with pytest.raises(HTTPException) as exc:
+            await delete_item("StockLevel", 1, db_session, None)
+        assert exc.value.status_code == 405
+
+    async def test_asset_listing_is_paged_and_projected(self, db_session: AsyncSession, test_factory):
+        """Asset pages are read by keyset with filters, sorting and joined names."""
+        empresa = await test_factory.create_empresa(db_session)
+        other = await test_factory.create_empresa(db_session, nome="Other")
+        tipo = TipoAtivo(nome="Notebook (listing test)")
+        local = LocalInstalacao(nome="Sala 1 (listing test)")
+        repair = StatusAtivo(nome="Manutenção (listing test)")
+        db_session.add_all([tipo, local, repair])
+        await db_session.flush()
+        empresa_id, tipo_id, local_id, repair_id = empresa.id, tipo.id, local.id, repair.id
+        db_session.add_all([
+            Ativo(empresa_id=empresa_id, serial_text=f"S-{n:02d}", tag=f"TAG-{n:02d}" if n % 3 else None,
+                  tipo_ativo_id=tipo_id if n % 2 else None, local_instalacao_id=local_id,
+                  status_ativo_id=repair_id if n == 7 else None)
+            for n in range(1, 8)
+        ] + [Ativo(empresa_id=other.id, serial_text="S-99", tipo_ativo_id=tipo_id)])
+        await db_session.commit()
+
+        repo = AtivoRepository()
+        first = await repo.list_page(db_session, empresa_id, sort="serial_text", limit=3)
+        assert [row.serial_text for row in first["items"]] == ["S-01", "S-02", "S-03"]
+        assert first["prev_cursor"] is None
+        row = first["items"][0]
+        assert (row.tipo_nome, row.local_nome, row.status_nome) == ("Notebook (listing test)", "Sala 1 (listing test)", None)
+
+        second = await repo.list_page(db_session, empresa_id, sort="serial_text", limit=3, cursor=first["next_cursor"])
+        third = await repo.list_page(db_session, empresa_id, sort="serial_text", limit=3, cursor=second["next_cursor"])
+        assert [row.serial_text for row in second["items"] + third["items"]] == ["S-04", "S-05", "S-06", "S-07"]
+        assert third["next_cursor"] is None
+        back = await repo.list_page(db_session, empresa_id, sort="serial_text", limit=3, cursor=second["prev_cursor"])
+        assert [row.serial_text for row in back["items"]] == ["S-01", "S-02", "S-03"]
+
+        # Nullable sort column: every row is still reached through the cursors
+        seen, cursor = [], None
+        while True:
+            page = await repo.list_page(db_session, empresa_id, sort="-tag", limit=2, cursor=cursor)
+            seen += [row.serial_text for row in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert seen[:5] == ["S-07", "S-05", "S-04", "S-02", "S-01"] and sorted(seen[5:]) == ["S-03", "S-06"]
+
+        filters = {"tipo": "notebook (listing test)", "search": "S-0"}
+        odd = await repo.list_page(db_session, empresa_id, filters, sort="-serial_text", limit=10)
+        assert [row.serial_text for row in odd["items"]] == ["S-07", "S-05", "S-03", "S-01"]
+        assert await repo.count(db_session, empresa_id, filters) == 4
+        assert await repo.count(db_session, empresa_id, {"tipo_ativo_id": tipo_id, "local_instalacao_id": local_id}) == 4
+        # Name filters ignore case, accents and spaces (the assets page sends slugs)
+        repairs = await repo.list_page(db_session, empresa_id, {"status": "manutencao (listing test)"})
+        assert [row.serial_text for row in repairs["items"]] == ["S-07"]
+        assert await repo.count(db_session, empresa_id, {"local": "sala1 (listing test)"}) == 7
+        assert await repo.count(db_session, empresa_id, {"tipo": "unknown (listing test)"}) == 0
+        with pytest.raises(ValidationError):
+            await repo.list_page(db_session, empresa_id, sort="status")
+        with pytest.raises(ValidationError):
+            await repo.list_page(db_session, empresa_id, sort="tag", cursor=first["next_cursor"])
+
 
 @pytest.mark.performance
 class TestHelpdeskPerformance:
@@ -343,7 +1698,46 @@ class TestHelpdeskPerformance:
         
         assert response.status_code == status.HTTP_200_OK
         assert performance_timer.duration < 1.0  # Should complete within 1 second
-    
+
+    async def test_ticket_list_builder_query_count_is_constant(
+        self, db_session: AsyncSession, test_factory, count_queries
+    ):
+        """Building a ticket page issues the same number of statements for 3 or 30 rows."""
+        empresa = await test_factory.create_empresa(db_session)
+        empresa_id = empresa.id
+        requester = await test_factory.create_contato(db_session, empresa_id, nome="Requester")
+        agent = await test_factory.create_contato(db_session, empresa_id, nome="Agent")
+        status_row = StatusChamado(nome="Aberto")
+        priority_row = Prioridade(nome="Alta")
+        db_session.add_all([status_row, priority_row])
+        await db_session.flush()
+        for i in range(30):
+            ticket = Chamado(
+                numero=f"E{empresa_id}WEB-{i + 1}", empresa_id=empresa_id, titulo=f"T{i}",
+                status_id=status_row.id, prioridade_id=priority_row.id,
+                requisitante_contato_id=requester.id, agente_contato_id=agent.id if i % 2 else None,
+            )
+            db_session.add(ticket)
+            await db_session.flush()
+            db_session.add(ChamadoComentario(chamado_id=ticket.id, contato_id=requester.id, comentario="hi"))
+        await db_session.commit()
+
+        ticket_service = TicketService()
+        await reference_data.load(db_session)
+        counts = {}
+        for page_size in (3, 30):
+            page = await ticket_service.list_tickets_page(db_session, empresa_id, limit=page_size)
+            db_session.expunge_all()
+            count_queries.clear()
+            responses = await _build_ticket_list_responses(db_session, page["tickets"])
+            counts[page_size] = len(count_queries)
+            assert len(responses) == page_size
+            assert all(r.requisitante and r.requisitante.nome == "Requester" for r in responses)
+            assert all(len(r.comentarios) == 1 for r in responses)
+
+        assert counts[3] == counts[30]
+        assert counts[30] <= 2  # comments, contacts; lookups come from the registry
+
     async def test_asset_list_performance(self, client: AsyncClient, authenticated_user: dict, performance_timer):
         """Test asset listing performance."""
         performance_timer.start()
@@ -356,6 +1750,23 @@ class TestHelpdeskPerformance:
         assert response.status_code == status.HTTP_200_OK
         assert performance_timer.duration < 1.0  # Should complete within 1 second
 
+    async def test_email_templates_render_from_compiled_cache(self):
+        """Email templates are compiled up front and identical renders are served from the cache."""
+        engine = EmailTemplateEngine(cache_size=8)
+        assert engine.preload() >= 9
+        ctx = {"numero": "E1WEB-7", "old_status": "Aberto", "new_status": "Fechado", "comment": "<b>ok</b>"}
+
+        html, text = engine.render("ticket_status_changed.html", ctx)
+        assert "&lt;b&gt;ok&lt;/b&gt;" in html
+        assert "E1WEB-7" in text and "<" not in text.replace("<b>ok</b>", "")
+        for _ in range(20):
+            assert engine.render("ticket_status_changed.html", dict(ctx)) == (html, text)
+        assert engine.render("ticket_status_changed.html", {**ctx, "text_fallback": "plain"})[1] == "plain"
+
+        stats = engine.get_stats()
+        assert (stats["hits"], stats["misses"]) == (20, 2)
+        assert stats["render_time"]["count"] >= 2
+
 
 @pytest.mark.security
 class TestHelpdeskSecurity: